@@ -3,6 +3,7 @@
 Gestión de personal, horarios, rutas, fichajes y bienestar del equipo
 """
 from .base_agent import BaseAgent
+from .shared_config import load_config_file
 from typing import Dict, Any, Optional
 import logging
 
@@ -24,17 +25,9 @@ class Afrodita(BaseAgent):
     """
     
     def __init__(self):
-        # Cargar configuración desde prompts.json
-        import os
-        import json
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        prompts_path = os.path.join(base_dir, "config", "prompts.json")
-        
-        # Cargar config de AFRODITA si existe, sino usar defaults
+        # Config de AFRODITA desde prompts.json (compartida) si existe, sino usar defaults
         try:
-            with open(prompts_path, "r", encoding="utf-8") as f:
-                config = json.load(f)
-            afrodita_config = config["zeus_prime_v1"]["agents"].get("AFRODITA", {})
+            afrodita_config = load_config_file("prompts.json")["zeus_prime_v1"]["agents"].get("AFRODITA", {})
             system_prompt = afrodita_config.get("prompt", None)
             temperature = afrodita_config.get("parameters", {}).get("temperature", 0.7)
             max_tokens = afrodita_config.get("parameters", {}).get("max_tokens", 2000)
@@ -3,12 +3,12 @@
 Agente especializado en Legal y Protección de Datos
 """
 
-import json
 import uuid
 import logging
 from datetime import datetime
 from typing import Dict, Any, Optional
 from agents.base_agent import BaseAgent
+from agents.shared_config import agent_prompt_config
 
 logger = logging.getLogger(__name__)
 
@@ -20,14 +20,8 @@ class Justicia(BaseAgent):
     """
     
     def __init__(self):
-        # Cargar configuración desde prompts.json
-        import os
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        prompts_path = os.path.join(base_dir, "config", "prompts.json")
-        with open(prompts_path, "r", encoding="utf-8") as f:
-            config = json.load(f)
-        
-        justicia_config = config["zeus_prime_v1"]["agents"]["JUSTICIA"]
+        # Configuración desde prompts.json (parseada una vez por proceso, compartida)
+        justicia_config = agent_prompt_config("JUSTICIA")
         
         super().__init__(
             name="JUSTICIA",
@@ -3,10 +3,10 @@
 Agente especializado en Marketing, SEO y Growth
 """
 
-import json
 import re
 from typing import Dict, Any
 from agents.base_agent import BaseAgent
+from agents.shared_config import agent_prompt_config
 
 
 def _needs_fiscal_context(message: str) -> bool:
@@ -46,14 +46,8 @@ class Perseo(BaseAgent):
     """
     
     def __init__(self):
-        # Cargar configuración desde prompts.json
-        import os
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        prompts_path = os.path.join(base_dir, "config", "prompts.json")
-        with open(prompts_path, "r", encoding="utf-8") as f:
-            config = json.load(f)
-        
-        perseo_config = config["zeus_prime_v1"]["agents"]["PERSEO"]
+        # Configuración desde prompts.json (parseada una vez por proceso, compartida)
+        perseo_config = agent_prompt_config("PERSEO")
         
         super().__init__(
             name="PERSEO",
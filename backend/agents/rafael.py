@@ -3,11 +3,11 @@
 Agente especializado en Fiscalidad y Contabilidad
 """
 
-import json
 import uuid
 import logging
 from typing import Dict, Any, Optional
 from agents.base_agent import BaseAgent
+from agents.shared_config import agent_prompt_config
 
 logger = logging.getLogger(__name__)
 
@@ -19,14 +19,8 @@ class Rafael(BaseAgent):
     """
     
     def __init__(self):
-        # Cargar configuración desde prompts.json
-        import os
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        prompts_path = os.path.join(base_dir, "config", "prompts.json")
-        with open(prompts_path, "r", encoding="utf-8") as f:
-            config = json.load(f)
-        
-        rafael_config = config["zeus_prime_v1"]["agents"]["RAFAEL"]
+        # Configuración desde prompts.json (parseada una vez por proceso, compartida)
+        rafael_config = agent_prompt_config("RAFAEL")
         
         super().__init__(
             name="RAFAEL",
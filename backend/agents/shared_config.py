@@ -0,0 +1,49 @@
+"""
+Configuración compartida de agentes (config/*.json).
+
+Cada fichero se lee y parsea una sola vez por proceso y se entrega congelado
+(MappingProxyType / tuplas): todos los agentes comparten la misma estructura y
+ninguno puede mutarla por accidente.
+"""
+
+import json
+import os
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Mapping
+
+_CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config")
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+@lru_cache(maxsize=None)
+def load_config_file(filename: str) -> Mapping[str, Any]:
+    """config/<filename> parseado y congelado. FileNotFoundError/ValueError se propagan."""
+    with open(os.path.join(_CONFIG_DIR, filename), "r", encoding="utf-8") as f:
+        return _freeze(json.load(f))
+
+
+def agent_prompt_config(agent_name: str) -> Mapping[str, Any]:
+    """Sección zeus_prime_v1.agents.<AGENTE> de prompts.json (KeyError si no existe)."""
+    return load_config_file("prompts.json")["zeus_prime_v1"]["agents"][agent_name]
+
+
+def system_prompt_config() -> Mapping[str, Any]:
+    """Sección zeus_prime_v1.system de prompts.json (ZEUS CORE)."""
+    return load_config_file("prompts.json")["zeus_prime_v1"]["system"]
+
+
+def orchestration_config() -> Mapping[str, Any]:
+    """config/zeus_core_config.json, o {} si no existe."""
+    try:
+        return load_config_file("zeus_core_config.json")
+    except FileNotFoundError:
+        return _EMPTY
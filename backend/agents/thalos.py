@@ -4,9 +4,9 @@ Agente especializado en Seguridad y Ciberdefensa
 ⚠️ CON SAFEGUARDS ESPECIALES PARA PROTEGER AL CREADOR
 """
 
-import json
 from typing import Dict, Any
 from agents.base_agent import BaseAgent
+from agents.shared_config import agent_prompt_config
 
 
 class Thalos(BaseAgent):
@@ -37,14 +37,8 @@ class Thalos(BaseAgent):
     ]
     
     def __init__(self):
-        # Cargar configuración desde prompts.json
-        import os
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        prompts_path = os.path.join(base_dir, "config", "prompts.json")
-        with open(prompts_path, "r", encoding="utf-8") as f:
-            config = json.load(f)
-        
-        thalos_config = config["zeus_prime_v1"]["agents"]["THALOS"]
+        # Configuración desde prompts.json (parseada una vez por proceso, compartida)
+        thalos_config = agent_prompt_config("THALOS")
         
         super().__init__(
             name="THALOS",
@@ -3,10 +3,10 @@
 El cerebro central que coordina todos los agentes
 """
 
-import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, TYPE_CHECKING
 from agents.base_agent import BaseAgent
+from agents.shared_config import orchestration_config, system_prompt_config
 from services.activity_logger import activity_logger
 
 if TYPE_CHECKING:
@@ -20,14 +20,8 @@ class ZeusCore(BaseAgent):
     """
     
     def __init__(self):
-        # Cargar configuración desde prompts.json
-        import os
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        prompts_path = os.path.join(base_dir, "config", "prompts.json")
-        with open(prompts_path, "r", encoding="utf-8") as f:
-            config = json.load(f)
-        
-        zeus_config = config["zeus_prime_v1"]["system"]
+        # Configuración desde prompts.json (parseada una vez por proceso, compartida)
+        zeus_config = system_prompt_config()
         
         super().__init__(
             name="ZEUS CORE",
@@ -38,12 +32,10 @@ class ZeusCore(BaseAgent):
         )
         
         # Cargar configuración de comportamiento y orquestación
-        zeus_core_config_path = os.path.join(base_dir, "config", "zeus_core_config.json")
-        try:
-            with open(zeus_core_config_path, "r", encoding="utf-8") as f:
-                self.orchestration_config = json.load(f)
+        self.orchestration_config = orchestration_config()
+        if self.orchestration_config:
             print("⚙️ [ZEUS] Configuración de orquestación cargada")
-        except FileNotFoundError:
+        else:
             print("⚠️ [ZEUS] Configuración de orquestación no encontrada, usando defaults")
             self.orchestration_config = {
                 "project_state_engine": {"default_state": "PRE_LAUNCH", "allowed_states": []},
@@ -0,0 +1,50 @@
+"""sales_daily_rollup — agregado diario de ventas TPV/CMR
+
+Revision ID: 0043
+Revises: 0042
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0043"
+down_revision = "0042"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    if "sales_daily_rollup" not in inspect(bind).get_table_names():
+        op.create_table(
+            "sales_daily_rollup",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("company_id", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("channel", sa.String(16), nullable=False),
+            sa.Column("payment_method", sa.String(30), nullable=False),
+            sa.Column("vat_band", sa.String(8), nullable=False),
+            sa.Column("sales_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("lines_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("base_amount", sa.Numeric(14, 2), nullable=False, server_default="0"),
+            sa.Column("tax_amount", sa.Numeric(14, 2), nullable=False, server_default="0"),
+            sa.Column("recargo_amount", sa.Numeric(14, 2), nullable=False, server_default="0"),
+            sa.Column("total_amount", sa.Numeric(14, 2), nullable=False, server_default="0"),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.UniqueConstraint(
+                "company_id", "user_id", "day", "channel", "payment_method", "vat_band",
+                name="uq_sales_daily_rollup_key",
+            ),
+        )
+        op.create_index("ix_sales_daily_rollup_company_id", "sales_daily_rollup", ["company_id"])
+        op.create_index("ix_sales_daily_rollup_user_id", "sales_daily_rollup", ["user_id"])
+        op.create_index("ix_sales_daily_rollup_day", "sales_daily_rollup", ["day"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_sales_daily_rollup_day", table_name="sales_daily_rollup")
+    op.drop_index("ix_sales_daily_rollup_user_id", table_name="sales_daily_rollup")
+    op.drop_index("ix_sales_daily_rollup_company_id", table_name="sales_daily_rollup")
+    op.drop_table("sales_daily_rollup")
@@ -0,0 +1,66 @@
+"""cashflow_balance_snapshots + cashflow_daily_aggregates — saldo O(1) y momentos diarios
+
+Revision ID: 0044
+Revises: 0043
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0044"
+down_revision = "0043"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    insp = inspect(bind)
+    tables = insp.get_table_names()
+    if "cashflow_ledger" in tables:
+        existing = {ix["name"] for ix in insp.get_indexes("cashflow_ledger")}
+        if "ix_cashflow_ledger_company_id_id" not in existing:
+            op.create_index("ix_cashflow_ledger_company_id_id", "cashflow_ledger", ["company_id", "id"])
+        if "ix_cashflow_ledger_company_created" not in existing:
+            op.create_index("ix_cashflow_ledger_company_created", "cashflow_ledger", ["company_id", "created_at"])
+    if "cashflow_balance_snapshots" not in tables:
+        op.create_table(
+            "cashflow_balance_snapshots",
+            sa.Column(
+                "company_id", sa.Integer(), sa.ForeignKey("companies.id", ondelete="CASCADE"), primary_key=True
+            ),
+            sa.Column("total_in", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("total_out", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("entries_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("last_entry_id", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+    if "cashflow_daily_aggregates" not in tables:
+        op.create_table(
+            "cashflow_daily_aggregates",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "company_id", sa.Integer(), sa.ForeignKey("companies.id", ondelete="CASCADE"), nullable=False
+            ),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("source", sa.String(64), nullable=False),
+            sa.Column("direction", sa.String(8), nullable=False),
+            sa.Column("entries_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("amount_sum", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("amount_sumsq", sa.Float(), nullable=False, server_default="0"),
+            sa.UniqueConstraint("company_id", "day", "source", "direction", name="uq_cashflow_daily_aggregate_key"),
+        )
+        op.create_index("ix_cashflow_daily_aggregates_company_id", "cashflow_daily_aggregates", ["company_id"])
+        op.create_index("ix_cashflow_daily_aggregates_day", "cashflow_daily_aggregates", ["day"])
+    # Sin backfill aquí: el primer record_movement de cada empresa pliega el histórico
+    # (watermark 0); rebuild_snapshots() lo hace de una vez.
+
+
+def downgrade() -> None:
+    op.drop_index("ix_cashflow_daily_aggregates_day", table_name="cashflow_daily_aggregates")
+    op.drop_index("ix_cashflow_daily_aggregates_company_id", table_name="cashflow_daily_aggregates")
+    op.drop_table("cashflow_daily_aggregates")
+    op.drop_table("cashflow_balance_snapshots")
+    op.drop_index("ix_cashflow_ledger_company_created", table_name="cashflow_ledger")
+    op.drop_index("ix_cashflow_ledger_company_id_id", table_name="cashflow_ledger")
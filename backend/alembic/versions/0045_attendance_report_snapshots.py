@@ -0,0 +1,40 @@
+"""attendance_reports: horas extra / pausas + índice único de snapshots diarios
+
+Revision ID: 0045
+Revises: 0044
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0045"
+down_revision = "0044"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    insp = inspect(bind)
+    if "attendance_reports" not in insp.get_table_names():
+        return
+    cols = {c["name"] for c in insp.get_columns("attendance_reports")}
+    if "overtime_hours" not in cols:
+        op.add_column("attendance_reports", sa.Column("overtime_hours", sa.Float(), server_default="0"))
+    if "break_hours" not in cols:
+        op.add_column("attendance_reports", sa.Column("break_hours", sa.Float(), server_default="0"))
+    indexes = {ix["name"] for ix in insp.get_indexes("attendance_reports")}
+    if "uq_attendance_reports_period" not in indexes:
+        op.create_index(
+            "uq_attendance_reports_period",
+            "attendance_reports",
+            ["user_id", "employee_id", "period_type", "period_start"],
+            unique=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_attendance_reports_period", table_name="attendance_reports")
+    op.drop_column("attendance_reports", "break_hours")
+    op.drop_column("attendance_reports", "overtime_hours")
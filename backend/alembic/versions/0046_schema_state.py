@@ -0,0 +1,33 @@
+"""zeus_schema_state — huella de esquema para el arranque con líder único
+
+Revision ID: 0046
+Revises: 0045
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0046"
+down_revision = "0045"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    if "zeus_schema_state" in inspect(bind).get_table_names():
+        return
+    op.create_table(
+        "zeus_schema_state",
+        sa.Column("component", sa.String(64), primary_key=True),
+        sa.Column("fingerprint", sa.String(64), nullable=False),
+        sa.Column("applied_by", sa.String(128), nullable=True),
+        sa.Column("duration_ms", sa.Float(), nullable=True),
+        sa.Column("report", sa.JSON(), nullable=True),
+        sa.Column("applied_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("zeus_schema_state")
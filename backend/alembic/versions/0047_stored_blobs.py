@@ -0,0 +1,51 @@
+"""stored_blobs + stored_blob_refs — subidas direccionadas por contenido con refcount
+
+Revision ID: 0047
+Revises: 0046
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0047"
+down_revision = "0046"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+    if "stored_blobs" not in tables:
+        op.create_table(
+            "stored_blobs",
+            sa.Column("sha256", sa.String(64), primary_key=True),
+            sa.Column("size_bytes", sa.BigInteger(), nullable=False),
+            sa.Column("content_type", sa.String(100), nullable=True),
+            sa.Column("backend", sa.String(16), nullable=False),
+            sa.Column("object_key", sa.String(255), nullable=False),
+            sa.Column("refcount", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+    if "stored_blob_refs" not in tables:
+        op.create_table(
+            "stored_blob_refs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "sha256", sa.String(64), sa.ForeignKey("stored_blobs.sha256", ondelete="CASCADE"), nullable=False
+            ),
+            sa.Column("owner_type", sa.String(40), nullable=False),
+            sa.Column("owner_id", sa.String(100), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.UniqueConstraint("sha256", "owner_type", "owner_id", name="uq_stored_blob_refs_owner"),
+        )
+        op.create_index("ix_stored_blob_refs_sha256", "stored_blob_refs", ["sha256"])
+        op.create_index("ix_stored_blob_refs_user_id", "stored_blob_refs", ["user_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("stored_blob_refs")
+    op.drop_table("stored_blobs")
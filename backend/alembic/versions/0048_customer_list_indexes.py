@@ -0,0 +1,49 @@
+"""customers — índices del listado CRM paginado (keyset name, id) y búsqueda trigram
+
+Revision ID: 0048
+Revises: 0047
+"""
+from alembic import op
+
+revision = "0048"
+down_revision = "0047"
+branch_labels = None
+depends_on = None
+
+LIST_INDEXES = (
+    ("ix_customers_company_name_id", ["company_id", "name", "id"]),
+    ("ix_customers_owner_name_id", ["owner_user_id", "name", "id"]),
+)
+TRGM_INDEXES = (
+    ("ix_customers_name_trgm", "lower(name)"),
+    ("ix_customers_email_trgm", "lower(email)"),
+    ("ix_customers_phone_trgm", "lower(phone)"),
+    ("ix_customers_tax_id_trgm", "lower(tax_id)"),
+)
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    if "customers" not in inspect(bind).get_table_names():
+        return
+    existing = {ix["name"] for ix in inspect(bind).get_indexes("customers")}
+    for name, cols in LIST_INDEXES:
+        if name not in existing:
+            op.create_index(name, "customers", cols)
+    if bind.dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, expr in TRGM_INDEXES:
+        if name not in existing:
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON customers USING gin ({expr} gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        for name, _ in TRGM_INDEXES:
+            op.execute(f"DROP INDEX IF EXISTS {name}")
+    for name, _ in LIST_INDEXES:
+        op.drop_index(name, table_name="customers")
@@ -0,0 +1,71 @@
+"""tpv_sales.customer_id (vínculo venta ↔ cliente indexado) + customer_scores
+
+Revision ID: 0049
+Revises: 0048
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0049"
+down_revision = "0048"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("tpv_sales", "ix_tpv_sales_customer_id", ["customer_id"]),
+    ("tpv_sales", "ix_tpv_sales_company_customer_date", ["company_id", "customer_id", "sale_date"]),
+    ("crm_activity_logs", "ix_crm_activity_logs_company_customer_created", ["company_id", "customer_id", "created_at"]),
+)
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+    if "tpv_sales" in tables and "customer_id" not in {c["name"] for c in inspect(bind).get_columns("tpv_sales")}:
+        op.add_column("tpv_sales", sa.Column("customer_id", sa.Integer(), nullable=True))
+        if bind.dialect.name == "postgresql":
+            op.create_foreign_key(
+                "fk_tpv_sales_customer_id", "tpv_sales", "customers", ["customer_id"], ["id"], ondelete="SET NULL"
+            )
+        # Backfill desde crm_sale_links; el de customer_data lo hace fiscal_engine.backfill_sale_customer_ids
+        if "crm_sale_links" in tables:
+            op.execute(
+                "UPDATE tpv_sales SET customer_id = "
+                "(SELECT l.customer_id FROM crm_sale_links l WHERE l.tpv_sale_id = tpv_sales.id) "
+                "WHERE customer_id IS NULL AND id IN (SELECT tpv_sale_id FROM crm_sale_links)"
+            )
+    for table, name, cols in INDEXES:
+        if table in tables and name not in {ix["name"] for ix in inspect(bind).get_indexes(table)}:
+            op.create_index(name, table, cols)
+    if "customer_scores" not in tables:
+        op.create_table(
+            "customer_scores",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("customer_id", sa.Integer(), sa.ForeignKey("customers.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("sales_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("revenue_amount", sa.Numeric(14, 2), nullable=False, server_default="0"),
+            sa.Column("activity_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("revenue_score", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("payment_score", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("engagement_score", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("potential_score", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("lead_score", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("customer_priority", sa.String(16), nullable=False, server_default="low"),
+            sa.Column("next_best_action", sa.String(64), nullable=False, server_default="nurture"),
+            sa.Column("computed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            sa.UniqueConstraint("company_id", "customer_id", name="uq_customer_scores_company_customer"),
+        )
+        op.create_index("ix_customer_scores_company_id", "customer_scores", ["company_id"])
+        op.create_index("ix_customer_scores_customer_id", "customer_scores", ["customer_id"])
+        op.create_index("ix_customer_scores_lead_score", "customer_scores", ["lead_score"])
+
+
+def downgrade() -> None:
+    op.drop_table("customer_scores")
+    op.drop_index("ix_crm_activity_logs_company_customer_created", table_name="crm_activity_logs")
+    op.drop_index("ix_tpv_sales_company_customer_date", table_name="tpv_sales")
+    op.drop_index("ix_tpv_sales_customer_id", table_name="tpv_sales")
+    op.drop_column("tpv_sales", "customer_id")
@@ -0,0 +1,52 @@
+"""agent_activity_hourly (rollup horario de agent_activities) + índices por fecha
+
+Revision ID: 0050
+Revises: 0049
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0050"
+down_revision = "0049"
+branch_labels = None
+depends_on = None
+
+ACTIVITY_INDEXES = (
+    ("ix_agent_activities_created_at", ["created_at"]),
+    ("ix_agent_activities_user_created", ["user_email", "created_at"]),
+)
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+    if "agent_activities" in tables:
+        existing = {ix["name"] for ix in inspect(bind).get_indexes("agent_activities")}
+        for name, cols in ACTIVITY_INDEXES:
+            if name not in existing:
+                op.create_index(name, "agent_activities", cols)
+    if "agent_activity_hourly" not in tables:
+        op.create_table(
+            "agent_activity_hourly",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("hour", sa.DateTime(), nullable=False),
+            sa.Column("agent_name", sa.String(64), nullable=False),
+            sa.Column("user_email", sa.String(255), nullable=False, server_default=""),
+            sa.Column("status", sa.String(32), nullable=False),
+            sa.Column("activity_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("rt_samples", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("rt_total_sec", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.UniqueConstraint("hour", "agent_name", "user_email", "status", name="uq_agent_activity_hourly_key"),
+        )
+        op.create_index("ix_agent_activity_hourly_hour", "agent_activity_hourly", ["hour"])
+        op.create_index("ix_agent_activity_hourly_user_email", "agent_activity_hourly", ["user_email"])
+        # Backfill desde agent_activities: scripts/backfill_activity_rollups.py
+
+
+def downgrade() -> None:
+    op.drop_table("agent_activity_hourly")
+    for name, _ in ACTIVITY_INDEXES:
+        op.drop_index(name, table_name="agent_activities")
@@ -0,0 +1,51 @@
+"""data_archive_segments (índice del archivo de retención) + índice por fecha de zeus_closure_audits
+
+Revision ID: 0051
+Revises: 0050
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0051"
+down_revision = "0050"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+    if "zeus_closure_audits" in tables:
+        existing = {ix["name"] for ix in inspect(bind).get_indexes("zeus_closure_audits")}
+        if "ix_zeus_closure_audits_created_at" not in existing:
+            op.create_index("ix_zeus_closure_audits_created_at", "zeus_closure_audits", ["created_at"])
+    if "data_archive_segments" not in tables:
+        op.create_table(
+            "data_archive_segments",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("table_name", sa.String(64), nullable=False),
+            sa.Column("first_id", sa.BigInteger(), nullable=False),
+            sa.Column("last_id", sa.BigInteger(), nullable=False),
+            sa.Column("min_created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("max_created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("row_count", sa.Integer(), nullable=False),
+            sa.Column("backend", sa.String(16), nullable=False),
+            sa.Column("fmt", sa.String(16), nullable=False),
+            sa.Column("location", sa.String(512), nullable=False),
+            sa.Column("size_bytes", sa.BigInteger(), nullable=False, server_default="0"),
+            sa.Column("sha256", sa.String(64), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        )
+        op.create_index("ix_data_archive_segments_id", "data_archive_segments", ["id"])
+        op.create_index(
+            "ix_data_archive_segments_table_range",
+            "data_archive_segments",
+            ["table_name", "min_created_at", "max_created_at"],
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("data_archive_segments")
+    op.drop_index("ix_zeus_closure_audits_created_at", table_name="zeus_closure_audits")
@@ -0,0 +1,46 @@
+"""Índices compuestos/parciales de las consultas calientes (ventas por fecha, cola de actividades, fichajes)
+
+Revision ID: 0052
+Revises: 0051
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0052"
+down_revision = "0051"
+branch_labels = None
+depends_on = None
+
+OPEN_STATUS_PREDICATE = "status IN ('pending', 'in_progress')"
+
+INDEXES = (
+    ("tpv_sales", "ix_tpv_sales_company_sale_date", ["company_id", "sale_date"], None),
+    ("tpv_sales", "ix_tpv_sales_user_sale_date", ["user_id", "sale_date"], None),
+    ("agent_activities", "ix_agent_activities_agent_created", ["agent_name", "created_at"], None),
+    ("agent_activities", "ix_agent_activities_open_created", ["created_at"], OPEN_STATUS_PREDICATE),
+    (
+        "time_tracking_records",
+        "ix_time_tracking_records_user_employee_checkin",
+        ["user_id", "employee_id", "check_in_time"],
+        None,
+    ),
+)
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+    for table, name, cols, where in INDEXES:
+        if table not in tables or name in {ix["name"] for ix in inspect(bind).get_indexes(table)}:
+            continue
+        if where:
+            op.create_index(name, table, cols, sqlite_where=sa.text(where), postgresql_where=sa.text(where))
+        else:
+            op.create_index(name, table, cols)
+
+
+def downgrade() -> None:
+    for table, name, _, _ in INDEXES:
+        op.drop_index(name, table_name=table)
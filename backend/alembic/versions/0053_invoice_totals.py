@@ -0,0 +1,61 @@
+"""Índices invoice_id de líneas y pagos + backfill de los totales desnormalizados de facturas
+
+Revision ID: 0053
+Revises: 0052
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0053"
+down_revision = "0052"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("invoice_items", "ix_invoice_items_invoice_id", ["invoice_id"]),
+    ("payments", "ix_payments_invoice_id", ["invoice_id"]),
+)
+
+LINES_BACKFILL = """
+UPDATE invoice_items SET
+    subtotal = quantity * unit_price,
+    tax_amount = quantity * unit_price * tax_rate / 100.0,
+    total = quantity * unit_price + quantity * unit_price * tax_rate / 100.0 - COALESCE(discount, 0)
+WHERE subtotal IS NULL OR tax_amount IS NULL OR total IS NULL
+   OR (subtotal = 0 AND total = 0 AND quantity * unit_price <> 0)
+"""
+
+INVOICES_BACKFILL = """
+UPDATE invoices SET
+    subtotal = (SELECT COALESCE(SUM(i.subtotal), 0) FROM invoice_items i WHERE i.invoice_id = invoices.id),
+    tax_amount = (SELECT COALESCE(SUM(i.tax_amount), 0) FROM invoice_items i WHERE i.invoice_id = invoices.id),
+    amount_paid = (SELECT COALESCE(SUM(p.amount), 0) FROM payments p
+                   WHERE p.invoice_id = invoices.id AND p.status = 'COMPLETED')
+"""
+
+TOTALS_BACKFILL = """
+UPDATE invoices SET
+    total = subtotal + tax_amount - COALESCE(discount_amount, 0),
+    amount_due = CASE WHEN subtotal + tax_amount - COALESCE(discount_amount, 0) - amount_paid > 0
+                      THEN subtotal + tax_amount - COALESCE(discount_amount, 0) - amount_paid ELSE 0 END
+"""
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+    for table, name, cols in INDEXES:
+        if table not in tables or name in {ix["name"] for ix in inspect(bind).get_indexes(table)}:
+            continue
+        op.create_index(name, table, cols)
+    if {"invoices", "invoice_items", "payments"} <= set(tables):
+        op.execute(sa.text(LINES_BACKFILL))
+        op.execute(sa.text(INVOICES_BACKFILL))
+        op.execute(sa.text(TOTALS_BACKFILL))
+
+
+def downgrade() -> None:
+    for table, name, _ in INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,51 @@
+"""Índices de users para el panel de superusuario + admin_revenue_snapshots (foto diaria de MRR)
+
+Revision ID: 0054
+Revises: 0053
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0054"
+down_revision = "0053"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_users_created_at", ["created_at"]),
+    ("ix_users_active_plan", ["is_active", "plan"]),
+)
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+    if "users" in tables:
+        existing = {ix["name"] for ix in inspect(bind).get_indexes("users")}
+        for name, cols in INDEXES:
+            if name not in existing:
+                op.create_index(name, "users", cols)
+    if "admin_revenue_snapshots" not in tables:
+        op.create_table(
+            "admin_revenue_snapshots",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("snapshot_date", sa.Date(), nullable=False),
+            sa.Column("total_customers", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("active_subscriptions", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("monthly_revenue", sa.Numeric(14, 2), nullable=False, server_default="0"),
+            sa.Column("total_setup_fees", sa.Numeric(14, 2), nullable=False, server_default="0"),
+            sa.Column("by_plan", sa.JSON(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_admin_revenue_snapshots_id", "admin_revenue_snapshots", ["id"])
+        op.create_index(
+            "ix_admin_revenue_snapshots_snapshot_date", "admin_revenue_snapshots", ["snapshot_date"], unique=True
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("admin_revenue_snapshots")
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name="users")
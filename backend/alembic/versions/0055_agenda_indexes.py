@@ -0,0 +1,34 @@
+"""Índices por rango para la agenda: reuniones por empresa y reservas por usuario/fecha
+
+Revision ID: 0055
+Revises: 0054
+"""
+from alembic import op
+
+revision = "0055"
+down_revision = "0054"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("crm_leads", "ix_crm_leads_company_meeting", ["company_id", "meeting_at"]),
+    ("reservations", "ix_reservations_user_date", ["user_id", "reservation_date"]),
+)
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+    for table, name, cols in INDEXES:
+        if table not in tables:
+            continue
+        existing = {ix["name"] for ix in inspect(bind).get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, cols)
+
+
+def downgrade() -> None:
+    for table, name, _ in INDEXES:
+        op.drop_index(name, table_name=table)
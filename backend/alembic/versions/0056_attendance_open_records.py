@@ -0,0 +1,28 @@
+"""attendance_reports.open_records: fichajes sin salida del día (esos días no se bloquean)
+
+Revision ID: 0056
+Revises: 0055
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0056"
+down_revision = "0055"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    insp = inspect(bind)
+    if "attendance_reports" not in insp.get_table_names():
+        return
+    cols = {c["name"] for c in insp.get_columns("attendance_reports")}
+    if "open_records" not in cols:
+        op.add_column("attendance_reports", sa.Column("open_records", sa.Integer(), server_default="0"))
+
+
+def downgrade() -> None:
+    op.drop_column("attendance_reports", "open_records")
@@ -0,0 +1,26 @@
+"""Índice customer_contacts.customer_id para la precarga de contactos del listado CRM
+
+Revision ID: 0057
+Revises: 0056
+"""
+from alembic import op
+
+revision = "0057"
+down_revision = "0056"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    if "customer_contacts" not in inspect(bind).get_table_names():
+        return
+    existing = {ix["name"] for ix in inspect(bind).get_indexes("customer_contacts")}
+    if "ix_customer_contacts_customer_id" not in existing:
+        op.create_index("ix_customer_contacts_customer_id", "customer_contacts", ["customer_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_customer_contacts_customer_id", table_name="customer_contacts")
@@ -9,6 +9,7 @@ from fastapi.responses import Response
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 
 from app.core.auth import get_current_active_user, resolve_user_scopes
+from app.core.principal_cache import principal_cache
 from jose import jwt, JWTError
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
@@ -1141,6 +1142,7 @@ async def logout(
     ).first()
     
     if db_token:
+        principal_cache.invalidate_user(db_token.user_id)
         user = db.query(User).filter(User.id == db_token.user_id).first()
         if user:
             try:
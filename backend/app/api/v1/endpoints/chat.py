@@ -6,13 +6,17 @@ import logging
 import os
 import sys
 import threading
+import time
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.db.async_session import get_async_db
 from app.db.session import get_db
 from app.schemas.chat_message import ChatMessageListResponse, ChatMessageOut
 from services import chat_persistence_service as chat_db
@@ -56,88 +60,119 @@ AGENT_ORDER_KEYS = (
     "AFRODITA",
 )
 
+# Estado de inicialización para /chat/ready: pending | warming | ready | failed
+_stack_state: Dict[str, Any] = {"state": "pending", "source": None, "total_ms": None, "error": None}
+_agent_status: Dict[str, Dict[str, Any]] = {k: {"status": "pending"} for k in AGENT_ORDER_KEYS}
 
-def ensure_agent_stack() -> None:
+
+class AgentStackNotReady(RuntimeError):
+    """La pila se está inicializando en otro hilo (timeout de espera) o falló en modo fail_fast."""
+
+
+def _fail_fast() -> bool:
+    return core_settings.ZEUS_AGENT_INIT_MODE == "fail_fast"
+
+
+def _timed_step(key: str, fn):
+    """Ejecuta un paso de init registrando estado y duración en _agent_status[key]."""
+    _agent_status[key] = {"status": "initializing"}
+    t0 = time.perf_counter()
+    try:
+        value = fn()
+    except Exception as exc:
+        _agent_status[key] = {
+            "status": "error",
+            "duration_ms": round((time.perf_counter() - t0) * 1000, 1),
+            "error": str(exc)[:300],
+        }
+        raise
+    _agent_status[key] = {"status": "ready", "duration_ms": round((time.perf_counter() - t0) * 1000, 1)}
+    return value
+
+
+def _build_agent_stack() -> None:
+    """
+    Construye ZEUS CORE + agentes y los cablea. Un agente secundario que falla queda a None
+    (su chat responde 500) sin tumbar al resto; si falla ZEUS CORE falla la pila entera.
+    """
+    global zeus, perseo, rafael, thalos, justicia, afrodita
+
+    print("🔄 Inicializando ZEUS CORE...")
+    z = _timed_step("ZEUS CORE", ZeusCore)
+    z.set_teamflow_engine(teamflow_engine)
+    print("✅ ZEUS CORE OK")
+
+    built: Dict[str, Any] = {"ZEUS CORE": z}
+    for key, factory in (
+        ("PERSEO", Perseo),
+        ("RAFAEL", Rafael),
+        ("THALOS", Thalos),
+        ("JUSTICIA", Justicia),
+        ("AFRODITA", Afrodita),
+    ):
+        print(f"🔄 Inicializando {key}...")
+        try:
+            agent = _timed_step(key, factory)
+        except Exception as agent_error:
+            if _fail_fast():
+                raise
+            print(f"❌ {key} no disponible: {agent_error}")
+            built[key] = None
+            continue
+        z.register_agent(agent)
+        agent.set_zeus_core_ref(z)
+        built[key] = agent
+        print(f"✅ {key} OK")
+
+    if os.getenv("ZEUS_AUTO_PRELAUNCH_PLAN", "false").strip().lower() in ("1", "true", "yes", "on"):
+        try:
+            plan_result = z.ensure_prelaunch_plan()
+            if plan_result.get("success"):
+                print("✅ Plan pre-lanzamiento preparado automáticamente.")
+        except Exception as prelaunch_error:
+            print(f"⚠️ No se pudo preparar el plan pre-lanzamiento automáticamente: {prelaunch_error}")
+
+    try:
+        from services.tpv_service import set_tpv_integrations
+
+        set_tpv_integrations(
+            rafael=built["RAFAEL"],
+            justicia=built["JUSTICIA"],
+            afrodita=built["AFRODITA"],
+        )
+        print("✅ Integraciones TPV configuradas")
+    except Exception as tpv_error:
+        print(f"⚠️ Error configurando integraciones TPV: {tpv_error}")
+
+    zeus, perseo, rafael, thalos, justicia, afrodita = (built[k] for k in AGENT_ORDER_KEYS)
+    AGENTS.clear()
+    AGENTS.update(built)
+
+
+def ensure_agent_stack(timeout: Optional[float] = None, source: str = "request") -> None:
     """
     Inicializa agentes y TPV una sola vez por proceso (Gunicorn worker).
     Evita cargar modelos/pesos al importar el router → arranque Railway más rápido y menos RAM duplicada en import.
+
+    Con ``timeout`` (segundos) una petición que encuentra la pila inicializándose en otro hilo
+    (p. ej. el precalentado) espera como máximo ese tiempo y lanza AgentStackNotReady.
     """
-    global zeus, perseo, rafael, thalos, justicia, afrodita, _agents_ready, AGENTS
+    global zeus, perseo, rafael, thalos, justicia, afrodita, _agents_ready
 
-    with _agents_lock:
+    if _agents_ready:
+        return
+    acquired = _agents_lock.acquire(timeout=timeout) if timeout else _agents_lock.acquire()
+    if not acquired:
+        raise AgentStackNotReady("La pila de agentes se está inicializando")
+    try:
         if _agents_ready:
             return
-
+        _stack_state.update(state="warming", source=source, error=None, total_ms=None)
+        t0 = time.perf_counter()
         try:
-            print("🔄 Inicializando ZEUS CORE...")
-            z = ZeusCore()
-            print("✅ ZEUS CORE OK")
-            z.set_teamflow_engine(teamflow_engine)
-
-            print("🔄 Inicializando PERSEO...")
-            p = Perseo()
-            print("✅ PERSEO OK")
-
-            print("🔄 Inicializando RAFAEL...")
-            r = Rafael()
-            print("✅ RAFAEL OK")
-
-            print("🔄 Inicializando THALOS...")
-            t = Thalos()
-            print("✅ THALOS OK")
-
-            print("🔄 Inicializando JUSTICIA...")
-            j = Justicia()
-            print("✅ JUSTICIA OK")
-
-            print("🔄 Inicializando AFRODITA...")
-            a = Afrodita()
-            print("✅ AFRODITA OK")
-
-            z.register_agent(p)
-            z.register_agent(r)
-            z.register_agent(t)
-            z.register_agent(j)
-            z.register_agent(a)
-
-            p.set_zeus_core_ref(z)
-            r.set_zeus_core_ref(z)
-            t.set_zeus_core_ref(z)
-            j.set_zeus_core_ref(z)
-            a.set_zeus_core_ref(z)
-
-            if os.getenv("ZEUS_AUTO_PRELAUNCH_PLAN", "false").strip().lower() in ("1", "true", "yes", "on"):
-                try:
-                    plan_result = z.ensure_prelaunch_plan()
-                    if plan_result.get("success"):
-                        print("✅ Plan pre-lanzamiento preparado automáticamente.")
-                except Exception as prelaunch_error:
-                    print(f"⚠️ No se pudo preparar el plan pre-lanzamiento automáticamente: {prelaunch_error}")
-
-            try:
-                from services.tpv_service import set_tpv_integrations
-
-                set_tpv_integrations(
-                    rafael=r,
-                    justicia=j,
-                    afrodita=a,
-                )
-                print("✅ Integraciones TPV configuradas")
-            except Exception as tpv_error:
-                print(f"⚠️ Error configurando integraciones TPV: {tpv_error}")
-
-            zeus, perseo, rafael, thalos, justicia, afrodita = z, p, r, t, j, a
-            AGENTS.clear()
-            AGENTS.update(
-                {
-                    "ZEUS CORE": zeus,
-                    "PERSEO": perseo,
-                    "RAFAEL": rafael,
-                    "THALOS": thalos,
-                    "JUSTICIA": justicia,
-                    "AFRODITA": afrodita,
-                }
-            )
+            _build_agent_stack()
+            _stack_state["state"] = "ready"
+            _agents_ready = True
             print("✅ Todos los agentes inicializados correctamente")
         except Exception as e:
             print(f"❌ Error inicializando agentes: {e}")
@@ -149,8 +184,55 @@ def ensure_agent_stack() -> None:
             AGENTS.clear()
             for k in AGENT_ORDER_KEYS:
                 AGENTS[k] = None
+            _stack_state.update(state="failed", error=str(e)[:300])
+            # fail_fast: fallo definitivo en este proceso. lazy: la siguiente petición reintenta.
+            _agents_ready = _fail_fast()
         finally:
-            _agents_ready = True
+            _stack_state["total_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    finally:
+        _agents_lock.release()
+
+
+async def _require_agent_stack() -> None:
+    """ensure_agent_stack fuera del event loop; 503 + Retry-After si la pila no está lista."""
+    try:
+        await asyncio.to_thread(ensure_agent_stack, core_settings.ZEUS_AGENT_READY_TIMEOUT_SEC or None)
+    except AgentStackNotReady as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"})
+    if _stack_state["state"] == "failed" and _fail_fast():
+        raise HTTPException(status_code=503, detail="Pila de agentes no disponible", headers={"Retry-After": "30"})
+
+
+def start_agent_prewarm() -> Optional[threading.Thread]:
+    """Precalienta la pila en un hilo daemon (llamado desde startup_event si ZEUS_AGENT_PREWARM)."""
+    if _agents_ready or _stack_state["state"] == "warming":
+        return None
+
+    def _prewarm() -> None:
+        try:
+            ensure_agent_stack(source="prewarm")
+            logger.info(
+                "[AGENTS] prewarm state=%s total_ms=%s", _stack_state["state"], _stack_state["total_ms"]
+            )
+        except Exception:
+            logger.exception("[AGENTS] prewarm falló")
+
+    thread = threading.Thread(target=_prewarm, name="zeus_agent_prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def agent_stack_readiness() -> Dict[str, Any]:
+    return {
+        "ready": _stack_state["state"] == "ready",
+        "state": _stack_state["state"],
+        "mode": core_settings.ZEUS_AGENT_INIT_MODE,
+        "prewarm": core_settings.ZEUS_AGENT_PREWARM,
+        "source": _stack_state["source"],
+        "total_ms": _stack_state["total_ms"],
+        "error": _stack_state["error"],
+        "agents": {k: dict(_agent_status.get(k) or {}) for k in AGENT_ORDER_KEYS},
+    }
 
 class ChatRequest(BaseModel):
     message: str
@@ -181,16 +263,16 @@ class MultiAgentTaskRequest(BaseModel):
     context: Optional[dict] = None
 
 
-def _persist_assistant(
-    db: Session,
+async def _persist_assistant(
+    adb: AsyncSession,
     user: User,
     agent_name: str,
     thread_id: str,
     text: str,
     company_id: Optional[int] = None,
 ) -> None:
-    chat_db.save_message(
-        db,
+    await chat_db.save_message_async(
+        adb,
         user=user,
         agent_name=agent_name,
         thread_id=thread_id,
@@ -206,13 +288,13 @@ async def get_chat_messages(
     thread_id: str = Query("main"),
     limit: int = Query(200, ge=1, le=500),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    adb: AsyncSession = Depends(get_async_db),
 ):
     """Historial de chat persistido para el usuario y agente indicados."""
     agent_norm = chat_db.normalize_agent_name(agent_name)
     tid = (thread_id or "main").strip() or "main"
-    rows = chat_db.list_messages(
-        db,
+    rows = await chat_db.list_messages_async(
+        adb,
         user=current_user,
         agent_name=agent_norm,
         thread_id=tid,
@@ -234,6 +316,7 @@ async def chat_with_agent(
     background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
+    adb: AsyncSession = Depends(get_async_db),
 ):
     """
     Chat con un agente específico
@@ -246,7 +329,7 @@ async def chat_with_agent(
         Respuesta del agente
     """
     # Carga de agentes antes de leer AGENTS (dict vacío hasta ensure).
-    await asyncio.to_thread(ensure_agent_stack)
+    await _require_agent_stack()
 
     # Normalizar nombre del agente
     agent_name = agent_name.upper().replace("-", " ").replace("_", " ")
@@ -287,8 +370,8 @@ async def chat_with_agent(
         if not isinstance(company_id, int):
             company_id = chat_db.resolve_company_id(db, current_user)
 
-        chat_db.save_message(
-            db,
+        await chat_db.save_message_async(
+            adb,
             user=current_user,
             agent_name=agent_name,
             thread_id=thread_id,
@@ -311,8 +394,8 @@ async def chat_with_agent(
             )
             if bridge and bridge.get("handled"):
                 bridge_msg = bridge.get("message", "") or ""
-                _persist_assistant(
-                    db,
+                await _persist_assistant(
+                    adb,
                     current_user,
                     agent_name,
                     thread_id,
@@ -450,8 +533,8 @@ async def chat_with_agent(
             except Exception:
                 logger.exception("ActivityLogger tras chat OK omitido (BD u otro fallo)")
             ok_msg = result.get("message", "Sin respuesta") or ""
-            _persist_assistant(
-                db,
+            await _persist_assistant(
+                adb,
                 current_user,
                 agent_name,
                 thread_id,
@@ -488,8 +571,8 @@ async def chat_with_agent(
         fail_msg = (result.get("message") or "").strip() or (
             result.get("error") or ""
         ).strip() or f"Error: {result.get('error', 'Error desconocido')}"
-        _persist_assistant(
-            db,
+        await _persist_assistant(
+            adb,
             current_user,
             agent_name,
             thread_id,
@@ -521,8 +604,8 @@ async def chat_with_agent(
         except Exception:
             logger.exception("ActivityLogger tras excepción chat omitido")
         exc_msg = f"Error interno: {str(e)}"
-        _persist_assistant(
-            db,
+        await _persist_assistant(
+            adb,
             current_user,
             agent_name,
             thread_id,
@@ -550,7 +633,7 @@ async def communicate_agents(
     Returns:
         Respuesta del agente destino
     """
-    await asyncio.to_thread(ensure_agent_stack)
+    await _require_agent_stack()
     if zeus is None:
         raise HTTPException(
             status_code=500,
@@ -593,7 +676,7 @@ async def coordinate_agents(
     Returns:
         Resultados de todos los agentes
     """
-    await asyncio.to_thread(ensure_agent_stack)
+    await _require_agent_stack()
     if zeus is None:
         raise HTTPException(
             status_code=500,
@@ -630,7 +713,9 @@ async def chat_health():
     if not _agents_ready:
         return {
             "status": "healthy",
-            "agents": {k: "lazy_pending" for k in AGENT_ORDER_KEYS},
+            "agents": {
+                k: ("warming" if _stack_state["state"] == "warming" else "lazy_pending") for k in AGENT_ORDER_KEYS
+            },
         }
     agents_status = {
         name: "initialized" if agent is not None else "error"
@@ -642,10 +727,17 @@ async def chat_health():
     }
 
 
+@router.get("/ready")
+async def chat_ready():
+    """Readiness de la pila de agentes: estado y duración de init por agente. 503 hasta estar lista."""
+    body = agent_stack_readiness()
+    return JSONResponse(status_code=200 if body["ready"] else 503, content=body)
+
+
 @router.get("/panel/executions")
 async def executions_panel():
     """Panel de control consolidado de ZEUS CORE."""
-    await asyncio.to_thread(ensure_agent_stack)
+    await _require_agent_stack()
     if zeus is None:
         raise HTTPException(status_code=500, detail="ZEUS CORE no está disponible")
     return {
@@ -3,12 +3,17 @@ Endpoints para el módulo de Control Horario Universal
 """
 from datetime import datetime, timedelta, timezone
 import re
+import time
 from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 import logging
 
+from app.db.async_session import attach_user, get_async_db
 from app.db.session import get_db
 from app.core.auth import get_current_active_user
 from app.core.config import settings
@@ -412,10 +417,10 @@ class CalculateHoursRequest(BaseModel):
     end_date: str  # ISO format
 
 
-async def _get_control_horario_info(current_user: User, db: Optional[Session] = None):
-    """Función auxiliar para obtener información del Control Horario"""
+def _load_control_horario_profile(current_user: User, db: Optional[Session] = None) -> None:
+    """Carga business_profile y horarios del usuario en el runtime (síncrono)."""
     is_superuser = getattr(current_user, 'is_superuser', False)
-    
+
     # Cargar business_profile del usuario (reusar sesión del request si existe).
     own_db = False
     if db is None:
@@ -466,6 +471,12 @@ async def _get_control_horario_info(current_user: User, db: Optional[Session] =
         if own_db:
             db.close()
 
+
+async def _get_control_horario_info(current_user: User, db: Optional[Session] = None):
+    """Función auxiliar para obtener información del Control Horario"""
+    is_superuser = getattr(current_user, 'is_superuser', False)
+    _load_control_horario_profile(current_user, db)
+
     config = control_horario_service.config if control_horario_service.business_profile else {}
     
     # Para superusuarios, asegurar configuración completa
@@ -515,6 +526,15 @@ async def get_control_horario_root(
     return await _get_control_horario_info(current_user, db)
 
 
+def _patterns_section(db: Session, user: User) -> Dict[str, Any]:
+    roster = _employees_roster_from_db(db, user)
+    if roster is None:
+        ids = list((_active_status_from_db(db, user).get("employees") or {}).keys())
+    else:
+        ids = [str(x["id"]) for x in roster if x.get("id")]
+    return sm.detect_patterns(db, user, ids)
+
+
 @router.get("/bootstrap")
 async def get_control_horario_bootstrap(
     current_user: User = Depends(get_current_active_user),
@@ -523,14 +543,44 @@ async def get_control_horario_bootstrap(
     """
     Carga inicial optimizada del módulo: evita 3 requests secuenciales desde frontend.
     Devuelve info + status + employees en una sola respuesta.
+
+    Secciones independientes en paralelo (una sesión del pool cada una); patrones,
+    ventana TPV y analítica de costes desde caché TTL por empresa. Alertas y coste
+    parcial los escribe workers/control_horario_worker.py, no este GET.
     """
+    from services.control_horario_bootstrap import cached_section, run_sections
+
+    t0 = time.perf_counter()
     info = await _get_control_horario_info(current_user, db)
-    status_data = _active_status_from_db(db, current_user)
+    cid = _primary_company_id(db, current_user)
+    info_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+    sections: Dict[str, Any] = {
+        "status": (_active_status_from_db, {"success": True, "employees": {}, "total_active": 0}),
+        "roster": (_employees_roster_from_db, None),
+        "today_records": (_today_records_from_db, []),
+        "alerts": (sm.fetch_recent_alerts, []),
+        "today_hours": (sm.today_completed_hours_by_employee, {}),
+        "patterns": (cached_section("patterns", cid, _patterns_section), {}),
+        "tpv": (cached_section("tpv", cid, sm.tpv_sales_window), {"ok": False, "reason": "unavailable"}),
+    }
+    if cid:
+        from services.time_cost_engine_v1 import get_active_sessions, get_cost_analytics
+
+        sections["cost_analytics"] = (
+            cached_section("cost_analytics", cid, lambda s, u: get_cost_analytics(s, user=u, company_id=cid)),
+            None,
+        )
+        sections["active_sessions"] = (lambda s, u: get_active_sessions(s, user=u, company_id=cid), None)
+    results, timings = await run_sections(current_user, sections)
+    timings["info"] = {"ms": info_ms}
+
+    status_data = results["status"]
     raw_status_employees = status_data.get("employees") or {}
     if not isinstance(raw_status_employees, dict):
         raw_status_employees = {}
 
-    db_roster = _employees_roster_from_db(db, current_user)
+    db_roster = results["roster"]
     if db_roster is not None:
         employees_payload = _merge_roster_with_status(db_roster, raw_status_employees)
         employees_source = "database"
@@ -543,63 +593,33 @@ async def get_control_horario_bootstrap(
             ]
         employees_source = "memory"
 
-    roster_for_ai: List[Dict[str, Any]] = []
-    if db_roster is not None:
-        roster_for_ai = list(db_roster)
-    elif isinstance(employees_payload, list):
-        roster_for_ai = [
-            {"id": str(e.get("id")), "name": e.get("name", "")}
-            for e in employees_payload
-            if e.get("id") is not None
-        ]
-    st_emp = raw_status_employees if isinstance(raw_status_employees, dict) else {}
-    try:
-        sm.evaluate_alerts(db, current_user, roster=roster_for_ai, employees_status=st_emp)
-    except Exception as e:
-        logger.warning("evaluate_alerts omitido: %s", e)
-
     smart_payload: Dict[str, Any] = {
         "mode": "ZEUS_SMART_TIME_CONTROL",
-        "alerts": sm.fetch_recent_alerts(db, current_user),
-        "patterns": sm.detect_patterns(
-            db,
-            current_user,
-            [str(x["id"]) for x in roster_for_ai if x.get("id")],
-        ),
-        "tpv": sm.tpv_sales_window(db, current_user),
-        "today_completed_hours_by_employee": sm.today_completed_hours_by_employee(db, current_user),
+        "alerts": results["alerts"],
+        "patterns": results["patterns"],
+        "tpv": results["tpv"],
+        "today_completed_hours_by_employee": results["today_hours"],
         "integrations": {"afrodita_activity_feed": True, "tpv_sales_window": True},
     }
 
     cost_engine: Dict[str, Any] = {}
-    cid = _primary_company_id(db, current_user)
-    if cid:
-        try:
-            from services.time_cost_engine_v1 import (
-                get_active_sessions,
-                get_cost_analytics,
-                refresh_partial_costs,
-            )
-
-            refresh_partial_costs(db, company_id=cid)
-            cost_engine = get_cost_analytics(db, user=current_user, company_id=cid)
-            cost_engine["active_sessions"] = get_active_sessions(
-                db, user=current_user, company_id=cid
-            )
-            cost_engine["company_id"] = cid
-        except Exception as e:
-            logger.warning("cost_engine bootstrap omitido: %s", e)
+    if cid and results.get("cost_analytics") is not None:
+        cost_engine = dict(results["cost_analytics"])
+        cost_engine["active_sessions"] = results.get("active_sessions") or []
+        cost_engine["company_id"] = cid
 
+    timings["total_ms"] = round((time.perf_counter() - t0) * 1000, 1)
     return {
         "success": True,
         "info": info,
         "status": status_data,
-        "today_records": _today_records_from_db(db, current_user),
+        "today_records": results["today_records"],
         "employees": employees_payload,
         "total_active": status_data.get("total_active", 0),
         "employees_source": employees_source,
         "smart": smart_payload,
         "cost_engine": cost_engine,
+        "timings": timings,
     }
 
 
@@ -641,12 +661,23 @@ async def check_in(
     request: CheckInRequest,
     http_req: Request,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Registrar entrada de un empleado"""
+    device = (http_req.headers.get("user-agent") or "")[:512] or None
+    return await db.run_sync(_check_in_sync, request, device, current_user)
+
+
+def _check_in_sync(
+    db: Session,
+    request: CheckInRequest,
+    device: Optional[str],
+    current_user: User,
+) -> Dict[str, Any]:
+    current_user = attach_user(db, current_user)
     try:
         if not control_horario_service.business_profile:
-            await _get_control_horario_info(current_user, db)
+            _load_control_horario_profile(current_user, db)
         _verify_employee_phone_or_raise(
             db,
             user=current_user,
@@ -679,8 +710,6 @@ async def check_in(
         if method_val == "on_site":
             method_val = "location"
 
-        device = (http_req.headers.get("user-agent") or "")[:512] or None
-
         existing_pre = (
             db.query(TimeTrackingRecord)
             .filter(
@@ -840,12 +869,23 @@ async def check_out(
     request: CheckOutRequest,
     http_req: Request,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Registrar salida de un empleado"""
+    device = (http_req.headers.get("user-agent") or "")[:512] or None
+    return await db.run_sync(_check_out_sync, request, device, current_user)
+
+
+def _check_out_sync(
+    db: Session,
+    request: CheckOutRequest,
+    device: Optional[str],
+    current_user: User,
+) -> Dict[str, Any]:
+    current_user = attach_user(db, current_user)
     try:
         if not control_horario_service.business_profile:
-            await _get_control_horario_info(current_user, db)
+            _load_control_horario_profile(current_user, db)
         _verify_employee_phone_or_raise(
             db,
             user=current_user,
@@ -886,7 +926,6 @@ async def check_out(
         if not isinstance(check_out_time, datetime):
             check_out_time = datetime.now(timezone.utc)
 
-        device = (http_req.headers.get("user-agent") or "")[:512] or None
         pex = sm.geo_payload_for_event(request.latitude, request.longitude)
 
         active = (
@@ -1200,16 +1239,36 @@ async def calculate_hours(
         if not control_horario_service.business_profile:
             await _get_control_horario_info(current_user, db)
         
+        from services import attendance_report_engine as are
+
         start_date = datetime.fromisoformat(request.start_date.replace('Z', '+00:00'))
         end_date = datetime.fromisoformat(request.end_date.replace('Z', '+00:00'))
-        
-        result = control_horario_service.calculate_hours(
+        today = datetime.now(timezone.utc).date()
+
+        daily = await run_in_threadpool(
+            are.daily_report,
+            db,
+            user_id=current_user.id,
+            start_day=are.parse_day(request.start_date, today),
+            end_day=are.parse_day(request.end_date, today),
             employee_id=request.employee_id,
-            start_date=start_date,
-            end_date=end_date
         )
-        
-        return result
+        total_hours = float(daily["worked_hours"].sum()) if not daily.empty else 0.0
+        records_count = int(daily["check_ins"].sum()) if not daily.empty else 0
+        days_worked = int((daily["check_ins"] > 0).sum()) if not daily.empty else 0
+
+        return {
+            "success": True,
+            "employee_id": request.employee_id,
+            "period": {
+                "start": start_date.isoformat(),
+                "end": end_date.isoformat()
+            },
+            "total_hours": round(total_hours, 2),
+            "records_count": records_count,
+            "overtime_hours": round(float(daily["overtime_hours"].sum()), 2) if not daily.empty else 0.0,
+            "average_hours_per_day": round(total_hours / days_worked, 2) if days_worked else 0
+        }
         
     except Exception as e:
         logger.error(f"Error calculando horas: {e}")
@@ -1271,30 +1330,70 @@ async def set_business_profile(
 @router.get("/reports")
 async def get_reports(
     employee_id: Optional[str] = Query(None),
-    start_date: Optional[str] = Query(None),
-    end_date: Optional[str] = Query(None),
+    start_date: Optional[str] = Query(None, description="YYYY-MM-DD (por defecto, día 1 del mes)"),
+    end_date: Optional[str] = Query(None, description="YYYY-MM-DD inclusive (por defecto, hoy)"),
+    group: str = Query("employee", pattern="^(employee|week|day)$"),
+    format: str = Query("json", pattern="^(json|csv|xlsx)$"),
+    refresh: bool = Query(False, description="Recalcular snapshots de días cerrados"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
-    """Obtener reportes de asistencia"""
+    """Informe de asistencia por periodo: horas, extras, retrasos, pausas y ausencias."""
+    from services import attendance_report_engine as are
+
+    today = datetime.now(timezone.utc).date()
+    try:
+        start_day = are.parse_day(start_date, today.replace(day=1))
+        end_day = are.parse_day(end_date, today)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Fechas inválidas (YYYY-MM-DD)")
+    if start_day > end_day:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start_date posterior a end_date")
+
     try:
         if not control_horario_service.business_profile:
             await _get_control_horario_info(current_user, db)
-        
-        # Por ahora, devolver datos básicos
-        # En producción, consultaría la base de datos
-        
+
+        frame = await run_in_threadpool(
+            are.build_report,
+            db,
+            current_user,
+            start_day=start_day,
+            end_day=end_day,
+            employee_id=employee_id,
+            group=group,
+            refresh=refresh,
+        )
+        filename = f"asistencia_{group}_{start_day.isoformat()}_{end_day.isoformat()}"
+        if format == "csv":
+            return StreamingResponse(
+                are.iter_csv(frame),
+                media_type="text/csv",
+                headers={"Content-Disposition": f"attachment; filename={filename}.csv"},
+            )
+        if format == "xlsx":
+            return StreamingResponse(
+                are.iter_xlsx(frame),
+                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                headers={"Content-Disposition": f"attachment; filename={filename}.xlsx"},
+            )
+
         status_data = _active_status_from_db(db, current_user)
-        
         return {
             "success": True,
+            "period": {"start": start_day.isoformat(), "end": end_day.isoformat()},
+            "group": group,
+            "rows": are.records_to_rows(frame),
+            "totals": are.report_totals(frame),
             "reports": {
                 "current_status": status_data,
                 "active_records": status_data.get("total_active", 0),
                 "today_records": _today_records_from_db(db, current_user),
-            }
+            },
         }
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error obteniendo reportes: {e}")
         raise HTTPException(
@@ -2,10 +2,10 @@
 
 from __future__ import annotations
 
+from typing import Optional
+
 from fastapi import APIRouter, Depends, File, Path, Query, UploadFile, status
-from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from io import BytesIO
 
 from app.core.auth import get_current_active_user
 from app.db.session import get_db
@@ -20,6 +20,7 @@ from app.schemas.crm_office import (
     RecordChargeIn,
     RecordChargeOut,
 )
+import services.crm_export_service as crm_export
 import services.crm_office_service as crm_svc
 
 router = APIRouter()
@@ -27,11 +28,19 @@ router = APIRouter()
 
 @router.get("/customers", response_model=CrmListResponse)
 def crm_list_customers(
+    limit: int = Query(200, ge=1, le=500),
+    cursor: Optional[str] = Query(None, max_length=512),
+    q: Optional[str] = Query(None, max_length=100),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    rows = crm_svc.list_customers(db, current_user)
-    return CrmListResponse(success=True, data=[CustomerOut.model_validate(r) for r in rows])
+    page = crm_svc.page_customers(db, current_user, limit=limit, cursor=cursor, q=q)
+    return CrmListResponse(
+        success=True,
+        data=[CustomerOut.model_validate(r) for r in page.items],
+        total=page.total,
+        next_cursor=page.next_cursor,
+    )
 
 
 @router.post(
@@ -186,41 +195,32 @@ def crm_table_payments(
 
 @router.get("/export/clients")
 def crm_export_clients(
+    fmt: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+    gzip: bool = Query(False),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    content = crm_svc.customers_to_csv(crm_svc.list_customers(db, current_user))
-    return StreamingResponse(
-        BytesIO(content.encode("utf-8")),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=clients.csv"},
-    )
+    return crm_export.export_response(db, current_user, "clients", fmt=fmt, gzip=gzip)
 
 
 @router.get("/export/cases")
 def crm_export_cases(
+    fmt: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+    gzip: bool = Query(False),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    content = crm_svc.cases_to_csv(crm_svc.list_cases_table(db, current_user))
-    return StreamingResponse(
-        BytesIO(content.encode("utf-8")),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=cases.csv"},
-    )
+    return crm_export.export_response(db, current_user, "cases", fmt=fmt, gzip=gzip)
 
 
 @router.get("/export/payments")
 def crm_export_payments(
+    fmt: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+    gzip: bool = Query(False),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    content = crm_svc.payments_to_csv(crm_svc.list_payments_table(db, current_user))
-    return StreamingResponse(
-        BytesIO(content.encode("utf-8")),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=payments.csv"},
-    )
+    return crm_export.export_response(db, current_user, "payments", fmt=fmt, gzip=gzip)
 
 
 @router.post("/import/clients", response_model=CrmListResponse)
@@ -1,4 +1,4 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
 from sqlalchemy.orm import Session, joinedload
 
@@ -73,25 +73,33 @@ def get_customer_or_404(
     operation_id="customers_list_api_v1",
     summary="List customers (tenant-scoped)",
 )
-async def list_customers(
+def list_customers(
     page: int = Query(1, ge=1),
     limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, max_length=512, description="next_cursor de la página anterior (preferente a page)"),
+    q: Optional[str] = Query(None, max_length=100, description="Búsqueda en nombre, email, teléfono y NIF"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    rows = crm_svc.list_customers(db, current_user)
-    total = len(rows)
-    start = (page - 1) * limit
-    page_rows = rows[start : start + limit]
+    result = crm_svc.page_customers(
+        db,
+        current_user,
+        limit=limit,
+        cursor=cursor,
+        q=q,
+        offset=None if cursor else (page - 1) * limit,
+    )
+    total = result.total or 0
     total_pages = max(1, (total + limit - 1) // limit) if total else 1
     return CustomerListResponse(
         success=True,
         message="OK",
-        data=[CustomerOut.model_validate(r) for r in page_rows],
+        data=[CustomerOut.model_validate(r) for r in result.items],
         total=total,
         page=page,
         limit=limit,
         total_pages=total_pages,
+        next_cursor=result.next_cursor,
     )
 
 @router.post(
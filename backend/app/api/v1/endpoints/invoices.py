@@ -1,16 +1,17 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Any
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import func, or_
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 
 from app.db.session import get_db
 from app.models.erp import Invoice, InvoiceItem, Payment, Product, InventoryMovement, InventoryMovementType
+from app.models import erp as erp_models
 from app.schemas.erp import (
-    InvoiceCreate, InvoiceUpdate, InvoiceInDB, InvoiceResponse, InvoiceListResponse,
+    InvoiceCreate, InvoiceUpdate, InvoiceInDB, InvoiceSummary, InvoiceResponse, InvoiceListResponse,
     InvoiceItemCreate, InvoiceItemInDB,
     PaymentCreate, PaymentInDB, PaymentResponse,
-    InvoiceStatus, InvoiceType, PaymentStatus, PaymentMethod
+    InvoiceStatus, InvoiceType, PaymentMethod
 )
 from app.core.security import get_current_active_user
 from app.models.user import User
@@ -28,7 +29,7 @@ def get_invoice_or_404(
     db: Session,
     invoice_id: int,
     current_user: User
-) -> InvoiceInDB:
+) -> Invoice:
     """
     Obtiene una factura por ID o lanza una excepción 404 si no se encuentra.
     
@@ -38,20 +39,14 @@ def get_invoice_or_404(
         current_user: Usuario autenticado
         
     Returns:
-        InvoiceInDB: El objeto de la factura en formato Pydantic si se encuentra
+        Invoice: La factura con líneas y pagos precargados (selectinload: 3 queries fijas)
         
     Raises:
         HTTPException: 404 si la factura no existe
-        HTTPException: 403 si el usuario no tiene permisos
     """
-    from fastapi import HTTPException, status
-    from sqlalchemy.orm import joinedload
-    
-    # Optimizar la consulta cargando relaciones comunes
     invoice = db.query(Invoice).options(
-        joinedload(Invoice.customer),
-        joinedload(Invoice.items),
-        joinedload(Invoice.payments)
+        selectinload(Invoice.items),
+        selectinload(Invoice.payments)
     ).filter(
         Invoice.id == invoice_id
     ).first()
@@ -66,50 +61,26 @@ def get_invoice_or_404(
     # Aquí podrías agregar lógica de autorización adicional según tus necesidades
     # Por ejemplo, verificar si el usuario pertenece a la misma organización
     
-    # Convertir el modelo SQLAlchemy a Pydantic
-    return InvoiceInDB.model_validate(invoice)
-
-def calculate_invoice_totals(invoice: Invoice, db: Session) -> Dict[str, float]:
-    """Calculate invoice subtotal, tax, and total"""
-    subtotal = 0.0
-    tax_amount = 0.0
-    
-    for item in invoice.items:
-        item_subtotal = item.quantity * item.unit_price
-        item_tax = item_subtotal * (item.tax_rate / 100.0)
-        item_total = item_subtotal + item_tax - item.discount
-        
-        subtotal += item_subtotal
-        tax_amount += item_tax
-    
-    total = subtotal + tax_amount - invoice.discount_amount
-    
-    # Calculate amount paid
-    amount_paid = sum(payment.amount for payment in invoice.payments if payment.status == PaymentStatus.COMPLETED)
-    amount_due = max(0.0, total - amount_paid)
-    
-    return {
-        "subtotal": subtotal,
-        "tax_amount": tax_amount,
-        "total": total,
-        "amount_paid": amount_paid,
-        "amount_due": amount_due
-    }
+    return invoice
 
 @router.get("/", response_model=InvoiceListResponse)
 def list_invoices(
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, le=1000, description="Maximum number of records to return"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     customer_id: Optional[int] = Query(None, description="Filter by customer ID"),
     status: Optional[str] = Query(None, description="Filter by status"),
     invoice_type: Optional[str] = Query(None, description="Filter by invoice type"),
     start_date: Optional[date] = Query(None, description="Filter by issue date (greater than or equal)"),
     end_date: Optional[date] = Query(None, description="Filter by issue date (less than or equal)"),
+    include_details: bool = Query(False, description="Include items and payments (two extra queries per page)"),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    List all invoices with optional filtering and pagination
+    List all invoices with optional filtering and pagination.
+
+    Los totales son columnas de la factura: sin include_details la página entera (y el
+    total de filas, vía COUNT(*) OVER ()) sale en una sola query.
     """
     query = db.query(Invoice)
     
@@ -127,16 +98,28 @@ def list_invoices(
         query = query.filter(Invoice.issue_date >= start_date)
         
     if end_date:
-        query = query.filter(Invoice.issue_date <= end_date)
-    
-    # Get total count for pagination
-    total = query.count()
+        query = query.filter(Invoice.issue_date < end_date + timedelta(days=1))
+
+    page = query.add_columns(func.count().over().label("total_count"))
+    if include_details:
+        page = page.options(selectinload(Invoice.items), selectinload(Invoice.payments))
     
     # Apply pagination and ordering
-    invoices = query.order_by(Invoice.issue_date.desc())\
-                   .offset(skip)\
-                   .limit(limit)\
-                   .all()
+    rows = page.order_by(Invoice.issue_date.desc(), Invoice.id.desc())\
+                .offset(skip)\
+                .limit(limit)\
+                .all()
+
+    if rows:
+        total = rows[0].total_count
+    elif skip:
+        # Página fuera de rango: la ventana no devuelve filas, el total se pide aparte
+        total = query.count()
+    else:
+        total = 0
+
+    schema = InvoiceInDB if include_details else InvoiceSummary
+    invoices = [schema.model_validate(row.Invoice, from_attributes=True) for row in rows]
     
     # Calculate pagination metadata
     total_pages = (total + limit - 1) // limit if limit > 0 else 1
@@ -216,17 +199,15 @@ def create_invoice(
                 # Update stock level
                 product.quantity_on_hand = max(0, product.quantity_on_hand - item.quantity)
     
-    # Calculate and update totals
-    totals = calculate_invoice_totals(invoice, db)
-    for key, value in totals.items():
-        setattr(invoice, key, value)
+    # El flush de las líneas recalcula los totales de la factura
+    db.flush()
 
     validate_invoice_logical(
         customer_id=invoice_in.customer_id,
         issue_date=invoice.issue_date,
-        subtotal=float(totals["subtotal"]),
-        tax_amount=float(totals["tax_amount"]),
-        total=float(totals["total"]),
+        subtotal=float(invoice.subtotal or 0),
+        tax_amount=float(invoice.tax_amount or 0),
+        total=float(invoice.total or 0),
         status_value=str(invoice.status.value if hasattr(invoice.status, "value") else invoice.status),
     )
     
@@ -260,22 +241,24 @@ def update_invoice(
     """
     invoice = get_invoice_or_404(db, invoice_id, current_user)
     
-    # Prevent updates to certain fields
-    for field in ["id", "invoice_number", "created_at", "created_by"]:
+    # Prevent updates to certain fields (totals are derived from items and payments)
+    for field in ["id", "invoice_number", "created_at", "created_by", "payments",
+                  "subtotal", "tax_amount", "total", "amount_paid", "amount_due"]:
         invoice_in.pop(field, None)
+    items_in = invoice_in.pop("items", None)
     
     # Update fields
     for field, value in invoice_in.items():
         if hasattr(invoice, field):
             setattr(invoice, field, value)
     
-    # Recalculate totals if items were updated
-    if "items" in invoice_in:
-        # In a real app, you'd want to handle item updates more carefully
-        # This is a simplified version that just recalculates totals
-        totals = calculate_invoice_totals(invoice, db)
-        for key, value in totals.items():
-            setattr(invoice, key, value)
+    # Replace items: the flush recomputes line amounts and invoice totals
+    if items_in is not None:
+        try:
+            parsed = [InvoiceItemCreate.model_validate(item) for item in items_in]
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+        invoice.items = [InvoiceItem(**item.model_dump()) for item in parsed]
     
     invoice.updated_at = func.now()
     db.commit()
@@ -299,32 +282,31 @@ def create_payment(
     validate_payment_logical(
         invoice_id=invoice_id,
         amount=float(payment_in.amount),
-        method=str(payment_in.method.value if hasattr(payment_in.method, "value") else payment_in.method),
+        method=str(payment_in.payment_method.value if hasattr(payment_in.payment_method, "value") else payment_in.payment_method),
         payment_date=payment_in.payment_date or datetime.utcnow().date(),
     )
     
     # Create payment
+    # Enums del modelo (no los del schema): la columna guarda el nombre y el
+    # recálculo de totales filtra por PaymentStatus.COMPLETED
+    payment_data = payment_in.model_dump()
+    payment_data["payment_method"] = erp_models.PaymentMethod(payment_in.payment_method.value)
+    payment_data["status"] = erp_models.PaymentStatus(payment_in.status.value)
     payment = Payment(
-        **payment_in.dict(),
+        **payment_data,
         invoice_id=invoice_id,
         created_by=current_user.id
     )
     
     db.add(payment)
-    db.flush()
+    db.flush()  # recalcula amount_paid / amount_due de la factura
 
-    # Update invoice status based on payment (payment now visible in totals)
-    totals = calculate_invoice_totals(invoice, db)
-    
-    if payment.status == PaymentStatus.COMPLETED:
-        if totals["amount_due"] <= 0:
-            invoice.status = InvoiceStatus.PAID
-        elif totals["amount_paid"] > 0:
-            invoice.status = InvoiceStatus.PARTIALLY_PAID
-    
-    # Update invoice amounts
-    for key, value in totals.items():
-        setattr(invoice, key, value)
+    # Update invoice status based on payment
+    if payment.status == erp_models.PaymentStatus.COMPLETED:
+        if (invoice.amount_due or 0) <= 0:
+            invoice.status = erp_models.InvoiceStatus.PAID
+        elif (invoice.amount_paid or 0) > 0:
+            invoice.status = erp_models.InvoiceStatus.PARTIALLY_PAID
     
     db.commit()
     db.refresh(payment)
@@ -6,8 +6,10 @@ from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.core.auth import get_current_active_user
+from app.core.auth import get_current_active_superuser, get_current_active_user
+from app.db.sql_instrumentation import sql_metrics_snapshot
 from app.models.user import User
+from services.activity_metrics_service import aggregate_activity
 
 router = APIRouter()
 
@@ -21,33 +23,16 @@ async def get_dashboard_metrics(
     Devuelve métricas calculadas de actividades reales de agentes
     """
     try:
-        from app.models.agent_activity import AgentActivity
-        
         # Calcular rango de fechas
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         
-        # Consultar actividades
-        activities = db.query(AgentActivity).filter(
-            AgentActivity.created_at >= start_date,
-            AgentActivity.created_at <= end_date
-        ).all()
-        
-        # Calcular métricas
-        total_interactions = len(activities)
-        completed = len([a for a in activities if a.status == 'completed'])
-        failed = len([a for a in activities if a.status == 'failed'])
-        
-        success_rate = (completed / total_interactions * 100) if total_interactions > 0 else 0
-        
-        # Calcular tiempo promedio de respuesta
-        response_times = []
-        for activity in activities:
-            if activity.completed_at and activity.created_at:
-                delta = (activity.completed_at - activity.created_at).total_seconds()
-                response_times.append(delta)
-        
-        avg_response = sum(response_times) / len(response_times) if response_times else 0
+        # Agregados SQL (GROUP BY agente/estado; rollup horario en rangos largos)
+        stats = aggregate_activity(db, start=start_date, end=end_date)
+        total_interactions = stats.total
+        completed = stats.completed
+        success_rate = stats.success_rate
+        avg_response = stats.avg_response_sec
         
         # Calcular ahorro de costos (estimado)
         # Cada interacción exitosa ahorra ~€50 en trabajo manual
@@ -55,10 +40,7 @@ async def get_dashboard_metrics(
         
         # Calcular tendencias (comparar con período anterior)
         prev_start = start_date - timedelta(days=days)
-        prev_activities = db.query(AgentActivity).filter(
-            AgentActivity.created_at >= prev_start,
-            AgentActivity.created_at < start_date
-        ).count()
+        prev_activities = aggregate_activity(db, start=prev_start, end=start_date, end_inclusive=False).total
         
         interactions_change = ((total_interactions - prev_activities) / prev_activities * 100) if prev_activities > 0 else 0
         
@@ -97,36 +79,37 @@ async def get_performance_metrics(
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """Métricas de rendimiento por agente (datos reales de activity_log)."""
-    from app.models.agent_activity import AgentActivity
-    from datetime import timedelta
-
     since = datetime.utcnow() - timedelta(days=days)
-    q = db.query(AgentActivity).filter(AgentActivity.created_at >= since)
-    if agent:
-        q = q.filter(AgentActivity.agent_name == agent.upper())
-    if not getattr(current_user, "is_superuser", False):
-        q = q.filter(AgentActivity.user_email == current_user.email)
-    activities = q.all()
-    total = len(activities)
-    completed = sum(1 for a in activities if a.status == "completed")
-    failed = sum(1 for a in activities if a.status == "failed")
-    response_times = []
-    for a in activities:
-        if a.completed_at and a.created_at:
-            response_times.append((a.completed_at - a.created_at).total_seconds())
-    avg_rt = sum(response_times) / len(response_times) if response_times else 0.0
-    success_pct = (completed / total * 100) if total else 0.0
-    error_pct = (failed / total * 100) if total else 0.0
+    stats = aggregate_activity(
+        db,
+        start=since,
+        end=datetime.utcnow(),
+        agent=agent,
+        user_email=None if getattr(current_user, "is_superuser", False) else current_user.email,
+    )
+    total = stats.total
+    avg_rt = stats.avg_response_sec
+    success_pct = stats.success_rate
+    error_pct = (stats.failed / total * 100) if total else 0.0
     return {
         "success": True,
         "agent": agent or "all",
         "response_times": {
             "avg": f"{avg_rt:.1f}s",
-            "samples": len(response_times),
+            "samples": stats.rt_samples,
         },
         "success_rate": f"{success_pct:.1f}%",
         "error_rate": f"{error_pct:.1f}%",
         "total_activities": total,
+        "by_agent": {
+            name: {
+                "total": b["total"],
+                "completed": b["completed"],
+                "failed": b["failed"],
+                "avg_response": f"{(b['rt_total_sec'] / b['rt_samples']) if b['rt_samples'] else 0.0:.1f}s",
+            }
+            for name, b in sorted(stats.by_agent.items())
+        },
     }
 
 
@@ -142,58 +125,27 @@ async def get_dashboard_summary(
     Los superusuarios ven todos los módulos sin restricciones de business_profile
     """
     try:
-        from app.models.agent_activity import AgentActivity
-        
         is_superuser = getattr(current_user, 'is_superuser', False)
         
         # Calcular rango de fechas (UTC para consistencia)
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         
-        # Consultar actividades (sin filtro de usuario para superusuarios)
-        activities_query = db.query(AgentActivity).filter(
-            AgentActivity.created_at >= start_date,
-            AgentActivity.created_at <= end_date
-        )
-        
         # Siempre filtrar por usuario autenticado (evita mezcla entre cuentas en BD compartida)
-        activities_query = activities_query.filter(
-            AgentActivity.user_email == current_user.email
-        )
-        
-        activities = activities_query.all()
-        
-        # Calcular métricas
-        total_interactions = len(activities)
-        completed = len([a for a in activities if a.status == 'completed'])
-        failed = len([a for a in activities if a.status == 'failed'])
-        
-        success_rate = (completed / total_interactions * 100) if total_interactions > 0 else 0
-        
-        # Calcular tiempo promedio de respuesta
-        response_times = []
-        for activity in activities:
-            if activity.completed_at and activity.created_at:
-                delta = (activity.completed_at - activity.created_at).total_seconds()
-                response_times.append(delta)
-        
-        avg_response = sum(response_times) / len(response_times) if response_times else 0
+        stats = aggregate_activity(db, start=start_date, end=end_date, user_email=current_user.email)
+        total_interactions = stats.total
+        completed = stats.completed
+        success_rate = stats.success_rate
+        avg_response = stats.avg_response_sec
         
         # Calcular ahorro de costos (estimado)
         cost_savings = completed * 50
         
         # Calcular tendencias (comparar con período anterior)
         prev_start = start_date - timedelta(days=days)
-        prev_activities_query = db.query(AgentActivity).filter(
-            AgentActivity.created_at >= prev_start,
-            AgentActivity.created_at < start_date
-        )
-        
-        prev_activities_query = prev_activities_query.filter(
-            AgentActivity.user_email == current_user.email
-        )
-        
-        prev_activities = prev_activities_query.count()
+        prev_activities = aggregate_activity(
+            db, start=prev_start, end=start_date, user_email=current_user.email, end_inclusive=False
+        ).total
         
         interactions_change = ((total_interactions - prev_activities) / prev_activities * 100) if prev_activities > 0 else 0
         
@@ -302,3 +254,14 @@ async def get_dashboard_summary(
             }
         }
 
+
+@router.get("/sql")
+async def get_sql_metrics(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_active_superuser),
+) -> Dict[str, Any]:
+    """
+    Queries por ruta en las peticiones muestreadas (media, máximo, tiempo en BD) y
+    último patrón N+1 detectado. Agregados en memoria de este proceso.
+    """
+    return sql_metrics_snapshot(limit=limit)
@@ -204,3 +204,12 @@ async def get_pending_authorizations(
         "last_checked": datetime.now().isoformat()
     }
 
+
+@router.get("/auth-cache")
+async def get_auth_cache_stats(
+    current_user: User = Depends(get_current_active_superuser),
+) -> Dict[str, Any]:
+    """Hits/misses de la caché de principal autenticado (por worker)."""
+    from app.core.principal_cache import principal_cache
+
+    return {"worker_pid": os.getpid(), **principal_cache.stats()}
@@ -6,15 +6,15 @@ from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Query
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 from decimal import Decimal
-from sqlalchemy import func, or_
-from sqlalchemy.orm import Session
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 import logging
-from pathlib import Path
 from datetime import datetime, date, timedelta, timezone
 import re
-import secrets
 import time
 import uuid
+from app.db.async_session import attach_user, get_async_db
 from app.db.session import get_db
 from app.core.auth import get_current_active_user, get_current_active_superuser
 from app.core.config import settings
@@ -28,6 +28,7 @@ from app.models.tpv_comanda_share import TPVComandaShare
 from app.models.tpv_table import TPVTable
 from services.tpv_service import BusinessProfile, PaymentMethod, TPVService, create_tpv_service
 from services.global_company_bootstrap import ensure_user_company_link_for_operations
+from services.image_variants import schedule_variants, variants_for_url
 from services.tpv_operator_context import (
     company_ids_for_user as _company_ids_for_user,
     primary_company_id as _primary_company_id,
@@ -616,6 +617,7 @@ async def create_product(
     )
     
     db.add(db_product)
+    _sync_product_image_ref(db, current_user.id, product_id, None, request.image)
     db.commit()
     db.refresh(db_product)
     
@@ -629,6 +631,7 @@ async def create_product(
         "iva_rate": db_product.iva_rate,
         "stock": db_product.stock,
         "image": db_product.image,
+        "image_variants": variants_for_url(db_product.image),
         "icon": db_product.icon,
         "metadata": db_product.metadata_ or {},
         "created_at": db_product.created_at.isoformat() if db_product.created_at else datetime.utcnow().isoformat(),
@@ -647,27 +650,30 @@ async def create_product(
     }
 
 
+def _products_scope_sync(db: Session, current_user: User) -> List[int]:
+    user = attach_user(db, current_user)
+    _ensure_employee_tpv_jornada(db, user)
+    return _company_ids_for_user(db, user)
+
+
 @router.get("/products")
 async def list_products(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Listar productos del usuario y catálogo compartido por empresa (multi-tenant)."""
-    _ensure_employee_tpv_jornada(db, current_user)
-    company_ids = _company_ids_for_user(db, current_user)
+    company_ids = await db.run_sync(_products_scope_sync, current_user)
+    stmt = select(TPVProduct)
     if company_ids:
-        db_products = (
-            db.query(TPVProduct)
-            .filter(
-                or_(
-                    TPVProduct.user_id == current_user.id,
-                    TPVProduct.company_id.in_(company_ids),
-                )
+        stmt = stmt.where(
+            or_(
+                TPVProduct.user_id == current_user.id,
+                TPVProduct.company_id.in_(company_ids),
             )
-            .all()
         )
     else:
-        db_products = db.query(TPVProduct).filter(TPVProduct.user_id == current_user.id).all()
+        stmt = stmt.where(TPVProduct.user_id == current_user.id)
+    db_products = (await db.execute(stmt)).scalars().all()
     
     # Convertir a formato dict para mantener compatibilidad con API
     products = []
@@ -681,6 +687,7 @@ async def list_products(
             "iva_rate": db_product.iva_rate,
             "stock": db_product.stock,
             "image": db_product.image,
+            "image_variants": variants_for_url(db_product.image),
             "icon": db_product.icon,
             "metadata": db_product.metadata_ or {},
             "created_at": db_product.created_at.isoformat() if db_product.created_at else None,
@@ -933,6 +940,7 @@ async def update_product(
     db_product.category = request.category
     db_product.iva_rate = request.iva_rate
     db_product.stock = request.stock
+    _sync_product_image_ref(db, current_user.id, product_id, db_product.image, request.image)
     db_product.image = request.image
     db_product.icon = request.icon
     db_product.metadata_ = request.metadata or {}
@@ -950,6 +958,7 @@ async def update_product(
         "iva_rate": db_product.iva_rate,
         "stock": db_product.stock,
         "image": db_product.image,
+        "image_variants": variants_for_url(db_product.image),
         "icon": db_product.icon,
         "metadata": db_product.metadata_ or {},
         "created_at": db_product.created_at.isoformat() if db_product.created_at else None,
@@ -964,14 +973,31 @@ async def update_product(
     }
 
 
+PRODUCT_IMAGE_MAX_BYTES = 2 * 1024 * 1024  # 2MB
+
+
+def _sync_product_image_ref(
+    db: Session, user_id: int, product_id: str, old_url: Optional[str], new_url: Optional[str]
+) -> None:
+    """Mantiene stored_blob_refs cuando un producto cambia de imagen (sin commit)."""
+    if old_url == new_url:
+        return
+    from services.upload_store import link_url, unlink_url
+
+    owner_id = f"{user_id}:{product_id}"
+    unlink_url(db, old_url, owner_type="tpv_product", owner_id=owner_id)
+    link_url(db, new_url, owner_type="tpv_product", owner_id=owner_id, user_id=user_id)
+
+
 @router.post("/products/upload-image")
 async def upload_product_image(
     image: UploadFile = File(...),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
 ):
-    """Subir imagen de producto"""
-    is_superuser = getattr(current_user, 'is_superuser', False)
-    
+    """Subir imagen de producto (almacén por contenido: la misma foto se guarda una vez)"""
+    from services.upload_store import store_upload
+
     # Permisos: Todos los usuarios autenticados pueden subir imágenes
     
     # Validar tipo de archivo
@@ -982,46 +1008,21 @@ async def upload_product_image(
             detail=f"Formato no soportado. Usa: {', '.join(allowed_types)}"
         )
     
-    # Validar tamaño (max 2MB)
-    MAX_SIZE = 2 * 1024 * 1024  # 2MB
-    contents = await image.read()
-    if len(contents) > MAX_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail="La imagen supera el límite de 2MB"
-        )
-    
-    # Crear directorio de productos si no existe
-    upload_dir = Path(settings.STATIC_DIR) / "uploads" / "products"
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Generar nombre único
-    extension = {
-        "image/png": ".png",
-        "image/jpeg": ".jpg",
-        "image/webp": ".webp"
-    }[image.content_type]
-    
-    timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
-    token = secrets.token_urlsafe(6)
-    filename = f"product_{timestamp}_{token}{extension}"
-    destination = upload_dir / filename
-    
-    # Guardar archivo
-    destination.write_bytes(contents)
-    
-    # Construir URL pública
-    public_url = f"{settings.STATIC_URL.rstrip('/')}/uploads/products/{filename}"
-    
-    logger.info(f"📸 Imagen de producto subida: {filename}")
+    # Tamaño validado mientras se copia (max 2MB → 413)
+    stored = await store_upload(
+        db,
+        image,
+        owner_type="tpv_product_upload",
+        owner_id=current_user.id,
+        user_id=current_user.id,
+        max_bytes=PRODUCT_IMAGE_MAX_BYTES,
+    )
     
-    return {
-        "success": True,
-        "url": public_url,
-        "filename": filename,
-        "content_type": image.content_type,
-        "size_bytes": len(contents)
-    }
+    logger.info(f"📸 Imagen de producto subida: {stored['filename']} (dedupe={stored['deduplicated']})")
+
+    # Variantes thumb/grid/detail en segundo plano (None hasta que estén listas)
+    schedule_variants(stored["url"])
+    return {"success": True, **stored, "image_variants": variants_for_url(stored["url"], schedule=False)}
 
 
 @router.delete("/products/{product_id}")
@@ -1055,6 +1056,7 @@ async def delete_product(
         )
     
     product_name = db_product.name
+    _sync_product_image_ref(db, current_user.id, product_id, db_product.image, None)
     db.delete(db_product)
     db.commit()
     
@@ -1135,7 +1137,7 @@ async def clear_cart(
 async def process_sale(
     request: ProcessSaleRequest,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Procesar venta: cart_items obligatorio; persistencia fiscal en BD o error 5xx."""
     try:
@@ -1146,6 +1148,17 @@ async def process_sale(
             detail=f"Método de pago inválido. Válidos: {[m.value for m in PaymentMethod]}",
         )
 
+    # Servicios fiscales síncronos sobre la conexión async: no bloquea el event loop en E/S.
+    return await db.run_sync(_process_sale_sync, request, payment_method, current_user)
+
+
+def _process_sale_sync(
+    db: Session,
+    request: ProcessSaleRequest,
+    payment_method: PaymentMethod,
+    current_user: User,
+) -> Dict[str, Any]:
+    current_user = attach_user(db, current_user)
     ensure_user_company_link_for_operations(db, current_user)
     _ensure_employee_tpv_jornada(db, current_user)
     from services.employee_work_session_service import get_active_work_session_id_for_sale
@@ -1386,6 +1399,7 @@ async def get_quarterly_vat(
     end_ts = dt.combine(end_d, dt.min.time())
     sales = (
         db.query(TPVSale)
+        .options(selectinload(TPVSale.items))
         .filter(
             TPVSale.user_id == current_user.id,
             TPVSale.sale_date >= start_ts,
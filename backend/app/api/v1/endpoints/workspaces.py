@@ -4,8 +4,6 @@ API de herramientas para los workspaces de los agentes.
 
 from __future__ import annotations
 
-from datetime import datetime
-from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
@@ -835,12 +833,22 @@ UPLOAD_WHITELIST = {
 }
 
 
+UPLOAD_MAX_BYTES = {
+    "imagenes": lambda: settings.UPLOAD_MAX_IMAGE_BYTES,
+    "videos": lambda: settings.UPLOAD_MAX_VIDEO_BYTES,
+    "documentos": lambda: settings.UPLOAD_MAX_DOCUMENT_BYTES,
+}
+
+
 @router.post("/uploads/{category}")
 async def workspace_upload(
     category: str,
     file: UploadFile = File(...),
-    _: User = Depends(get_current_active_user),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
 ):
+    from services.upload_store import store_upload
+
     cat = category.lower()
     if cat not in UPLOAD_WHITELIST:
         raise HTTPException(status_code=400, detail="Categoría no soportada")
@@ -850,19 +858,13 @@ async def workspace_upload(
             detail=f"Formato no permitido para {cat}.",
         )
 
-    upload_root = Path(settings.STATIC_DIR) / "uploads" / cat
-    upload_root.mkdir(parents=True, exist_ok=True)
-    filename = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}_{file.filename}"
-    destination = upload_root / filename
-
-    contents = await file.read()
-    destination.write_bytes(contents)
-
-    return {
-        "success": True,
-        "filename": filename,
-        "content_type": file.content_type,
-        "size_bytes": len(contents),
-        "url": f"{settings.STATIC_URL.rstrip('/')}/uploads/{cat}/{filename}",
-    }
+    stored = await store_upload(
+        db,
+        file,
+        owner_type=f"workspace_upload:{cat}",
+        owner_id=current_user.id,
+        user_id=current_user.id,
+        max_bytes=UPLOAD_MAX_BYTES[cat](),
+    )
+    return {"success": True, "original_filename": file.filename, **stored}
 
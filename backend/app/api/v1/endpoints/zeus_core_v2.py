@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
@@ -13,12 +13,12 @@ from app.db.session import get_db
 from app.models.user import User
 import services.crm_office_service as crm_svc
 from services.zeus_agent_executor_v1 import execute_agent_action
-from services.zeus_agenda_optimizer_v1 import propose_meeting_slots, schedule_meeting
+from services.zeus_agenda_optimizer_v1 import propose_meeting_slots, schedule_leads_batch, schedule_meeting
 from services.zeus_core_metrics_v1 import get_core_metrics
 from services.zeus_core_workspace_bootstrap_v1 import run_zeus_core_workspace_bootstrap
 from services.zeus_external_intelligence_v1 import research_business
 from services.zeus_human_approval_v1 import list_pending, resolve_approval
-from services.zeus_scoring_engine_v1 import convert_lead_to_customer, create_lead, score_lead
+from services.zeus_scoring_engine_v1 import convert_lead_to_customer, create_lead, get_company_scores, score_lead
 
 router = APIRouter()
 
@@ -42,6 +42,12 @@ class ScheduleMeetingRequest(BaseModel):
     start_iso: str
 
 
+class BatchScheduleRequest(BaseModel):
+    lead_ids: Optional[List[int]] = Field(None, max_length=5000)
+    duration_minutes: int = Field(30, ge=5, le=480)
+    apply: bool = False
+
+
 class ApprovalResolveRequest(BaseModel):
     approve: bool = True
 
@@ -145,6 +151,39 @@ def leads_score(
     return {"success": True, **score_lead(db, user=current_user, lead_id=lead_id)}
 
 
+@router.get("/customers/scores")
+def customers_scores(
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    refresh: bool = Query(False, description="Recalcular toda la empresa antes de leer"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """Scores de todos los clientes (caché customer_scores) para el panel de priorización."""
+    return {
+        "success": True,
+        **get_company_scores(db, user=current_user, limit=limit, max_age_sec=0 if refresh else None),
+    }
+
+
+@router.post("/leads/agenda/batch-schedule")
+def agenda_batch_schedule(
+    body: BatchScheduleRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """Primer hueco libre por lead (score descendente); con ``apply`` guarda las reuniones."""
+    return {
+        "success": True,
+        **schedule_leads_batch(
+            db,
+            user=current_user,
+            lead_ids=body.lead_ids,
+            duration_minutes=body.duration_minutes,
+            apply=body.apply,
+        ),
+    }
+
+
 @router.get("/leads/{lead_id}/agenda/slots")
 def agenda_slots(
     lead_id: int,
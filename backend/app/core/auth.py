@@ -9,6 +9,7 @@ from sqlalchemy.exc import OperationalError, DisconnectionError, ProgrammingErro
 import logging
 
 from app.core.config import settings
+from app.core.principal_cache import lookup_principal, store_principal
 from app.core.security import verify_password
 from app.db.base import get_db
 from app.models.user import User
@@ -265,7 +266,16 @@ async def get_current_user(
         # Limpiar el token por si viene con prefijo 'Bearer '
         if isinstance(token, str) and token.startswith('Bearer '):
             token = token[7:].strip()
-            
+
+        # Hit en caché: sin jwt.decode ni lookup de User (ver app/core/principal_cache.py)
+        cached = lookup_principal(db, token)
+        if cached is not None:
+            user, payload = cached
+            if request:
+                request.state.user = user
+                request.state.token_payload = payload
+            return user
+
         # Decodificar el token con leeway para tolerar diferencias de reloj
         try:
             payload = jwt.decode(
@@ -318,7 +328,8 @@ async def get_current_user(
         # Resolver scopes efectivos y adjuntarlos al payload
         effective_scopes = resolve_user_scopes(user, payload.get("scopes"))
         payload["scopes"] = effective_scopes
-            
+        store_principal(token, user, payload)
+
         # Agregar información del usuario al request para uso posterior
         if request:
             request.state.user = user
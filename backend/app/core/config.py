@@ -160,6 +160,9 @@ class Settings(BaseSettings):
     PERSEO_FFMPEG_PRESET: str = os.getenv("PERSEO_FFMPEG_PRESET", "veryfast").strip() or "veryfast"
     # Tiempo máximo (s) para la generación MP4/GIF en el job en background (evita pending infinito).
     PERSEO_VIDEO_JOB_TIMEOUT_SEC: float = float(os.getenv("PERSEO_VIDEO_JOB_TIMEOUT_SEC", "240") or "240")
+    # Caché de renders FFmpeg v3/v4 (imagen + guion + marca + parámetros → asset ya almacenado)
+    PERSEO_RENDER_CACHE_ENABLED: bool = os.getenv("PERSEO_RENDER_CACHE_ENABLED", "true").lower() in ("true", "1", "yes")
+    PERSEO_RENDER_CACHE_TTL_SEC: int = int(os.getenv("PERSEO_RENDER_CACHE_TTL_SEC", str(30 * 86400)) or str(30 * 86400))
     # Control horario: si true y hay user_companies pero 0 filas en company_employees, roster vacío (sin demo en front).
     # Si false, el roster BD se usa igualmente cuando exista al menos un empleado en BD para las empresas del usuario.
     CONTROL_HORARIO_DB_EMPLOYEES: bool = False
@@ -173,6 +176,17 @@ class Settings(BaseSettings):
     CONTROL_HORARIO_ALERT_GRACE_MINUTES: int = int(os.getenv("CONTROL_HORARIO_ALERT_GRACE_MINUTES", "15") or "15")
     CONTROL_HORARIO_TPV_HIGH_RATIO: float = float(os.getenv("CONTROL_HORARIO_TPV_HIGH_RATIO", "1.35") or "1.35")
     CONTROL_HORARIO_TPV_LOW_RATIO: float = float(os.getenv("CONTROL_HORARIO_TPV_LOW_RATIO", "0.65") or "0.65")
+    # Bootstrap control horario: TTL (s) de secciones cacheadas por empresa (0 desactiva)
+    CONTROL_HORARIO_PATTERNS_TTL_SEC: float = float(os.getenv("CONTROL_HORARIO_PATTERNS_TTL_SEC", "300") or "0")
+    CONTROL_HORARIO_TPV_TTL_SEC: float = float(os.getenv("CONTROL_HORARIO_TPV_TTL_SEC", "60") or "0")
+    CONTROL_HORARIO_COST_TTL_SEC: float = float(os.getenv("CONTROL_HORARIO_COST_TTL_SEC", "30") or "0")
+    # Secciones del bootstrap con sesión abierta a la vez en el proceso (0 = pool_size del engine)
+    CONTROL_HORARIO_BOOTSTRAP_DB_SLOTS: int = int(os.getenv("CONTROL_HORARIO_BOOTSTRAP_DB_SLOTS", "0") or "0")
+    # Worker periódico: alertas + coste parcial de sesiones activas (regla cada 5 min)
+    CONTROL_HORARIO_WORKER_ENABLED: bool = os.getenv(
+        "CONTROL_HORARIO_WORKER_ENABLED", "true"
+    ).lower() in ("true", "1", "yes")
+    CONTROL_HORARIO_WORKER_INTERVAL_SEC: int = int(os.getenv("CONTROL_HORARIO_WORKER_INTERVAL_SEC", "300") or "300")
     SMART_TIME_CONTROL_LOG_AFRODITA: bool = os.getenv(
         "SMART_TIME_CONTROL_LOG_AFRODITA", "true"
     ).lower() in ("true", "1", "yes")
@@ -192,6 +206,65 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: str = os.getenv("AWS_SECRET_ACCESS_KEY", "").strip()
     AWS_S3_PUBLIC_URL_PREFIX: str = os.getenv("AWS_S3_PUBLIC_URL_PREFIX", "").strip().rstrip("/")
     AWS_S3_SIGNED_URL_TTL_SEC: int = int(os.getenv("AWS_S3_SIGNED_URL_TTL_SEC", "3600") or "3600")
+    # Subidas direccionadas por contenido (services/upload_store.py): local | s3.
+    # Con s3 conviene AWS_S3_PUBLIC_URL_PREFIX: las URLs firmadas caducan y se guardan en productos.
+    UPLOAD_STORE_BACKEND: str = os.getenv(
+        "UPLOAD_STORE_BACKEND", os.getenv("PERSEO_STORAGE_BACKEND", "local")
+    ).strip().lower()
+    UPLOAD_MAX_IMAGE_BYTES: int = int(os.getenv("UPLOAD_MAX_IMAGE_BYTES", str(10 * 1024 * 1024)))
+    UPLOAD_MAX_VIDEO_BYTES: int = int(os.getenv("UPLOAD_MAX_VIDEO_BYTES", str(200 * 1024 * 1024)))
+    UPLOAD_MAX_DOCUMENT_BYTES: int = int(os.getenv("UPLOAD_MAX_DOCUMENT_BYTES", str(25 * 1024 * 1024)))
+    # Blobs sin referencias se borran pasado este margen (evita carrera con una subida en curso)
+    UPLOAD_GC_GRACE_SEC: int = int(os.getenv("UPLOAD_GC_GRACE_SEC", "86400") or "86400")
+    # Retención de tablas de auditoría (services/data_retention_service.py): filas más
+    # antiguas que N días se archivan (JSONL.gz / Parquet en local o S3) y se borran.
+    RETENTION_ENABLED: bool = os.getenv("RETENTION_ENABLED", "false").lower() in ("true", "1", "yes")
+    RETENTION_INTERVAL_SEC: int = int(os.getenv("RETENTION_INTERVAL_SEC", "21600") or "21600")
+    RETENTION_BATCH_SIZE: int = int(os.getenv("RETENTION_BATCH_SIZE", "5000") or "5000")
+    RETENTION_MAX_BATCHES: int = int(os.getenv("RETENTION_MAX_BATCHES", "50") or "50")
+    RETENTION_ARCHIVE_BACKEND: str = os.getenv("RETENTION_ARCHIVE_BACKEND", "local").strip().lower()
+    # Junto al volumen de STATIC_DIR pero fuera de él: /static se sirve públicamente
+    RETENTION_ARCHIVE_DIR: str = os.getenv(
+        "RETENTION_ARCHIVE_DIR", os.path.normpath(os.path.join(STATIC_DIR, "..", "archive"))
+    )
+    RETENTION_ARCHIVE_FORMAT: str = os.getenv("RETENTION_ARCHIVE_FORMAT", "jsonl").strip().lower()
+    RETENTION_DAYS_AGENT_ACTIVITIES: int = int(os.getenv("RETENTION_DAYS_AGENT_ACTIVITIES", "90") or "90")
+    RETENTION_DAYS_THALOS_EVENTS: int = int(os.getenv("RETENTION_DAYS_THALOS_EVENTS", "30") or "30")
+    RETENTION_DAYS_ZEUS_DOMAIN_EVENTS: int = int(os.getenv("RETENTION_DAYS_ZEUS_DOMAIN_EVENTS", "90") or "90")
+    RETENTION_DAYS_ZEUS_CLOSURE_AUDITS: int = int(os.getenv("RETENTION_DAYS_ZEUS_CLOSURE_AUDITS", "180") or "180")
+    RETENTION_DAYS_CHAT_MESSAGES: int = int(os.getenv("RETENTION_DAYS_CHAT_MESSAGES", "365") or "365")
+    # Postgres: crear particiones mensuales por adelantado en las tablas ya particionadas
+    RETENTION_PARTITION_MONTHS_AHEAD: int = int(os.getenv("RETENTION_PARTITION_MONTHS_AHEAD", "2") or "2")
+    # Instrumentación SQL por petición (app/db/sql_instrumentation.py): solo las peticiones
+    # muestreadas cuentan queries/tiempo; las demás pagan una lectura de contextvar por query.
+    SQL_INSTRUMENTATION_ENABLED: bool = os.getenv("SQL_INSTRUMENTATION_ENABLED", "true").lower() in ("true", "1", "yes")
+    SQL_INSTRUMENTATION_SAMPLE_RATE: float = float(os.getenv("SQL_INSTRUMENTATION_SAMPLE_RATE", "0.05") or "0.05")
+    # Misma forma de sentencia repetida N+ veces en una petición = sospecha de N+1
+    SQL_N_PLUS_ONE_THRESHOLD: int = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "10") or "10")
+    # Server-Timing con tiempo en BD y nº de queries: visible para cualquier cliente, solo en local/CI
+    SQL_SERVER_TIMING_HEADER: bool = os.getenv("SQL_SERVER_TIMING_HEADER", "false").lower() in ("true", "1", "yes")
+    # Hilos PIL para variantes thumb/grid/detail de imágenes de producto (services/image_variants.py)
+    IMAGE_VARIANT_WORKERS: int = int(os.getenv("IMAGE_VARIANT_WORKERS", "2") or "2")
+    # Cliente HTTP saliente compartido (services/http_client.py): pool por host, reintentos, breaker
+    HTTP_CONNECT_TIMEOUT_SEC: float = float(os.getenv("HTTP_CONNECT_TIMEOUT_SEC", "5") or "5")
+    HTTP_READ_TIMEOUT_SEC: float = float(os.getenv("HTTP_READ_TIMEOUT_SEC", "30") or "30")
+    HTTP_MAX_RETRIES: int = int(os.getenv("HTTP_MAX_RETRIES", "2") or "2")
+    HTTP_POOL_MAXSIZE: int = int(os.getenv("HTTP_POOL_MAXSIZE", "10") or "10")
+    HTTP_BREAKER_THRESHOLD: int = int(os.getenv("HTTP_BREAKER_THRESHOLD", "5") or "5")
+    HTTP_BREAKER_RESET_SEC: float = float(os.getenv("HTTP_BREAKER_RESET_SEC", "30") or "30")
+    HTTP_SLOW_CALL_MS: float = float(os.getenv("HTTP_SLOW_CALL_MS", "5000") or "5000")
+    # COUNT del listado CRM paginado (services/crm_office_service.page_customers); 0 = sin caché
+    CRM_COUNT_CACHE_TTL_SEC: float = float(os.getenv("CRM_COUNT_CACHE_TTL_SEC", "30") or "30")
+    # Caché customer_scores (services/zeus_scoring_engine_v1.get_company_scores): antigüedad máxima
+    CUSTOMER_SCORE_TTL_SEC: float = float(os.getenv("CUSTOMER_SCORE_TTL_SEC", "3600") or "3600")
+    # Agenda comercial (services/zeus_agenda_optimizer_v1): horario por defecto si la empresa no
+    # tiene turnos (EmployeeSchedule), duración asumida de reuniones/reservas y horizonte de búsqueda
+    AGENDA_DAY_START: str = os.getenv("AGENDA_DAY_START", "09:00").strip() or "09:00"
+    AGENDA_DAY_END: str = os.getenv("AGENDA_DAY_END", "19:00").strip() or "19:00"
+    AGENDA_MEETING_MINUTES: int = int(os.getenv("AGENDA_MEETING_MINUTES", "30") or "30")
+    AGENDA_RESERVATION_MINUTES: int = int(os.getenv("AGENDA_RESERVATION_MINUTES", "90") or "90")
+    AGENDA_SLOT_STEP_MINUTES: int = int(os.getenv("AGENDA_SLOT_STEP_MINUTES", "30") or "30")
+    AGENDA_HORIZON_DAYS: int = int(os.getenv("AGENDA_HORIZON_DAYS", "14") or "14")
     REPLICATE_API_TOKEN: str = os.getenv("REPLICATE_API_TOKEN", "").strip()
     STABILITY_API_KEY: str = os.getenv("STABILITY_API_KEY", "").strip()
     PERSEO_IMAGE_PROVIDER: str = os.getenv("PERSEO_IMAGE_PROVIDER", "replicate").strip().lower()
@@ -330,7 +403,32 @@ class Settings(BaseSettings):
     JWT_ISSUER: str = "zeus-ia-backend"  # Emisor del token
     JWT_ACCESS_TOKEN_TYPE: str = "access"
     JWT_WEBSOCKET_TOKEN_TYPE: str = "websocket"
-    
+
+    # Caché de principal autenticado (app/core/principal_cache.py): 0 desactiva
+    AUTH_PRINCIPAL_CACHE_SIZE: int = int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", "2048") or "0")
+    AUTH_PRINCIPAL_CACHE_TTL_SEC: float = float(os.getenv("AUTH_PRINCIPAL_CACHE_TTL_SEC", "60") or "0")
+
+    # Snapshot de contexto global ZEUS (services/zeus_global_context.py): 0 desactiva
+    ZEUS_GLOBAL_CONTEXT_TTL_SEC: float = float(os.getenv("ZEUS_GLOBAL_CONTEXT_TTL_SEC", "30") or "0")
+
+    # Pila de agentes de chat (app/api/v1/endpoints/chat.py): precalentado tras startup y modo ante fallo.
+    # lazy = un fallo deja la pila sin inicializar y la siguiente petición reintenta;
+    # fail_fast = el fallo es definitivo en el proceso y /chat/ready responde 503.
+    ZEUS_AGENT_PREWARM: bool = os.getenv(
+        "ZEUS_AGENT_PREWARM", os.getenv("ZEUS_PREWARM_AGENTS", "false")
+    ).strip().lower() in ("1", "true", "yes", "on")
+    ZEUS_AGENT_INIT_MODE: str = (os.getenv("ZEUS_AGENT_INIT_MODE", "lazy") or "lazy").strip().lower()
+    # Espera máxima de una petición mientras otra inicializa la pila (0 = sin límite) → 503 + Retry-After
+    ZEUS_AGENT_READY_TIMEOUT_SEC: float = float(os.getenv("ZEUS_AGENT_READY_TIMEOUT_SEC", "45") or "0")
+
+    # Arranque de esquema (app/db/schema_bootstrap.py): un líder aplica, el resto verifica huella
+    ZEUS_SCHEMA_LOCK_TIMEOUT_SEC: float = float(os.getenv("ZEUS_SCHEMA_LOCK_TIMEOUT_SEC", "120") or "120")
+    ZEUS_SCHEMA_FORCE_PATCHES: bool = os.getenv("ZEUS_SCHEMA_FORCE_PATCHES", "false").lower() in (
+        "true",
+        "1",
+        "yes",
+    )
+
     # Validar clave secreta
     if not SECRET_KEY:
         raise ValueError("La SECRET_KEY no puede estar vacía")
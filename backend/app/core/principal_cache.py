@@ -0,0 +1,213 @@
+"""
+Caché de principal autenticado para get_current_user.
+
+Evita jwt.decode + lookup de User + resolve_user_scopes en cada request:
+las páginas del dashboard lanzan 10-20 llamadas autenticadas en paralelo con el
+mismo access token. La clave es el sha256 del token (nunca el token en claro),
+el tamaño está acotado (LRU) y el TTL nunca supera la expiración del token.
+
+Se guarda el payload ya decodificado (con scopes efectivos) y un snapshot
+detached del User; en cada hit el snapshot se adjunta a la sesión del request
+con ``Session.merge(load=False)``, sin round-trip a la BD.
+
+Invalidación: cualquier UPDATE/DELETE de User (incluida la desactivación) vía
+eventos de mapper, y logout explícito. La caché es por proceso; entre workers
+de Gunicorn la coherencia la acota el TTL (AUTH_PRINCIPAL_CACHE_TTL_SEC).
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.config import settings
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachedPrincipal:
+    user_id: int
+    payload: Dict[str, Any]
+    user_snapshot: User
+    expires_at: float
+
+
+def token_cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def snapshot_user(user: User) -> User:
+    """Copia detached (solo columnas) de un User persistente, sin cambios pendientes."""
+    snap = User()
+    for attr in sa_inspect(User).column_attrs:
+        setattr(snap, attr.key, getattr(user, attr.key))
+    make_transient_to_detached(snap)
+    return snap
+
+
+class PrincipalCache:
+    """LRU acotado con TTL por entrada; seguro entre hilos (threadpool de FastAPI)."""
+
+    def __init__(self, maxsize: int, ttl_sec: float) -> None:
+        self.maxsize = max(0, int(maxsize))
+        self.ttl_sec = max(0.0, float(ttl_sec))
+        self._entries: "OrderedDict[str, CachedPrincipal]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl_sec > 0
+
+    def get(self, key: str) -> Optional[CachedPrincipal]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= now:
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, user: User, payload: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        now = time.time()
+        expires_at = now + self.ttl_sec
+        exp_claim = payload.get("exp")
+        if isinstance(exp_claim, (int, float)):
+            expires_at = min(expires_at, float(exp_claim))
+        if expires_at <= now:
+            return
+        entry = CachedPrincipal(
+            user_id=int(user.id),
+            payload=copy.deepcopy(payload),
+            user_snapshot=snapshot_user(user),
+            expires_at=expires_at,
+        )
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._by_user.setdefault(entry.user_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate_token(self, token: str) -> None:
+        key = token_cache_key(token)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+                self.invalidations += 1
+
+    def invalidate_user(self, user_id: Optional[int]) -> None:
+        if user_id is None:
+            return
+        with self._lock:
+            keys = self._by_user.pop(int(user_id), set())
+            for key in keys:
+                self._entries.pop(key, None)
+            if keys:
+                self.invalidations += len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_sec": self.ttl_sec,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_user.get(entry.user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                self._by_user.pop(entry.user_id, None)
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.AUTH_PRINCIPAL_CACHE_SIZE,
+    ttl_sec=settings.AUTH_PRINCIPAL_CACHE_TTL_SEC,
+)
+
+
+def lookup_principal(db: Session, token: str) -> Optional[Tuple[User, Dict[str, Any]]]:
+    """Hit → (user adjunto a ``db``, copia del payload). Miss → None."""
+    entry = principal_cache.get(token_cache_key(token))
+    if entry is None:
+        return None
+    user = db.merge(entry.user_snapshot, load=False)
+    return user, copy.deepcopy(entry.payload)
+
+
+def store_principal(token: str, user: User, payload: Dict[str, Any]) -> None:
+    try:
+        principal_cache.put(token_cache_key(token), user, payload)
+    except Exception as exc:
+        # La caché nunca debe romper la autenticación
+        logger.warning("principal_cache.put: %s", exc)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_user_update(mapper, connection, target) -> None:
+    principal_cache.invalidate_user(getattr(target, "id", None))
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_on_user_delete(mapper, connection, target) -> None:
+    principal_cache.invalidate_user(getattr(target, "id", None))
+
+
+@event.listens_for(Session, "after_bulk_update")
+def _invalidate_on_bulk_user_update(update_context) -> None:
+    mapper = getattr(update_context, "mapper", None)
+    if mapper is not None and mapper.class_ is User:
+        principal_cache.clear()
+
+
+@event.listens_for(Session, "after_bulk_delete")
+def _invalidate_on_bulk_user_delete(delete_context) -> None:
+    mapper = getattr(delete_context, "mapper", None)
+    if mapper is not None and mapper.class_ is User:
+        principal_cache.clear()
@@ -0,0 +1,129 @@
+"""
+Ruta asíncrona de base de datos (junto a la síncrona de app/db/base.py).
+
+Los routers ``async def`` que usan la ``Session`` síncrona bloquean el event loop
+en cada ``db.query(...)``: una query lenta frena todas las peticiones en vuelo
+del worker. Aquí se define un engine ``AsyncEngine`` (asyncpg en PostgreSQL,
+aiosqlite en local) y la dependencia ``get_async_db``.
+
+Para portar rutas que reutilizan servicios síncronos (venta TPV, fichajes) se usa
+``await db.run_sync(fn, ...)``: ``fn`` recibe una ``Session`` síncrona cuya E/S va
+por el driver async, de modo que el event loop queda libre mientras la BD responde.
+
+Pool configurable: ZEUS_DB_ASYNC_POOL_SIZE / ZEUS_DB_ASYNC_MAX_OVERFLOW (por
+defecto los mismos ZEUS_DB_POOL_SIZE / ZEUS_DB_MAX_OVERFLOW del engine síncrono).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import AsyncIterator, Optional
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+_engine_lock = threading.Lock()
+_async_engine: Optional[AsyncEngine] = None
+_async_sessionmaker: Optional[async_sessionmaker] = None
+
+# Parámetros libpq que asyncpg no acepta en la URL (Neon/Railway los añaden)
+_LIBPQ_ONLY_PARAMS = ("sslmode", "channel_binding", "connect_timeout", "options")
+
+
+def async_database_url(url: str) -> tuple[str, dict]:
+    """Traduce DATABASE_URL síncrona a su driver async → (url, connect_args)."""
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend == "sqlite":
+        return str(u.set(drivername="sqlite+aiosqlite")), {}
+    if backend in ("postgresql", "postgres"):
+        query = dict(u.query)
+        connect_args: dict = {
+            "timeout": int(os.getenv("ZEUS_DB_CONNECT_TIMEOUT", "30")),
+            "server_settings": {"statement_timeout": "30000"},
+        }
+        sslmode = query.get("sslmode")
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = sslmode
+        for key in _LIBPQ_ONLY_PARAMS:
+            query.pop(key, None)
+        u = u.set(drivername="postgresql+asyncpg", query=query)
+        return u.render_as_string(hide_password=False), connect_args
+    raise ValueError(f"Backend sin driver async configurado: {backend}")
+
+
+def get_async_engine() -> AsyncEngine:
+    """Engine async perezoso (no importar asyncpg/aiosqlite si nadie lo usa)."""
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        return _async_engine
+    with _engine_lock:
+        if _async_engine is not None:
+            return _async_engine
+        url, connect_args = async_database_url(settings.DATABASE_URL)
+        if url.startswith("sqlite"):
+            engine = create_async_engine(url, poolclass=NullPool)
+        else:
+            pool = int(os.getenv("ZEUS_DB_ASYNC_POOL_SIZE", os.getenv("ZEUS_DB_POOL_SIZE", "3")))
+            overflow = int(os.getenv("ZEUS_DB_ASYNC_MAX_OVERFLOW", os.getenv("ZEUS_DB_MAX_OVERFLOW", "5")))
+            engine = create_async_engine(
+                url,
+                pool_size=pool,
+                max_overflow=overflow,
+                pool_pre_ping=True,
+                pool_recycle=3600,
+                connect_args=connect_args,
+            )
+            logger.info("🔌 Engine async PostgreSQL pool_size=%s max_overflow=%s", pool, overflow)
+        _async_sessionmaker = async_sessionmaker(
+            bind=engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+        _async_engine = engine
+        return engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    get_async_engine()
+    return _async_sessionmaker()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependencia FastAPI: sesión async por request."""
+    db = AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_sessionmaker
+    engine = _async_engine
+    _async_engine = None
+    _async_sessionmaker = None
+    if engine is not None:
+        await engine.dispose()
+
+
+def attach_user(db: Session, user: User) -> User:
+    """Adjunta el usuario autenticado (cargado por la sesión de auth) a ``db``.
+
+    Dentro de ``run_sync`` evita que los servicios lancen lazy-loads contra la
+    sesión síncrona de autenticación.
+    """
+    try:
+        return db.merge(user, load=False)
+    except Exception:
+        return db.get(User, user.id) or user
@@ -41,28 +41,128 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def _schema_patch_steps():
+    """
+    Parches en orden de aplicación (el nombre de cada función entra en la huella de esquema).
+    Cada parche relanza sus errores para que ensure_schema_patches los anote en ``errors``.
+    """
+    return (
+        _migrate_user_columns,
+        _migrate_document_approvals_columns,
+        _migrate_rafael_fiscal_tables,
+        _migrate_tpv_company_columns,
+        _migrate_smart_time_control_tables,
+        _migrate_time_cost_engine_v1,
+        _migrate_cashflow_ledger,
+        _migrate_zeus_domain_events,
+        _migrate_zeus_analytics_tables,
+        _migrate_sales_daily_rollup,
+        _migrate_cashflow_snapshots,
+        _migrate_stored_blobs,
+        _migrate_customer_list_indexes,
+        _migrate_customer_scoring,
+        _migrate_agent_activity_hourly,
+        _migrate_data_retention,
+        _migrate_workload_indexes,
+        _migrate_invoice_totals,
+        _migrate_admin_stats,
+        _migrate_agenda_indexes,
+        _migrate_customer_contact_indexes,
+    )
+
+
 def ensure_schema_patches():
-    """Migraciones idempotentes (legacy sin Alembic real). Seguro llamar en cada arranque."""
-    try:
-        print("[SCHEMA] Aplicando parches de esquema...")
-        _migrate_user_columns()
-        _migrate_document_approvals_columns()
-        _migrate_rafael_fiscal_tables()
-        _migrate_tpv_company_columns()
-        _migrate_smart_time_control_tables()
-        _migrate_time_cost_engine_v1()
-        _migrate_cashflow_ledger()
-        _migrate_zeus_domain_events()
-        _migrate_zeus_analytics_tables()
-        print("[SCHEMA] Parches de esquema completados")
-    except Exception as e:
-        logger.warning("ensure_schema_patches: %s", e)
-        import traceback
-        traceback.print_exc()
+    """
+    Migraciones idempotentes (legacy sin Alembic real). Seguro llamar en cada arranque.
+
+    Devuelve {"patches": {nombre: ms}, "errors": {nombre: error}} para el informe de arranque.
+    """
+    import time
+
+    report = {"patches": {}, "errors": {}}
+    print("[SCHEMA] Aplicando parches de esquema...")
+    for step in _schema_patch_steps():
+        t0 = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.warning("ensure_schema_patches %s: %s", step.__name__, e)
+            import traceback
+            traceback.print_exc()
+            report["errors"][step.__name__] = str(e)[:200]
+        report["patches"][step.__name__] = round((time.perf_counter() - t0) * 1000, 1)
+    print("[SCHEMA] Parches de esquema completados")
+    return report
+
+
+def import_all_models():
+    """Registra todos los modelos en Base.metadata (create_all y huella de esquema)."""
+    # Importar modelos aquí para evitar importación circular
+    from app.models.user import User, RefreshToken, PasswordResetToken
+    from app.models.user_settings import UserSettings
+    from app.models.company import Company, UserCompany
+    from app.models.customer import Customer
+    from app.models.erp import Invoice, Product, Payment, TPVProduct
+    from app.models.fiscal import TaxRate, FiscalProfile, TPVSale, TPVSaleItem
+    from app.models.expense import Expense
+    from app.models.agent_activity import AgentActivity
+    from app.models.document_approval import DocumentApproval
+    from app.models.agent_memory import AgentOperationalState, AgentDecisionLog, AgentShortTermBuffer
+    from app.models.automation_readiness import AutomationReadiness
+    from app.models.payroll_draft import PayrollDraft
+    from app.models.reservation import Reservation
+    from app.models.tpv_comanda_share import TPVComandaShare
+    from app.models.tpv_table import TPVTable
+    from app.models.crm_office import CrmActivityLog, CrmSaleLink, CustomerRecord
+    from app.models.chat_message import ChatMessage
+    from app.models.employee_work_session import EmployeeWorkSession
+    from app.models.time_cost_checkin import TimeCostCheckin
+    from app.models.cashflow_ledger import CashflowBalanceSnapshot, CashflowDailyAggregate, CashflowLedgerEntry
+    from app.models.crm_lead import CrmLead
+    from app.models.zeus_pending_approval import ZeusPendingApproval
+    from app.models.scan_event import ScanEvent
+    from app.models.thalos_security_event import ThalosSecurityEvent, ThalosLoginAttempt
+    from app.models.thalos_event import ThalosEvent
+    from app.models.thalos_alert import ThalosAlert
+    from app.models.zeus_closure_audit import ZeusClosureAudit
+    from app.models.thalos_workspace_item import ThalosWorkspaceItem
+    from app.models.workspace_file import WorkspaceFile
+    from app.models.workspace_playbook import WorkspacePlaybook
+    from app.models.ops_route import OpsRoute
+    from app.models.zeus_transaction import ZeusTransaction
+    from app.models.perseo_job import PerseoJob
+    from app.models.legal_document import LegalDocument
+    from app.models.compliance_event import ComplianceEvent
+    from app.models.teamflow_item import TeamFlowItem
+    from app.models.teamflow_event import TeamFlowEvent
+    from app.models.zeus_domain_event import ZeusDomainEvent
+    from app.models.sales_daily_rollup import SalesDailyRollup
+    from app.models.schema_state import SchemaState
+    from app.models.stored_blob import StoredBlob, StoredBlobRef
+    from app.models.customer_score import CustomerScore
+    from app.models.agent_activity_hourly import AgentActivityHourly
+    from app.models.data_archive_segment import DataArchiveSegment
+    from app.models.admin_revenue_snapshot import AdminRevenueSnapshot
+    from app.models.tpv_operator_session import TPVOperatorSession
+    from app.models.time_tracking import (
+        TimeTrackingRecord,
+        EmployeeSchedule,
+        AttendanceReport,
+        TimeControlEvent,
+        TimeControlAlert,
+    )
 
 
 def create_tables():
-    """Crear todas las tablas en la base de datos"""
+    """
+    Parches de esquema + create_all + parches. Devuelve tiempos por fase, o None si falla.
+
+    La primera pasada va antes de create_all: algunos parches hacen backfill solo cuando
+    crean su tabla. La segunda aplica el DDL que solo existe en los parches (p. ej. los
+    índices trigram de customers) sobre las tablas que acaba de crear create_all; sus
+    ``errors`` son los que cuentan para la huella. En arranque usar
+    app.db.schema_bootstrap.bootstrap_schema (un solo proceso aplica; el resto verifica la huella).
+    """
     import time
     # Postgres "sleeping" / cold start en Railway: más intentos y backoff.
     max_retries = int(os.getenv("ZEUS_DB_CREATE_TABLES_RETRIES", "8"))
@@ -72,61 +172,23 @@ def create_tables():
         try:
             print(f"[DATABASE] Intento {attempt + 1}/{max_retries}: Creando tablas...")
             
-            ensure_schema_patches()
-
-            # Importar modelos aquí para evitar importación circular
-            from app.models.user import User, RefreshToken, PasswordResetToken
-            from app.models.user_settings import UserSettings
-            from app.models.company import Company, UserCompany
-            from app.models.customer import Customer
-            from app.models.erp import Invoice, Product, Payment, TPVProduct
-            from app.models.fiscal import TaxRate, FiscalProfile, TPVSale, TPVSaleItem
-            from app.models.expense import Expense
-            from app.models.agent_activity import AgentActivity
-            from app.models.document_approval import DocumentApproval
-            from app.models.agent_memory import AgentOperationalState, AgentDecisionLog, AgentShortTermBuffer
-            from app.models.automation_readiness import AutomationReadiness
-            from app.models.payroll_draft import PayrollDraft
-            from app.models.reservation import Reservation
-            from app.models.tpv_comanda_share import TPVComandaShare
-            from app.models.tpv_table import TPVTable
-            from app.models.crm_office import CrmActivityLog, CrmSaleLink, CustomerRecord
-            from app.models.chat_message import ChatMessage
-            from app.models.employee_work_session import EmployeeWorkSession
-            from app.models.time_cost_checkin import TimeCostCheckin
-            from app.models.cashflow_ledger import CashflowLedgerEntry
-            from app.models.crm_lead import CrmLead
-            from app.models.zeus_pending_approval import ZeusPendingApproval
-            from app.models.scan_event import ScanEvent
-            from app.models.thalos_security_event import ThalosSecurityEvent, ThalosLoginAttempt
-            from app.models.thalos_event import ThalosEvent
-            from app.models.thalos_alert import ThalosAlert
-            from app.models.zeus_closure_audit import ZeusClosureAudit
-            from app.models.thalos_workspace_item import ThalosWorkspaceItem
-            from app.models.workspace_file import WorkspaceFile
-            from app.models.workspace_playbook import WorkspacePlaybook
-            from app.models.ops_route import OpsRoute
-            from app.models.zeus_transaction import ZeusTransaction
-            from app.models.perseo_job import PerseoJob
-            from app.models.legal_document import LegalDocument
-            from app.models.compliance_event import ComplianceEvent
-            from app.models.teamflow_item import TeamFlowItem
-            from app.models.teamflow_event import TeamFlowEvent
-            from app.models.zeus_domain_event import ZeusDomainEvent
-            from app.models.tpv_operator_session import TPVOperatorSession
-            from app.models.time_tracking import (
-                TimeTrackingRecord,
-                EmployeeSchedule,
-                AttendanceReport,
-                TimeControlEvent,
-                TimeControlAlert,
-            )
+            t0 = time.perf_counter()
+            report = ensure_schema_patches()
+            report["schema_patches_ms"] = round((time.perf_counter() - t0) * 1000, 1)
 
+            import_all_models()
+            t1 = time.perf_counter()
             Base.metadata.create_all(bind=engine)
+            report["create_all_ms"] = round((time.perf_counter() - t1) * 1000, 1)
             print("[DATABASE] [OK] Tablas creadas correctamente")
-            
-            ensure_schema_patches()
-            return  # Éxito, salir de la función
+
+            t2 = time.perf_counter()
+            second = ensure_schema_patches()
+            report["schema_patches_ms"] += round((time.perf_counter() - t2) * 1000, 1)
+            for name, ms in second["patches"].items():
+                report["patches"][name] = round(report["patches"].get(name, 0) + ms, 1)
+            report["errors"] = second["errors"]
+            return report  # Éxito, salir de la función
             
         except Exception as e:
             error_msg = str(e)
@@ -149,7 +211,7 @@ def create_tables():
                 traceback.print_exc()
                 # No lanzar el error, permitir que la aplicación continúe
                 print("[DATABASE] [ADVERTENCIA] La aplicación continuará sin base de datos. Algunas funciones pueden no estar disponibles.")
-                return
+                return None
 
 
 def _migrate_user_columns():
@@ -232,6 +294,7 @@ def _migrate_user_columns():
                         print(f"[MIGRATION] [INFO] Columna '{column_name}' ya existe")
                     else:
                         print(f"[MIGRATION] [WARN] Error agregando columna '{column_name}': {e}")
+                        raise
             else:
                 print(f"[MIGRATION] [INFO] Columna '{column_name}' ya existe")
         
@@ -242,8 +305,7 @@ def _migrate_user_columns():
                 
     except Exception as e:
         print(f"[MIGRATION] [WARN] No se pudo ejecutar migracion: {e}")
-        import traceback
-        traceback.print_exc()
+        raise
 
 
 def _migrate_document_approvals_columns():
@@ -304,6 +366,7 @@ def _migrate_document_approvals_columns():
                     print(f"[MIGRATION] [INFO] document_approvals.{column_name} ya existe")
                 else:
                     print(f"[MIGRATION] [WARN] No se pudo agregar document_approvals.{column_name}: {e}")
+                    raise
 
         # Índice útil para trazabilidad de tickets
         try:
@@ -327,6 +390,7 @@ def _migrate_document_approvals_columns():
                 print("[MIGRATION] [OK] Índice ix_document_approvals_ticket_id creado")
         except Exception as e:
             print(f"[MIGRATION] [WARN] No se pudo crear índice ticket_id en document_approvals: {e}")
+            raise
 
         try:
             indexes = {ix["name"] for ix in inspector.get_indexes("document_approvals")}
@@ -349,6 +413,7 @@ def _migrate_document_approvals_columns():
                 print("[MIGRATION] [OK] Índice ix_document_approvals_company_id creado")
         except Exception as e:
             print(f"[MIGRATION] [WARN] No se pudo crear índice company_id en document_approvals: {e}")
+            raise
 
         if added:
             print(f"[MIGRATION] [OK] document_approvals alineada. Nuevas columnas: {', '.join(added)}")
@@ -356,8 +421,7 @@ def _migrate_document_approvals_columns():
             print("[MIGRATION] [OK] document_approvals ya estaba alineada")
     except Exception as e:
         print(f"[MIGRATION] [WARN] No se pudo verificar document_approvals: {e}")
-        import traceback
-        traceback.print_exc()
+        raise
 
 
 def _migrate_rafael_fiscal_tables():
@@ -437,10 +501,12 @@ def _migrate_rafael_fiscal_tables():
                     print("[MIGRATION] [OK] Tabla expenses creada (SQL)")
                 except (OperationalError, ProgrammingError) as sql_err:
                     print(f"[MIGRATION] [WARN] No se pudo crear expenses: {sql_err}")
+                    raise
         else:
             print("[MIGRATION] [OK] Tabla expenses ya existe")
     except Exception as e:
         print(f"[MIGRATION] [WARN] No se pudo verificar tablas fiscales RAFAEL: {e}")
+        raise
 
 
 def _migrate_tpv_company_columns():
@@ -473,6 +539,7 @@ def _migrate_tpv_company_columns():
                     print(f"[MIGRATION] [INFO] {table_name}.company_id ya existe")
                 else:
                     print(f"[MIGRATION] [WARN] No se pudo agregar {table_name}.company_id: {e}")
+                    raise
 
             # índice útil para consultas por empresa en TPV
             try:
@@ -491,6 +558,7 @@ def _migrate_tpv_company_columns():
                     print(f"[MIGRATION] [OK] Índice {idx_name} creado")
             except Exception as e:
                 print(f"[MIGRATION] [WARN] No se pudo crear índice company_id en {table_name}: {e}")
+                raise
 
         if "invoices" in inspector.get_table_names():
             inv_cols = {c["name"] for c in inspector.get_columns("invoices")}
@@ -511,10 +579,10 @@ def _migrate_tpv_company_columns():
                     print("[MIGRATION] [OK] invoices.company_id backfill desde created_by")
                 except Exception as e:
                     print(f"[MIGRATION] [WARN] backfill invoices.company_id: {e}")
+                    raise
     except Exception as e:
         print(f"[MIGRATION] [WARN] No se pudo verificar tpv company_id: {e}")
-        import traceback
-        traceback.print_exc()
+        raise
 
 
 def _migrate_smart_time_control_tables():
@@ -548,6 +616,45 @@ def _migrate_smart_time_control_tables():
                         print("[MIGRATION] [INFO] extra_hours ya existe")
                     else:
                         print(f"[MIGRATION] [WARN] extra_hours: {e}")
+                        raise
+
+        if "attendance_reports" in tables:
+            cols = {c["name"] for c in inspector.get_columns("attendance_reports")}
+            for column_name in ("overtime_hours", "break_hours"):
+                if column_name in cols:
+                    continue
+                try:
+                    with engine.begin() as conn:
+                        col_type = "DOUBLE PRECISION" if is_postgres else "FLOAT"
+                        conn.execute(
+                            text(f"ALTER TABLE attendance_reports ADD COLUMN {column_name} {col_type} DEFAULT 0")
+                        )
+                    print(f"[MIGRATION] [OK] attendance_reports.{column_name} agregada")
+                except (OperationalError, ProgrammingError) as e:
+                    print(f"[MIGRATION] [WARN] attendance_reports.{column_name}: {e}")
+                    raise
+            if "open_records" not in cols:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text("ALTER TABLE attendance_reports ADD COLUMN open_records INTEGER DEFAULT 0"))
+                    print("[MIGRATION] [OK] attendance_reports.open_records agregada")
+                except (OperationalError, ProgrammingError) as e:
+                    print(f"[MIGRATION] [WARN] attendance_reports.open_records: {e}")
+                    raise
+            indexes = {ix["name"] for ix in inspector.get_indexes("attendance_reports")}
+            if "uq_attendance_reports_period" not in indexes:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(
+                            text(
+                                "CREATE UNIQUE INDEX IF NOT EXISTS uq_attendance_reports_period "
+                                "ON attendance_reports (user_id, employee_id, period_type, period_start)"
+                            )
+                        )
+                    print("[MIGRATION] [OK] uq_attendance_reports_period creado")
+                except (OperationalError, ProgrammingError) as e:
+                    print(f"[MIGRATION] [WARN] uq_attendance_reports_period: {e}")
+                    raise
 
         if "time_control_events" not in tables:
             print("[MIGRATION] [INFO] time_control_events se creará vía create_all si el modelo está importado")
@@ -555,6 +662,7 @@ def _migrate_smart_time_control_tables():
             print("[MIGRATION] [INFO] time_control_alerts se creará vía create_all si el modelo está importado")
     except Exception as e:
         print(f"[MIGRATION] [WARN] smart time control migrate: {e}")
+        raise
 
 
 def _migrate_time_cost_engine_v1():
@@ -586,6 +694,7 @@ def _migrate_time_cost_engine_v1():
                     em = str(e).lower()
                     if "duplicate column" not in em and "already exists" not in em:
                         print(f"[MIGRATION] [WARN] hourly_rate: {e}")
+                        raise
 
         if "employee_work_sessions" in tables:
             cols = {c["name"] for c in inspector.get_columns("employee_work_sessions")}
@@ -614,11 +723,13 @@ def _migrate_time_cost_engine_v1():
                         em = str(e).lower()
                         if "duplicate column" not in em and "already exists" not in em:
                             print(f"[MIGRATION] [WARN] employee_work_sessions.{col_name}: {e}")
+                            raise
 
         if "time_cost_checkins" not in tables:
             print("[MIGRATION] [INFO] time_cost_checkins se creará vía create_all si el modelo está importado")
     except Exception as e:
         print(f"[MIGRATION] [WARN] time cost engine v1 migrate: {e}")
+        raise
 
 
 def _migrate_cashflow_ledger():
@@ -632,6 +743,38 @@ def _migrate_cashflow_ledger():
         print("[MIGRATION] [INFO] cashflow_ledger se creará vía create_all si el modelo está importado")
     except Exception as e:
         print(f"[MIGRATION] [WARN] cashflow_ledger migrate: {e}")
+        raise
+
+
+def _migrate_cashflow_snapshots():
+    """Snapshots de saldo + agregados diarios de cashflow (migration 0044); backfill al crearlos."""
+    from sqlalchemy import inspect
+
+    try:
+        names = set(inspect(engine).get_table_names())
+        if "cashflow_ledger" not in names:
+            return
+        from app.models.cashflow_ledger import CashflowBalanceSnapshot, CashflowDailyAggregate, CashflowLedgerEntry
+
+        for idx in CashflowLedgerEntry.__table__.indexes:
+            if idx.name in ("ix_cashflow_ledger_company_id_id", "ix_cashflow_ledger_company_created"):
+                idx.create(bind=engine, checkfirst=True)
+        if "cashflow_balance_snapshots" in names and "cashflow_daily_aggregates" in names:
+            return
+        CashflowBalanceSnapshot.__table__.create(bind=engine, checkfirst=True)
+        CashflowDailyAggregate.__table__.create(bind=engine, checkfirst=True)
+        print("[MIGRATION] [OK] cashflow_balance_snapshots / cashflow_daily_aggregates creadas")
+        from services.cashflow_ledger_service import rebuild_snapshots
+
+        db = SessionLocal()
+        try:
+            stats = rebuild_snapshots(db)
+            print(f"[MIGRATION] [OK] cashflow snapshots backfill: {stats}")
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"[MIGRATION] [WARN] cashflow snapshots migrate: {e}")
+        raise
 
 
 def _migrate_zeus_domain_events():
@@ -647,6 +790,7 @@ def _migrate_zeus_domain_events():
         print("[MIGRATION] [OK] zeus_domain_events creada")
     except Exception as e:
         print(f"[MIGRATION] [WARN] zeus_domain_events migrate: {e}")
+        raise
 
 
 def _migrate_zeus_analytics_tables():
@@ -664,6 +808,356 @@ def _migrate_zeus_analytics_tables():
                 print(f"[MIGRATION] [OK] {model.__tablename__} creada")
     except Exception as e:
         print(f"[MIGRATION] [WARN] zeus_analytics tables migrate: {e}")
+        raise
+
+
+def _migrate_sales_daily_rollup():
+    """Tabla sales_daily_rollup (migration 0043); al crearla, backfill desde tpv_sales."""
+    from sqlalchemy import inspect
+
+    try:
+        names = set(inspect(engine).get_table_names())
+        if "sales_daily_rollup" in names:
+            return
+        from app.models.sales_daily_rollup import SalesDailyRollup
+
+        SalesDailyRollup.__table__.create(bind=engine, checkfirst=True)
+        print("[MIGRATION] [OK] sales_daily_rollup creada")
+        if "tpv_sales" in names and "tpv_sale_items" in names:
+            from services.sales_rollup_service import rebuild_rollups
+
+            db = SessionLocal()
+            try:
+                stats = rebuild_rollups(db)
+                print(f"[MIGRATION] [OK] sales_daily_rollup backfill: {stats}")
+            finally:
+                db.close()
+    except Exception as e:
+        print(f"[MIGRATION] [WARN] sales_daily_rollup migrate: {e}")
+        raise
+
+
+def _migrate_stored_blobs():
+    """Tablas stored_blobs + stored_blob_refs (migration 0047)."""
+    from sqlalchemy import inspect
+
+    try:
+        names = set(inspect(engine).get_table_names())
+        from app.models.stored_blob import StoredBlob, StoredBlobRef
+
+        for model in (StoredBlob, StoredBlobRef):
+            if model.__tablename__ not in names:
+                model.__table__.create(bind=engine, checkfirst=True)
+                print(f"[MIGRATION] [OK] {model.__tablename__} creada")
+    except Exception as e:
+        print(f"[MIGRATION] [WARN] stored_blobs migrate: {e}")
+        raise
+
+
+CUSTOMER_LIST_INDEXES = (
+    ("ix_customers_company_name_id", "company_id, name, id"),
+    ("ix_customers_owner_name_id", "owner_user_id, name, id"),
+)
+CUSTOMER_TRGM_INDEXES = (
+    ("ix_customers_name_trgm", "lower(name)"),
+    ("ix_customers_email_trgm", "lower(email)"),
+    ("ix_customers_phone_trgm", "lower(phone)"),
+    ("ix_customers_tax_id_trgm", "lower(tax_id)"),
+)
+
+
+def _migrate_customer_list_indexes():
+    """Índices del listado CRM paginado (migration 0048); trigram solo en Postgres con pg_trgm."""
+    from sqlalchemy import inspect, text
+
+    try:
+        if "customers" not in set(inspect(engine).get_table_names()):
+            return
+        existing = {ix["name"] for ix in inspect(engine).get_indexes("customers")}
+        with engine.begin() as conn:
+            for name, cols in CUSTOMER_LIST_INDEXES:
+                if name not in existing:
+                    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON customers ({cols})"))
+                    print(f"[MIGRATION] [OK] {name} creado")
+        if engine.dialect.name != "postgresql":
+            return
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for name, expr in CUSTOMER_TRGM_INDEXES:
+                if name not in existing:
+                    conn.execute(
+                        text(f"CREATE INDEX IF NOT EXISTS {name} ON customers USING gin ({expr} gin_trgm_ops)")
+                    )
+                    print(f"[MIGRATION] [OK] {name} creado")
+    except Exception as e:
+        print(f"[MIGRATION] [WARN] customer list indexes migrate: {e}")
+        raise
+
+
+CUSTOMER_SCORING_INDEXES = (
+    ("tpv_sales", "ix_tpv_sales_customer_id", "customer_id"),
+    ("tpv_sales", "ix_tpv_sales_company_customer_date", "company_id, customer_id, sale_date"),
+    ("crm_activity_logs", "ix_crm_activity_logs_company_customer_created", "company_id, customer_id, created_at"),
+)
+
+
+def _migrate_customer_scoring():
+    """tpv_sales.customer_id + índices + customer_scores (migration 0049); backfill al añadir la columna."""
+    from sqlalchemy import inspect, text
+
+    try:
+        inspector = inspect(engine)
+        names = set(inspector.get_table_names())
+        added = False
+        if "tpv_sales" in names and "customer_id" not in {c["name"] for c in inspector.get_columns("tpv_sales")}:
+            with engine.begin() as conn:
+                conn.execute(text("ALTER TABLE tpv_sales ADD COLUMN customer_id INTEGER"))
+            added = True
+            print("[MIGRATION] [OK] tpv_sales.customer_id agregada")
+        for table, name, cols in CUSTOMER_SCORING_INDEXES:
+            if table not in names:
+                continue
+            if name not in {ix["name"] for ix in inspect(engine).get_indexes(table)}:
+                with engine.begin() as conn:
+                    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})"))
+                print(f"[MIGRATION] [OK] {name} creado")
+        if "customer_scores" not in names:
+            from app.models.customer_score import CustomerScore
+
+            CustomerScore.__table__.create(bind=engine, checkfirst=True)
+            print("[MIGRATION] [OK] customer_scores creada")
+        if added:
+            from services.fiscal_engine import backfill_sale_customer_ids
+
+            import_all_models()  # el backfill usa el ORM: mappers completos
+            db = SessionLocal()
+            try:
+                stats = backfill_sale_customer_ids(db)
+                print(f"[MIGRATION] [OK] tpv_sales.customer_id backfill: {stats}")
+            finally:
+                db.close()
+    except Exception as e:
+        print(f"[MIGRATION] [WARN] customer scoring migrate: {e}")
+        raise
+
+
+AGENT_ACTIVITY_INDEXES = (
+    ("ix_agent_activities_created_at", "created_at"),
+    ("ix_agent_activities_user_created", "user_email, created_at"),
+)
+
+
+def _migrate_agent_activity_hourly():
+    """Índices de agent_activities + tabla agent_activity_hourly (migration 0050); backfill al crearla."""
+    from sqlalchemy import inspect, text
+
+    try:
+        names = set(inspect(engine).get_table_names())
+        if "agent_activities" in names:
+            existing = {ix["name"] for ix in inspect(engine).get_indexes("agent_activities")}
+            for name, cols in AGENT_ACTIVITY_INDEXES:
+                if name not in existing:
+                    with engine.begin() as conn:
+                        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON agent_activities ({cols})"))
+                    print(f"[MIGRATION] [OK] {name} creado")
+        if "agent_activity_hourly" in names:
+            return
+        from app.models.agent_activity_hourly import AgentActivityHourly
+
+        AgentActivityHourly.__table__.create(bind=engine, checkfirst=True)
+        print("[MIGRATION] [OK] agent_activity_hourly creada")
+        if "agent_activities" in names:
+            from services.activity_metrics_service import rebuild_hourly_rollups
+
+            db = SessionLocal()
+            try:
+                stats = rebuild_hourly_rollups(db)
+                print(f"[MIGRATION] [OK] agent_activity_hourly backfill: {stats}")
+            finally:
+                db.close()
+    except Exception as e:
+        print(f"[MIGRATION] [WARN] agent_activity_hourly migrate: {e}")
+        raise
+
+
+def _migrate_data_retention():
+    """Tabla data_archive_segments + índice por fecha de zeus_closure_audits (migration 0051)."""
+    from sqlalchemy import inspect, text
+
+    try:
+        names = set(inspect(engine).get_table_names())
+        if "zeus_closure_audits" in names:
+            existing = {ix["name"] for ix in inspect(engine).get_indexes("zeus_closure_audits")}
+            if "ix_zeus_closure_audits_created_at" not in existing:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text(
+                            "CREATE INDEX IF NOT EXISTS ix_zeus_closure_audits_created_at "
+                            "ON zeus_closure_audits (created_at)"
+                        )
+                    )
+                print("[MIGRATION] [OK] ix_zeus_closure_audits_created_at creado")
+        if "data_archive_segments" in names:
+            return
+        from app.models.data_archive_segment import DataArchiveSegment
+
+        DataArchiveSegment.__table__.create(bind=engine, checkfirst=True)
+        print("[MIGRATION] [OK] data_archive_segments creada")
+    except Exception as e:
+        print(f"[MIGRATION] [WARN] data retention migrate: {e}")
+        raise
+
+
+WORKLOAD_INDEXES = (
+    ("tpv_sales", "ix_tpv_sales_company_sale_date", "company_id, sale_date", None),
+    ("tpv_sales", "ix_tpv_sales_user_sale_date", "user_id, sale_date", None),
+    ("agent_activities", "ix_agent_activities_agent_created", "agent_name, created_at", None),
+    (
+        "agent_activities",
+        "ix_agent_activities_open_created",
+        "created_at",
+        "status IN ('pending', 'in_progress')",
+    ),
+    (
+        "time_tracking_records",
+        "ix_time_tracking_records_user_employee_checkin",
+        "user_id, employee_id, check_in_time",
+        None,
+    ),
+)
+
+
+def _migrate_workload_indexes():
+    """Índices compuestos/parciales de las consultas calientes (migration 0052)."""
+    from sqlalchemy import inspect, text
+
+    try:
+        inspector = inspect(engine)
+        names = set(inspector.get_table_names())
+        for table, name, cols, where in WORKLOAD_INDEXES:
+            if table not in names:
+                continue
+            if name in {ix["name"] for ix in inspector.get_indexes(table)}:
+                continue
+            ddl = f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})"
+            with engine.begin() as conn:
+                conn.execute(text(f"{ddl} WHERE {where}" if where else ddl))
+            print(f"[MIGRATION] [OK] {name} creado")
+    except Exception as e:
+        print(f"[MIGRATION] [WARN] workload indexes migrate: {e}")
+        raise
+
+
+INVOICE_TOTALS_INDEXES = (
+    ("invoice_items", "ix_invoice_items_invoice_id", "invoice_id"),
+    ("payments", "ix_payments_invoice_id", "invoice_id"),
+)
+
+
+def _migrate_invoice_totals():
+    """Índices invoice_id de líneas/pagos (migration 0053); backfill de totales al crearlos."""
+    from sqlalchemy import inspect, text
+
+    try:
+        inspector = inspect(engine)
+        names = set(inspector.get_table_names())
+        created = False
+        for table, name, cols in INVOICE_TOTALS_INDEXES:
+            if table not in names or name in {ix["name"] for ix in inspector.get_indexes(table)}:
+                continue
+            with engine.begin() as conn:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})"))
+            print(f"[MIGRATION] [OK] {name} creado")
+            created = True
+        if created and "invoices" in names:
+            from services.invoice_totals_service import backfill_invoice_totals
+
+            db = SessionLocal()
+            try:
+                stats = backfill_invoice_totals(db)
+                print(f"[MIGRATION] [OK] invoice totals backfill: {stats}")
+            finally:
+                db.close()
+    except Exception as e:
+        print(f"[MIGRATION] [WARN] invoice totals migrate: {e}")
+        raise
+
+
+ADMIN_STATS_INDEXES = (
+    ("ix_users_created_at", "created_at"),
+    ("ix_users_active_plan", "is_active, plan"),
+)
+
+
+def _migrate_admin_stats():
+    """Índices de users para el panel de superusuario + admin_revenue_snapshots (migration 0054)."""
+    from sqlalchemy import inspect, text
+
+    try:
+        names = set(inspect(engine).get_table_names())
+        if "users" in names:
+            existing = {ix["name"] for ix in inspect(engine).get_indexes("users")}
+            for name, cols in ADMIN_STATS_INDEXES:
+                if name not in existing:
+                    with engine.begin() as conn:
+                        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON users ({cols})"))
+                    print(f"[MIGRATION] [OK] {name} creado")
+        if "admin_revenue_snapshots" in names:
+            return
+        from app.models.admin_revenue_snapshot import AdminRevenueSnapshot
+
+        AdminRevenueSnapshot.__table__.create(bind=engine, checkfirst=True)
+        print("[MIGRATION] [OK] admin_revenue_snapshots creada")
+    except Exception as e:
+        print(f"[MIGRATION] [WARN] admin stats migrate: {e}")
+        raise
+
+
+AGENDA_INDEXES = (
+    ("crm_leads", "ix_crm_leads_company_meeting", "company_id, meeting_at"),
+    ("reservations", "ix_reservations_user_date", "user_id, reservation_date"),
+)
+
+
+def _migrate_agenda_indexes():
+    """Índices por rango para el índice de disponibilidad de la agenda (migration 0055)."""
+    from sqlalchemy import inspect, text
+
+    try:
+        names = set(inspect(engine).get_table_names())
+        for table, name, cols in AGENDA_INDEXES:
+            if table not in names:
+                continue
+            existing = {ix["name"] for ix in inspect(engine).get_indexes(table)}
+            if name not in existing:
+                with engine.begin() as conn:
+                    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})"))
+                print(f"[MIGRATION] [OK] {name} creado")
+    except Exception as e:
+        print(f"[MIGRATION] [WARN] agenda indexes migrate: {e}")
+        raise
+
+
+def _migrate_customer_contact_indexes():
+    """customer_contacts.customer_id para la precarga de contactos del listado CRM (migration 0057)."""
+    from sqlalchemy import inspect, text
+
+    try:
+        if "customer_contacts" not in set(inspect(engine).get_table_names()):
+            return
+        existing = {ix["name"] for ix in inspect(engine).get_indexes("customer_contacts")}
+        if "ix_customer_contacts_customer_id" not in existing:
+            with engine.begin() as conn:
+                conn.execute(
+                    text(
+                        "CREATE INDEX IF NOT EXISTS ix_customer_contacts_customer_id "
+                        "ON customer_contacts (customer_id)"
+                    )
+                )
+            print("[MIGRATION] [OK] ix_customer_contacts_customer_id creado")
+    except Exception as e:
+        print(f"[MIGRATION] [WARN] customer contact indexes migrate: {e}")
+        raise
 
 
 def _migrate_firewall_columns_legacy():
@@ -0,0 +1,234 @@
+"""
+Arranque de esquema versionado con líder único.
+
+Antes cada worker de Gunicorn ejecutaba ensure_schema_patches() + create_all (y los
+parches tres veces). Ahora:
+
+1. Se calcula la huella del esquema del código (modelos + lista de parches +
+   SCHEMA_BOOTSTRAP_VERSION) y se compara con zeus_schema_state en una consulta.
+   Si coincide, el worker no toca el esquema.
+2. Si no coincide, se toma el lock de líder (pg_advisory_lock en Postgres, flock
+   sobre un fichero junto a la BD en SQLite). Quien lo obtiene vuelve a comprobar la
+   huella (otro líder pudo terminar mientras esperaba), aplica parches + create_all
+   una vez y guarda la huella. El resto espera al lock y solo verifica.
+
+Cada fase queda cronometrada en el informe que devuelve ``bootstrap_schema`` (ver
+también ``last_bootstrap_report`` y /debug).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import socket
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.base import Base, _schema_patch_steps, create_tables, engine, import_all_models
+
+logger = logging.getLogger(__name__)
+
+# Subir para forzar una pasada de parches aunque los modelos no cambien (p. ej. backfill nuevo).
+SCHEMA_BOOTSTRAP_VERSION = 1
+SCHEMA_COMPONENT = "app"
+_PG_LOCK_KEY = 0x5A455553_0001  # "ZEUS" + 1
+_LOCK_POLL_SEC = 0.5
+
+_last_report: Dict[str, Any] = {}
+
+
+def schema_fingerprint() -> str:
+    """sha256 estable de tablas/columnas/índices de Base.metadata y de los parches registrados."""
+    import_all_models()
+    parts = [f"v{SCHEMA_BOOTSTRAP_VERSION}"]
+    parts.extend(f"patch:{step.__name__}" for step in _schema_patch_steps())
+    for name in sorted(Base.metadata.tables):
+        table = Base.metadata.tables[name]
+        parts.append(f"table:{name}")
+        for col in table.columns:
+            parts.append(f"col:{col.name}:{col.type!r}:{int(bool(col.nullable))}:{int(bool(col.primary_key))}")
+        parts.extend(sorted(f"ix:{ix.name}:{int(bool(ix.unique))}" for ix in table.indexes))
+        parts.extend(sorted(f"cons:{c.name}" for c in table.constraints if c.name))
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def _read_fingerprint() -> Optional[str]:
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(
+                text("SELECT fingerprint FROM zeus_schema_state WHERE component = :c"),
+                {"c": SCHEMA_COMPONENT},
+            ).first()
+        return row[0] if row else None
+    except Exception:
+        # Tabla aún inexistente (primer arranque) o BD no disponible: tratar como desalineado.
+        return None
+
+
+def _write_fingerprint(fingerprint: str, duration_ms: float, report: Dict[str, Any]) -> None:
+    from app.db.session import SessionLocal
+    from app.models.schema_state import SchemaState
+
+    SchemaState.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        row = db.get(SchemaState, SCHEMA_COMPONENT)
+        if row is None:
+            row = SchemaState(component=SCHEMA_COMPONENT)
+            db.add(row)
+        row.fingerprint = fingerprint
+        row.applied_by = f"{socket.gethostname()}:{os.getpid()}"[:128]
+        row.duration_ms = duration_ms
+        row.report = report
+        db.commit()
+    finally:
+        db.close()
+
+
+def _sqlite_lock_path() -> str:
+    db_path = engine.url.database or ""
+    if db_path and db_path != ":memory:":
+        return os.path.abspath(db_path) + ".schema.lock"
+    return os.path.join(tempfile.gettempdir(), "zeus_schema_bootstrap.lock")
+
+
+@contextmanager
+def leader_lock(timeout: float) -> Iterator[bool]:
+    """Lock de líder entre procesos. Produce True si se obtuvo antes de ``timeout``."""
+    deadline = time.monotonic() + max(0.0, timeout)
+    if engine.dialect.name == "postgresql":
+        conn = engine.connect()
+        acquired = False
+        try:
+            while True:
+                acquired = bool(conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _PG_LOCK_KEY}).scalar())
+                conn.commit()
+                if acquired or time.monotonic() >= deadline:
+                    break
+                time.sleep(_LOCK_POLL_SEC)
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _PG_LOCK_KEY})
+                    conn.commit()
+                except Exception as exc:
+                    logger.warning("schema bootstrap: unlock falló: %s", exc)
+            conn.close()
+        return
+
+    try:
+        import fcntl
+    except ImportError:  # Windows: entorno de desarrollo de un solo proceso
+        yield True
+        return
+    with open(_sqlite_lock_path(), "a+") as fh:
+        acquired = False
+        try:
+            while True:
+                try:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    acquired = True
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        break
+                    time.sleep(_LOCK_POLL_SEC)
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 1)
+
+
+def bootstrap_schema(*, force: Optional[bool] = None, lock_timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Deja el esquema al día una sola vez por huella. Devuelve el informe de arranque:
+    {"role": verified|leader|follower|follower_timeout|fallback, "phases": {fase: ms}, ...}.
+    """
+    global _last_report
+    force = settings.ZEUS_SCHEMA_FORCE_PATCHES if force is None else force
+    timeout = settings.ZEUS_SCHEMA_LOCK_TIMEOUT_SEC if lock_timeout is None else lock_timeout
+    t_start = time.perf_counter()
+    report: Dict[str, Any] = {"role": None, "phases": {}, "pid": os.getpid()}
+    phases = report["phases"]
+
+    t0 = time.perf_counter()
+    fingerprint = schema_fingerprint()
+    report["fingerprint"] = fingerprint[:12]
+    phases["fingerprint"] = _ms(t0)
+
+    t0 = time.perf_counter()
+    current = None if force else _read_fingerprint()
+    phases["verify"] = _ms(t0)
+    if current == fingerprint:
+        report["role"] = "verified"
+    else:
+        t0 = time.perf_counter()
+        applying = False
+        try:
+            with leader_lock(timeout) as acquired:
+                phases["lock_wait"] = _ms(t0)
+                if not acquired:
+                    report["role"] = "follower_timeout"
+                    logger.warning(
+                        "schema bootstrap: sin lock de líder tras %.0fs; se continúa sin aplicar parches", timeout
+                    )
+                elif not force and _read_fingerprint() == fingerprint:
+                    report["role"] = "follower"
+                else:
+                    report["role"] = "leader"
+                    applying = True
+                    _apply(report, fingerprint)
+        except Exception as exc:
+            if applying:
+                # El fallo es de los parches, no del lock: repetirlos sin lock no ayuda.
+                raise
+            # Lock no disponible (BD aún arrancando): comportamiento previo, create_tables con reintentos.
+            logger.warning("schema bootstrap: lock de líder falló (%s); aplicando sin lock", exc)
+            report["role"] = "fallback"
+            _apply(report, fingerprint)
+
+    report["total_ms"] = _ms(t_start)
+    _last_report = report
+    logger.info(
+        "[SCHEMA] bootstrap role=%s total_ms=%s phases=%s", report["role"], report["total_ms"], phases
+    )
+    return report
+
+
+def _apply(report: Dict[str, Any], fingerprint: str) -> None:
+    phases = report["phases"]
+    t0 = time.perf_counter()
+    result = create_tables()
+    phases["apply"] = _ms(t0)
+    if result is None:
+        report["applied"] = False
+        return
+    phases["schema_patches"] = result.get("schema_patches_ms")
+    phases["create_all"] = result.get("create_all_ms")
+    report["patches"] = result.get("patches") or {}
+    report["applied"] = True
+    if result.get("errors"):
+        # Sin huella: el siguiente arranque reintenta los parches fallidos.
+        report["errors"] = result["errors"]
+        return
+    t0 = time.perf_counter()
+    try:
+        _write_fingerprint(fingerprint, phases["apply"], {"patches": report["patches"], "phases": dict(phases)})
+    except Exception as exc:
+        logger.warning("schema bootstrap: no se pudo guardar la huella: %s", exc)
+    phases["fingerprint_write"] = _ms(t0)
+
+
+def last_bootstrap_report() -> Dict[str, Any]:
+    return dict(_last_report)
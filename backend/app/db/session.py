@@ -1,72 +1,51 @@
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import OperationalError, DisconnectionError
-from fastapi import HTTPException, status
+from sqlalchemy.exc import DisconnectionError, OperationalError, ProgrammingError
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
 from app.db.base import SessionLocal
 import logging
-import time
 
 logger = logging.getLogger(__name__)
 
+_SCHEMA_MISSING = ("no such table", "does not exist", "undefinedtable")
+
 
 def get_db():
-    """Obtener sesión de base de datos con reintentos automáticos"""
-    max_retries = 3
-    retry_delay = 1
+    """Obtener sesión de base de datos.
+
+    Sin ``SELECT 1`` por request: la validez de la conexión la comprueba el pool
+    (``pool_pre_ping`` en PostgreSQL, que además reconecta conexiones caídas; en
+    SQLite cada checkout abre conexión nueva con NullPool). La sesión no toca la
+    BD hasta la primera query real del endpoint; si esa query falla por la BD,
+    ``database_error_handler`` responde 503 en lugar de un 500.
+    """
+    db: Session = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def database_error_handler(request: Request, exc: Exception) -> JSONResponse:
+    """503 ``db_unavailable`` / ``schema_missing`` para errores de BD (registrado en app.main)."""
+    error_msg = str(exc).lower()
+    if any(k in error_msg for k in _SCHEMA_MISSING):
+        logger.error("Error de esquema path=%s: %s", request.url.path, exc)
+        detail = {
+            "error": "schema_missing",
+            "message": "Esquema de BD incompleto — ejecute alembic upgrade head",
+        }
+    elif isinstance(exc, (OperationalError, DisconnectionError)):
+        logger.error("BD no disponible path=%s: %s", request.url.path, exc)
+        detail = {
+            "error": "db_unavailable",
+            "execution_mode": "ERROR",
+            "message": "Base de datos temporalmente no disponible",
+        }
+    else:
+        # ProgrammingError que no es de esquema: bug, lo recoge uncaught_exception_guard
+        raise exc
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"detail": detail})
 
-    for attempt in range(max_retries):
-        try:
-            db: Session = SessionLocal()
-            try:
-                from sqlalchemy import text
-                db.execute(text("SELECT 1"))
-            except Exception as verify_error:
-                db.close()
-                error_msg = str(verify_error).lower()
-                if any(k in error_msg for k in ["connection", "conexión", "timeout"]):
-                    raise
-                raise
-            try:
-                yield db
-            finally:
-                db.close()
-            return
 
-        except (OperationalError, DisconnectionError) as e:
-            error_msg = str(e).lower()
-            if attempt < max_retries - 1 and any(
-                k in error_msg for k in [
-                    "connection", "conexión", "timeout", "refused", "reset", "operationalerror"
-                ]
-            ):
-                logger.warning(
-                    "Error de conexión a BD (intento %d/%d), reintentando...",
-                    attempt + 1, max_retries,
-                )
-                time.sleep(retry_delay)
-                retry_delay *= 2
-                continue
-            logger.error("Error crítico de conexión a BD después de %d intentos: %s", max_retries, e)
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail={
-                    "error": "db_unavailable",
-                    "execution_mode": "ERROR",
-                    "message": "Base de datos temporalmente no disponible",
-                },
-            ) from e
-        except HTTPException:
-            # 401 Token expirado, 403, etc.: no son errores de BD, propagar sin logear como get_db
-            raise
-        except Exception as e:
-            error_msg = str(e).lower()
-            if any(k in error_msg for k in ("no such table", "does not exist", "undefinedtable")):
-                logger.error("Error de esquema en get_db: %s", e)
-                raise HTTPException(
-                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    detail={
-                        "error": "schema_missing",
-                        "message": "Esquema de BD incompleto — ejecute alembic upgrade head",
-                    },
-                ) from e
-            logger.error("Error inesperado en get_db: %s", e)
-            raise
+DATABASE_ERRORS = (OperationalError, DisconnectionError, ProgrammingError)
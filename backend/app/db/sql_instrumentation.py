@@ -0,0 +1,219 @@
+"""
+Instrumentación SQL por petición: nº de queries, tiempo en BD y detección de N+1.
+
+Los eventos ``before/after_cursor_execute`` se registran sobre la clase ``Engine`` (cubre
+el engine síncrono, el async y los de tests). Solo cuentan las peticiones muestreadas
+(SQL_INSTRUMENTATION_SAMPLE_RATE): el resto paga una lectura de contextvar por query.
+
+Cada sentencia se reduce a una huella (literales y listas IN normalizados); si la misma
+huella se repite SQL_N_PLUS_ONE_THRESHOLD veces en una petición se registra como N+1.
+Los agregados por ruta viven en memoria del proceso y se leen en GET /metrics/sql.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_ROUTES = 500
+_T0_KEY = "zeus_sql_t0"
+
+_current: contextvars.ContextVar[Optional["SqlStats"]] = contextvars.ContextVar("zeus_sql_stats", default=None)
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Forma de la sentencia: sin literales, parámetros unificados y listas IN colapsadas."""
+    text = _SPACE_RE.sub(" ", statement).strip()
+    text = _LITERAL_RE.sub("?", text)
+    text = _PARAM_RE.sub("?", text)
+    return _IN_LIST_RE.sub("(?+)", text)
+
+
+class SqlStats:
+    """Queries de una petición (o de un bloque ``capture_queries``)."""
+
+    __slots__ = ("queries", "db_ms", "shapes")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_ms = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.queries += 1
+        self.db_ms += elapsed_ms
+        self.shapes[fingerprint(statement)] += 1
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Huellas repetidas ``threshold``+ veces, de más a menos."""
+        limit = max(2, int(threshold or settings.SQL_N_PLUS_ONE_THRESHOLD))
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= limit]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is None:
+        return
+    conn.info.setdefault(_T0_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get(_T0_KEY)
+    if not starts:
+        return
+    stats.record(statement, (time.perf_counter() - starts.pop()) * 1000.0)
+
+
+def _handle_error(exception_context) -> None:
+    conn = exception_context.connection
+    if conn is not None and conn.info.get(_T0_KEY):
+        conn.info[_T0_KEY].pop()
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install() -> None:
+    """Registra los listeners sobre ``Engine`` (idempotente)."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+        _installed = True
+
+
+def start_request() -> Optional[SqlStats]:
+    """SqlStats si esta petición entra en la muestra; None si no se instrumenta."""
+    if not settings.SQL_INSTRUMENTATION_ENABLED:
+        return None
+    rate = float(settings.SQL_INSTRUMENTATION_SAMPLE_RATE)
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return None
+    return SqlStats()
+
+
+def bind(stats: SqlStats) -> contextvars.Token:
+    return _current.set(stats)
+
+
+def unbind(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+@contextmanager
+def capture_queries() -> Iterator[SqlStats]:
+    """Cuenta las queries del bloque en el hilo actual (tests, scripts); ignora el muestreo."""
+    install()
+    stats = SqlStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def server_timing(stats: SqlStats, total_ms: Optional[float] = None) -> str:
+    parts = [f'db;dur={stats.db_ms:.1f};desc="{stats.queries} queries"']
+    if total_ms is not None:
+        parts.append(f"app;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+# --- Agregados por ruta ------------------------------------------------------------
+
+_routes: Dict[str, Dict[str, Any]] = {}
+_routes_lock = threading.Lock()
+
+
+def record_request(route: str, stats: SqlStats, *, total_ms: float) -> List[Tuple[str, int]]:
+    """Acumula la petición en su ruta; devuelve (y registra en log) las huellas N+1."""
+    suspects = stats.repeated()
+    with _routes_lock:
+        entry = _routes.get(route)
+        if entry is None:
+            if len(_routes) >= MAX_ROUTES:
+                route = "<other>"
+                entry = _routes.get(route)
+            if entry is None:
+                entry = _routes[route] = {
+                    "requests": 0,
+                    "queries_total": 0,
+                    "queries_max": 0,
+                    "db_ms_total": 0.0,
+                    "app_ms_total": 0.0,
+                    "n_plus_one_requests": 0,
+                    "n_plus_one_last": None,
+                }
+        entry["requests"] += 1
+        entry["queries_total"] += stats.queries
+        entry["queries_max"] = max(entry["queries_max"], stats.queries)
+        entry["db_ms_total"] += stats.db_ms
+        entry["app_ms_total"] += total_ms
+        if suspects:
+            entry["n_plus_one_requests"] += 1
+            shape, count = suspects[0]
+            entry["n_plus_one_last"] = {"count": count, "statement": shape[:500]}
+    if suspects:
+        shape, count = suspects[0]
+        logger.warning("[SQL] posible N+1 en %s: %sx %s", route, count, shape[:200])
+    return suspects
+
+
+def sql_metrics_snapshot(*, limit: int = 50) -> Dict[str, Any]:
+    """Rutas ordenadas por queries medias (las peores primero)."""
+    with _routes_lock:
+        rows = [(route, dict(entry)) for route, entry in _routes.items()]
+    out = []
+    for route, e in rows:
+        n = max(1, e["requests"])
+        out.append(
+            {
+                "route": route,
+                "sampled_requests": e["requests"],
+                "avg_queries": round(e["queries_total"] / n, 2),
+                "max_queries": e["queries_max"],
+                "avg_db_ms": round(e["db_ms_total"] / n, 2),
+                "avg_app_ms": round(e["app_ms_total"] / n, 2),
+                "n_plus_one_requests": e["n_plus_one_requests"],
+                "n_plus_one_last": e["n_plus_one_last"],
+            }
+        )
+    out.sort(key=lambda r: (r["avg_queries"], r["max_queries"]), reverse=True)
+    return {
+        "enabled": bool(settings.SQL_INSTRUMENTATION_ENABLED),
+        "sample_rate": float(settings.SQL_INSTRUMENTATION_SAMPLE_RATE),
+        "n_plus_one_threshold": int(settings.SQL_N_PLUS_ONE_THRESHOLD),
+        "routes": out[: max(1, limit)],
+    }
+
+
+def reset_sql_metrics() -> None:
+    with _routes_lock:
+        _routes.clear()
@@ -5,6 +5,7 @@
 import logging
 import sys
 import os
+import time
 from pathlib import Path
 
 from fastapi import FastAPI, HTTPException, Request, status
@@ -18,10 +19,10 @@ from app.core.security_middleware import SecurityMiddleware
 from app.core.config import settings, ensure_static_root_ready
 from app.api.v1 import api_router
 from app.api.v1.endpoints import checkin as checkin_v1
-from app.db.base import create_tables, ensure_schema_patches
+from app.db.schema_bootstrap import bootstrap_schema, last_bootstrap_report
 from services.automation import start_agent_automation, stop_agent_automation
 from app.db.initial_superuser import ensure_initial_superuser
-from app.db.session import SessionLocal
+from app.db.session import DATABASE_ERRORS, SessionLocal, database_error_handler
 from app.models.user import User
 from app.models.agent_activity import AgentActivity
 from services.activity_logger import ActivityLogger
@@ -80,6 +81,13 @@ app.add_middleware(
 )
 app.add_middleware(SecurityMiddleware)
 
+if settings.SQL_INSTRUMENTATION_ENABLED:
+    from app.db import sql_instrumentation
+    from app.middleware.sql_instrumentation_middleware import SqlInstrumentationMiddleware
+
+    sql_instrumentation.install()
+    app.add_middleware(SqlInstrumentationMiddleware)
+
 if settings.THALOS_REAL_MONITORING:
     from app.middleware.thalos_login_audit_middleware import ThalosLoginAuditMiddleware
 
@@ -101,6 +109,11 @@ async def uncaught_exception_guard(request: Request, call_next):
         )
 
 
+# Errores de BD en endpoints: 503 db_unavailable / schema_missing (get_db ya no hace ping)
+for _db_error in DATABASE_ERRORS:
+    app.add_exception_handler(_db_error, database_error_handler)
+
+
 # Middleware específico para WebSockets en Railway
 # @app.middleware("http")
 # async def websocket_middleware(request: Request, call_next):
@@ -229,6 +242,16 @@ def _execute_zeus_launch_started():
         session.close()
 
 
+_startup_timings: dict = {"phases": {}}
+
+
+def _startup_phase(name: str, t0: float) -> float:
+    """Registra la duración de una fase de arranque y devuelve el nuevo instante de referencia."""
+    now = time.perf_counter()
+    _startup_timings["phases"][name] = round((now - t0) * 1000, 1)
+    return now
+
+
 @app.on_event("startup")
 async def startup_event():
     import asyncio
@@ -247,15 +270,19 @@ async def startup_event():
         "yes",
         "on",
     )
+    t_start = time.perf_counter()
+    t0 = t_start
     if not skip_db:
-        ensure_schema_patches()
-        create_tables()
+        _startup_timings["schema_bootstrap"] = bootstrap_schema()
+        t0 = _startup_phase("schema", t0)
         ensure_initial_superuser()
+        t0 = _startup_phase("initial_superuser", t0)
     else:
         logger.warning(
             "ZEUS_SKIP_STARTUP_DB_INIT activo: no se ejecutan create_tables ni ensure_initial_superuser."
         )
     await start_agent_automation()
+    t0 = _startup_phase("agent_automation", t0)
     if settings.ZEUS_TOTAL_SYSTEM_CLOSURE_ENABLED:
         from services.zeus_runtime_guard_v1 import attach_runtime_guard
 
@@ -285,6 +312,7 @@ async def startup_event():
             logger.error("[AFRODITA_STARTUP] Railway env misconfiguration: %s", audit)
     except Exception as exc:
         logger.warning("[AFRODITA_STARTUP] flag diagnostic failed: %s", exc)
+    t0 = _startup_phase("diagnostics", t0)
     try:
         from workers.thalos_worker import start_thalos_worker
 
@@ -297,13 +325,37 @@ async def startup_event():
         start_zeus_automation_worker()
     except Exception as exc:
         logger.warning("[ZEUS_AUTOMATION] worker start failed: %s", exc)
+    try:
+        from workers.control_horario_worker import start_control_horario_worker
+
+        start_control_horario_worker()
+    except Exception as exc:
+        logger.warning("[CONTROL_HORARIO] worker start failed: %s", exc)
+    try:
+        from workers.retention_worker import start_retention_worker
+
+        start_retention_worker()
+    except Exception as exc:
+        logger.warning("[RETENTION] worker start failed: %s", exc)
     try:
         from services.zeus_safe_lock_v1 import log_startup_safe_lock
 
         log_startup_safe_lock()
     except Exception as exc:
         logger.warning("[ZEUS_SAFE_LOCK] startup check failed: %s", exc)
-    logger.info("ZEUS-IA backend ready")
+    t0 = _startup_phase("workers", t0)
+    if settings.ZEUS_AGENT_PREWARM:
+        # Hilo daemon: no retrasa el arranque; /api/v1/chat/ready informa del progreso.
+        from app.api.v1.endpoints.chat import start_agent_prewarm
+
+        start_agent_prewarm()
+        _startup_phase("agent_prewarm_started", t0)
+    _startup_timings["total_ms"] = round((time.perf_counter() - t_start) * 1000, 1)
+    logger.info(
+        "ZEUS-IA backend ready in %sms phases=%s",
+        _startup_timings["total_ms"],
+        _startup_timings["phases"],
+    )
 
 
 @app.on_event("shutdown")
@@ -320,7 +372,31 @@ async def shutdown_event():
         stop_zeus_automation_worker()
     except Exception:
         pass
+    try:
+        from workers.control_horario_worker import stop_control_horario_worker
+
+        stop_control_horario_worker()
+    except Exception:
+        pass
+    try:
+        from workers.retention_worker import stop_retention_worker
+
+        stop_retention_worker()
+    except Exception:
+        pass
     await stop_agent_automation()
+    try:
+        from app.db.async_session import dispose_async_engine
+
+        await dispose_async_engine()
+    except Exception:
+        pass
+    try:
+        from services.http_client import aclose_async_clients
+
+        await aclose_async_clients()
+    except Exception:
+        pass
 
 # Subidas + URL /static → volumen opcional (ZEUS_STATIC_DIR, p. ej. /data/static).
 # SPA (index.html, /assets de Vite) → SPA_STATIC_DIR (imagen Docker /app/static si hay volumen).
@@ -358,6 +434,15 @@ async def health_check():
     return {"status": "healthy", "service": "zeus-ia"}
 
 
+def _http_client_metrics() -> dict:
+    try:
+        from services.http_client import metrics_snapshot
+
+        return metrics_snapshot()
+    except Exception as exc:
+        return {"error": str(exc)}
+
+
 @app.get("/debug")
 async def debug_info():
     afrodita_diag: dict = {}
@@ -390,6 +475,8 @@ async def debug_info():
         "static_dir": static_root,
         "spa_static_dir": spa_root,
         "afrodita": afrodita_diag,
+        "startup": {**_startup_timings, "schema_bootstrap": last_bootstrap_report()},
+        "http_clients": _http_client_metrics(),
     }
 
 
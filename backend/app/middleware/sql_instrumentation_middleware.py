@@ -0,0 +1,39 @@
+"""Middleware: queries y tiempo en BD por petición muestreada (Server-Timing + /metrics/sql)."""
+
+from __future__ import annotations
+
+import time
+from typing import Callable
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.db import sql_instrumentation as sqli
+
+
+class SqlInstrumentationMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        stats = sqli.start_request()
+        if stats is None:
+            return await call_next(request)
+
+        t0 = time.perf_counter()
+        token = sqli.bind(stats)
+        try:
+            response = await call_next(request)
+        finally:
+            sqli.unbind(token)
+        total_ms = (time.perf_counter() - t0) * 1000.0
+
+        # Plantilla de ruta (/customers/{customer_id}), no la URL: cardinalidad acotada.
+        # En StreamingResponse las queries del generador llegan después y no cuentan aquí.
+        route = request.scope.get("route")
+        template = getattr(route, "path", None) or "<unmatched>"
+        sqli.record_request(f"{request.method} {template}", stats, total_ms=total_ms)
+        if settings.SQL_SERVER_TIMING_HEADER:
+            timing = sqli.server_timing(stats, total_ms)
+            existing = response.headers.get("Server-Timing")
+            response.headers["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+        return response
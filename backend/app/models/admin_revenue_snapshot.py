@@ -0,0 +1,27 @@
+"""Foto diaria de ingresos SaaS del panel de superusuario (services.admin_stats_service)."""
+
+from sqlalchemy import JSON, Column, Date, DateTime, Integer, Numeric
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class AdminRevenueSnapshot(Base):
+    """
+    Una fila por día con los agregados de ``users`` en ese momento.
+
+    ``monthly_revenue`` es el MRR real de ese día (clientes activos con plan): el gráfico
+    de ingresos por mes lo usa en lugar de reconstruirlo desde el estado actual, que
+    olvida a los clientes dados de baja. ``by_plan`` = {plan: {count, monthly_total}}.
+    """
+
+    __tablename__ = "admin_revenue_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    snapshot_date = Column(Date, nullable=False, unique=True, index=True)
+    total_customers = Column(Integer, nullable=False, default=0)
+    active_subscriptions = Column(Integer, nullable=False, default=0)
+    monthly_revenue = Column(Numeric(14, 2), nullable=False, default=0)
+    total_setup_fees = Column(Numeric(14, 2), nullable=False, default=0)
+    by_plan = Column(JSON, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
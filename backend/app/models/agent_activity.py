@@ -2,13 +2,28 @@
 📊 Agent Activity Model
 Registro de actividades de cada agente IA
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Boolean, Index, bindparam, text
 from sqlalchemy.sql import func
 from app.db.base import Base
 
+# Cola del AgentAutomationExecutor; el predicado del índice parcial debe coincidir literalmente
+OPEN_STATUSES = ("pending", "in_progress")
+OPEN_STATUS_PREDICATE = "status IN ('pending', 'in_progress')"
+
 class AgentActivity(Base):
     """Modelo para registrar actividades de los agentes"""
     __tablename__ = "agent_activities"
+    __table_args__ = (
+        Index("ix_agent_activities_created_at", "created_at"),
+        Index("ix_agent_activities_user_created", "user_email", "created_at"),
+        Index("ix_agent_activities_agent_created", "agent_name", "created_at"),
+        Index(
+            "ix_agent_activities_open_created",
+            "created_at",
+            sqlite_where=text(OPEN_STATUS_PREDICATE),
+            postgresql_where=text(OPEN_STATUS_PREDICATE),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -43,6 +58,11 @@ class AgentActivity(Base):
     # Visible al cliente
     visible_to_client = Column(Boolean, default=True)
 
+    @classmethod
+    def open_status_clause(cls):
+        """status IN (pendientes) con literales: con parámetros el planner no usa el índice parcial."""
+        return cls.status.in_(bindparam("open_statuses", list(OPEN_STATUSES), expanding=True, literal_execute=True))
+
     def __repr__(self):
         return f"<AgentActivity {self.agent_name}: {self.action_type}>"
 
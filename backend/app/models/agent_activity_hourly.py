@@ -0,0 +1,31 @@
+"""Agregado horario de agent_activities (mantenido por services.activity_metrics_service)."""
+
+from sqlalchemy import Column, DateTime, Float, Integer, String, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class AgentActivityHourly(Base):
+    """
+    Una fila por (hora UTC, agente, usuario, estado).
+
+    ``hour`` es naive UTC truncada a la hora; ``user_email`` = "" cuando la actividad
+    no tiene usuario (clave única sin NULL). ``rt_samples`` / ``rt_total_sec`` permiten
+    reconstruir el tiempo medio de respuesta (completed_at - created_at).
+    """
+
+    __tablename__ = "agent_activity_hourly"
+    __table_args__ = (
+        UniqueConstraint("hour", "agent_name", "user_email", "status", name="uq_agent_activity_hourly_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    hour = Column(DateTime, nullable=False, index=True)
+    agent_name = Column(String(64), nullable=False)
+    user_email = Column(String(255), nullable=False, default="", index=True)
+    status = Column(String(32), nullable=False)
+    activity_count = Column(Integer, nullable=False, default=0)
+    rt_samples = Column(Integer, nullable=False, default=0)
+    rt_total_sec = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
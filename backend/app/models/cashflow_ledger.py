@@ -1,6 +1,6 @@
 """Libro mayor de cashflow — movimientos reales persistidos."""
 
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Index, Integer, String, Text, UniqueConstraint
 from sqlalchemy.sql import func
 
 from app.db.base import Base
@@ -8,6 +8,11 @@ from app.db.base import Base
 
 class CashflowLedgerEntry(Base):
     __tablename__ = "cashflow_ledger"
+    __table_args__ = (
+        # Delta sobre snapshot (id > last_entry_id) y ventanas por fecha, ambos por empresa.
+        Index("ix_cashflow_ledger_company_id_id", "company_id", "id"),
+        Index("ix_cashflow_ledger_company_created", "company_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -23,3 +28,39 @@ class CashflowLedgerEntry(Base):
     reference = Column(String(255), nullable=True)
     metadata_json = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+
+class CashflowBalanceSnapshot(Base):
+    """
+    Saldo acumulado por empresa hasta ``last_entry_id`` (inclusive).
+
+    Saldo real = snapshot + movimientos con id > last_entry_id (delta, normalmente vacío).
+    La fila también sirve de cerrojo por empresa en record_movement.
+    """
+
+    __tablename__ = "cashflow_balance_snapshots"
+
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), primary_key=True)
+    total_in = Column(Float, nullable=False, default=0.0)
+    total_out = Column(Float, nullable=False, default=0.0)
+    entries_count = Column(Integer, nullable=False, default=0)
+    last_entry_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class CashflowDailyAggregate(Base):
+    """Momentos diarios (n, Σx, Σx²) por empresa, origen y dirección; cubre hasta el snapshot."""
+
+    __tablename__ = "cashflow_daily_aggregates"
+    __table_args__ = (
+        UniqueConstraint("company_id", "day", "source", "direction", name="uq_cashflow_daily_aggregate_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
+    day = Column(Date, nullable=False, index=True)
+    source = Column(String(64), nullable=False)
+    direction = Column(String(8), nullable=False)
+    entries_count = Column(Integer, nullable=False, default=0)
+    amount_sum = Column(Float, nullable=False, default=0.0)
+    amount_sumsq = Column(Float, nullable=False, default=0.0)
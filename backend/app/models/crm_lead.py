@@ -1,6 +1,6 @@
 """Leads CRM con scoring para zeus_final_closure_v2."""
 
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.sql import func
 
 from app.db.base import Base
@@ -8,6 +8,10 @@ from app.db.base import Base
 
 class CrmLead(Base):
     __tablename__ = "crm_leads"
+    __table_args__ = (
+        # Agenda: reuniones de la empresa en un rango de fechas
+        Index("ix_crm_leads_company_meeting", "company_id", "meeting_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric, String, Text, JSON
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, Numeric, String, Text, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -27,6 +27,9 @@ class CustomerRecord(Base):
 
 class CrmActivityLog(Base):
     __tablename__ = "crm_activity_logs"
+    __table_args__ = (
+        Index("ix_crm_activity_logs_company_customer_created", "company_id", "customer_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 from datetime import datetime
@@ -33,13 +33,19 @@ class Customer(Base):
     # Metadata
     metadata_ = Column("metadata", JSON, nullable=True)
 
+    # Listado CRM paginado por cursor (name, id) dentro del ámbito empresa / propietario
+    __table_args__ = (
+        Index("ix_customers_company_name_id", "company_id", "name", "id"),
+        Index("ix_customers_owner_name_id", "owner_user_id", "name", "id"),
+    )
+
 
 class ContactPerson(Base):
     """Contact person model for customer contacts"""
     __tablename__ = "customer_contacts"
     
     id = Column(Integer, primary_key=True, index=True)
-    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), nullable=False, index=True)
     
     # Contact details
     name = Column(String(100), nullable=False)
@@ -0,0 +1,33 @@
+"""Caché de scoring comercial por cliente (zeus_scoring_engine_v1.score_customers_batch)."""
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, Numeric, String, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class CustomerScore(Base):
+    """
+    Una fila por (empresa, cliente) con los componentes del score y el resultado.
+
+    Se recalcula por lotes (todas las de una empresa) y de forma incremental en
+    ``payment_registered`` / ``client_updated``; ``computed_at`` marca la frescura.
+    """
+
+    __tablename__ = "customer_scores"
+    __table_args__ = (UniqueConstraint("company_id", "customer_id", name="uq_customer_scores_company_customer"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), nullable=False, index=True)
+    sales_count = Column(Integer, nullable=False, default=0)
+    revenue_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    activity_count = Column(Integer, nullable=False, default=0)
+    revenue_score = Column(Float, nullable=False, default=0)
+    payment_score = Column(Float, nullable=False, default=0)
+    engagement_score = Column(Float, nullable=False, default=0)
+    potential_score = Column(Float, nullable=False, default=0)
+    lead_score = Column(Float, nullable=False, default=0, index=True)
+    customer_priority = Column(String(16), nullable=False, default="low")
+    next_best_action = Column(String(64), nullable=False, default="nurture")
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
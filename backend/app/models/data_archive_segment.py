@@ -0,0 +1,33 @@
+"""Índice de segmentos archivados por services.data_retention_service."""
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class DataArchiveSegment(Base):
+    """
+    Un fichero de archivo (JSONL.gz o Parquet) con un lote de filas frías de una tabla.
+
+    ``first_id``/``last_id`` y ``min_created_at``/``max_created_at`` acotan el lote para
+    que el lector solo abra los segmentos que solapan la búsqueda; ``location`` es la
+    ruta relativa a RETENTION_ARCHIVE_DIR (local) o la clave S3.
+    """
+
+    __tablename__ = "data_archive_segments"
+    __table_args__ = (Index("ix_data_archive_segments_table_range", "table_name", "min_created_at", "max_created_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    table_name = Column(String(64), nullable=False)
+    first_id = Column(BigInteger, nullable=False)
+    last_id = Column(BigInteger, nullable=False)
+    min_created_at = Column(DateTime(timezone=True), nullable=False)
+    max_created_at = Column(DateTime(timezone=True), nullable=False)
+    row_count = Column(Integer, nullable=False)
+    backend = Column(String(16), nullable=False)  # local | s3
+    fmt = Column(String(16), nullable=False)  # jsonl | parquet
+    location = Column(String(512), nullable=False)
+    size_bytes = Column(BigInteger, nullable=False, default=0)
+    sha256 = Column(String(64), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -153,7 +153,7 @@ class Invoice(Base):
     issue_date = Column(DateTime, default=datetime.utcnow)
     due_date = Column(DateTime, nullable=True)
     
-    # Totals
+    # Totals (desnormalizados: los mantiene services.invoice_totals_service al tocar líneas/pagos)
     subtotal = Column(Float(precision=2), default=0.0)
     tax_amount = Column(Float(precision=2), default=0.0)
     discount_amount = Column(Float(precision=2), default=0.0)
@@ -184,7 +184,7 @@ class InvoiceItem(Base):
     __tablename__ = "invoice_items"
     
     id = Column(Integer, primary_key=True, index=True)
-    invoice_id = Column(Integer, ForeignKey("invoices.id", ondelete="CASCADE"), nullable=False)
+    invoice_id = Column(Integer, ForeignKey("invoices.id", ondelete="CASCADE"), nullable=False, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=True)
     
     # Item details
@@ -228,7 +228,7 @@ class Payment(Base):
     __tablename__ = "payments"
     
     id = Column(Integer, primary_key=True, index=True)
-    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False)
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False, index=True)
     
     # Payment details
     amount = Column(Float(precision=2), nullable=False)
@@ -291,3 +291,7 @@ class TPVProduct(Base):
 
 # Fiscal models live in app.models.fiscal (re-exported for backward compatibility).
 from app.models.fiscal import FiscalProfile, TaxRate, TPVSale, TPVSaleItem  # noqa: F401
+
+# Totales desnormalizados de Invoice: los eventos se registran junto a los modelos para que
+# API, workers y scripts los tengan activos sin depender de qué router se haya importado.
+import services.invoice_totals_service  # noqa: E402,F401
@@ -3,7 +3,7 @@ ZEUS_TPV_FULL_FISCAL_INFRASTRUCTURE_ES_003
 Modelos fiscales: tipos de IVA, perfiles fiscales, ventas TPV y líneas con snapshot inmutable.
 Preparado para modelo 303, recargo de equivalencia e inspección AEAT.
 """
-from sqlalchemy import Column, Integer, String, Numeric, Boolean, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Numeric, Boolean, ForeignKey, DateTime, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -40,6 +40,12 @@ class FiscalProfile(Base):
 class TPVSale(Base):
     """Cabecera de venta TPV con totales fiscales (snapshot inmutable, no recalcular)."""
     __tablename__ = "tpv_sales"
+    __table_args__ = (
+        Index("ix_tpv_sales_company_customer_date", "company_id", "customer_id", "sale_date"),
+        # Ventanas por fecha (analítica, IVA trimestral, tpv_sales_window)
+        Index("ix_tpv_sales_company_sale_date", "company_id", "sale_date"),
+        Index("ix_tpv_sales_user_sale_date", "user_id", "sale_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -54,6 +60,8 @@ class TPVSale(Base):
     recargo_amount = Column(Numeric(12, 2), nullable=True, default=0)
     total = Column(Numeric(12, 2), nullable=False)
     customer_data = Column(JSON, nullable=True)
+    # Cliente CRM normalizado (customer_data.customer_id / crm_customer_id); indexado para scoring
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="SET NULL"), nullable=True, index=True)
     work_session_id = Column(
         Integer,
         ForeignKey("employee_work_sessions.id", ondelete="SET NULL"),
@@ -1,5 +1,5 @@
 """Reservas web + TPV: multi-tenant por user_id (dueño del negocio)."""
-from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -7,6 +7,10 @@ from app.db.base import Base
 
 class Reservation(Base):
     __tablename__ = "reservations"
+    __table_args__ = (
+        # Agenda: reservas de los usuarios de la empresa en un rango de fechas
+        Index("ix_reservations_user_date", "user_id", "reservation_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
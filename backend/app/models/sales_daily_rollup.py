@@ -0,0 +1,45 @@
+"""Agregado diario de ventas TPV/CMR (mantenido por persist_fiscal_sale)."""
+
+from sqlalchemy import Column, Date, DateTime, Integer, Numeric, String, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class SalesDailyRollup(Base):
+    """
+    Una fila por (empresa, usuario, día, canal, método de pago, tramo de IVA).
+
+    Importes por tramo a nivel de línea (base, IVA, recargo, total); ``sales_count``
+    se imputa una sola vez por venta (al tramo con mayor base), de modo que
+    SUM(sales_count) y SUM(total_amount) sobre tramos reproducen tpv_sales.
+    ``company_id`` = 0 cuando la venta no tiene empresa (clave única sin NULL).
+    """
+
+    __tablename__ = "sales_daily_rollup"
+    __table_args__ = (
+        UniqueConstraint(
+            "company_id",
+            "user_id",
+            "day",
+            "channel",
+            "payment_method",
+            "vat_band",
+            name="uq_sales_daily_rollup_key",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, nullable=False, default=0, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    day = Column(Date, nullable=False, index=True)
+    channel = Column(String(16), nullable=False)  # tpv | cmr
+    payment_method = Column(String(30), nullable=False)
+    vat_band = Column(String(8), nullable=False)  # "21", "10", "4", "0"
+    sales_count = Column(Integer, nullable=False, default=0)
+    lines_count = Column(Integer, nullable=False, default=0)
+    base_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    tax_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    recargo_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    total_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
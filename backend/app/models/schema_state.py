@@ -0,0 +1,23 @@
+"""Huella de esquema aplicada (app/db/schema_bootstrap.py)."""
+
+from sqlalchemy import JSON, Column, DateTime, Float, String
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class SchemaState(Base):
+    """
+    Una fila por componente ("app"): huella del esquema que dejó aplicado el último
+    líder de arranque. Si coincide con la del código, los workers no repiten
+    parches ni create_all.
+    """
+
+    __tablename__ = "zeus_schema_state"
+
+    component = Column(String(64), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    applied_by = Column(String(128), nullable=True)  # host:pid del líder
+    duration_ms = Column(Float, nullable=True)
+    report = Column(JSON, nullable=True)
+    applied_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,38 @@
+"""Almacén de subidas direccionado por contenido (services/upload_store.py)."""
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class StoredBlob(Base):
+    """
+    Un objeto por sha256 del contenido. ``refcount`` = nº de filas en stored_blob_refs;
+    con 0 referencias el objeto es candidato a GC (collect_garbage, tras un periodo de gracia).
+    """
+
+    __tablename__ = "stored_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size_bytes = Column(BigInteger, nullable=False)
+    content_type = Column(String(100), nullable=True)
+    backend = Column(String(16), nullable=False)  # local | s3
+    object_key = Column(String(255), nullable=False)  # uploads/cas/ab/<sha>.ext
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class StoredBlobRef(Base):
+    """Quién usa un blob: (tipo de dueño, id). Una subida repetida del mismo dueño no suma referencia."""
+
+    __tablename__ = "stored_blob_refs"
+    __table_args__ = (UniqueConstraint("sha256", "owner_type", "owner_id", name="uq_stored_blob_refs_owner"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), ForeignKey("stored_blobs.sha256", ondelete="CASCADE"), nullable=False, index=True)
+    owner_type = Column(String(40), nullable=False)  # workspace_upload | tpv_product_upload | tpv_product
+    owner_id = Column(String(100), nullable=False)
+    user_id = Column(Integer, nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
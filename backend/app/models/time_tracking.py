@@ -1,7 +1,7 @@
 """
 Modelos para el módulo de Control Horario
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Float, Text, JSON, Enum as SQLEnum
+from sqlalchemy import Column, Index, Integer, String, DateTime, Boolean, ForeignKey, Float, Text, JSON, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -31,6 +31,10 @@ class TimeTrackingRecord(Base):
     Registro de fichaje de un empleado
     """
     __tablename__ = "time_tracking_records"
+    __table_args__ = (
+        # Fichaje activo y patrones por empleado (detect_patterns, work sessions)
+        Index("ix_time_tracking_records_user_employee_checkin", "user_id", "employee_id", "check_in_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -176,9 +180,21 @@ class TimeControlAlert(Base):
 
 class AttendanceReport(Base):
     """
-    Reportes de asistencia pre-calculados
+    Reportes de asistencia pre-calculados.
+    Los diarios bloqueados (is_locked) son snapshots inmutables de días cerrados
+    (services/attendance_report_engine.py).
     """
     __tablename__ = "attendance_reports"
+    __table_args__ = (
+        Index(
+            "uq_attendance_reports_period",
+            "user_id",
+            "employee_id",
+            "period_type",
+            "period_start",
+            unique=True,
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -195,6 +211,8 @@ class AttendanceReport(Base):
     total_hours = Column(Float, default=0.0)
     expected_hours = Column(Float, default=0.0)
     hours_difference = Column(Float, default=0.0)
+    overtime_hours = Column(Float, default=0.0)
+    break_hours = Column(Float, default=0.0)
     
     # Registros
     check_ins_count = Column(Integer, default=0)
@@ -205,6 +223,7 @@ class AttendanceReport(Base):
     early_check_outs = Column(Integer, default=0)
     missing_breaks = Column(Integer, default=0)
     absences = Column(Integer, default=0)
+    open_records = Column(Integer, default=0)  # Fichajes sin salida (esos días no se bloquean)
     
     # Estado
     is_locked = Column(Boolean, default=False)  # Reporte cerrado/validado
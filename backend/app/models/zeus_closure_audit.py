@@ -28,4 +28,5 @@ class ZeusClosureAudit(Base):
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
         nullable=False,
+        index=True,
     )
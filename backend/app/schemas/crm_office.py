@@ -72,3 +72,6 @@ class RecordChargeOut(BaseModel):
 class CrmListResponse(BaseModel):
     success: bool = True
     data: List[Any] = []
+    # Solo en listados paginados por cursor (clientes)
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
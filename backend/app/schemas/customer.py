@@ -113,6 +113,8 @@ class CustomerListResponse(BaseModel):
     page: int = 1
     limit: int = 100
     total_pages: int = 1
+    # Cursor keyset (name, id) para la página siguiente; None en la última
+    next_cursor: Optional[str] = None
     
     model_config = {
         "json_encoders": {
@@ -109,6 +109,12 @@ class InvoiceBase(BaseModel):
     issue_date: date = Field(default_factory=date.today, description="Date the invoice was issued")
     due_date: Optional[date] = Field(None, description="Due date for payment")
     notes: Optional[str] = Field(None, description="Additional notes")
+
+    @field_validator('issue_date', 'due_date', mode='before')
+    @classmethod
+    def coerce_datetime(cls, v: Any) -> Any:
+        # El modelo guarda DateTime; la API expone solo la fecha
+        return v.date() if isinstance(v, datetime) else v
     
     @model_validator(mode='after')
     def validate_due_date(self) -> 'InvoiceBase':
@@ -140,6 +146,11 @@ class PaymentBase(BaseModel):
     notes: Optional[str] = Field(None, description="Additional notes")
     payment_date: date = Field(default_factory=date.today, description="Date of payment")
 
+    @field_validator('payment_date', mode='before')
+    @classmethod
+    def coerce_datetime(cls, v: Any) -> Any:
+        return v.date() if isinstance(v, datetime) else v
+
 # Create schemas
 class ProductVariantCreate(ProductVariantBase):
     pass
@@ -275,7 +286,14 @@ class InvoiceItemInDB(InvoiceItemBase):
     created_at: datetime
     updated_at: datetime
 
-class InvoiceInDB(InvoiceBase):
+class PaymentInDB(PaymentBase):
+    id: int
+    invoice_id: int
+    created_at: datetime
+    created_by: Optional[int]
+
+class InvoiceSummary(InvoiceBase):
+    """Factura sin relaciones: los totales son columnas, no se tocan líneas ni pagos."""
     id: int
     invoice_number: str
     subtotal: float
@@ -287,13 +305,11 @@ class InvoiceInDB(InvoiceBase):
     created_at: datetime
     updated_at: datetime
     created_by: Optional[int]
-    items: List[InvoiceItemInDB] = []
 
-class PaymentInDB(PaymentBase):
-    id: int
-    invoice_id: int
-    created_at: datetime
-    created_by: Optional[int]
+class InvoiceInDB(InvoiceSummary):
+    # None = no cargadas (listado sin include_details)
+    items: Optional[List[InvoiceItemInDB]] = None
+    payments: Optional[List[PaymentInDB]] = None
 
 # Response models for API endpoints
 class ProductResponse(BaseModel):
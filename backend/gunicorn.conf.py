@@ -93,23 +93,8 @@ def pre_fork(server, worker):
 def post_fork(server, worker):
     """Called just after a worker has been forked."""
     server.log.info(f"✅ Worker {worker.pid} iniciado")
-    # Precalentar agentes en segundo plano: el primer POST /chat no debe sumar init+LLM por encima
-    # del timeout del edge (p. ej. Railway ~60s) → evita 502 "Application failed to respond".
-    prewarm = os.getenv("ZEUS_PREWARM_AGENTS", "").strip().lower() in ("1", "true", "yes", "on")
-    if prewarm:
-
-        def _prewarm_agents():
-            try:
-                from app.api.v1.endpoints.chat import ensure_agent_stack
-
-                ensure_agent_stack()
-                server.log.info(f"🔥 Worker {worker.pid}: pila de agentes precalentada")
-            except Exception as e:
-                server.log.warning("Prewarm agentes omitido en worker %s: %s", worker.pid, e)
-
-        import threading
-
-        threading.Thread(target=_prewarm_agents, name="zeus_agent_prewarm", daemon=True).start()
+    # El precalentado de agentes (ZEUS_AGENT_PREWARM / ZEUS_PREWARM_AGENTS) lo lanza startup_event
+    # en app/main.py, con estado por agente en /api/v1/chat/ready.
 
 def worker_abort(worker):
     """Called when a worker received the SIGABRT signal."""
@@ -0,0 +1,45 @@
+"""Reconstruye agent_activity_hourly desde agent_activities (backfill inicial o reparación)."""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+
+def _bootstrap_import_path() -> str:
+    """Añade la raíz del backend (/app) a sys.path; el script vive en /app/scripts/."""
+    env_root = (os.environ.get("ZEUS_APP_ROOT") or "").strip()
+    if env_root and os.path.isfile(os.path.join(env_root, "alembic.ini")):
+        backend_root = env_root
+    else:
+        backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if backend_root not in sys.path:
+        sys.path.insert(0, backend_root)
+    return backend_root
+
+
+_bootstrap_import_path()
+
+from app.db.base import SessionLocal, import_all_models  # noqa: E402
+from services.activity_metrics_service import rebuild_hourly_rollups  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=None, help="Solo los últimos N días (por defecto todo)")
+    args = parser.parse_args()
+
+    import_all_models()
+    since = datetime.utcnow() - timedelta(days=args.days) if args.days else None
+    db = SessionLocal()
+    try:
+        stats = rebuild_hourly_rollups(db, since=since)
+        print(f"[ROLLUP] actividades={stats['activities']} filas={stats['rollup_rows']}")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
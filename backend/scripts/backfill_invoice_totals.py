@@ -0,0 +1,49 @@
+"""Backfill / verificación de los totales desnormalizados de facturas."""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+
+
+def _bootstrap_import_path() -> str:
+    """Añade la raíz del backend (/app) a sys.path; el script vive en /app/scripts/."""
+    env_root = (os.environ.get("ZEUS_APP_ROOT") or "").strip()
+    if env_root and os.path.isfile(os.path.join(env_root, "alembic.ini")):
+        backend_root = env_root
+    else:
+        backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if backend_root not in sys.path:
+        sys.path.insert(0, backend_root)
+    return backend_root
+
+
+_bootstrap_import_path()
+
+from app.db.base import SessionLocal, import_all_models  # noqa: E402
+from services import invoice_totals_service as totals  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--check", action="store_true", help="Solo informa de facturas descuadradas")
+    parser.add_argument("--fix", action="store_true", help="Con --check: recalcula solo las descuadradas")
+    parser.add_argument("--batch-size", type=int, default=totals.BATCH_SIZE)
+    args = parser.parse_args()
+
+    import_all_models()
+    db = SessionLocal()
+    try:
+        if args.check:
+            report = totals.check_invoice_totals(db, fix=args.fix)
+            print(json.dumps(report, indent=2, default=str))
+            return 1 if report["mismatched"] and not args.fix else 0
+        print(json.dumps(totals.backfill_invoice_totals(db, batch_size=args.batch_size), indent=2))
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+"""Genera variantes thumb/grid/detail para imágenes de producto ya subidas (uploads/products y uploads/cas)."""
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import os
+import sys
+
+
+def _bootstrap_import_path() -> str:
+    """Añade la raíz del backend (/app) a sys.path; el script vive en /app/scripts/."""
+    env_root = (os.environ.get("ZEUS_APP_ROOT") or "").strip()
+    if env_root and os.path.isfile(os.path.join(env_root, "alembic.ini")):
+        backend_root = env_root
+    else:
+        backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if backend_root not in sys.path:
+        sys.path.insert(0, backend_root)
+    return backend_root
+
+
+_bootstrap_import_path()
+
+from pathlib import Path  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from services.image_variants import render_variants  # noqa: E402
+
+_IMAGE_EXT = {".png", ".jpg", ".jpeg", ".webp"}
+
+
+def _render(path: str) -> str:
+    # Proceso hijo: solo PIL + disco, sin BD
+    return render_variants(Path(path))["sha256"]
+
+
+def _sources(include_cas: bool):
+    root = Path(settings.STATIC_DIR) / "uploads"
+    dirs = [root / "products"] + ([root / "cas"] if include_cas else [])
+    for d in dirs:
+        if d.is_dir():
+            for p in sorted(d.rglob("*")):
+                if p.is_file() and p.suffix.lower() in _IMAGE_EXT:
+                    yield str(p)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--no-cas", action="store_true", help="Solo uploads/products (legacy)")
+    args = parser.parse_args()
+
+    paths = list(_sources(include_cas=not args.no_cas))
+    done = failed = 0
+    shas = set()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(_render, p): p for p in paths}
+        for fut in concurrent.futures.as_completed(futures):
+            try:
+                shas.add(fut.result())
+                done += 1
+            except Exception as exc:
+                failed += 1
+                print(f"[VARIANTS] error {futures[fut]}: {exc}")
+    print(f"[VARIANTS] imagenes={len(paths)} ok={done} unicas={len(shas)} fallidas={failed}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,46 @@
+"""Reconstruye sales_daily_rollup desde tpv_sales (backfill inicial o reparación)."""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+
+def _bootstrap_import_path() -> str:
+    """Añade la raíz del backend (/app) a sys.path; el script vive en /app/scripts/."""
+    env_root = (os.environ.get("ZEUS_APP_ROOT") or "").strip()
+    if env_root and os.path.isfile(os.path.join(env_root, "alembic.ini")):
+        backend_root = env_root
+    else:
+        backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if backend_root not in sys.path:
+        sys.path.insert(0, backend_root)
+    return backend_root
+
+
+_bootstrap_import_path()
+
+from app.db.base import SessionLocal  # noqa: E402
+from services.sales_rollup_service import rebuild_rollups  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--company-id", type=int, default=None, help="Solo esta empresa")
+    parser.add_argument("--user-id", type=int, default=None, help="Solo este usuario")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        stats = rebuild_rollups(
+            db, company_id=args.company_id, user_id=args.user_id, batch_size=args.batch_size
+        )
+        print(f"[ROLLUP] ventas={stats['sales']} filas={stats['rollup_rows']}")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,46 @@
+"""Borra blobs del almacén de subidas sin referencias (stored_blobs.refcount = 0)."""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+
+def _bootstrap_import_path() -> str:
+    """Añade la raíz del backend (/app) a sys.path; el script vive en /app/scripts/."""
+    env_root = (os.environ.get("ZEUS_APP_ROOT") or "").strip()
+    if env_root and os.path.isfile(os.path.join(env_root, "alembic.ini")):
+        backend_root = env_root
+    else:
+        backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if backend_root not in sys.path:
+        sys.path.insert(0, backend_root)
+    return backend_root
+
+
+_bootstrap_import_path()
+
+from app.db.base import SessionLocal  # noqa: E402
+from services.upload_store import collect_garbage  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--grace-sec", type=int, default=None, help="Por defecto UPLOAD_GC_GRACE_SEC")
+    parser.add_argument("--limit", type=int, default=500)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        stats = collect_garbage(db, grace_sec=args.grace_sec, limit=args.limit)
+        print(
+            f"[UPLOADS] referencias caducadas={stats['expired_refs']} "
+            f"borrados={stats['deleted']} fallidos={stats['failed']}"
+        )
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -27,9 +27,11 @@ from app.db.session import SessionLocal
 from app.models.user import User, RefreshToken, PasswordResetToken
 from app.models.company import Company, UserCompany
 from app.models.agent_activity import AgentActivity
+from app.models.agent_activity_hourly import AgentActivityHourly
 from app.models.document_approval import DocumentApproval
 from app.models.customer import Customer, ContactPerson
 from app.models.erp import TPVSale, TPVSaleItem, TPVProduct
+from app.models.sales_daily_rollup import SalesDailyRollup
 from app.models.chat_message import ChatMessage
 from app.models.time_tracking import (
     TimeTrackingRecord,
@@ -39,6 +41,7 @@ from app.models.time_tracking import (
     AttendanceReport,
 )
 from app.models.automation_readiness import AutomationReadiness
+from services.activity_metrics_service import purge_user_activity
 
 DEFAULT_EMAILS = (
     "equipo@wwwavefenix.com",
@@ -96,13 +99,16 @@ def purge_user_scoped_rows(db: Session, user: User, dry_run: bool) -> dict:
     def _del(label: str, n: int):
         counts[label] = counts.get(label, 0) + n
 
-    # Actividades por email
-    n = db.query(AgentActivity).filter(AgentActivity.user_email == email).count()
-    if n and not dry_run:
-        db.query(AgentActivity).filter(AgentActivity.user_email == email).delete(
-            synchronize_session=False
+    # Actividades por email y su rollup horario (el DELETE masivo no dispara los eventos de mapper)
+    if dry_run:
+        _del("agent_activities", db.query(AgentActivity).filter(AgentActivity.user_email == email).count())
+        _del(
+            "agent_activity_hourly",
+            db.query(AgentActivityHourly).filter(AgentActivityHourly.user_email == email).count(),
         )
-    _del("agent_activities", n)
+    else:
+        for label, n in purge_user_activity(db, email).items():
+            _del(label, n)
 
     # Documentos
     n = db.query(DocumentApproval).filter(DocumentApproval.user_id == uid).count()
@@ -119,6 +125,9 @@ def purge_user_scoped_rows(db: Session, user: User, dry_run: bool) -> dict:
             synchronize_session=False
         )
         db.query(TPVSale).filter(TPVSale.user_id == uid).delete(synchronize_session=False)
+        db.query(SalesDailyRollup).filter(SalesDailyRollup.user_id == uid).delete(
+            synchronize_session=False
+        )
     _del("tpv_sales", len(sale_ids))
 
     n = db.query(TPVProduct).filter(TPVProduct.user_id == uid).count()
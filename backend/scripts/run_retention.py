@@ -0,0 +1,69 @@
+"""Pasada manual de retención (archivar + podar) y conversión a particionado en Postgres."""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+
+
+def _bootstrap_import_path() -> str:
+    """Añade la raíz del backend (/app) a sys.path; el script vive en /app/scripts/."""
+    env_root = (os.environ.get("ZEUS_APP_ROOT") or "").strip()
+    if env_root and os.path.isfile(os.path.join(env_root, "alembic.ini")):
+        backend_root = env_root
+    else:
+        backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if backend_root not in sys.path:
+        sys.path.insert(0, backend_root)
+    return backend_root
+
+
+_bootstrap_import_path()
+
+from sqlalchemy import text  # noqa: E402
+
+from app.db.base import SessionLocal, import_all_models  # noqa: E402
+from services import data_retention_service as retention  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--table", action="append", choices=sorted(retention.POLICIES), help="Solo esta tabla (repetible)")
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta las filas pendientes de archivar")
+    parser.add_argument(
+        "--partition",
+        choices=sorted(t for t, p in retention.POLICIES.items() if p.partitionable),
+        help="Muestra el SQL para particionar la tabla por mes (Postgres)",
+    )
+    parser.add_argument("--apply", action="store_true", help="Con --partition: ejecuta el SQL en una transacción")
+    args = parser.parse_args()
+
+    import_all_models()
+    db = SessionLocal()
+    try:
+        if args.partition:
+            if not retention.is_postgres(db):
+                print("[RETENTION] el particionado nativo solo aplica a Postgres")
+                return 1
+            if retention.is_partitioned(db, args.partition):
+                print(f"[RETENTION] {args.partition} ya está particionada")
+                return 0
+            stmts = retention.partition_conversion_sql(db, args.partition)
+            for stmt in stmts:
+                print(f"{stmt};")
+            if args.apply:
+                for stmt in stmts:
+                    db.execute(text(stmt))
+                db.commit()
+                print(f"[RETENTION] {args.partition} particionada; {args.partition}_legacy conserva las filas frías")
+            return 0
+        report = retention.run_retention(db, tables=args.table, dry_run=args.dry_run)
+        print(json.dumps(report, indent=2, default=str))
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
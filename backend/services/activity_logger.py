@@ -9,7 +9,8 @@ from sqlalchemy.exc import OperationalError
 from threading import Lock
 from app.models.agent_activity import AgentActivity
 from app.db.session import SessionLocal
-from app.db.base import create_tables
+import services.activity_metrics_service  # noqa: F401  (eventos que mantienen agent_activity_hourly)
+from app.db.schema_bootstrap import bootstrap_schema
 
 
 _tables_initialized = False
@@ -25,9 +26,9 @@ def ensure_tables_initialized() -> None:
     with _tables_lock:
         if _tables_initialized:
             return
-        # Una sola vez por proceso: idempotente con startup. No marcar "listo" sin crear tablas.
+        # Una sola vez por proceso: si startup ya dejó la huella de esquema, es una sola consulta.
         print("[ACTIVITY] Inicializando tablas (una sola vez)...")
-        create_tables()
+        bootstrap_schema()
         _tables_initialized = True
 
 
@@ -0,0 +1,405 @@
+"""
+Métricas de actividad de agentes (agent_activities) agregadas en SQL.
+
+Los dashboards (endpoints /metrics y MetricsService) ya no cargan filas en Python:
+``aggregate_activity`` devuelve conteos por agente y estado y el tiempo medio de
+respuesta con un GROUP BY. Para rangos de más de ``ROLLUP_MIN_DAYS`` las horas
+completas salen de agent_activity_hourly y solo los bordes parciales se consultan
+en crudo, así que el coste deja de crecer con el tamaño de la tabla.
+
+El rollup horario se mantiene con eventos de mapper sobre AgentActivity (inserción,
+cambio de estado / completed_at, borrado) en la misma transacción que la escritura;
+``rebuild_hourly_rollups`` lo reconstruye desde agent_activities (backfill o
+reparación: scripts/backfill_activity_rollups.py) sin tocar las horas archivadas.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import case, event, func, inspect as sa_inspect, literal_column, select
+from sqlalchemy.orm import Session
+
+from app.models.agent_activity import AgentActivity
+from app.models.agent_activity_hourly import AgentActivityHourly
+from app.models.data_archive_segment import DataArchiveSegment
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_MIN_DAYS = 7
+_KEY_COLUMNS = ("hour", "agent_name", "user_email", "status")
+_MEASURES = ("activity_count", "rt_samples", "rt_total_sec")
+
+
+@dataclass
+class ActivityStats:
+    """Agregado de un rango: totales y desglose por agente."""
+
+    total: int = 0
+    by_status: Dict[str, int] = field(default_factory=dict)
+    rt_samples: int = 0
+    rt_total_sec: float = 0.0
+    by_agent: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    source: str = "raw"
+
+    @property
+    def completed(self) -> int:
+        return self.by_status.get("completed", 0)
+
+    @property
+    def failed(self) -> int:
+        return self.by_status.get("failed", 0)
+
+    @property
+    def avg_response_sec(self) -> float:
+        return self.rt_total_sec / self.rt_samples if self.rt_samples else 0.0
+
+    @property
+    def success_rate(self) -> float:
+        return self.completed / self.total * 100 if self.total else 0.0
+
+    def add(self, agent: str, status: str, count: int, rt_samples: int, rt_total: float) -> None:
+        count, rt_samples, rt_total = int(count or 0), int(rt_samples or 0), float(rt_total or 0)
+        status = status or "unknown"
+        self.total += count
+        self.by_status[status] = self.by_status.get(status, 0) + count
+        self.rt_samples += rt_samples
+        self.rt_total_sec += rt_total
+        bucket = self.by_agent.setdefault(
+            agent or "UNKNOWN", {"total": 0, "completed": 0, "failed": 0, "rt_samples": 0, "rt_total_sec": 0.0}
+        )
+        bucket["total"] += count
+        if status in ("completed", "failed"):
+            bucket[status] += count
+        bucket["rt_samples"] += rt_samples
+        bucket["rt_total_sec"] += rt_total
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def floor_hour(value: datetime) -> datetime:
+    return _naive_utc(value).replace(minute=0, second=0, microsecond=0)
+
+
+def _ceil_hour(value: datetime) -> datetime:
+    floored = floor_hour(value)
+    return floored if floored == _naive_utc(value) else floored + timedelta(hours=1)
+
+
+def _response_seconds_expr(dialect: str):
+    """completed_at - created_at en segundos (NULL si no hay completed_at)."""
+    if dialect == "postgresql":
+        return func.extract("epoch", AgentActivity.completed_at - AgentActivity.created_at)
+    return (func.julianday(AgentActivity.completed_at) - func.julianday(AgentActivity.created_at)) * 86400.0
+
+
+def _hour_expr(dialect: str):
+    if dialect == "postgresql":
+        return func.date_trunc("hour", literal_column("agent_activities.created_at AT TIME ZONE 'UTC'"))
+    return func.strftime("%Y-%m-%d %H:00:00", AgentActivity.created_at)
+
+
+def _scoped(q, model, *, user_email: Optional[str], agent: Optional[str]):
+    if user_email is not None:
+        q = q.filter(model.user_email == user_email)
+    if agent:
+        q = q.filter(model.agent_name == agent.upper())
+    return q
+
+
+def _raw_into(
+    db: Session,
+    stats: ActivityStats,
+    start: datetime,
+    end: datetime,
+    *,
+    user_email: Optional[str],
+    agent: Optional[str],
+    end_inclusive: bool,
+) -> None:
+    rt = _response_seconds_expr(db.get_bind().dialect.name)
+    q = db.query(
+        AgentActivity.agent_name,
+        AgentActivity.status,
+        func.count(AgentActivity.id),
+        func.count(AgentActivity.completed_at),
+        func.coalesce(func.sum(case((AgentActivity.completed_at.isnot(None), rt), else_=0.0)), 0.0),
+    ).filter(
+        AgentActivity.created_at >= start,
+        AgentActivity.created_at <= end if end_inclusive else AgentActivity.created_at < end,
+    )
+    q = _scoped(q, AgentActivity, user_email=user_email, agent=agent)
+    for agent_name, status, count, samples, total in q.group_by(AgentActivity.agent_name, AgentActivity.status):
+        stats.add(agent_name, status, count, samples, total)
+
+
+def _rollup_into(
+    db: Session,
+    stats: ActivityStats,
+    start_hour: datetime,
+    end_hour: datetime,
+    *,
+    user_email: Optional[str],
+    agent: Optional[str],
+) -> None:
+    r = AgentActivityHourly
+    q = db.query(
+        r.agent_name,
+        r.status,
+        func.coalesce(func.sum(r.activity_count), 0),
+        func.coalesce(func.sum(r.rt_samples), 0),
+        func.coalesce(func.sum(r.rt_total_sec), 0.0),
+    ).filter(r.hour >= start_hour, r.hour < end_hour)
+    q = _scoped(q, r, user_email=user_email, agent=agent)
+    for agent_name, status, count, samples, total in q.group_by(r.agent_name, r.status):
+        stats.add(agent_name, status, count, samples, total)
+
+
+def aggregate_activity(
+    db: Session,
+    *,
+    start: datetime,
+    end: datetime,
+    user_email: Optional[str] = None,
+    agent: Optional[str] = None,
+    end_inclusive: bool = True,
+) -> ActivityStats:
+    """
+    Conteos por agente/estado y tiempo de respuesta en [start, end] (naive UTC).
+    Rangos > ROLLUP_MIN_DAYS: horas completas desde el rollup, bordes en crudo.
+    """
+    start, end = _naive_utc(start), _naive_utc(end)
+    stats = ActivityStats()
+    if end < start:
+        return stats
+    first_hour, last_hour = _ceil_hour(start), floor_hour(end)
+    if end - start <= timedelta(days=ROLLUP_MIN_DAYS) or last_hour <= first_hour:
+        _raw_into(db, stats, start, end, user_email=user_email, agent=agent, end_inclusive=end_inclusive)
+        return stats
+    stats.source = "rollup"
+    if start < first_hour:
+        _raw_into(db, stats, start, first_hour, user_email=user_email, agent=agent, end_inclusive=False)
+    _rollup_into(db, stats, first_hour, last_hour, user_email=user_email, agent=agent)
+    _raw_into(db, stats, last_hour, end, user_email=user_email, agent=agent, end_inclusive=end_inclusive)
+    return stats
+
+
+# --- Mantenimiento incremental del rollup ---------------------------------------
+
+
+def _response_seconds(created_at: Any, completed_at: Any) -> Optional[float]:
+    if not isinstance(created_at, datetime) or not isinstance(completed_at, datetime):
+        return None
+    return (_naive_utc(completed_at) - _naive_utc(created_at)).total_seconds()
+
+
+def _contribution(values: Dict[str, Any]) -> Tuple[Tuple, Dict[str, Any]]:
+    created = values.get("created_at")
+    hour = floor_hour(created if isinstance(created, datetime) else datetime.utcnow())
+    key = (
+        hour,
+        ((values.get("agent_name") or "UNKNOWN"))[:64],
+        (values.get("user_email") or "")[:255],
+        (values.get("status") or "unknown")[:32],
+    )
+    rt = _response_seconds(created, values.get("completed_at"))
+    return key, {
+        "activity_count": 1,
+        "rt_samples": 1 if rt is not None else 0,
+        "rt_total_sec": rt if rt is not None else 0.0,
+    }
+
+
+def _upsert_increment(connection, key: Tuple, inc: Dict[str, Any]) -> None:
+    table = AgentActivityHourly.__table__
+    values = dict(zip(_KEY_COLUMNS, key))
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(**values, **inc)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(_KEY_COLUMNS),
+            set_={**{m: table.c[m] + stmt.excluded[m] for m in inc}, "updated_at": func.now()},
+        )
+        connection.execute(stmt)
+        return
+    where = [table.c[k] == v for k, v in values.items()]
+    result = connection.execute(table.update().where(*where).values(**{m: table.c[m] + v for m, v in inc.items()}))
+    if not result.rowcount:
+        connection.execute(table.insert().values(**values, **inc))
+
+
+_TRACKED = ("created_at", "completed_at", "status", "agent_name", "user_email")
+
+
+def _current_values(target: AgentActivity) -> Dict[str, Any]:
+    loaded = sa_inspect(target).dict
+    return {name: loaded.get(name) for name in _TRACKED}
+
+
+def _previous_values(target: AgentActivity) -> Dict[str, Any]:
+    state = sa_inspect(target)
+    out = {}
+    for name in _TRACKED:
+        hist = state.attrs[name].history
+        if hist.deleted:
+            out[name] = hist.deleted[0]
+        elif hist.unchanged:
+            out[name] = hist.unchanged[0]
+        else:
+            out[name] = state.dict.get(name)
+    return out
+
+
+def _created_at(connection, target: AgentActivity, values: Dict[str, Any]) -> None:
+    """created_at expirado (p. ej. tras commit): se lee de la fila para imputar la hora correcta."""
+    if values.get("created_at") is None and target.id is not None:
+        values["created_at"] = connection.execute(
+            select(AgentActivity.created_at).where(AgentActivity.id == target.id)
+        ).scalar()
+
+
+def _negate(inc: Dict[str, Any]) -> Dict[str, Any]:
+    return {m: -v for m, v in inc.items()}
+
+
+def _stamp_created_at(mapper, connection, target) -> None:
+    # Sin created_at explícito se fija aquí (en vez del server_default) para que la fila
+    # guardada y el cubo horario del rollup usen exactamente el mismo instante
+    if target.created_at is None:
+        target.created_at = datetime.now(timezone.utc)
+
+
+def _on_insert(mapper, connection, target) -> None:
+    values = _current_values(target)
+    key, inc = _contribution(values)
+    _upsert_increment(connection, key, inc)
+
+
+def _on_update(mapper, connection, target) -> None:
+    state = sa_inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in _TRACKED if name != "created_at"):
+        return
+    old, new = _previous_values(target), _current_values(target)
+    _created_at(connection, target, old)
+    new["created_at"] = new.get("created_at") or old.get("created_at")
+    old_key, old_inc = _contribution(old)
+    new_key, new_inc = _contribution(new)
+    if (old_key, old_inc) == (new_key, new_inc):
+        return
+    _upsert_increment(connection, old_key, _negate(old_inc))
+    _upsert_increment(connection, new_key, new_inc)
+
+
+def _on_delete(mapper, connection, target) -> None:
+    values = _previous_values(target)
+    _created_at(connection, target, values)
+    key, inc = _contribution(values)
+    _upsert_increment(connection, key, _negate(inc))
+
+
+event.listen(AgentActivity, "before_insert", _stamp_created_at)
+event.listen(AgentActivity, "after_insert", _on_insert)
+event.listen(AgentActivity, "after_update", _on_update)
+event.listen(AgentActivity, "before_delete", _on_delete)
+
+
+def purge_user_activity(db: Session, user_email: str) -> Dict[str, int]:
+    """
+    Borra las actividades de ``user_email`` y sus filas de agent_activity_hourly en la misma
+    transacción (el DELETE masivo no dispara los eventos de mapper). Sin commit.
+    """
+    activities = (
+        db.query(AgentActivity)
+        .filter(AgentActivity.user_email == user_email)
+        .delete(synchronize_session=False)
+    )
+    rollups = (
+        db.query(AgentActivityHourly)
+        .filter(AgentActivityHourly.user_email == (user_email or "")[:255])
+        .delete(synchronize_session=False)
+    )
+    return {"agent_activities": activities, "agent_activity_hourly": rollups}
+
+
+def _parse_hour(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return floor_hour(value)
+    return datetime.strptime(str(value)[:19], "%Y-%m-%d %H:%M:%S")
+
+
+def _archived_floor(db: Session) -> Optional[datetime]:
+    """Primera hora posterior a todo lo archivado de agent_activities (None si no hay archivo)."""
+    newest = (
+        db.query(func.max(DataArchiveSegment.max_created_at))
+        .filter(DataArchiveSegment.table_name == AgentActivity.__tablename__)
+        .scalar()
+    )
+    if newest is None:
+        return None
+    if not isinstance(newest, datetime):
+        newest = datetime.fromisoformat(str(newest))
+    return floor_hour(newest) + timedelta(hours=1)
+
+
+def rebuild_hourly_rollups(db: Session, *, since: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Reconstruye agent_activity_hourly con un GROUP BY hora/agente/usuario/estado. Hace commit.
+
+    Solo toca horas >= ``since`` (por defecto, la de la actividad más antigua en crudo) y
+    nunca horas con filas archivadas (data_retention_service): esas solo viven en el
+    rollup y la hora frontera mezcla archivo y crudo.
+    """
+    dialect = db.get_bind().dialect.name
+    hour = _hour_expr(dialect).label("hour")
+    rt = _response_seconds_expr(dialect)
+    q = db.query(
+        hour,
+        AgentActivity.agent_name,
+        func.coalesce(AgentActivity.user_email, ""),
+        AgentActivity.status,
+        func.count(AgentActivity.id),
+        func.count(AgentActivity.completed_at),
+        func.coalesce(func.sum(case((AgentActivity.completed_at.isnot(None), rt), else_=0.0)), 0.0),
+    )
+    if since is None:
+        oldest = db.query(func.min(AgentActivity.created_at)).scalar()
+        since = oldest if isinstance(oldest, datetime) else None
+    archived_floor = _archived_floor(db)
+    bounds = [b for b in (since and floor_hour(since), archived_floor) if b is not None]
+    if not bounds:
+        # Sin crudo ni archivo no hay nada que reconstruir (y nunca un DELETE sin límite)
+        return {"activities": 0, "rollup_rows": 0}
+    since = max(bounds)
+    q = q.filter(AgentActivity.created_at >= since)
+    dq = db.query(AgentActivityHourly).filter(AgentActivityHourly.hour >= since)
+
+    acc: Dict[Tuple, Dict[str, Any]] = defaultdict(lambda: {m: 0 for m in _MEASURES})
+    activities = 0
+    for h, agent_name, email, status, count, samples, total in q.group_by(
+        hour, AgentActivity.agent_name, AgentActivity.user_email, AgentActivity.status
+    ):
+        key = (_parse_hour(h), (agent_name or "UNKNOWN")[:64], (email or "")[:255], (status or "unknown")[:32])
+        bucket = acc[key]
+        bucket["activity_count"] += int(count or 0)
+        bucket["rt_samples"] += int(samples or 0)
+        bucket["rt_total_sec"] += float(total or 0)
+        activities += int(count or 0)
+
+    dq.delete(synchronize_session=False)
+    for key, measures in acc.items():
+        db.add(AgentActivityHourly(**dict(zip(_KEY_COLUMNS, key)), **measures))
+    db.commit()
+    logger.info("activity rollups rebuilt: activities=%s rows=%s", activities, len(acc))
+    return {"activities": activities, "rollup_rows": len(acc)}
@@ -11,10 +11,10 @@ from sqlalchemy.orm import Session
 
 from app.models.user import User, RefreshToken, PasswordResetToken
 from app.models.company import Company, UserCompany
-from app.models.agent_activity import AgentActivity
 from app.models.document_approval import DocumentApproval
 from app.models.customer import Customer, ContactPerson
 from app.models.erp import TPVSale, TPVSaleItem, TPVProduct, TaxRate, FiscalProfile
+from app.models.sales_daily_rollup import SalesDailyRollup
 from app.models.chat_message import ChatMessage
 from app.models.time_tracking import (
     TimeTrackingRecord,
@@ -32,6 +32,7 @@ from app.models.employee_work_session import EmployeeWorkSession
 from app.models.tpv_comanda_share import TPVComandaShare
 from app.models.company_employee import CompanyEmployee
 from app.models.crm_office import CustomerRecord, CrmActivityLog, CrmSaleLink
+from services.activity_metrics_service import purge_user_activity
 logger = logging.getLogger(__name__)
 
 ALLOWED_DEACTIVATION_REASONS = frozenset(
@@ -128,10 +129,8 @@ def _purge_user_rows(db: Session, user: User) -> Dict[str, int]:
     def bump(key: str, n: int) -> None:
         counts[key] = counts.get(key, 0) + n
 
-    n = db.query(AgentActivity).filter(AgentActivity.user_email == email).delete(
-        synchronize_session=False
-    )
-    bump("agent_activities", n)
+    for key, n in purge_user_activity(db, email).items():
+        bump(key, n)
 
     n = db.query(DocumentApproval).filter(DocumentApproval.user_id == uid).delete(
         synchronize_session=False
@@ -149,6 +148,10 @@ def _purge_user_rows(db: Session, user: User) -> Dict[str, int]:
         )
         db.query(TPVSale).filter(TPVSale.user_id == uid).delete(synchronize_session=False)
     bump("tpv_sales", len(sale_ids))
+    n = db.query(SalesDailyRollup).filter(SalesDailyRollup.user_id == uid).delete(
+        synchronize_session=False
+    )
+    bump("sales_daily_rollup", n)
 
     n = db.query(TPVProduct).filter(TPVProduct.user_id == uid).delete(synchronize_session=False)
     bump("tpv_products", n)
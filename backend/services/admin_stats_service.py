@@ -0,0 +1,266 @@
+"""
+Estadísticas del panel de superusuario con agregados SQL.
+
+Los ingresos SaaS salen de ``users`` agrupado por (activo, plan) y por (mes de alta, plan):
+el coste es O(planes) / O(meses·planes) filas devueltas, no O(usuarios) objetos en
+Python. ``admin_revenue_snapshots`` guarda una foto diaria del MRR para que el histórico
+del gráfico no dependa del estado actual de los clientes.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.models.admin_revenue_snapshot import AdminRevenueSnapshot
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Precios de los planes (deben coincidir con onboarding.py)
+PRICING_PLANS = {
+    "startup": {"monthly_price": 197, "setup_price": 197},
+    "growth": {"monthly_price": 497, "setup_price": 497},
+    "business": {"monthly_price": 897, "setup_price": 897},
+    "enterprise": {"monthly_price": 1797, "setup_price": 1797}
+}
+
+_last_snapshot_day: Optional[date] = None
+
+
+def _plan_expr():
+    return func.lower(func.trim(func.coalesce(User.plan, "")))
+
+
+def _month_expr(dialect: str):
+    if dialect == "postgresql":
+        return func.to_char(func.timezone("UTC", User.created_at), "YYYY-MM")
+    return func.strftime("%Y-%m", User.created_at)
+
+
+def _month_key(day: date) -> str:
+    return day.strftime("%Y-%m")
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def compute_stats(db: Session) -> Dict[str, Any]:
+    """Clientes, suscripciones activas, MRR, setup fees y reparto por plan (una query)."""
+    plan = _plan_expr().label("plan")
+    rows = (
+        db.query(plan, User.is_active, func.count(User.id))
+        .group_by(plan, User.is_active)
+        .all()
+    )
+    total_customers = 0
+    active_subscriptions = 0
+    monthly_revenue = 0
+    total_setup_fees = 0
+    by_plan: Dict[str, Dict[str, int]] = {}
+    for plan_name, is_active, count in rows:
+        total_customers += count
+        if not is_active:
+            continue
+        active_subscriptions += count
+        plan_info = PRICING_PLANS.get(plan_name)
+        if not plan_info:
+            continue
+        monthly_revenue += plan_info["monthly_price"] * count
+        total_setup_fees += plan_info["setup_price"] * count
+        entry = by_plan.setdefault(plan_name.upper(), {"count": 0, "monthly_total": 0})
+        entry["count"] += count
+        entry["monthly_total"] += plan_info["monthly_price"] * count
+    return {
+        "total_customers": total_customers,
+        "active_subscriptions": active_subscriptions,
+        "monthly_revenue": monthly_revenue,
+        "total_setup_fees": total_setup_fees,
+        # Ingresos totales (setup fees + proyección de 12 meses de suscripciones)
+        "total_revenue": total_setup_fees + monthly_revenue * 12,
+        "by_plan": by_plan,
+    }
+
+
+# --- Foto diaria ------------------------------------------------------------------
+
+
+def record_snapshot(db: Session, stats: Dict[str, Any], *, day: Optional[date] = None) -> None:
+    """Inserta o actualiza la foto de ``day`` (hoy por defecto). Hace commit."""
+    day = day or datetime.utcnow().date()
+    values = {
+        "total_customers": stats["total_customers"],
+        "active_subscriptions": stats["active_subscriptions"],
+        "monthly_revenue": stats["monthly_revenue"],
+        "total_setup_fees": stats["total_setup_fees"],
+        "by_plan": stats["by_plan"],
+    }
+    table = AdminRevenueSnapshot.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(snapshot_date=day, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["snapshot_date"],
+            set_={**{k: stmt.excluded[k] for k in values}, "updated_at": func.now()},
+        )
+        db.execute(stmt)
+    else:
+        row = db.query(AdminRevenueSnapshot).filter(AdminRevenueSnapshot.snapshot_date == day).first()
+        if row is None:
+            db.add(AdminRevenueSnapshot(snapshot_date=day, **values))
+        else:
+            for key, value in values.items():
+                setattr(row, key, value)
+    db.commit()
+
+
+def ensure_daily_snapshot(db: Session, stats: Dict[str, Any]) -> None:
+    """Primera lectura del día en este proceso: guarda la foto (las siguientes no tocan la BD)."""
+    global _last_snapshot_day
+    today = datetime.utcnow().date()
+    if _last_snapshot_day == today:
+        return
+    try:
+        record_snapshot(db, stats, day=today)
+        _last_snapshot_day = today
+    except Exception as e:
+        db.rollback()
+        logger.warning("[ADMIN_STATS] no se pudo guardar la foto diaria: %s", e)
+
+
+def _snapshot_mrr_by_month(db: Session, since: date) -> Dict[str, float]:
+    """MRR de la última foto de cada mes desde ``since``."""
+    rows = (
+        db.query(AdminRevenueSnapshot.snapshot_date, AdminRevenueSnapshot.monthly_revenue)
+        .filter(AdminRevenueSnapshot.snapshot_date >= since)
+        .order_by(AdminRevenueSnapshot.snapshot_date)
+        .all()
+    )
+    return {_month_key(day): float(mrr or 0) for day, mrr in rows}
+
+
+# --- Gráfico de ingresos ------------------------------------------------------------
+
+
+def revenue_by_month(db: Session, months: int = 12) -> List[Tuple[str, Dict[str, float]]]:
+    """
+    [(YYYY-MM, {revenue, setup, subscriptions})] de los últimos ``months`` meses.
+
+    Altas: GROUP BY mes de alta y plan (clientes activos con plan). ``revenue`` es el MRR
+    acumulado de esas altas, salvo en los meses cerrados con foto diaria, donde manda la
+    última foto del mes.
+    """
+    months = max(1, int(months))
+    month = _month_expr(db.get_bind().dialect.name).label("month")
+    plan = _plan_expr().label("plan")
+    rows = (
+        db.query(month, plan, func.count(User.id))
+        .filter(User.is_active == True, User.created_at.isnot(None), plan.in_(list(PRICING_PLANS)))  # noqa: E712
+        .group_by(month, plan)
+        .all()
+    )
+    signups: Dict[str, Dict[str, float]] = {}
+    for month_key, plan_name, count in rows:
+        plan_info = PRICING_PLANS[plan_name]
+        entry = signups.setdefault(month_key, {"mrr": 0, "setup": 0, "subscriptions": 0})
+        entry["mrr"] += plan_info["monthly_price"] * count
+        entry["setup"] += plan_info["setup_price"] * count
+        entry["subscriptions"] += count
+    if not signups:
+        return []
+
+    now = datetime.utcnow().date()
+    cursor = datetime.strptime(min(signups), "%Y-%m").date()
+    series: List[Tuple[str, Dict[str, float]]] = []
+    running = 0
+    while cursor <= now:
+        key = _month_key(cursor)
+        entry = signups.get(key, {})
+        running += entry.get("mrr", 0)
+        series.append(
+            (key, {"revenue": running, "setup": entry.get("setup", 0), "subscriptions": entry.get("subscriptions", 0)})
+        )
+        cursor = _next_month(cursor)
+    series = series[-months:]
+
+    # El mes en curso se queda con el valor vivo: la foto de hoy puede ser de esta mañana
+    snapshots = _snapshot_mrr_by_month(db, datetime.strptime(series[0][0], "%Y-%m").date())
+    for key, point in series:
+        if key in snapshots and key != _month_key(now):
+            point["revenue"] = snapshots[key]
+    return series
+
+
+# --- Listado de clientes ------------------------------------------------------------
+
+
+def search_customers(
+    db: Session,
+    *,
+    q: Optional[str] = None,
+    status: Optional[str] = None,
+    plan: Optional[str] = None,
+    page: int = 1,
+    limit: int = 50,
+) -> Tuple[List[User], int]:
+    """Una página de usuarios (más recientes primero) y el total filtrado en la misma query."""
+    query = db.query(User)
+    term = (q or "").strip()
+    if term:
+        like = f"%{term}%"
+        query = query.filter(
+            or_(User.email.ilike(like), User.full_name.ilike(like), User.company_name.ilike(like))
+        )
+    if status in ("active", "inactive"):
+        query = query.filter(User.is_active == (status == "active"))
+    if plan:
+        plan_key = plan.strip().lower()
+        query = query.filter(_plan_expr() == ("" if plan_key == "none" else plan_key))
+    offset = (max(1, page) - 1) * limit
+    rows = (
+        query.add_columns(func.count().over().label("total_count"))
+        .order_by(User.created_at.desc(), User.id.desc())
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    if rows:
+        total = rows[0].total_count
+    elif offset:
+        total = query.count()
+    else:
+        total = 0
+    return [row.User for row in rows], total
+
+
+def serialize_customer(user: User) -> Dict[str, Any]:
+    plan = user.plan and user.plan.lower().strip()
+    plan_info = PRICING_PLANS.get(plan, {"monthly_price": 0, "setup_price": 0})
+    # Próximo pago: 30 días desde creación o último update
+    next_payment_date = user.updated_at or user.created_at
+    next_payment = next_payment_date + timedelta(days=30) if next_payment_date else None
+    return {
+        "id": user.id,
+        "email": user.email,
+        "company_name": getattr(user, "company_name", "N/A") or "N/A",
+        "full_name": user.full_name or user.email,
+        "plan": plan or "none",
+        "employees": getattr(user, "employees", 0) or 0,
+        "status": "active" if user.is_active else "inactive",
+        "is_superuser": user.is_superuser,
+        "created_at": user.created_at.isoformat() if user.created_at else None,
+        "next_payment": next_payment.isoformat() if next_payment else None,
+        "monthly_price": plan_info["monthly_price"],
+        "setup_price": plan_info["setup_price"],
+        "public_site_enabled": getattr(user, "public_site_enabled", False),
+        "public_site_slug": getattr(user, "public_site_slug", None) or "",
+    }
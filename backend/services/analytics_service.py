@@ -8,21 +8,17 @@ from typing import Any, Dict, List, Optional
 from sqlalchemy.orm import Session
 
 from app.models.agent_activity import AgentActivity
-from app.models.customer import Customer
-from app.models.fiscal import TPVSale
 from app.models.user import User
 import services.crm_office_service as crm_svc
+import services.sales_rollup_service as rollup_svc
 
 
-def _sales_query(db: Session, user: User, since: datetime):
-    q = db.query(TPVSale).filter(TPVSale.sale_date >= since)
+def _sales_scope(db: Session, user: User) -> Dict[str, Optional[int]]:
     company_id = crm_svc.primary_company_id(db, user)
     is_superuser = bool(getattr(user, "is_superuser", False))
     if company_id is not None and not is_superuser:
-        q = q.filter(TPVSale.company_id == company_id)
-    elif getattr(user, "id", None) is not None:
-        q = q.filter(TPVSale.user_id == user.id)
-    return q
+        return {"company_id": company_id, "user_id": None}
+    return {"company_id": None, "user_id": getattr(user, "id", None)}
 
 
 def build_analytics_summary(
@@ -30,31 +26,29 @@ def build_analytics_summary(
     user: User,
     days: int = 30,
 ) -> Dict[str, Any]:
-    """Resumen unificado para dashboard y orquestador."""
+    """Resumen unificado para dashboard y orquestador (ventas desde sales_daily_rollup)."""
     since = datetime.utcnow() - timedelta(days=days)
-    sales = _sales_query(db, user, since).order_by(TPVSale.sale_date.asc()).all()
+    rows = rollup_svc.daily_channel_totals(db, since_day=since.date(), **_sales_scope(db, user))
 
     total_revenue = 0.0
+    sales_count = 0
     cmr_count = 0
     tpv_count = 0
     by_day: Dict[str, float] = {}
 
-    for sale in sales:
-        amount = float(sale.total or 0)
+    for day, channel, count, amount in rows:
         total_revenue += amount
-        day_key = sale.sale_date.strftime("%Y-%m-%d") if sale.sale_date else "unknown"
+        sales_count += count
+        day_key = day.strftime("%Y-%m-%d")
         by_day[day_key] = by_day.get(day_key, 0.0) + amount
-        cd = sale.customer_data if isinstance(sale.customer_data, dict) else {}
-        if cd.get("source") == "office_crm":
-            cmr_count += 1
+        if channel == rollup_svc.CHANNEL_CMR:
+            cmr_count += count
         else:
-            tpv_count += 1
+            tpv_count += count
 
-    sales_count = len(sales)
     avg_ticket = total_revenue / sales_count if sales_count else 0.0
 
-    customers = crm_svc.list_customers(db, user)
-    active_customers = len(customers)
+    customers = crm_svc.count_customers(db, user)
 
     act_q = db.query(AgentActivity).filter(AgentActivity.created_at >= since)
     if getattr(user, "email", None):
@@ -77,8 +71,8 @@ def build_analytics_summary(
             "tpv_sales_count": tpv_count,
         },
         "customers": {
-            "active_total": active_customers,
-            "with_email": sum(1 for c in customers if c.email),
+            "active_total": customers["total"],
+            "with_email": customers["with_email"],
         },
         "activity": {
             "total_events": activity_total,
@@ -0,0 +1,590 @@
+"""
+Motor de informes de asistencia (registro de jornada / inspección de trabajo).
+
+Lee el rango de time_tracking_records en una consulta en streaming (particiones
+de ``yield_per``) y calcula en columnas con pandas/NumPy: horas trabajadas, pausas
+(eventos break-start/break-end de time_control_events, o ``break_duration`` si no
+hay eventos), horas esperadas según employee_schedules, horas extra, retrasos y
+ausencias. Días en UTC, como el resto del control horario.
+
+Los días cerrados (anteriores a hoy) se guardan como snapshots inmutables en
+attendance_reports (period_type="daily", is_locked=True), una fila por empleado y
+día, solo al calcular la plantilla completa. Semanas y totales se agregan desde
+los diarios. Exportación CSV/XLSX por filas (generadores / openpyxl write_only).
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import logging
+import tempfile
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.company import UserCompany
+from app.models.company_employee import CompanyEmployee
+from app.models.time_tracking import (
+    AttendanceReport,
+    EmployeeSchedule,
+    TimeControlEvent,
+    TimeTrackingRecord,
+)
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPECTED_HOURS = 8.0
+STREAM_CHUNK_ROWS = 5000
+
+DAILY_COLUMNS = [
+    "employee_id",
+    "day",
+    "worked_hours",
+    "expected_hours",
+    "hours_difference",
+    "overtime_hours",
+    "break_hours",
+    "check_ins",
+    "check_outs",
+    "late_check_ins",
+    "early_check_outs",
+    "missing_breaks",
+    "absences",
+    "open_records",
+]
+_SUM_COLUMNS = DAILY_COLUMNS[2:]
+_RECORD_COLUMNS = [
+    "record_id",
+    "employee_id",
+    "check_in_time",
+    "check_out_time",
+    "break_duration",
+    "is_late_check_in",
+    "is_early_check_out",
+    "is_missing_break",
+]
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _day_start(d: date) -> datetime:
+    return datetime.combine(d, time.min, tzinfo=timezone.utc)
+
+
+def _empty_daily() -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype="object" if c in ("employee_id", "day") else "float64") for c in DAILY_COLUMNS})
+
+
+def _stream_frame(db: Session, stmt, columns: List[str]) -> pd.DataFrame:
+    result = db.execute(stmt.execution_options(yield_per=STREAM_CHUNK_ROWS))
+    frames = [pd.DataFrame(part, columns=columns) for part in result.partitions()]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _load_records(
+    db: Session, user_id: int, start: datetime, end: datetime, employee_id: Optional[str]
+) -> pd.DataFrame:
+    stmt = (
+        select(
+            TimeTrackingRecord.id,
+            TimeTrackingRecord.employee_id,
+            TimeTrackingRecord.check_in_time,
+            TimeTrackingRecord.check_out_time,
+            TimeTrackingRecord.break_duration,
+            TimeTrackingRecord.is_late_check_in,
+            TimeTrackingRecord.is_early_check_out,
+            TimeTrackingRecord.is_missing_break,
+        )
+        .where(
+            TimeTrackingRecord.user_id == user_id,
+            TimeTrackingRecord.check_in_time >= start,
+            TimeTrackingRecord.check_in_time < end,
+        )
+        .order_by(TimeTrackingRecord.check_in_time.asc())
+    )
+    if employee_id:
+        stmt = stmt.where(TimeTrackingRecord.employee_id == str(employee_id))
+    return _stream_frame(db, stmt, _RECORD_COLUMNS)
+
+
+def _break_hours_by_record(db: Session, user_id: int, start: datetime, end: datetime) -> pd.Series:
+    """Suma de pausas cerradas (break-start seguido de break-end) por record_id."""
+    stmt = (
+        select(TimeControlEvent.record_id, TimeControlEvent.event_type, TimeControlEvent.occurred_at)
+        .where(
+            TimeControlEvent.user_id == user_id,
+            TimeControlEvent.record_id.isnot(None),
+            TimeControlEvent.event_type.in_(("break-start", "break-end")),
+            TimeControlEvent.occurred_at >= start,
+            TimeControlEvent.occurred_at < end + timedelta(days=1),
+        )
+        .order_by(TimeControlEvent.record_id.asc(), TimeControlEvent.occurred_at.asc())
+    )
+    ev = _stream_frame(db, stmt, ["record_id", "event_type", "occurred_at"])
+    if ev.empty:
+        return pd.Series(dtype="float64")
+    ev["occurred_at"] = pd.to_datetime(ev["occurred_at"], utc=True)
+    grouped = ev.groupby("record_id", sort=False)
+    nxt_type = grouped["event_type"].shift(-1)
+    nxt_at = grouped["occurred_at"].shift(-1)
+    closed = (ev["event_type"] == "break-start") & (nxt_type == "break-end")
+    hours = (nxt_at - ev["occurred_at"]).dt.total_seconds() / 3600.0
+    return hours.where(closed, 0.0).groupby(ev["record_id"]).sum()
+
+
+def _schedules(db: Session, user_id: int, employee_id: Optional[str]) -> pd.DataFrame:
+    q = db.query(
+        EmployeeSchedule.employee_id,
+        EmployeeSchedule.day_of_week,
+        EmployeeSchedule.start_time,
+        EmployeeSchedule.end_time,
+        EmployeeSchedule.valid_from,
+        EmployeeSchedule.valid_until,
+    ).filter(EmployeeSchedule.user_id == user_id, EmployeeSchedule.is_active.is_(True))
+    if employee_id:
+        q = q.filter(EmployeeSchedule.employee_id == str(employee_id))
+    sch = pd.DataFrame(
+        q.all(), columns=["employee_id", "dow", "start_time", "end_time", "valid_from", "valid_until"]
+    )
+    if sch.empty:
+        return sch.assign(start_min=pd.Series(dtype="float64"), sched_hours=pd.Series(dtype="float64"))
+
+    def _minutes(col: pd.Series) -> pd.Series:
+        parts = col.astype(str).str.strip().str.split(":", expand=True)
+        h = pd.to_numeric(parts[0], errors="coerce").fillna(0)
+        m = pd.to_numeric(parts[1], errors="coerce").fillna(0) if parts.shape[1] > 1 else 0
+        return h * 60 + m
+
+    sch["employee_id"] = sch["employee_id"].astype(str)
+    sch["start_min"] = _minutes(sch["start_time"])
+    end_min = _minutes(sch["end_time"])
+    span = (end_min - sch["start_min"]) / 60.0
+    # Mismo criterio que expected_hours_today_for_employee: turno inválido → 8h.
+    sch["sched_hours"] = np.where(span > 0, span, DEFAULT_EXPECTED_HOURS)
+    sch["valid_from"] = pd.to_datetime(sch["valid_from"], utc=True)
+    sch["valid_until"] = pd.to_datetime(sch["valid_until"], utc=True)
+    return sch.drop_duplicates(["employee_id", "dow"], keep="first")
+
+
+def _apply_schedule_window(frame: pd.DataFrame) -> pd.DataFrame:
+    """Descarta el horario en días fuera de [valid_from, valid_until]."""
+    if frame.empty or "valid_from" not in frame:
+        return frame
+    day_ts = pd.to_datetime(frame["day"]).dt.tz_localize("UTC")
+    outside = (frame["valid_from"].notna() & (day_ts < frame["valid_from"].dt.floor("D"))) | (
+        frame["valid_until"].notna() & (day_ts > frame["valid_until"])
+    )
+    frame.loc[outside, ["sched_hours", "start_min"]] = np.nan
+    return frame
+
+
+def compute_daily(
+    db: Session,
+    *,
+    user_id: int,
+    start_day: date,
+    end_day: date,
+    employee_id: Optional[str] = None,
+    now: Optional[datetime] = None,
+) -> pd.DataFrame:
+    """Filas empleado×día para [start_day, end_day] (ambos inclusive), calculadas desde BD."""
+    now = now or _utc_now()
+    start, end = _day_start(start_day), _day_start(end_day + timedelta(days=1))
+    rec = _load_records(db, user_id, start, end, employee_id)
+    sch = _schedules(db, user_id, employee_id)
+    grace = float(getattr(settings, "CONTROL_HORARIO_ALERT_GRACE_MINUTES", 15) or 15)
+
+    if rec.empty:
+        daily = _empty_daily()
+    else:
+        rec["employee_id"] = rec["employee_id"].astype(str)
+        check_in = pd.to_datetime(rec["check_in_time"], utc=True)
+        check_out = pd.to_datetime(rec["check_out_time"], utc=True)
+        open_mask = check_out.isna()
+        # Fichaje abierto: cuenta hasta ahora, como mucho hasta el final de su propio día.
+        day_end = (check_in.dt.floor("D") + pd.Timedelta(days=1)).clip(upper=pd.Timestamp(now))
+        effective_out = check_out.where(~open_mask, day_end)
+        gross = ((effective_out - check_in).dt.total_seconds() / 3600.0).clip(lower=0)
+        breaks_ev = _break_hours_by_record(db, user_id, start, end)
+        breaks = rec["record_id"].map(breaks_ev)
+        breaks = breaks.where(breaks.notna(), pd.to_numeric(rec["break_duration"], errors="coerce")).fillna(0.0)
+        rec = rec.assign(
+            day=check_in.dt.floor("D").dt.date,
+            in_min=check_in.dt.hour * 60 + check_in.dt.minute,
+            worked_hours=(gross - breaks).clip(lower=0),
+            break_hours=breaks,
+            has_out=(~open_mask).astype(int),
+            open_records=open_mask.astype(int),
+            late_flag=rec["is_late_check_in"].fillna(False).astype(bool),
+            early_flag=rec["is_early_check_out"].fillna(False).astype(bool),
+            missing_flag=rec["is_missing_break"].fillna(False).astype(bool),
+        )
+        daily = (
+            rec.groupby(["employee_id", "day"], sort=True)
+            .agg(
+                worked_hours=("worked_hours", "sum"),
+                break_hours=("break_hours", "sum"),
+                check_ins=("record_id", "count"),
+                check_outs=("has_out", "sum"),
+                open_records=("open_records", "sum"),
+                first_in_min=("in_min", "min"),
+                late_flag=("late_flag", "any"),
+                early_check_outs=("early_flag", "sum"),
+                missing_breaks=("missing_flag", "sum"),
+            )
+            .reset_index()
+        )
+        daily["dow"] = pd.to_datetime(daily["day"]).dt.weekday
+        if not sch.empty:
+            daily = daily.merge(
+                sch[["employee_id", "dow", "sched_hours", "start_min", "valid_from", "valid_until"]],
+                on=["employee_id", "dow"],
+                how="left",
+            )
+            daily = _apply_schedule_window(daily)
+        else:
+            daily["sched_hours"] = np.nan
+            daily["start_min"] = np.nan
+        late_by_schedule = daily["start_min"].notna() & (daily["first_in_min"] > daily["start_min"] + grace)
+        daily["late_check_ins"] = (daily["late_flag"] | late_by_schedule).astype(int)
+        daily["expected_hours"] = daily["sched_hours"].fillna(DEFAULT_EXPECTED_HOURS)
+        daily["absences"] = 0
+
+    # Ausencias: turno programado en día cerrado sin ningún fichaje.
+    today = now.astimezone(timezone.utc).date()
+    last_closed = min(end_day, today - timedelta(days=1))
+    if not sch.empty and last_closed >= start_day:
+        days = pd.DataFrame({"day": pd.date_range(start_day, last_closed, freq="D").date})
+        days["dow"] = pd.to_datetime(days["day"]).dt.weekday
+        scheduled = days.merge(sch, on="dow", how="inner")
+        scheduled = _apply_schedule_window(scheduled)
+        scheduled = scheduled[scheduled["sched_hours"].notna()]
+        if not daily.empty:
+            seen = daily[["employee_id", "day"]].assign(_seen=1)
+            scheduled = scheduled.merge(seen, on=["employee_id", "day"], how="left")
+            scheduled = scheduled[scheduled["_seen"].isna()]
+        if not scheduled.empty:
+            absent = pd.DataFrame(
+                {
+                    "employee_id": scheduled["employee_id"].values,
+                    "day": scheduled["day"].values,
+                    "worked_hours": 0.0,
+                    "break_hours": 0.0,
+                    "check_ins": 0,
+                    "check_outs": 0,
+                    "open_records": 0,
+                    "late_check_ins": 0,
+                    "early_check_outs": 0,
+                    "missing_breaks": 0,
+                    "expected_hours": scheduled["sched_hours"].values,
+                    "absences": 1,
+                }
+            )
+            daily = absent if daily.empty else pd.concat([daily, absent], ignore_index=True)
+
+    if daily.empty:
+        return _empty_daily()
+    daily["hours_difference"] = daily["worked_hours"] - daily["expected_hours"]
+    daily["overtime_hours"] = daily["hours_difference"].clip(lower=0)
+    return daily[DAILY_COLUMNS].sort_values(["day", "employee_id"]).reset_index(drop=True)
+
+
+# ---------------------------------------------------------------------------
+# Snapshots de días cerrados
+# ---------------------------------------------------------------------------
+
+
+def _snapshot_days(db: Session, user_id: int, start_day: date, end_day: date) -> Set[date]:
+    rows = (
+        db.query(AttendanceReport.period_start)
+        .filter(
+            AttendanceReport.user_id == user_id,
+            AttendanceReport.period_type == "daily",
+            AttendanceReport.is_locked.is_(True),
+            AttendanceReport.period_start >= _day_start(start_day),
+            AttendanceReport.period_start < _day_start(end_day + timedelta(days=1)),
+        )
+        .distinct()
+        .all()
+    )
+    return {pd.Timestamp(r[0]).date() for r in rows}
+
+
+def _load_snapshots(
+    db: Session, user_id: int, start_day: date, end_day: date, employee_id: Optional[str]
+) -> pd.DataFrame:
+    stmt = select(
+        AttendanceReport.employee_id,
+        AttendanceReport.period_start,
+        AttendanceReport.total_hours,
+        AttendanceReport.expected_hours,
+        AttendanceReport.hours_difference,
+        AttendanceReport.overtime_hours,
+        AttendanceReport.break_hours,
+        AttendanceReport.check_ins_count,
+        AttendanceReport.check_outs_count,
+        AttendanceReport.late_check_ins,
+        AttendanceReport.early_check_outs,
+        AttendanceReport.missing_breaks,
+        AttendanceReport.absences,
+        AttendanceReport.open_records,
+    ).where(
+        AttendanceReport.user_id == user_id,
+        AttendanceReport.period_type == "daily",
+        AttendanceReport.is_locked.is_(True),
+        AttendanceReport.period_start >= _day_start(start_day),
+        AttendanceReport.period_start < _day_start(end_day + timedelta(days=1)),
+    )
+    if employee_id:
+        stmt = stmt.where(AttendanceReport.employee_id == str(employee_id))
+    frame = _stream_frame(db, stmt, DAILY_COLUMNS)
+    if frame.empty:
+        return _empty_daily()
+    frame["day"] = pd.to_datetime(frame["day"], utc=True).dt.date
+    frame["open_records"] = frame["open_records"].fillna(0)
+    return frame[DAILY_COLUMNS]
+
+
+def _persist_snapshots(db: Session, user_id: int, daily: pd.DataFrame) -> int:
+    """Guarda los días cerrados; los días con algún fichaje sin salida se recalculan en cada lectura."""
+    if daily.empty:
+        return 0
+    open_days = set(daily.loc[daily["open_records"] > 0, "day"])
+    daily = daily[~daily["day"].isin(open_days)]
+    if daily.empty:
+        return 0
+    rows = []
+    for rec in daily.to_dict("records"):
+        start = _day_start(rec["day"])
+        rows.append(
+            AttendanceReport(
+                employee_id=str(rec["employee_id"]),
+                user_id=user_id,
+                period_start=start,
+                period_end=start + timedelta(days=1),
+                period_type="daily",
+                total_hours=float(rec["worked_hours"]),
+                expected_hours=float(rec["expected_hours"]),
+                hours_difference=float(rec["hours_difference"]),
+                overtime_hours=float(rec["overtime_hours"]),
+                break_hours=float(rec["break_hours"]),
+                check_ins_count=int(rec["check_ins"]),
+                check_outs_count=int(rec["check_outs"]),
+                late_check_ins=int(rec["late_check_ins"]),
+                early_check_outs=int(rec["early_check_outs"]),
+                missing_breaks=int(rec["missing_breaks"]),
+                absences=int(rec["absences"]),
+                open_records=int(rec["open_records"]),
+                is_locked=True,
+            )
+        )
+    db.add_all(rows)
+    db.commit()
+    return len(rows)
+
+
+def _day_blocks(days: List[date]) -> Iterator[tuple]:
+    """Agrupa días sueltos en rangos contiguos [(inicio, fin)]."""
+    if not days:
+        return
+    days = sorted(days)
+    block_start = prev = days[0]
+    for d in days[1:]:
+        if d != prev + timedelta(days=1):
+            yield block_start, prev
+            block_start = d
+        prev = d
+    yield block_start, prev
+
+
+def daily_report(
+    db: Session,
+    *,
+    user_id: int,
+    start_day: date,
+    end_day: date,
+    employee_id: Optional[str] = None,
+    refresh: bool = False,
+) -> pd.DataFrame:
+    """Diario empleado×día: snapshots para días cerrados ya calculados, BD para el resto."""
+    now = _utc_now()
+    today = now.date()
+    last_closed = min(end_day, today - timedelta(days=1))
+    closed_days = [start_day + timedelta(days=i) for i in range((last_closed - start_day).days + 1)]
+
+    if refresh and not employee_id and closed_days:
+        db.query(AttendanceReport).filter(
+            AttendanceReport.user_id == user_id,
+            AttendanceReport.period_type == "daily",
+            AttendanceReport.period_start >= _day_start(start_day),
+            AttendanceReport.period_start < _day_start(last_closed + timedelta(days=1)),
+        ).delete(synchronize_session=False)
+        db.commit()
+
+    cached: Set[date] = set()
+    if closed_days and not refresh:
+        cached = _snapshot_days(db, user_id, start_day, last_closed)
+    parts: List[pd.DataFrame] = []
+    if cached:
+        parts.append(_load_snapshots(db, user_id, min(cached), max(cached), employee_id))
+    missing = [d for d in closed_days if d not in cached]
+    for block_start, block_end in _day_blocks(missing):
+        block = compute_daily(
+            db, user_id=user_id, start_day=block_start, end_day=block_end, employee_id=employee_id, now=now
+        )
+        if not employee_id:
+            try:
+                _persist_snapshots(db, user_id, block)
+            except Exception as exc:
+                logger.warning("attendance snapshot persist failed: %s", exc)
+                db.rollback()
+        parts.append(block)
+    open_start = max(start_day, today)
+    if open_start <= end_day:
+        parts.append(
+            compute_daily(db, user_id=user_id, start_day=open_start, end_day=end_day, employee_id=employee_id, now=now)
+        )
+    parts = [p for p in parts if not p.empty]
+    if not parts:
+        return _empty_daily()
+    daily = pd.concat(parts, ignore_index=True)
+    if cached:
+        in_range = (daily["day"] >= start_day) & (daily["day"] <= end_day)
+        daily = daily[in_range]
+    return daily.sort_values(["day", "employee_id"]).reset_index(drop=True)
+
+
+def _round(frame: pd.DataFrame) -> pd.DataFrame:
+    hours = [c for c in frame.columns if c.endswith("_hours") or c == "hours_difference"]
+    frame[hours] = frame[hours].astype(float).round(2)
+    counts = [c for c in _SUM_COLUMNS if c in frame.columns and c not in hours]
+    frame[counts] = frame[counts].astype(int)
+    return frame
+
+
+def aggregate(daily: pd.DataFrame, group: str) -> pd.DataFrame:
+    """group = day | week | employee."""
+    if daily.empty:
+        return _round(daily.copy())
+    if group == "day":
+        return _round(daily.copy())
+    frame = daily.copy()
+    if group == "week":
+        iso = pd.to_datetime(frame["day"]).dt.isocalendar()
+        frame["week"] = iso["year"].astype(str) + "-W" + iso["week"].astype(str).str.zfill(2)
+        keys = ["employee_id", "week"]
+    else:
+        keys = ["employee_id"]
+    frame["days_worked"] = (frame["check_ins"] > 0).astype(int)
+    out = frame.groupby(keys, sort=True)[_SUM_COLUMNS + ["days_worked"]].sum().reset_index()
+    # overtime_hours = suma de excesos diarios (no el neto de hours_difference).
+    return _round(out)
+
+
+def employee_names(db: Session, user: User) -> Dict[str, str]:
+    cids = [r[0] for r in db.query(UserCompany.company_id).filter(UserCompany.user_id == user.id).all()]
+    if not cids:
+        return {}
+    rows = (
+        db.query(CompanyEmployee.employee_code, CompanyEmployee.full_name)
+        .filter(CompanyEmployee.company_id.in_(cids))
+        .all()
+    )
+    return {str(code): name for code, name in rows}
+
+
+def build_report(
+    db: Session,
+    user: User,
+    *,
+    start_day: date,
+    end_day: date,
+    employee_id: Optional[str] = None,
+    group: str = "employee",
+    refresh: bool = False,
+) -> pd.DataFrame:
+    daily = daily_report(
+        db, user_id=user.id, start_day=start_day, end_day=end_day, employee_id=employee_id, refresh=refresh
+    )
+    out = aggregate(daily, group)
+    names = employee_names(db, user)
+    out.insert(1, "employee_name", out["employee_id"].map(names).fillna("") if not out.empty else "")
+    if "day" in out.columns:
+        out["day"] = out["day"].map(lambda d: d.isoformat())
+    return out
+
+
+def report_totals(frame: pd.DataFrame) -> Dict[str, Any]:
+    if frame.empty:
+        return {c: 0 for c in _SUM_COLUMNS}
+    sums = frame[_SUM_COLUMNS].sum()
+    return {c: (round(float(sums[c]), 2) if frame[c].dtype.kind == "f" else int(sums[c])) for c in _SUM_COLUMNS}
+
+
+# ---------------------------------------------------------------------------
+# Exportación
+# ---------------------------------------------------------------------------
+
+
+def iter_csv(frame: pd.DataFrame, chunk_rows: int = 500) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(list(frame.columns))
+    for i, row in enumerate(frame.itertuples(index=False, name=None), start=1):
+        writer.writerow(row)
+        if i % chunk_rows == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+    yield buf.getvalue()
+
+
+def iter_xlsx(frame: pd.DataFrame, sheet: str = "asistencia", chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    try:
+        from openpyxl import Workbook  # pyright: ignore[reportMissingModuleSource]
+    except ImportError as exc:
+        raise RuntimeError("openpyxl no disponible") from exc
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet)
+    ws.append(list(frame.columns))
+    for row in frame.itertuples(index=False, name=None):
+        ws.append([v.item() if isinstance(v, np.generic) else v for v in row])
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as tmp:
+        wb.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def records_to_rows(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    return [
+        {k: (v.item() if isinstance(v, np.generic) else v) for k, v in row.items()}
+        for row in frame.to_dict("records")
+    ]
+
+
+def parse_day(raw: Optional[str], default: date) -> date:
+    if not raw:
+        return default
+    value = str(raw).strip().replace("Z", "+00:00")
+    if len(value) == 10:
+        return date.fromisoformat(value)
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.date()
@@ -65,7 +65,7 @@ class AgentAutomationExecutor:
         try:
             pending = (
                 session.query(AgentActivity)
-                .filter(AgentActivity.status.in_(["pending", "in_progress"]))
+                .filter(AgentActivity.open_status_clause())
                 .order_by(AgentActivity.created_at.asc())
                 .all()
             )
@@ -1,18 +1,24 @@
 """
 Persistencia real de cashflow — cada cobro/venta genera un movimiento en BD.
+
+record_movement mantiene en la misma transacción un snapshot de saldo por empresa
+(cashflow_balance_snapshots) y momentos diarios n/Σx/Σx² por origen y dirección
+(cashflow_daily_aggregates). Saldo, resumen y detección de anomalías leen
+snapshot + delta (movimientos con id > last_entry_id), sin recorrer el histórico.
 """
 
 from __future__ import annotations
 
 import json
 import logging
-from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import func
+from sqlalchemy import case, func, or_
 from sqlalchemy.orm import Session
 
-from app.models.cashflow_ledger import CashflowLedgerEntry
+from app.models.cashflow_ledger import CashflowBalanceSnapshot, CashflowDailyAggregate, CashflowLedgerEntry
 
 logger = logging.getLogger(__name__)
 
@@ -73,12 +79,14 @@ def record_movement(
 
     mark_authorized_session(db)
     try:
+        # Cerrojo por empresa antes del INSERT: los ids posteriores quedan por encima del watermark.
+        snapshot = _lock_snapshot(db, int(company_id))
         db.add(entry)
+        db.flush()
+        _fold_delta(db, snapshot)
         if auto_commit:
             db.commit()
             db.refresh(entry)
-        else:
-            db.flush()
     finally:
         clear_authorized_session(db)
     logger.info(
@@ -92,24 +100,172 @@ def record_movement(
     return entry
 
 
+def _entry_day(created_at: Optional[datetime]) -> date:
+    if created_at is None:
+        return datetime.now(timezone.utc).date()
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+
+def _lock_snapshot(db: Session, company_id: int) -> CashflowBalanceSnapshot:
+    table = CashflowBalanceSnapshot.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        db.execute(insert(table).values(company_id=company_id).on_conflict_do_nothing(index_elements=["company_id"]))
+    elif db.get(CashflowBalanceSnapshot, company_id) is None:
+        db.add(CashflowBalanceSnapshot(company_id=company_id))
+        db.flush()
+    return (
+        db.query(CashflowBalanceSnapshot)
+        .filter(CashflowBalanceSnapshot.company_id == company_id)
+        .populate_existing()
+        .with_for_update()
+        .one()
+    )
+
+
+def _fold_delta(db: Session, snapshot: CashflowBalanceSnapshot) -> None:
+    """Incorpora al snapshot y a los agregados diarios los movimientos con id > watermark."""
+    rows = (
+        db.query(
+            CashflowLedgerEntry.id,
+            CashflowLedgerEntry.amount,
+            CashflowLedgerEntry.direction,
+            CashflowLedgerEntry.source,
+            CashflowLedgerEntry.created_at,
+        )
+        .filter(
+            CashflowLedgerEntry.company_id == snapshot.company_id,
+            CashflowLedgerEntry.id > (snapshot.last_entry_id or 0),
+        )
+        .order_by(CashflowLedgerEntry.id.asc())
+        .all()
+    )
+    if not rows:
+        return
+    moments: Dict[Tuple[date, str, str], List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+    for entry_id, amount, direction, source, created_at in rows:
+        amt = float(amount or 0)
+        if direction == "out":
+            snapshot.total_out = float(snapshot.total_out or 0) + amt
+        else:
+            snapshot.total_in = float(snapshot.total_in or 0) + amt
+        snapshot.entries_count = int(snapshot.entries_count or 0) + 1
+        snapshot.last_entry_id = max(int(snapshot.last_entry_id or 0), int(entry_id))
+        m = moments[(_entry_day(created_at), source, direction)]
+        m[0] += 1
+        m[1] += amt
+        m[2] += amt * amt
+    for (day, source, direction), (n, total, sumsq) in moments.items():
+        agg = (
+            db.query(CashflowDailyAggregate)
+            .filter_by(company_id=snapshot.company_id, day=day, source=source, direction=direction)
+            .first()
+        )
+        if agg is None:
+            agg = CashflowDailyAggregate(
+                company_id=snapshot.company_id, day=day, source=source, direction=direction,
+                entries_count=0, amount_sum=0.0, amount_sumsq=0.0,
+            )
+            db.add(agg)
+        agg.entries_count = int(agg.entries_count or 0) + n
+        agg.amount_sum = float(agg.amount_sum or 0) + total
+        agg.amount_sumsq = float(agg.amount_sumsq or 0) + sumsq
+    db.flush()
+
+
+def _snapshot_state(db: Session, company_id: int) -> Tuple[float, float, int]:
+    row = (
+        db.query(
+            CashflowBalanceSnapshot.total_in,
+            CashflowBalanceSnapshot.total_out,
+            CashflowBalanceSnapshot.last_entry_id,
+        )
+        .filter(CashflowBalanceSnapshot.company_id == company_id)
+        .first()
+    )
+    if row is None:
+        return 0.0, 0.0, 0
+    return float(row[0] or 0), float(row[1] or 0), int(row[2] or 0)
+
+
 def get_balance(db: Session, *, company_id: int) -> float:
-    ins = (
-        db.query(func.coalesce(func.sum(CashflowLedgerEntry.amount), 0.0))
+    total_in, total_out, watermark = _snapshot_state(db, company_id)
+    delta_in, delta_out = (
+        db.query(
+            func.coalesce(func.sum(case((CashflowLedgerEntry.direction == "in", CashflowLedgerEntry.amount), else_=0.0)), 0.0),
+            func.coalesce(func.sum(case((CashflowLedgerEntry.direction == "out", CashflowLedgerEntry.amount), else_=0.0)), 0.0),
+        )
         .filter(
             CashflowLedgerEntry.company_id == company_id,
-            CashflowLedgerEntry.direction == "in",
+            CashflowLedgerEntry.id > watermark,
+        )
+        .one()
+    )
+    return round(total_in + float(delta_in or 0) - total_out - float(delta_out or 0), 2)
+
+
+def period_moments(
+    db: Session,
+    *,
+    company_id: int,
+    since: datetime,
+) -> Dict[Tuple[str, str], Dict[str, float]]:
+    """
+    {(source, direction): {"count", "sum", "sumsq"}} desde ``since``.
+
+    Días completos posteriores al de ``since`` salen de cashflow_daily_aggregates;
+    el día frontera y el delta sobre el snapshot se leen del libro (acotados por índice).
+    """
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    boundary_day = since.astimezone(timezone.utc).date()
+    next_day = datetime.combine(boundary_day + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    _, _, watermark = _snapshot_state(db, company_id)
+
+    out: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(lambda: {"count": 0, "sum": 0.0, "sumsq": 0.0})
+    stored = (
+        db.query(
+            CashflowDailyAggregate.source,
+            CashflowDailyAggregate.direction,
+            func.sum(CashflowDailyAggregate.entries_count),
+            func.sum(CashflowDailyAggregate.amount_sum),
+            func.sum(CashflowDailyAggregate.amount_sumsq),
+        )
+        .filter(
+            CashflowDailyAggregate.company_id == company_id,
+            CashflowDailyAggregate.day > boundary_day,
         )
-        .scalar()
+        .group_by(CashflowDailyAggregate.source, CashflowDailyAggregate.direction)
+        .all()
     )
-    outs = (
-        db.query(func.coalesce(func.sum(CashflowLedgerEntry.amount), 0.0))
+    live = (
+        db.query(
+            CashflowLedgerEntry.source,
+            CashflowLedgerEntry.direction,
+            func.count(CashflowLedgerEntry.id),
+            func.sum(CashflowLedgerEntry.amount),
+            func.sum(CashflowLedgerEntry.amount * CashflowLedgerEntry.amount),
+        )
         .filter(
             CashflowLedgerEntry.company_id == company_id,
-            CashflowLedgerEntry.direction == "out",
+            CashflowLedgerEntry.created_at >= since,
+            or_(CashflowLedgerEntry.created_at < next_day, CashflowLedgerEntry.id > watermark),
         )
-        .scalar()
+        .group_by(CashflowLedgerEntry.source, CashflowLedgerEntry.direction)
+        .all()
     )
-    return round(float(ins or 0) - float(outs or 0), 2)
+    for source, direction, n, total, sumsq in list(stored) + list(live):
+        m = out[(source, direction)]
+        m["count"] += int(n or 0)
+        m["sum"] += float(total or 0)
+        m["sumsq"] += float(sumsq or 0)
+    return dict(out)
 
 
 def get_summary(
@@ -119,22 +275,24 @@ def get_summary(
     days: int = 30,
 ) -> Dict[str, Any]:
     since = datetime.now(timezone.utc) - timedelta(days=max(1, int(days)))
-    rows: List[CashflowLedgerEntry] = (
+    moments = period_moments(db, company_id=company_id, since=since)
+    total_in = sum(m["sum"] for (_, d), m in moments.items() if d == "in")
+    total_out = sum(m["sum"] for (_, d), m in moments.items() if d == "out")
+    by_source: Dict[str, float] = {}
+    for (source, direction), m in moments.items():
+        if direction != "in":
+            continue
+        by_source[source] = by_source.get(source, 0.0) + m["sum"]
+    recent: List[CashflowLedgerEntry] = (
         db.query(CashflowLedgerEntry)
         .filter(
             CashflowLedgerEntry.company_id == company_id,
             CashflowLedgerEntry.created_at >= since,
         )
         .order_by(CashflowLedgerEntry.created_at.desc())
+        .limit(20)
         .all()
     )
-    total_in = sum(r.amount for r in rows if r.direction == "in")
-    total_out = sum(r.amount for r in rows if r.direction == "out")
-    by_source: Dict[str, float] = {}
-    for r in rows:
-        if r.direction != "in":
-            continue
-        by_source[r.source] = by_source.get(r.source, 0.0) + float(r.amount or 0)
 
     return {
         "company_id": company_id,
@@ -144,7 +302,7 @@ def get_summary(
         "total_out": round(total_out, 2),
         "net_period": round(total_in - total_out, 2),
         "by_source": {k: round(v, 2) for k, v in by_source.items()},
-        "entries_count": len(rows),
+        "entries_count": int(sum(m["count"] for m in moments.values())),
         "recent": [
             {
                 "id": r.id,
@@ -154,11 +312,61 @@ def get_summary(
                 "ticket_id": r.ticket_id,
                 "created_at": r.created_at.isoformat() if r.created_at else None,
             }
-            for r in rows[:20]
+            for r in recent
         ],
     }
 
 
+def rebuild_snapshots(db: Session, *, company_id: Optional[int] = None, batch_size: int = 5000) -> Dict[str, int]:
+    """Reconstruye snapshots y agregados diarios desde cashflow_ledger (backfill/reparación). Hace commit."""
+    q = db.query(
+        CashflowLedgerEntry.company_id,
+        CashflowLedgerEntry.id,
+        CashflowLedgerEntry.amount,
+        CashflowLedgerEntry.direction,
+        CashflowLedgerEntry.source,
+        CashflowLedgerEntry.created_at,
+    )
+    snap_q = db.query(CashflowBalanceSnapshot)
+    agg_q = db.query(CashflowDailyAggregate)
+    if company_id is not None:
+        q = q.filter(CashflowLedgerEntry.company_id == company_id)
+        snap_q = snap_q.filter(CashflowBalanceSnapshot.company_id == company_id)
+        agg_q = agg_q.filter(CashflowDailyAggregate.company_id == company_id)
+
+    snaps: Dict[int, Dict[str, Any]] = defaultdict(
+        lambda: {"total_in": 0.0, "total_out": 0.0, "entries_count": 0, "last_entry_id": 0}
+    )
+    moments: Dict[Tuple[int, date, str, str], List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+    entries = 0
+    for cid, entry_id, amount, direction, source, created_at in q.order_by(CashflowLedgerEntry.id.asc()).yield_per(batch_size):
+        entries += 1
+        amt = float(amount or 0)
+        snap = snaps[int(cid)]
+        snap["total_out" if direction == "out" else "total_in"] += amt
+        snap["entries_count"] += 1
+        snap["last_entry_id"] = max(snap["last_entry_id"], int(entry_id))
+        m = moments[(int(cid), _entry_day(created_at), source, direction)]
+        m[0] += 1
+        m[1] += amt
+        m[2] += amt * amt
+
+    agg_q.delete(synchronize_session=False)
+    snap_q.delete(synchronize_session=False)
+    for cid, values in snaps.items():
+        db.add(CashflowBalanceSnapshot(company_id=cid, **values))
+    for (cid, day, source, direction), (n, total, sumsq) in moments.items():
+        db.add(
+            CashflowDailyAggregate(
+                company_id=cid, day=day, source=source, direction=direction,
+                entries_count=n, amount_sum=total, amount_sumsq=sumsq,
+            )
+        )
+    db.commit()
+    logger.info("cashflow snapshots rebuilt: entries=%s companies=%s", entries, len(snaps))
+    return {"entries": entries, "companies": len(snaps), "daily_rows": len(moments)}
+
+
 def detect_anomaly(
     db: Session,
     *,
@@ -5,6 +5,8 @@ from __future__ import annotations
 import logging
 from typing import List, Optional
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.chat_message import ChatMessage
@@ -28,6 +30,28 @@ def resolve_company_id(db: Session, user: User) -> Optional[int]:
         return None
 
 
+def _build_message_row(
+    *,
+    user: User,
+    agent_name: str,
+    thread_id: str,
+    role: str,
+    text: str,
+    company_id: Optional[int],
+) -> ChatMessage:
+    role_norm = (role or "user").strip().lower()
+    if role_norm not in ("user", "assistant", "system"):
+        role_norm = "user"
+    return ChatMessage(
+        company_id=company_id,
+        user_id=user.id,
+        agent_name=normalize_agent_name(agent_name),
+        thread_id=(thread_id or "main").strip() or "main",
+        role=role_norm,
+        message=text[:50000],
+    )
+
+
 def save_message(
     db: Session,
     *,
@@ -41,17 +65,14 @@ def save_message(
     text = (message or "").strip()
     if not text:
         return None
-    role_norm = (role or "user").strip().lower()
-    if role_norm not in ("user", "assistant", "system"):
-        role_norm = "user"
     cid = company_id if company_id is not None else resolve_company_id(db, user)
-    row = ChatMessage(
+    row = _build_message_row(
+        user=user,
+        agent_name=agent_name,
+        thread_id=thread_id,
+        role=role,
+        text=text,
         company_id=cid,
-        user_id=user.id,
-        agent_name=normalize_agent_name(agent_name),
-        thread_id=(thread_id or "main").strip() or "main",
-        role=role_norm,
-        message=text[:50000],
     )
     try:
         db.add(row)
@@ -64,27 +85,76 @@ def save_message(
         return None
 
 
-def list_messages(
-    db: Session,
+async def save_message_async(
+    db: AsyncSession,
     *,
     user: User,
     agent_name: str,
-    thread_id: str = "main",
-    limit: int = MAX_HISTORY,
-) -> List[ChatMessage]:
+    thread_id: str,
+    role: str,
+    message: str,
+    company_id: Optional[int] = None,
+) -> Optional[ChatMessage]:
+    """Como save_message, sobre AsyncSession (no bloquea el event loop en el commit)."""
+    text = (message or "").strip()
+    if not text:
+        return None
+    if company_id is None:
+        company_id = await db.run_sync(resolve_company_id, user)
+    row = _build_message_row(
+        user=user,
+        agent_name=agent_name,
+        thread_id=thread_id,
+        role=role,
+        text=text,
+        company_id=company_id,
+    )
+    try:
+        db.add(row)
+        await db.commit()
+        await db.refresh(row)
+        return row
+    except Exception:
+        await db.rollback()
+        logger.exception("save_message_async failed user_id=%s agent=%s", user.id, agent_name)
+        return None
+
+
+def _messages_stmt(*, user: User, agent_name: str, thread_id: str, limit: int):
     agent = normalize_agent_name(agent_name)
     tid = (thread_id or "main").strip() or "main"
     limit = max(1, min(limit, MAX_HISTORY))
-    q = (
-        db.query(ChatMessage)
-        .filter(
+    return (
+        select(ChatMessage)
+        .where(
             ChatMessage.user_id == user.id,
             ChatMessage.agent_name == agent,
             ChatMessage.thread_id == tid,
         )
         .order_by(ChatMessage.created_at.asc(), ChatMessage.id.asc())
+        .limit(limit)
     )
-    rows = q.limit(limit).all()
-    if len(rows) >= limit:
-        return rows
-    return rows
+
+
+def list_messages(
+    db: Session,
+    *,
+    user: User,
+    agent_name: str,
+    thread_id: str = "main",
+    limit: int = MAX_HISTORY,
+) -> List[ChatMessage]:
+    stmt = _messages_stmt(user=user, agent_name=agent_name, thread_id=thread_id, limit=limit)
+    return list(db.execute(stmt).scalars().all())
+
+
+async def list_messages_async(
+    db: AsyncSession,
+    *,
+    user: User,
+    agent_name: str,
+    thread_id: str = "main",
+    limit: int = MAX_HISTORY,
+) -> List[ChatMessage]:
+    stmt = _messages_stmt(user=user, agent_name=agent_name, thread_id=thread_id, limit=limit)
+    return list((await db.execute(stmt)).scalars().all())
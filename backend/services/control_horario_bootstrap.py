@@ -0,0 +1,208 @@
+"""
+Agregador de GET /control-horario/bootstrap y ciclo periódico de control horario.
+
+Las secciones independientes del bootstrap se ejecutan en paralelo (threadpool de
+Starlette), cada una con su propia sesión del pool; un semáforo de proceso limita las
+sesiones abiertas a la vez al tamaño del pool para que varias peticiones concurrentes
+no lo agoten. Las lentas de cambiar (patrones,
+ventana TPV, analítica de costes) se sirven de una caché TTL por empresa/usuario.
+Las escrituras que antes hacía el GET (evaluate_alerts, refresh_partial_costs) viven
+en ``run_control_horario_cycle``, llamado por workers/control_horario_worker.py.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.async_session import attach_user
+from app.db.base import engine
+from app.db.session import SessionLocal
+from app.models.company import UserCompany
+from app.models.company_employee import CompanyEmployee
+from app.models.time_tracking import RecordStatus, TimeTrackingRecord
+from app.models.user import User
+from services import smart_time_control_service as sm
+
+logger = logging.getLogger(__name__)
+
+Section = Callable[[Session, User], Any]
+
+_CACHE_MAX_ENTRIES = 2048
+_cache: Dict[Tuple[str, Optional[int], int], Tuple[float, Any]] = {}
+_cache_lock = threading.Lock()
+_slots: Optional[threading.BoundedSemaphore] = None
+_slots_lock = threading.Lock()
+
+
+def _db_slots() -> threading.BoundedSemaphore:
+    """Semáforo de sesiones del bootstrap: CONTROL_HORARIO_BOOTSTRAP_DB_SLOTS o pool_size."""
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            size = settings.CONTROL_HORARIO_BOOTSTRAP_DB_SLOTS
+            if size <= 0:
+                pool_size = getattr(engine.pool, "size", None)
+                # NullPool (SQLite) no tiene tamaño: conexión por checkout, basta un límite bajo
+                size = pool_size() if callable(pool_size) else 4
+            _slots = threading.BoundedSemaphore(max(1, size))
+        return _slots
+
+
+def section_ttl(name: str) -> float:
+    return float(
+        {
+            "patterns": settings.CONTROL_HORARIO_PATTERNS_TTL_SEC,
+            "tpv": settings.CONTROL_HORARIO_TPV_TTL_SEC,
+            "cost_analytics": settings.CONTROL_HORARIO_COST_TTL_SEC,
+        }.get(name, 0)
+        or 0
+    )
+
+
+def cached_section(name: str, company_id: Optional[int], fn: Section) -> Section:
+    """Envuelve ``fn`` con caché TTL por (sección, empresa, usuario)."""
+
+    def _run(db: Session, user: User) -> Any:
+        ttl = section_ttl(name)
+        key = (name, company_id, int(user.id))
+        now = time.monotonic()
+        if ttl > 0:
+            with _cache_lock:
+                hit = _cache.get(key)
+            if hit is not None and hit[0] > now:
+                return hit[1]
+        value = fn(db, user)
+        if ttl > 0:
+            with _cache_lock:
+                _cache[key] = (now + ttl, value)
+                if len(_cache) > _CACHE_MAX_ENTRIES:
+                    for k in [k for k, (exp, _) in _cache.items() if exp <= now]:
+                        _cache.pop(k, None)
+                while len(_cache) > _CACHE_MAX_ENTRIES:
+                    _cache.pop(next(iter(_cache)))
+        return value
+
+    return _run
+
+
+def invalidate_bootstrap_cache(*, company_id: Optional[int] = None, user_id: Optional[int] = None) -> None:
+    """Descarta secciones cacheadas de la empresa y/o del usuario; sin argumentos vacía la caché."""
+    with _cache_lock:
+        if company_id is None and user_id is None:
+            _cache.clear()
+            return
+        stale = [
+            k for k in _cache
+            if (company_id is not None and k[1] == company_id) or (user_id is not None and k[2] == user_id)
+        ]
+        for k in stale:
+            _cache.pop(k, None)
+
+
+def _run_section(name: str, fn: Section, user: User, default: Any) -> Tuple[str, Any, Dict[str, Any]]:
+    t0 = time.perf_counter()
+    with _db_slots():
+        wait_ms = round((time.perf_counter() - t0) * 1000, 1)
+        db = SessionLocal()
+        try:
+            value = fn(db, attach_user(db, user))
+            db.rollback()  # secciones de solo lectura: no dejar nada pendiente
+            timing: Dict[str, Any] = {"ms": round((time.perf_counter() - t0) * 1000, 1)}
+        except Exception as exc:
+            logger.warning("control-horario bootstrap: sección %s omitida: %s", name, exc)
+            db.rollback()
+            value = default
+            timing = {"ms": round((time.perf_counter() - t0) * 1000, 1), "error": str(exc)[:200]}
+        finally:
+            db.close()
+    timing["wait_ms"] = wait_ms
+    return name, value, timing
+
+
+async def run_sections(
+    user: User,
+    sections: Dict[str, Tuple[Section, Any]],
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """Ejecuta {nombre: (fn, valor_por_defecto)} en paralelo. Devuelve (resultados, tiempos)."""
+    done = await asyncio.gather(
+        *(run_in_threadpool(_run_section, name, fn, user, default) for name, (fn, default) in sections.items())
+    )
+    results = {name: value for name, value, _ in done}
+    timings = {name: timing for name, _, timing in done}
+    return results, timings
+
+
+# ---------------------------------------------------------------------------
+# Ciclo periódico (escrituras fuera del GET)
+# ---------------------------------------------------------------------------
+
+
+def _cycle_user_ids(db: Session) -> Set[int]:
+    with_roster = (
+        db.query(UserCompany.user_id)
+        .join(CompanyEmployee, CompanyEmployee.company_id == UserCompany.company_id)
+        .filter(CompanyEmployee.is_active.is_(True))
+        .distinct()
+        .all()
+    )
+    since = datetime.now(timezone.utc) - timedelta(days=1)
+    with_active = (
+        db.query(TimeTrackingRecord.user_id)
+        .filter(
+            TimeTrackingRecord.status == RecordStatus.ACTIVE,
+            TimeTrackingRecord.check_in_time >= since,
+        )
+        .distinct()
+        .all()
+    )
+    return {int(r[0]) for r in with_roster + with_active if r[0] is not None}
+
+
+def _alert_roster(db: Session, user: User, status_map: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    cids = [r[0] for r in db.query(UserCompany.company_id).filter(UserCompany.user_id == user.id).all()]
+    if cids:
+        rows = (
+            db.query(CompanyEmployee.employee_code, CompanyEmployee.full_name)
+            .filter(CompanyEmployee.company_id.in_(cids), CompanyEmployee.is_active.is_(True))
+            .all()
+        )
+        if rows:
+            return [{"id": str(code), "name": name} for code, name in rows]
+    return [{"id": eid, "name": ""} for eid in status_map]
+
+
+def run_control_horario_cycle(db: Session) -> Dict[str, Any]:
+    """Evalúa alertas por usuario y refresca costes parciales por empresa. Hace commit por usuario."""
+    from services.time_cost_engine_v1 import refresh_partial_costs
+
+    users = alerts = companies = 0
+    refreshed: Set[int] = set()
+    for uid in sorted(_cycle_user_ids(db)):
+        user = db.get(User, uid)
+        if user is None or not user.is_active:
+            continue
+        try:
+            status_map, _ = sm.build_employees_smart_status(db, user)
+            roster = _alert_roster(db, user, status_map)
+            alerts += len(sm.evaluate_alerts(db, user, roster=roster, employees_status=status_map))
+            for (cid,) in db.query(UserCompany.company_id).filter(UserCompany.user_id == uid).all():
+                if cid in refreshed:
+                    continue
+                refresh_partial_costs(db, company_id=int(cid))
+                refreshed.add(int(cid))
+                companies += 1
+            db.commit()
+            users += 1
+        except Exception:
+            logger.exception("control-horario cycle falló user_id=%s", uid)
+            db.rollback()
+    return {"users": users, "alerts": alerts, "companies_refreshed": companies}
@@ -0,0 +1,190 @@
+"""
+Exportaciones CRM (clientes, expedientes, cobros) en streaming: CSV, CSV.gz y XLSX.
+
+Las filas salen de la BD con ``yield_per`` (cursor de servidor en Postgres), solo con
+las columnas exportadas, y pasan por ``csv.writer`` a trozos de ~64KB: la memoria no
+crece con el número de filas y la cabecera sale en el primer trozo, antes de la query.
+
+El generador abre su propia sesión: FastAPI cierra la de ``get_db`` antes de enviar el
+cuerpo de un StreamingResponse. El ámbito (empresas del usuario) se resuelve antes,
+con la sesión de la petición.
+
+XLSX usa openpyxl en modo write-only (filas a disco, no en memoria); el zip solo existe
+al final, así que se escribe a un fichero temporal y se sirve por trozos.
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+import tempfile
+import zlib
+from io import StringIO
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.db.base import SessionLocal
+from app.models.crm_office import CrmSaleLink, CustomerRecord
+from app.models.customer import Customer
+from app.models.fiscal import TPVSale
+from app.models.user import User
+from services.crm_office_service import customer_scope
+
+YIELD_PER = 1000
+CHUNK_BYTES = 64 * 1024
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def _iso(value: Any) -> str:
+    return value.isoformat() if value else ""
+
+
+def _client_rows(db: Session, scope) -> Iterator[List[Any]]:
+    q = (
+        db.query(Customer.id, Customer.name, Customer.email, Customer.phone, Customer.is_active, Customer.created_at)
+        .filter(scope)
+        .order_by(Customer.name.asc(), Customer.id.asc())
+        .yield_per(YIELD_PER)
+    )
+    for r in q:
+        yield [r.id, r.name, r.email or "", r.phone or "", "active" if r.is_active else "inactive", _iso(r.created_at)]
+
+
+def _case_rows(db: Session, scope) -> Iterator[List[Any]]:
+    q = (
+        db.query(
+            CustomerRecord.id,
+            CustomerRecord.customer_id,
+            CustomerRecord.title,
+            CustomerRecord.status,
+            CustomerRecord.amount,
+            CustomerRecord.created_at,
+        )
+        .join(Customer, Customer.id == CustomerRecord.customer_id)
+        .filter(scope)
+        .order_by(CustomerRecord.created_at.desc(), CustomerRecord.id.desc())
+        .yield_per(YIELD_PER)
+    )
+    for r in q:
+        yield [r.id, r.customer_id, r.title, r.status, r.amount, r.status == "paid", _iso(r.created_at)]
+
+
+def _payment_rows(db: Session, scope) -> Iterator[List[Any]]:
+    q = (
+        db.query(CrmSaleLink.id, CustomerRecord.id.label("case_id"), TPVSale.total, TPVSale.payment_method, CrmSaleLink.created_at)
+        .join(TPVSale, TPVSale.id == CrmSaleLink.tpv_sale_id)
+        .join(CustomerRecord, CustomerRecord.id == CrmSaleLink.customer_record_id)
+        .join(Customer, Customer.id == CrmSaleLink.customer_id)
+        .filter(scope)
+        .order_by(CrmSaleLink.created_at.desc(), CrmSaleLink.id.desc())
+        .yield_per(YIELD_PER)
+    )
+    for r in q:
+        yield [r.id, r.case_id, r.total, r.payment_method, "registered", _iso(r.created_at)]
+
+
+EXPORTS: Dict[str, Tuple[Tuple[str, ...], Callable[[Session, Any], Iterator[List[Any]]]]] = {
+    "clients": (("id", "name", "email", "phone", "status", "created_at"), _client_rows),
+    "cases": (("id", "client_id", "title", "status", "amount", "paid", "created_at"), _case_rows),
+    "payments": (("id", "case_id", "amount", "method", "status", "created_at"), _payment_rows),
+}
+
+
+def _spec(entity: str):
+    spec = EXPORTS.get(entity)
+    if spec is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entidad no exportable")
+    return spec
+
+
+def _rows(entity: str, scope) -> Iterator[List[Any]]:
+    _, producer = _spec(entity)
+    db = SessionLocal()
+    try:
+        yield from producer(db, scope)
+    finally:
+        db.close()
+
+
+def iter_csv(entity: str, scope, *, gzip: bool = False) -> Iterator[bytes]:
+    """CSV por trozos (opcionalmente gzip); la cabecera se emite antes de consultar la BD."""
+    header, _ = _spec(entity)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    def _take(flush: bool = False) -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        if compressor is None:
+            return data
+        out = compressor.compress(data)
+        return out + compressor.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    writer.writerow(header)
+    yield _take(flush=True)
+    for row in _rows(entity, scope):
+        writer.writerow(["true" if v is True else "false" if v is False else v for v in row])
+        if buffer.tell() >= CHUNK_BYTES:
+            chunk = _take()
+            if chunk:
+                yield chunk
+    tail = _take()
+    if compressor is not None:
+        tail += compressor.flush()
+    if tail:
+        yield tail
+
+
+def iter_xlsx(entity: str, scope) -> Iterator[bytes]:
+    """XLSX write-only volcado a fichero temporal y servido por trozos."""
+    from openpyxl import Workbook  # pyright: ignore[reportMissingModuleSource]
+
+    header, _ = _spec(entity)
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(entity)
+        ws.append(list(header))
+        for row in _rows(entity, scope):
+            ws.append(row)
+        wb.save(path)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+                yield chunk
+    finally:
+        os.unlink(path)
+
+
+def export_response(db: Session, user: User, entity: str, *, fmt: str = "csv", gzip: bool = False) -> StreamingResponse:
+    """StreamingResponse de la exportación ``entity`` en ``fmt`` (csv | xlsx)."""
+    _spec(entity)
+    scope = customer_scope(db, user)
+    if fmt == "xlsx":
+        try:
+            import openpyxl  # noqa: F401  # pyright: ignore[reportMissingModuleSource]
+        except ImportError as exc:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="openpyxl no disponible") from exc
+        return StreamingResponse(
+            iter_xlsx(entity, scope),
+            media_type=XLSX_MEDIA_TYPE,
+            headers={"Content-Disposition": f"attachment; filename={entity}.xlsx"},
+        )
+    if fmt != "csv":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Formato no soportado (csv | xlsx)")
+    if gzip:
+        return StreamingResponse(
+            iter_csv(entity, scope, gzip=True),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f"attachment; filename={entity}.csv.gz"},
+        )
+    return StreamingResponse(
+        iter_csv(entity, scope),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={entity}.csv"},
+    )
@@ -2,17 +2,25 @@
 
 from __future__ import annotations
 
+import base64
+import binascii
+import json
 import logging
 import csv
+import threading
+import time
 import uuid
+from dataclasses import dataclass, field
 from io import StringIO
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import HTTPException, status
-from sqlalchemy import and_, or_
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, event, func, or_
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.core.config import settings
 
 from app.models.company import UserCompany
 from app.models.customer import Customer, ContactPerson
@@ -57,6 +65,11 @@ def _customer_scope_filter(user: User, cids: List[int]):
     )
 
 
+def customer_scope(db: Session, user: User):
+    """Filtro SQL de clientes visibles para ``user`` (reutilizable sin la sesión: exportaciones)."""
+    return _customer_scope_filter(user, company_ids_for_user(db, user))
+
+
 def resolve_customer(db: Session, user: User, customer_id: int) -> Customer:
     cids = company_ids_for_user(db, user)
     q = db.query(Customer).filter(Customer.id == customer_id).filter(_customer_scope_filter(user, cids))
@@ -77,6 +90,163 @@ def list_customers(db: Session, user: User) -> List[Customer]:
     return q.all()
 
 
+def count_customers(db: Session, user: User) -> Dict[str, int]:
+    """Totales de clientes en alcance (COUNT en BD, sin cargar filas ni contactos)."""
+    cids = company_ids_for_user(db, user)
+    total, with_email, with_phone = (
+        db.query(
+            func.count(Customer.id),
+            func.count(Customer.id).filter(and_(Customer.email.isnot(None), func.trim(Customer.email) != "")),
+            func.count(Customer.id).filter(and_(Customer.phone.isnot(None), func.trim(Customer.phone) != "")),
+        )
+        .filter(_customer_scope_filter(user, cids))
+        .one()
+    )
+    return {"total": int(total or 0), "with_email": int(with_email or 0), "with_phone": int(with_phone or 0)}
+
+
+# --- Listado paginado (keyset) ---------------------------------------------------------
+
+SEARCH_FIELDS = (Customer.name, Customer.email, Customer.phone, Customer.tax_id)
+# Con 3+ caracteres la búsqueda es "contiene" (índices trigram en Postgres); con menos, prefijo
+TRIGRAM_MIN_CHARS = 3
+
+_count_lock = threading.Lock()
+_count_cache: Dict[Tuple[Any, ...], Tuple[float, int, Dict[str, int]]] = {}
+_count_generation = 0
+
+
+@dataclass
+class CustomerPage:
+    items: List[Customer] = field(default_factory=list)
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+    limit: int = 100
+
+
+def encode_cursor(name: str, customer_id: int) -> str:
+    raw = json.dumps([name, customer_id], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        name, customer_id = json.loads(raw.decode("utf-8"))
+        return str(name), int(customer_id)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginación no válido")
+
+
+def _like_escape(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def customer_search_filter(q: str):
+    """name / email / phone / tax_id: prefijo (<3 caracteres) o subcadena, sin distinguir mayúsculas."""
+    term = _like_escape(q.strip().lower())
+    pattern = f"%{term}%" if len(term) >= TRIGRAM_MIN_CHARS else f"{term}%"
+    return or_(*(func.lower(col).like(pattern, escape="\\") for col in SEARCH_FIELDS))
+
+
+def _scoped_customers(db: Session, user: User, q: Optional[str]):
+    query = db.query(Customer).filter(_customer_scope_filter(user, company_ids_for_user(db, user)))
+    if q and q.strip():
+        query = query.filter(customer_search_filter(q))
+    return query
+
+
+@event.listens_for(Customer, "after_insert")
+@event.listens_for(Customer, "after_update")
+@event.listens_for(Customer, "after_delete")
+def _invalidate_customer_counts(mapper, connection, target) -> None:
+    global _count_generation
+    with _count_lock:
+        _count_generation += 1
+
+
+def _cached_counts(key: Tuple[Any, ...], compute) -> Dict[str, int]:
+    ttl = settings.CRM_COUNT_CACHE_TTL_SEC
+    now = time.monotonic()
+    with _count_lock:
+        generation = _count_generation
+        hit = _count_cache.get(key)
+        if ttl > 0 and hit and hit[0] > now and hit[1] == generation:
+            return dict(hit[2])
+    value = compute()
+    if ttl > 0:
+        with _count_lock:
+            if len(_count_cache) > 4096:
+                _count_cache.clear()
+            _count_cache[key] = (now + ttl, generation, value)
+    return dict(value)
+
+
+def count_customers_matching(
+    db: Session, user: User, q: Optional[str] = None, *, cached: bool = True
+) -> int:
+    """COUNT del listado (con búsqueda) separado de la página; cacheado CRM_COUNT_CACHE_TTL_SEC."""
+
+    def _compute() -> Dict[str, int]:
+        return {"total": int(_scoped_customers(db, user, q).with_entities(func.count(Customer.id)).scalar() or 0)}
+
+    if not cached:
+        return _compute()["total"]
+    key = ("match", user.id, (q or "").strip().lower())
+    return _cached_counts(key, _compute)["total"]
+
+
+def page_customers(
+    db: Session,
+    user: User,
+    *,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    q: Optional[str] = None,
+    offset: Optional[int] = None,
+    with_total: bool = True,
+    cached_total: bool = True,
+    with_contacts: bool = True,
+) -> CustomerPage:
+    """
+    Página de clientes ordenada por (name, id). Con ``cursor`` (keyset) el coste no depende
+    de la posición; ``offset`` se mantiene solo para el parámetro ``page`` heredado.
+    """
+    query = _scoped_customers(db, user, q)
+    if cursor:
+        last_name, last_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(Customer.name > last_name, and_(Customer.name == last_name, Customer.id > last_id))
+        )
+    query = query.order_by(Customer.name.asc(), Customer.id.asc())
+    if offset and not cursor:
+        query = query.offset(offset)
+    if with_contacts:
+        query = query.options(selectinload(Customer.contacts))
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    return CustomerPage(
+        items=items,
+        total=count_customers_matching(db, user, q, cached=cached_total) if with_total else None,
+        next_cursor=encode_cursor(items[-1].name, items[-1].id) if has_more and items else None,
+        limit=limit,
+    )
+
+
+def list_customer_recipients(db: Session, user: User, limit: int) -> List[Dict[str, Any]]:
+    """Clientes con email (id, name, email) para campañas: solo columnas y hasta ``limit`` filas."""
+    rows = (
+        db.query(Customer.id, Customer.name, Customer.email)
+        .filter(_customer_scope_filter(user, company_ids_for_user(db, user)))
+        .filter(Customer.email.isnot(None), func.trim(Customer.email) != "")
+        .order_by(Customer.name.asc(), Customer.id.asc())
+        .limit(limit)
+        .all()
+    )
+    return [{"id": r.id, "name": r.name, "email": str(r.email).strip().lower()} for r in rows]
+
+
 def assert_email_unique_in_company(
     db: Session, company_id: Optional[int], email: Optional[str], exclude_customer_id: Optional[int] = None
 ) -> None:
@@ -346,61 +516,6 @@ def update_customer(
     return customer
 
 
-def customers_to_csv(rows: List[Customer]) -> str:
-    buffer = StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(["id", "name", "email", "phone", "status", "created_at"])
-    for row in rows:
-        writer.writerow(
-            [
-                row.id,
-                row.name,
-                row.email or "",
-                row.phone or "",
-                "active" if row.is_active else "inactive",
-                row.created_at.isoformat() if row.created_at else "",
-            ]
-        )
-    return buffer.getvalue()
-
-
-def cases_to_csv(rows: List[Dict[str, Any]]) -> str:
-    buffer = StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(["id", "client_id", "title", "status", "amount", "paid", "created_at"])
-    for row in rows:
-        writer.writerow(
-            [
-                row["id"],
-                row["client_id"],
-                row["title"],
-                row["status"],
-                row["amount"],
-                "true" if row["paid"] else "false",
-                row["created_at"].isoformat() if row.get("created_at") else "",
-            ]
-        )
-    return buffer.getvalue()
-
-
-def payments_to_csv(rows: List[Dict[str, Any]]) -> str:
-    buffer = StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(["id", "case_id", "amount", "method", "status", "created_at"])
-    for row in rows:
-        writer.writerow(
-            [
-                row["id"],
-                row["case_id"],
-                row["amount"],
-                row["method"],
-                row["status"],
-                row["created_at"].isoformat() if row.get("created_at") else "",
-            ]
-        )
-    return buffer.getvalue()
-
-
 def import_customers_from_csv(db: Session, user: User, csv_text: str) -> Dict[str, int]:
     cid = primary_company_id(db, user)
     if cid is None:
@@ -634,6 +749,7 @@ def register_record_charge(
             work_session_id=work_sid,
             customer_data=customer_data,
             auto_commit=False,
+            customer_id=cust.id,
         )
         ticket = build_cmr_fiscal_ticket(
             ticket_id=ticket_id,
@@ -0,0 +1,522 @@
+"""
+Retención de tablas de auditoría de alto volumen.
+
+agent_activities, thalos_events, zeus_domain_events, zeus_closure_audits y
+chat_messages crecen sin límite (cada pago escribe varias filas). Cada tabla tiene una
+política (RETENTION_DAYS_<TABLA>): las filas más antiguas se archivan por lotes a
+ficheros JSONL.gz (o Parquet si pyarrow está instalado) en RETENTION_ARCHIVE_DIR o S3,
+y se borran en la misma transacción que registra el segmento en data_archive_segments.
+Así las tablas calientes se quedan en lo que cabe en caché.
+
+``read_archive`` mantiene las consultas de auditoría: solo abre los segmentos cuyo
+rango de fechas solapa la búsqueda. El borrado es Core (sin eventos de mapper), así
+que el rollup agent_activity_hourly conserva las horas archivadas. Las filas que otra
+tabla aún referencia (eventos THALOS con alertas) no se archivan: el DELETE en cascada
+se llevaría las alertas sin archivarlas.
+
+En Postgres, las tablas convertidas a particionado nativo por mes
+(scripts/run_retention.py --partition) reciben particiones por adelantado y las
+particiones frías vacías tras archivar se eliminan.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, select, text
+from sqlalchemy import column as sql_column, table as sql_table
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.data_archive_segment import DataArchiveSegment
+from services import perseo_storage_v2 as cloud
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PREFIX = "archive"
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    table: str
+    model_path: str
+    days_setting: str
+    # Postgres exige la clave de partición en toda restricción única (public_id lo impide), y
+    # una PK (id, created_at) no puede respaldar una FK entrante sobre id solo
+    partitionable: bool = True
+    # "tabla.columna" que apuntan a esta tabla (p. ej. FK con ON DELETE CASCADE): las filas
+    # referenciadas se quedan en caliente para no arrastrar ni perder las de la otra tabla
+    referenced_by: Tuple[str, ...] = ()
+
+    @property
+    def hot_days(self) -> int:
+        return int(getattr(settings, self.days_setting))
+
+    @property
+    def model(self):
+        module, name = self.model_path.rsplit(".", 1)
+        return getattr(__import__(module, fromlist=[name]), name)
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        return (now or datetime.now(timezone.utc)) - timedelta(days=self.hot_days)
+
+
+POLICIES: Dict[str, RetentionPolicy] = {
+    p.table: p
+    for p in (
+        RetentionPolicy("agent_activities", "app.models.agent_activity.AgentActivity", "RETENTION_DAYS_AGENT_ACTIVITIES"),
+        RetentionPolicy(
+            "thalos_events",
+            "app.models.thalos_event.ThalosEvent",
+            "RETENTION_DAYS_THALOS_EVENTS",
+            partitionable=False,
+            referenced_by=("thalos_alerts.event_id",),
+        ),
+        RetentionPolicy(
+            "zeus_domain_events",
+            "app.models.zeus_domain_event.ZeusDomainEvent",
+            "RETENTION_DAYS_ZEUS_DOMAIN_EVENTS",
+            partitionable=False,
+        ),
+        RetentionPolicy(
+            "zeus_closure_audits", "app.models.zeus_closure_audit.ZeusClosureAudit", "RETENTION_DAYS_ZEUS_CLOSURE_AUDITS"
+        ),
+        RetentionPolicy("chat_messages", "app.models.chat_message.ChatMessage", "RETENTION_DAYS_CHAT_MESSAGES"),
+    )
+}
+
+
+def get_policy(table: str) -> RetentionPolicy:
+    policy = POLICIES.get(table)
+    if policy is None:
+        raise ValueError(f"Tabla sin política de retención: {table}")
+    return policy
+
+
+# --- Ficheros de archivo ---------------------------------------------------------
+
+
+def _backend() -> str:
+    return "s3" if settings.RETENTION_ARCHIVE_BACKEND == "s3" and cloud.s3_configured() else "local"
+
+
+def _format() -> str:
+    if settings.RETENTION_ARCHIVE_FORMAT != "parquet":
+        return "jsonl"
+    try:
+        import pyarrow  # noqa: F401  # pyright: ignore[reportMissingImports]
+    except ImportError:
+        logger.warning("[RETENTION] pyarrow no instalado: archivando en JSONL.gz")
+        return "jsonl"
+    return "parquet"
+
+
+def _archive_root() -> Path:
+    return Path(settings.RETENTION_ARCHIVE_DIR)
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _write_file(dest: Path, rows: List[Dict[str, Any]], fmt: str) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(dir=dest.parent, suffix=".part")
+    os.close(fd)
+    try:
+        if fmt == "parquet":
+            import pyarrow as pa  # pyright: ignore[reportMissingImports]
+            import pyarrow.parquet as pq  # pyright: ignore[reportMissingImports]
+
+            pq.write_table(pa.Table.from_pylist(rows), name, compression="zstd")
+        else:
+            with gzip.open(name, "wt", encoding="utf-8") as out:
+                for row in rows:
+                    out.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+                    out.write("\n")
+        os.replace(name, dest)
+    except BaseException:
+        Path(name).unlink(missing_ok=True)
+        raise
+
+
+def _read_file(path: Path, fmt: str) -> Iterator[Dict[str, Any]]:
+    if fmt == "parquet":
+        import pyarrow.parquet as pq  # pyright: ignore[reportMissingImports]
+
+        yield from pq.read_table(path).to_pylist()
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _store_segment(table: str, rows: List[Dict[str, Any]], min_ts: datetime) -> Dict[str, Any]:
+    fmt = _format()
+    ext = "parquet" if fmt == "parquet" else "jsonl.gz"
+    # Sufijo aleatorio: SQLite reutiliza ids tras borrar y un rango repetido no debe pisar otro segmento
+    rel = f"{table}/{min_ts:%Y/%m}/{table}-{rows[0]['id']:012d}-{rows[-1]['id']:012d}-{uuid.uuid4().hex[:8]}.{ext}"
+    local = _archive_root() / rel
+    _write_file(local, rows, fmt)
+    info = {"fmt": fmt, "size_bytes": local.stat().st_size, "sha256": _sha256(local), "backend": "local"}
+    if _backend() == "s3":
+        key = f"{ARCHIVE_PREFIX}/{rel}"
+        content_type = "application/vnd.apache.parquet" if fmt == "parquet" else "application/gzip"
+        cloud.put_object(local, key=key, content_type=content_type)
+        local.unlink(missing_ok=True)
+        info.update(backend="s3", location=key)
+    else:
+        info["location"] = rel
+    return info
+
+
+def _discard_segment(info: Dict[str, Any]) -> None:
+    try:
+        if info.get("backend") == "s3":
+            cloud.delete_object(info["location"])
+        else:
+            (_archive_root() / info["location"]).unlink(missing_ok=True)
+    except Exception as exc:
+        logger.warning("[RETENTION] no se pudo descartar %s: %s", info.get("location"), exc)
+
+
+# --- Archivado -------------------------------------------------------------------
+
+
+def _cold_filter(policy: RetentionPolicy, cutoff: datetime):
+    t = policy.model.__table__
+    cond = t.c.created_at < cutoff
+    for ref in policy.referenced_by:
+        ref_table, ref_column = ref.split(".", 1)
+        fk = sql_column(ref_column, _selectable=sql_table(ref_table))
+        cond = and_(cond, ~select(fk).where(fk == t.c.id).correlate(t).exists())
+    return cond
+
+
+def count_cold_rows(db: Session, policy: RetentionPolicy, *, now: Optional[datetime] = None) -> int:
+    table = policy.model.__table__
+    q = select(func.count()).select_from(table).where(_cold_filter(policy, policy.cutoff(now)))
+    return int(db.execute(q).scalar() or 0)
+
+
+def archive_table(
+    db: Session,
+    table: str,
+    *,
+    now: Optional[datetime] = None,
+    batch_size: Optional[int] = None,
+    max_batches: Optional[int] = None,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Archiva y borra por lotes las filas anteriores al corte de la política.
+    Cada lote: fichero → segmento + DELETE en una transacción (si falla, el fichero se descarta).
+    """
+    policy = get_policy(table)
+    cutoff = policy.cutoff(now)
+    report: Dict[str, Any] = {"table": table, "cutoff": cutoff.isoformat(), "archived": 0, "segments": 0}
+    if dry_run:
+        report["pending"] = count_cold_rows(db, policy, now=now)
+        return report
+
+    t = policy.model.__table__
+    size = max(1, int(batch_size or settings.RETENTION_BATCH_SIZE))
+    limit = max(1, int(max_batches or settings.RETENTION_MAX_BATCHES))
+    for _ in range(limit):
+        rows = [
+            dict(r)
+            for r in db.execute(select(t).where(_cold_filter(policy, cutoff)).order_by(t.c.id.asc()).limit(size))
+            .mappings()
+            .all()
+        ]
+        if not rows:
+            break
+        stamps = [r["created_at"] for r in rows if r.get("created_at") is not None]
+        min_ts, max_ts = min(stamps), max(stamps)
+        payload = [{k: _json_value(v) for k, v in r.items()} for r in rows]
+        info = _store_segment(table, payload, min_ts)
+        try:
+            db.add(
+                DataArchiveSegment(
+                    table_name=table,
+                    first_id=rows[0]["id"],
+                    last_id=rows[-1]["id"],
+                    min_created_at=min_ts,
+                    max_created_at=max_ts,
+                    row_count=len(rows),
+                    backend=info["backend"],
+                    fmt=info["fmt"],
+                    location=info["location"],
+                    size_bytes=info["size_bytes"],
+                    sha256=info["sha256"],
+                )
+            )
+            ids = [r["id"] for r in rows]
+            db.execute(delete(t).where(t.c.id.in_(ids), _cold_filter(policy, cutoff)))
+            db.commit()
+        except Exception:
+            db.rollback()
+            _discard_segment(info)
+            raise
+        report["archived"] += len(rows)
+        report["segments"] += 1
+        if len(rows) < size:
+            break
+    if report["archived"]:
+        logger.info("[RETENTION] %s archivadas=%s segmentos=%s", table, report["archived"], report["segments"])
+    return report
+
+
+def run_retention(
+    db: Session,
+    *,
+    tables: Optional[List[str]] = None,
+    now: Optional[datetime] = None,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """Una pasada de retención sobre todas las políticas (o ``tables``)."""
+    out: Dict[str, Any] = {}
+    for table in tables or list(POLICIES):
+        try:
+            out[table] = archive_table(db, table, now=now, dry_run=dry_run)
+            if not dry_run and is_postgres(db):
+                out[table]["partitions"] = maintain_partitions(db, table, now=now)
+        except Exception as exc:
+            logger.exception("[RETENTION] %s falló", table)
+            out[table] = {"table": table, "error": str(exc)[:200]}
+    return out
+
+
+# --- Lectura del archivo -------------------------------------------------------------
+
+
+def _segment_path(seg: DataArchiveSegment, scratch: Path) -> Path:
+    if seg.backend == "s3":
+        dest = scratch / Path(seg.location).name
+        cloud.get_object(seg.location, dest)
+        return dest
+    return _archive_root() / seg.location
+
+
+def _parse_ts(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return _naive_utc(value)
+    if not value:
+        return None
+    try:
+        return _naive_utc(datetime.fromisoformat(str(value)))
+    except ValueError:
+        return None
+
+
+def read_archive(
+    db: Session,
+    table: str,
+    *,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    match: Optional[Dict[str, Any]] = None,
+    limit: int = 500,
+) -> List[Dict[str, Any]]:
+    """
+    Filas archivadas de ``table`` en [start, end] cuyos campos coinciden con ``match``
+    (comparación como texto), en orden de archivado.
+    """
+    get_policy(table)
+    q = db.query(DataArchiveSegment).filter(DataArchiveSegment.table_name == table)
+    if start is not None:
+        q = q.filter(DataArchiveSegment.max_created_at >= start)
+    if end is not None:
+        q = q.filter(DataArchiveSegment.min_created_at <= end)
+    lo = _naive_utc(start) if start else None
+    hi = _naive_utc(end) if end else None
+    wanted = {k: str(v) for k, v in (match or {}).items()}
+    out: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="zeus_archive_") as scratch:
+        for seg in q.order_by(DataArchiveSegment.min_created_at.asc(), DataArchiveSegment.id.asc()):
+            try:
+                path = _segment_path(seg, Path(scratch))
+                rows = _read_file(path, seg.fmt)
+                for row in rows:
+                    ts = _parse_ts(row.get("created_at"))
+                    if (lo and (ts is None or ts < lo)) or (hi and (ts is None or ts > hi)):
+                        continue
+                    if any(str(row.get(k)) != v for k, v in wanted.items()):
+                        continue
+                    out.append(row)
+                    if len(out) >= limit:
+                        return out
+            except (OSError, ValueError, cloud.PerseoStorageError) as exc:
+                logger.warning("[RETENTION] segmento ilegible %s: %s", seg.location, exc)
+    return out
+
+
+def retention_status(db: Session, *, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Estado por tabla: días en caliente, filas pendientes de archivar y volumen archivado."""
+    archived = {
+        name: (int(n or 0), int(rows or 0), int(size or 0))
+        for name, n, rows, size in db.query(
+            DataArchiveSegment.table_name,
+            func.count(DataArchiveSegment.id),
+            func.sum(DataArchiveSegment.row_count),
+            func.sum(DataArchiveSegment.size_bytes),
+        ).group_by(DataArchiveSegment.table_name)
+    }
+    pg = is_postgres(db)
+    out = []
+    for table, policy in POLICIES.items():
+        segments, rows, size = archived.get(table, (0, 0, 0))
+        out.append(
+            {
+                "table": table,
+                "hot_days": policy.hot_days,
+                "cutoff": policy.cutoff(now).isoformat(),
+                "pending_rows": count_cold_rows(db, policy, now=now),
+                "archived_segments": segments,
+                "archived_rows": rows,
+                "archived_bytes": size,
+                "partitioned": bool(pg and is_partitioned(db, table)),
+            }
+        )
+    return out
+
+
+# --- Particionado nativo (Postgres) --------------------------------------------------
+
+
+def is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def is_partitioned(db: Session, table: str) -> bool:
+    relkind = db.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table}
+    ).scalar()
+    return relkind == "p"
+
+
+def _month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value: date) -> date:
+    return date(value.year + (value.month == 12), value.month % 12 + 1, 1)
+
+
+def _partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def partition_ddl(table: str, month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {_partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+    )
+
+
+def maintain_partitions(db: Session, table: str, *, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    En tablas ya particionadas: crea las particiones del mes actual y los siguientes
+    (RETENTION_PARTITION_MONTHS_AHEAD) y borra las particiones frías que quedaron vacías.
+    """
+    if not is_partitioned(db, table):
+        return {"partitioned": False}
+    now = now or datetime.now(timezone.utc)
+    month = _month_start(now)
+    created = []
+    for _ in range(max(0, settings.RETENTION_PARTITION_MONTHS_AHEAD) + 1):
+        db.execute(text(partition_ddl(table, month)))
+        created.append(_partition_name(table, month))
+        month = _next_month(month)
+    cutoff_month = _month_start(get_policy(table).cutoff(now))
+    dropped = []
+    children = db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:t)"
+        ),
+        {"t": table},
+    ).scalars()
+    prefix = f"{table}_p"
+    for name in list(children):
+        suffix = name[len(prefix):] if name.startswith(prefix) else ""
+        if len(suffix) != 6 or not suffix.isdigit():
+            continue
+        upper = _next_month(date(int(suffix[:4]), int(suffix[4:]), 1))
+        if upper > cutoff_month:
+            continue
+        if db.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() is None:
+            db.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    db.commit()
+    return {"partitioned": True, "ensured": created, "dropped": dropped}
+
+
+def partition_conversion_sql(db: Session, table: str, *, now: Optional[datetime] = None) -> List[str]:
+    """
+    Sentencias para convertir ``table`` en particionada por mes (created_at).
+    La tabla original queda como <table>_legacy con las filas frías; solo se copian las
+    calientes (archivar antes). Lo ejecuta scripts/run_retention.py --partition --apply.
+    """
+    policy = get_policy(table)
+    if not policy.partitionable:
+        raise ValueError(f"{table} tiene restricciones únicas o FK entrantes sin created_at: no se puede particionar")
+    model = policy.model
+    now = now or datetime.now(timezone.utc)
+    cutoff = policy.cutoff(now)
+    legacy = f"{table}_legacy"
+    stmts = [
+        f"ALTER TABLE {table} RENAME TO {legacy}",
+        f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING STORAGE) PARTITION BY RANGE (created_at)",
+        f"ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)",
+        f"CREATE TABLE IF NOT EXISTS {table}_pdefault PARTITION OF {table} DEFAULT",
+    ]
+    month = _month_start(cutoff)
+    end = _month_start(now)
+    for _ in range(max(0, settings.RETENTION_PARTITION_MONTHS_AHEAD)):
+        end = _next_month(end)
+    while month <= end:
+        stmts.append(partition_ddl(table, month))
+        month = _next_month(month)
+    # Los nombres de índice son globales en el esquema: sufijo _p para no chocar con los de _legacy
+    for index in model.__table__.indexes:
+        if not index.unique and not any(c.primary_key for c in index.columns):
+            cols = ", ".join(c.name for c in index.columns)
+            stmts.append(f"CREATE INDEX IF NOT EXISTS {index.name}_p ON {table} ({cols})")
+    stmts.append(f"INSERT INTO {table} SELECT * FROM {legacy} WHERE created_at >= '{cutoff.isoformat()}'")
+    sequence = db.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table}).scalar()
+    if sequence:
+        stmts.append(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+    return stmts
@@ -6,11 +6,12 @@ import asyncio
 import logging
 import os
 import smtplib
+import uuid
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from typing import Optional, Dict, Any, List
 
-import requests  # pyright: ignore[reportMissingImports, reportMissingModuleSource]
+from services import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -116,14 +117,17 @@ class EmailService:
             payload["html"] = content
         else:
             payload["text"] = content
-        resp = requests.post(
+        # Idempotency-Key: Resend descarta el duplicado si un reintento repite el envío
+        resp = http_client.post(
             "https://api.resend.com/emails",
             json=payload,
             headers={
                 "Authorization": f"Bearer {self.resend_api_key}",
                 "Content-Type": "application/json",
+                "Idempotency-Key": uuid.uuid4().hex,
             },
             timeout=30,
+            retry_non_idempotent=True,
         )
         if resp.status_code in (200, 201):
             data = resp.json() if resp.text else {}
@@ -100,7 +100,6 @@ def emit_payment_registered(
         logger.warning("emit_payment_registered blocked: %s", ev.human_message)
         return
 
-    _ = db
     payload: Dict[str, Any] = {
         "user_id": user_id,
         "company_id": company_id,
@@ -141,6 +140,10 @@ def emit_payment_registered(
     except Exception as e:
         logger.warning("event_payment_registered activity log failed: %s", e)
 
+    from services.zeus_scoring_engine_v1 import refresh_customer_score_safe
+
+    refresh_customer_score_safe(db, company_id=company_id, customer_id=customer_id)
+
 
 def emit_client_created(
     *,
@@ -429,6 +432,12 @@ def emit_time_control_event(
     if details:
         payload["details"] = details
     logger.info("event time_control %s", payload)
+    try:
+        from services.control_horario_bootstrap import invalidate_bootstrap_cache
+
+        invalidate_bootstrap_cache(company_id=company_id, user_id=user_id)
+    except Exception as e:
+        logger.warning("event_time_control bootstrap cache invalidate failed: %s", e)
     try:
         from services.activity_logger import ActivityLogger
 
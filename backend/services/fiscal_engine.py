@@ -5,7 +5,7 @@ Backend = única fuente de verdad; snapshot inmutable por línea.
 """
 from decimal import Decimal
 from typing import Any, Dict, List, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,6 +28,92 @@ def _decimal(val: Any) -> Decimal:
     return Decimal(str(float(val) if val is not None else 0))
 
 
+def sale_customer_id(customer_data: Any) -> Optional[int]:
+    """Id de cliente CRM declarado en customer_data (customer_id / crm_customer_id), o None."""
+    cd = customer_data if isinstance(customer_data, dict) else {}
+    for key in ("crm_customer_id", "customer_id"):
+        raw = cd.get(key)
+        if raw is None or isinstance(raw, bool):
+            continue
+        try:
+            value = int(raw)
+        except (TypeError, ValueError):
+            continue
+        if value > 0:
+            return value
+    return None
+
+
+def _resolve_sale_customer(db: Any, company_id: Optional[int], customer_id: Optional[int]) -> Optional[int]:
+    """Solo enlaza clientes existentes de la misma empresa (customer_data viene del cliente TPV)."""
+    if not customer_id:
+        return None
+    from app.models.customer import Customer
+
+    q = db.query(Customer.id).filter(Customer.id == customer_id)
+    if company_id is not None:
+        q = q.filter(Customer.company_id == company_id)
+    return customer_id if q.first() else None
+
+
+def backfill_sale_customer_ids(db: Any, batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Rellena tpv_sales.customer_id en ventas antiguas: primero desde crm_sale_links
+    (un UPDATE correlacionado) y después desde customer_data, por lotes de id.
+    Solo enlaza clientes existentes de la misma empresa. Idempotente.
+    """
+    from sqlalchemy import select, update
+
+    from app.models.crm_office import CrmSaleLink
+    from app.models.customer import Customer
+    from app.models.erp import TPVSale
+
+    linked = db.execute(
+        update(TPVSale)
+        .where(TPVSale.customer_id.is_(None))
+        .where(TPVSale.id.in_(select(CrmSaleLink.tpv_sale_id)))
+        .values(
+            customer_id=select(CrmSaleLink.customer_id)
+            .where(CrmSaleLink.tpv_sale_id == TPVSale.id)
+            .scalar_subquery()
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount or 0
+    db.commit()
+
+    from_json = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.query(TPVSale.id, TPVSale.company_id, TPVSale.customer_data)
+            .filter(TPVSale.id > last_id, TPVSale.customer_id.is_(None), TPVSale.customer_data.isnot(None))
+            .order_by(TPVSale.id.asc())
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        last_id = rows[-1].id
+        wanted = {r.id: sale_customer_id(r.customer_data) for r in rows}
+        candidates = {c for c in wanted.values() if c}
+        valid = set()
+        if candidates:
+            valid = {
+                (cid, company)
+                for cid, company in db.query(Customer.id, Customer.company_id).filter(Customer.id.in_(candidates))
+            }
+        updates = [
+            {"id": r.id, "customer_id": wanted[r.id]}
+            for r in rows
+            if wanted[r.id] and (wanted[r.id], r.company_id) in valid
+        ]
+        if updates:
+            db.bulk_update_mappings(TPVSale, updates)
+            db.commit()
+            from_json += len(updates)
+    return {"from_links": int(linked), "from_customer_data": from_json}
+
+
 def build_fiscal_items_from_cart(
     cart: List[Dict[str, Any]],
     apply_recargo: bool = False,
@@ -80,9 +166,11 @@ def persist_fiscal_sale(
     work_session_id: Optional[int] = None,
     customer_data: Optional[Dict[str, Any]] = None,
     auto_commit: bool = True,
+    customer_id: Optional[int] = None,
 ) -> int:
     """
     Persistir venta fiscal en tpv_sales y tpv_sale_items (snapshot inmutable).
+    ``customer_id`` (o el declarado en customer_data) se normaliza en tpv_sales.customer_id.
     Retorna tpv_sale.id. Lanza excepción si falla (sin éxito silencioso).
     """
     try:
@@ -91,8 +179,11 @@ def persist_fiscal_sale(
         tax_total = sum(_decimal(i["tax_amount"]) for i in fiscal_items)
         recargo_total = sum(_decimal(i.get("recargo_amount") or 0) for i in fiscal_items)
         total = subtotal + tax_total + recargo_total
+        # Explícito (no server_default): el rollup se imputa al mismo día que guarda la fila
+        sale_date = datetime.now(timezone.utc)
         sale = TPVSale(
             user_id=user_id,
+            sale_date=sale_date,
             company_id=company_id,
             ticket_id=ticket_id,
             document_type=document_type,
@@ -104,6 +195,7 @@ def persist_fiscal_sale(
             total=total,
             work_session_id=work_session_id,
             customer_data=customer_data,
+            customer_id=_resolve_sale_customer(db, company_id, customer_id or sale_customer_id(customer_data)),
         )
         db.add(sale)
         db.flush()
@@ -122,6 +214,18 @@ def persist_fiscal_sale(
                 consumption_type=row.get("consumption_type"),
             )
             db.add(line)
+        from services.sales_rollup_service import apply_sale
+
+        # Mismo commit que la venta: el rollup diario nunca diverge de tpv_sales.
+        apply_sale(
+            db,
+            user_id=user_id,
+            company_id=company_id,
+            payment_method=payment_method,
+            fiscal_items=fiscal_items,
+            customer_data=customer_data,
+            sale_date=sale_date,
+        )
         if auto_commit:
             db.commit()
         logger.info(f"Fiscal sale persisted: ticket_id={ticket_id} tpv_sale_id={sale.id}")
@@ -0,0 +1,448 @@
+"""
+Cliente HTTP compartido para integraciones salientes (Replicate, Meta Graph, SendGrid,
+Resend, OpenAI, Twilio, Stripe, descargas de imágenes...).
+
+- Una ``requests.Session`` por host (pool keep-alive): sin handshake TCP+TLS por llamada.
+  En async, un ``httpx.AsyncClient`` por event loop (httpx ya agrupa por host).
+- Timeouts (connect, read) por proveedor; nunca una llamada sin timeout.
+- Reintentos con backoff exponencial y jitter completo (respeta ``Retry-After``). Solo
+  métodos idempotentes, salvo 429 / fallo de conexión antes de enviar, para no duplicar
+  un POST (un cobro, un email, una predicción de Replicate).
+- Circuit breaker por proveedor: tras N fallos seguidos (errores de red / 5xx) se corta
+  durante HTTP_BREAKER_RESET_SEC y se deja pasar una sola petición de prueba. Los hosts
+  sin proveedor conocido tienen breaker propio (``external:<host>``): un CDN caído no
+  corta las descargas de los demás.
+- Las sesiones compartidas no guardan cookies (se comparten entre llamadores y
+  tenants); las cookies pasadas en la propia llamada sí se envían.
+- Latencias por proveedor (p50/p95/máx) en ``metrics_snapshot()`` → GET /debug.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from http import cookiejar
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+DEFAULT_PROVIDER = "external"
+
+# Host → proveedor (política + breaker + métricas). Hosts no listados: "external:<host>".
+HOST_PROVIDERS: Dict[str, str] = {
+    "api.replicate.com": "replicate",
+    "graph.facebook.com": "meta",
+    "api.sendgrid.com": "sendgrid",
+    "api.resend.com": "resend",
+    "api.openai.com": "openai",
+    "api.twilio.com": "twilio",
+    "api.stripe.com": "stripe",
+    "api.stability.ai": "stability",
+}
+
+# Tope de claves "external:<host>"; por encima, los hosts nuevos comparten "external".
+MAX_EXTERNAL_HOSTS = 256
+
+Timeout = Union[float, Tuple[float, float], None]
+
+
+class _RejectAllCookies(cookiejar.DefaultCookiePolicy):
+    """Política del jar de las sesiones compartidas: no guarda ni devuelve cookies."""
+
+    def set_ok(self, cookie, request) -> bool:
+        return False
+
+    def return_ok(self, cookie, request) -> bool:
+        return False
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Proveedor con el circuito abierto: la llamada no sale. Es un ConnectionError para los ``except`` existentes."""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f"circuit open for {provider} (retry in {retry_in:.0f}s)")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+@dataclass(frozen=True)
+class ProviderPolicy:
+    name: str
+    connect_timeout: float
+    read_timeout: float
+    retries: int
+    backoff_base: float = 0.3
+    backoff_max: float = 8.0
+
+
+# Ajustes por proveedor sobre los valores por defecto de settings
+_POLICY_OVERRIDES: Dict[str, Dict[str, Any]] = {
+    "replicate": {"read_timeout": 60.0},
+    "openai": {"read_timeout": 60.0},
+    "stripe": {"read_timeout": 80.0},
+}
+
+
+class CircuitBreaker:
+    """closed → open tras ``threshold`` fallos seguidos → half_open pasado ``reset_sec`` (una prueba)."""
+
+    def __init__(self, name: str, threshold: int, reset_sec: float):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.reset_sec = reset_sec
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == "closed":
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == "open" and elapsed >= self.reset_sec:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            raise CircuitOpenError(self.name, max(0.0, self.reset_sec - elapsed))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.state = "closed"
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Libera la prueba half_open sin contar fallo (error ajeno al proveedor)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.trips += 1
+                    logger.warning("[HTTP] circuito abierto para %s tras %d fallos", self.name, self.failures)
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures, "trips": self.trips}
+
+
+class _LatencyStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.samples: Deque[float] = deque(maxlen=512)
+        self._lock = threading.Lock()
+
+    def record(self, ms: float, ok: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+            self.samples.append(ms)
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            ordered = sorted(self.samples)
+            calls, errors, retries = self.calls, self.errors, self.retries
+
+        def _pct(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 1)
+
+        return {
+            "calls": calls,
+            "errors": errors,
+            "retries": retries,
+            "p50_ms": _pct(0.50),
+            "p95_ms": _pct(0.95),
+            "max_ms": round(ordered[-1], 1) if ordered else None,
+        }
+
+
+_lock = threading.Lock()
+_sessions: Dict[str, requests.Session] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_stats: Dict[str, _LatencyStats] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def provider_for_url(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    known = HOST_PROVIDERS.get(host)
+    if known:
+        return known
+    if not host:
+        return DEFAULT_PROVIDER
+    name = f"{DEFAULT_PROVIDER}:{host}"
+    with _lock:
+        if name in _breakers or len(_breakers) < MAX_EXTERNAL_HOSTS + len(HOST_PROVIDERS):
+            return name
+    return DEFAULT_PROVIDER
+
+
+def policy(provider: str) -> ProviderPolicy:
+    base = {
+        "connect_timeout": settings.HTTP_CONNECT_TIMEOUT_SEC,
+        "read_timeout": settings.HTTP_READ_TIMEOUT_SEC,
+        "retries": settings.HTTP_MAX_RETRIES,
+    }
+    base.update(_POLICY_OVERRIDES.get(provider, {}))
+    return ProviderPolicy(name=provider, **base)
+
+
+def _breaker(provider: str) -> CircuitBreaker:
+    with _lock:
+        br = _breakers.get(provider)
+        if br is None:
+            br = _breakers[provider] = CircuitBreaker(
+                provider, settings.HTTP_BREAKER_THRESHOLD, settings.HTTP_BREAKER_RESET_SEC
+            )
+        return br
+
+
+def _stat(provider: str) -> _LatencyStats:
+    with _lock:
+        st = _stats.get(provider)
+        if st is None:
+            st = _stats[provider] = _LatencyStats()
+        return st
+
+
+def session_for(url: str) -> requests.Session:
+    """Sesión keep-alive compartida para el host de ``url`` (también para SDKs como Stripe)."""
+    parts = urlsplit(url)
+    origin = f"{parts.scheme}://{parts.netloc}".lower()
+    with _lock:
+        sess = _sessions.get(origin)
+        if sess is None:
+            sess = requests.Session()
+            sess.cookies.set_policy(_RejectAllCookies())
+            # Reintentos los gestiona request(); el adapter solo agrupa conexiones
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.HTTP_POOL_MAXSIZE, max_retries=0)
+            sess.mount(f"{parts.scheme}://", adapter)
+            _sessions[origin] = sess
+        return sess
+
+
+def _backoff(attempt: int, pol: ProviderPolicy, retry_after: Optional[str] = None) -> float:
+    if retry_after:
+        try:
+            return min(pol.backoff_max, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    # Jitter completo: evita que todos los workers reintenten a la vez
+    return random.uniform(0, min(pol.backoff_max, pol.backoff_base * (2 ** attempt)))
+
+
+def _resolve_timeout(timeout: Timeout, pol: ProviderPolicy) -> Tuple[float, float]:
+    if timeout is None:
+        return (pol.connect_timeout, pol.read_timeout)
+    if isinstance(timeout, tuple):
+        return timeout
+    return (min(pol.connect_timeout, float(timeout)), float(timeout))
+
+
+def request(
+    method: str,
+    url: str,
+    *,
+    provider: Optional[str] = None,
+    timeout: Timeout = None,
+    retries: Optional[int] = None,
+    retry_non_idempotent: bool = False,
+    **kwargs: Any,
+) -> requests.Response:
+    """
+    Petición síncrona con pool, timeouts, reintentos y breaker. Devuelve la respuesta
+    aunque sea 4xx/5xx (como ``requests``); lanza ``requests.RequestException`` en fallos de red.
+    """
+    method = method.upper()
+    name = provider or provider_for_url(url)
+    pol = policy(name)
+    breaker, stats = _breaker(name), _stat(name)
+    attempts = 1 + max(0, pol.retries if retries is None else retries)
+    idempotent = retry_non_idempotent or method in IDEMPOTENT_METHODS
+    sess = session_for(url)
+    to = _resolve_timeout(timeout, pol)
+
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        breaker.before_call()
+        t0 = time.perf_counter()
+        try:
+            resp = sess.request(method, url, timeout=to, **kwargs)
+        except requests.RequestException as exc:
+            stats.record((time.perf_counter() - t0) * 1000, ok=False)
+            breaker.record_failure()
+            # ConnectTimeout: la petición no llegó a enviarse
+            if last or not (idempotent or isinstance(exc, requests.exceptions.ConnectTimeout)):
+                raise
+            stats.record_retry()
+            time.sleep(_backoff(attempt, pol))
+            continue
+        except BaseException:
+            # Cualquier otro error no debe dejar la prueba half_open ocupada para siempre
+            breaker.release_probe()
+            raise
+
+        ms = (time.perf_counter() - t0) * 1000
+        server_error = resp.status_code >= 500
+        stats.record(ms, ok=not server_error)
+        if server_error:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if ms > settings.HTTP_SLOW_CALL_MS:
+            logger.info("[HTTP] lenta %s %s %s %.0fms", name, method, resp.status_code, ms)
+        if (
+            not last
+            and resp.status_code in RETRY_STATUSES
+            and (idempotent or resp.status_code == 429)
+        ):
+            stats.record_retry()
+            delay = _backoff(attempt, pol, resp.headers.get("Retry-After"))
+            resp.close()
+            time.sleep(delay)
+            continue
+        return resp
+    raise RuntimeError("unreachable")  # pragma: no cover
+
+
+def get(url: str, **kwargs: Any) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs: Any) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def _async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_POOL_MAXSIZE * 4,
+                max_keepalive_connections=settings.HTTP_POOL_MAXSIZE,
+            ),
+            follow_redirects=True,
+        )
+        client.cookies.jar.set_policy(_RejectAllCookies())
+        _async_clients[loop] = client
+    return client
+
+
+async def async_request(
+    method: str,
+    url: str,
+    *,
+    provider: Optional[str] = None,
+    timeout: Timeout = None,
+    retries: Optional[int] = None,
+    retry_non_idempotent: bool = False,
+    **kwargs: Any,
+) -> httpx.Response:
+    """Equivalente async de ``request`` sobre ``httpx.AsyncClient``; lanza ``httpx.HTTPError``."""
+    method = method.upper()
+    name = provider or provider_for_url(url)
+    pol = policy(name)
+    breaker, stats = _breaker(name), _stat(name)
+    attempts = 1 + max(0, pol.retries if retries is None else retries)
+    idempotent = retry_non_idempotent or method in IDEMPOTENT_METHODS
+    connect, read = _resolve_timeout(timeout, pol)
+    to = httpx.Timeout(read, connect=connect)
+    client = _async_client()
+
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        breaker.before_call()
+        t0 = time.perf_counter()
+        try:
+            resp = await client.request(method, url, timeout=to, **kwargs)
+        except httpx.TransportError as exc:
+            stats.record((time.perf_counter() - t0) * 1000, ok=False)
+            breaker.record_failure()
+            # ConnectError / ConnectTimeout: no se llegó a enviar nada
+            if last or not (idempotent or isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout))):
+                raise
+            stats.record_retry()
+            await asyncio.sleep(_backoff(attempt, pol))
+            continue
+        except BaseException:
+            breaker.release_probe()
+            raise
+
+        ms = (time.perf_counter() - t0) * 1000
+        server_error = resp.status_code >= 500
+        stats.record(ms, ok=not server_error)
+        if server_error:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if (
+            not last
+            and resp.status_code in RETRY_STATUSES
+            and (idempotent or resp.status_code == 429)
+        ):
+            stats.record_retry()
+            await asyncio.sleep(_backoff(attempt, pol, resp.headers.get("Retry-After")))
+            continue
+        return resp
+    raise RuntimeError("unreachable")  # pragma: no cover
+
+
+async def aclose_async_clients() -> None:
+    """Cierra el AsyncClient del loop actual (shutdown de la app)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+def metrics_snapshot() -> Dict[str, Any]:
+    with _lock:
+        names = sorted(set(_stats) | set(_breakers))
+        pools = sorted(_sessions)
+    providers = {}
+    for name in names:
+        providers[name] = {**_stat(name).snapshot(), "circuit": _breaker(name).snapshot()}
+    return {"providers": providers, "pooled_hosts": pools}
+
+
+def reset_state() -> None:
+    """Olvida breakers y métricas (tests / reconfiguración)."""
+    with _lock:
+        _breakers.clear()
+        _stats.clear()
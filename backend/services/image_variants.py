@@ -0,0 +1,311 @@
+"""
+Variantes responsive de imágenes de producto TPV (thumb / grid / detail en WebP y JPEG).
+
+El original (hasta 2MB) no debe viajar a cada tablet: por cada imagen se generan
+variantes redimensionadas con PIL en un pool de hilos (PIL libera el GIL al
+redimensionar/codificar) y se cachean en disco bajo
+``uploads/variants/<sha[:2]>/<sha>_<ancho>.<ext>``: la clave es hash de contenido +
+tamaño, así la misma foto usada por varios productos o empresas se procesa una vez.
+Un manifiesto ``<sha>.json`` se escribe al final y marca la imagen como lista.
+
+La generación se lanza al subir la imagen o, de forma perezosa, la primera vez que
+``GET /tpv/products`` la ve; mientras tanto el producto sale sin ``image_variants`` y
+el cliente usa ``image``. Los renders fallidos y el hash de los ficheros sin sha en la
+URL se recuerdan en memoria para no repetirlos en cada listado. Las imágenes antiguas
+de ``uploads/products`` se rellenan con scripts/backfill_product_image_variants.py.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+VARIANT_SIZES: Tuple[Tuple[str, int], ...] = (("thumb", 160), ("grid", 400), ("detail", 1024))
+VARIANT_FORMATS: Tuple[Tuple[str, str, str], ...] = (
+    # (clave en payload, formato PIL, extensión)
+    ("webp", "WEBP", ".webp"),
+    ("jpeg", "JPEG", ".jpg"),
+)
+VARIANTS_PREFIX = "uploads/variants"
+_SOURCE_PREFIXES = ("uploads/products/", "uploads/cas/")
+_HASH_CHUNK = 1024 * 1024
+
+_lock = threading.Lock()
+_manifests: Dict[str, Dict[str, Any]] = {}
+_source_sha: Dict[Tuple[str, int, int], str] = {}
+_inflight: Dict[Any, concurrent.futures.Future] = {}
+# Renders fallidos (SVG, imagen corrupta) por sha y por (ruta, mtime, tamaño): no se reencolan
+_failed: Dict[Any, str] = {}
+_FAILED_MAX = 4096
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+
+def _pool() -> concurrent.futures.ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max(1, settings.IMAGE_VARIANT_WORKERS),
+                thread_name_prefix="zeus_img_variant",
+            )
+        return _executor
+
+
+def _variants_root() -> Path:
+    return Path(settings.STATIC_DIR) / VARIANTS_PREFIX
+
+
+def _manifest_path(sha256: str) -> Path:
+    return _variants_root() / sha256[:2] / f"{sha256}.json"
+
+
+def variant_key(sha256: str, width: int, ext: str) -> str:
+    return f"{VARIANTS_PREFIX}/{sha256[:2]}/{sha256}_{width}{ext}"
+
+
+def _public_url(key: str) -> str:
+    return f"{settings.STATIC_URL.rstrip('/')}/{key}"
+
+
+def resolve_source(url: Optional[str]) -> Optional[Path]:
+    """Fichero local detrás de una URL de imagen de producto (None si es externa o S3)."""
+    if not url:
+        return None
+    prefix = settings.STATIC_URL.rstrip("/") + "/"
+    path = url.split("?", 1)[0]
+    if not path.startswith(prefix):
+        return None
+    rel = path[len(prefix):]
+    if not rel.startswith(_SOURCE_PREFIXES):
+        return None
+    root = Path(settings.STATIC_DIR).resolve()
+    candidate = (root / rel).resolve()
+    if not any((root / p).resolve() in candidate.parents for p in _SOURCE_PREFIXES):
+        return None
+    return candidate
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stat_key(path: Path) -> Optional[Tuple[str, int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+def _save_atomic(img, dest: Path, fmt: str) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(dir=dest.parent, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if fmt == "JPEG":
+                img.save(out, fmt, quality=82, optimize=True, progressive=True)
+            else:
+                img.save(out, fmt, quality=80, method=4)
+        os.replace(name, dest)
+    except BaseException:
+        Path(name).unlink(missing_ok=True)
+        raise
+
+
+def _read_manifest(sha256: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_manifest_path(sha256), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def render_variants(source: Path, sha256: Optional[str] = None) -> Dict[str, Any]:
+    """Genera (o reutiliza) las variantes de ``source``. Devuelve el manifiesto."""
+    from PIL import Image, ImageOps
+
+    sha = sha256 or file_sha256(source)
+    manifest = _read_manifest(sha)
+    if manifest is not None:
+        return manifest
+
+    with Image.open(source) as opened:
+        img = ImageOps.exif_transpose(opened)
+        img.load()
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+    # JPEG no admite alfa: fondo blanco como la rejilla del TPV
+    if img.mode == "RGBA":
+        flat = Image.new("RGB", img.size, (255, 255, 255))
+        flat.paste(img, mask=img.getchannel("A"))
+    else:
+        flat = img
+
+    widths: Dict[str, int] = {}
+    rendered: Dict[int, None] = {}
+    for name, target in VARIANT_SIZES:
+        # Sin ampliar: una foto pequeña comparte fichero entre tamaños
+        width = min(target, img.width)
+        widths[name] = width
+        if width in rendered:
+            continue
+        height = max(1, round(img.height * width / img.width))
+        for fmt_name, pil_fmt, ext in VARIANT_FORMATS:
+            src = flat if pil_fmt == "JPEG" else img
+            resized = src if width == img.width else src.resize((width, height), Image.LANCZOS)
+            _save_atomic(resized, Path(settings.STATIC_DIR) / variant_key(sha, width, ext), pil_fmt)
+        rendered[width] = None
+
+    manifest = {"sha256": sha, "source": [img.width, img.height], "widths": widths}
+    dest = _manifest_path(sha)
+    fd, name = tempfile.mkstemp(dir=dest.parent, suffix=".part")
+    with os.fdopen(fd, "w", encoding="utf-8") as out:
+        json.dump(manifest, out)
+    os.replace(name, dest)
+    return manifest
+
+
+def _remember_failure(keys: Tuple[Any, ...], exc: BaseException) -> None:
+    with _lock:
+        if len(_failed) >= _FAILED_MAX:
+            _failed.clear()
+        for key in keys:
+            if key is not None:
+                _failed[key] = str(exc)[:200]
+
+
+def _job(source: Path, sha256: Optional[str], stat_key: Optional[Tuple[str, int, int]]) -> Dict[str, Any]:
+    sha = sha256
+    try:
+        if sha is None:
+            # Hash una vez por (ruta, mtime, tamaño), aunque el render falle después
+            sha = file_sha256(source)
+            if stat_key is not None:
+                with _lock:
+                    _source_sha[stat_key] = sha
+        manifest = render_variants(source, sha)
+    except Exception as exc:
+        _remember_failure((sha, stat_key), exc)
+        raise
+    with _lock:
+        _manifests[manifest["sha256"]] = manifest
+    return manifest
+
+
+def _sha_hint(url: str, source: Path) -> Tuple[Optional[str], Optional[Tuple[str, int, int]]]:
+    from services.upload_store import sha_from_url
+
+    sha = sha_from_url(url)
+    if sha:
+        return sha, None
+    key = _stat_key(source)
+    with _lock:
+        return (_source_sha.get(key) if key else None), key
+
+
+def schedule_variants(url: Optional[str]) -> Optional[concurrent.futures.Future]:
+    """Encola la generación para ``url`` (idempotente). None si no hay fuente local o ya está lista."""
+    source = resolve_source(url)
+    if source is None or not source.is_file():
+        return None
+    sha, stat_key = _sha_hint(url, source)
+    job_key = sha or stat_key or str(source)
+    pool = _pool()
+    with _lock:
+        if sha and sha in _manifests:
+            return None
+        if job_key in _failed or (stat_key is not None and stat_key in _failed):
+            return None
+        pending = _inflight.get(job_key)
+        if pending is not None:
+            return pending
+        future = pool.submit(_job, source, sha, stat_key)
+        _inflight[job_key] = future
+
+    def _done(f: concurrent.futures.Future) -> None:
+        with _lock:
+            _inflight.pop(job_key, None)
+        if f.exception() is not None:
+            logger.warning("variantes de imagen fallidas para %s: %s", source.name, f.exception())
+
+    future.add_done_callback(_done)
+    return future
+
+
+def _payload(manifest: Dict[str, Any]) -> Dict[str, Any]:
+    sha = manifest["sha256"]
+    sizes: Dict[str, Any] = {}
+    for name, _ in VARIANT_SIZES:
+        width = manifest["widths"][name]
+        entry: Dict[str, Any] = {"width": width}
+        for fmt_name, _, ext in VARIANT_FORMATS:
+            entry[fmt_name] = _public_url(variant_key(sha, width, ext))
+        sizes[name] = entry
+    srcset = {}
+    for fmt_name, _, _ in VARIANT_FORMATS:
+        seen: Dict[int, str] = {}
+        for name, _ in VARIANT_SIZES:
+            seen.setdefault(sizes[name]["width"], sizes[name][fmt_name])
+        srcset[fmt_name] = ", ".join(f"{u} {w}w" for w, u in seen.items())
+    return {"sizes": sizes, "srcset": srcset["webp"], "srcset_jpeg": srcset["jpeg"]}
+
+
+def variants_for_url(url: Optional[str], *, schedule: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    ``image_variants`` para el payload de producto, o None si aún no existen.
+
+    Solo toca memoria y, la primera vez por imagen, el manifiesto en disco: nunca
+    lee ni decodifica la imagen en la petición (eso ocurre en el pool).
+    """
+    source = resolve_source(url)
+    if source is None:
+        return None
+    sha, _ = _sha_hint(url, source)
+    manifest = None
+    if sha:
+        with _lock:
+            if sha in _failed:
+                return None
+            manifest = _manifests.get(sha)
+        if manifest is None:
+            manifest = _read_manifest(sha)
+            if manifest is not None:
+                with _lock:
+                    _manifests[sha] = manifest
+    if manifest is None:
+        if schedule:
+            schedule_variants(url)
+        return None
+    return _payload(manifest)
+
+
+def purge_variants(sha256: str) -> int:
+    """Borra variantes y manifiesto de un blob (GC del almacén de subidas)."""
+    with _lock:
+        manifest = _manifests.pop(sha256, None)
+    manifest = manifest or _read_manifest(sha256)
+    removed = 0
+    if manifest:
+        for width in set(manifest.get("widths", {}).values()):
+            for _, _, ext in VARIANT_FORMATS:
+                path = Path(settings.STATIC_DIR) / variant_key(sha256, width, ext)
+                if path.exists():
+                    path.unlink()
+                    removed += 1
+    _manifest_path(sha256).unlink(missing_ok=True)
+    return removed
@@ -0,0 +1,263 @@
+"""
+Totales desnormalizados de facturas (subtotal, impuestos, total, cobrado, pendiente).
+
+Las columnas de ``invoices`` se mantienen dentro de la misma transacción que toca las
+líneas o los pagos:
+
+- ``before_insert/update`` de InvoiceItem calcula los importes de la línea salvo que el
+  llamador los fije (p. ej. el borrador de escaneo QR, redondeado a partir del bruto).
+- ``after_insert/update/delete`` de InvoiceItem y Payment (y el cambio de
+  ``discount_amount`` de Invoice) apuntan el id de la factura en ``session.info``.
+- ``after_flush_postexec`` recalcula esas facturas con un único UPDATE de subconsultas
+  correlacionadas y expira los atributos en memoria.
+
+Las escrituras masivas (``bulk_*``, ``update()`` Core) no disparan eventos: para eso están
+``check_invoice_totals`` y ``backfill_invoice_totals`` (scripts/backfill_invoice_totals.py).
+
+Los eventos se registran al importar ``app.models.erp`` (última línea del módulo), así que
+están activos en cualquier proceso que use los modelos, no solo en la API.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import and_, case, event, func, or_, select, update
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.models.erp import Invoice, InvoiceItem, Payment, PaymentStatus
+
+logger = logging.getLogger(__name__)
+
+TOTAL_COLUMNS = ("subtotal", "tax_amount", "total", "amount_paid", "amount_due")
+TOLERANCE = 0.005
+BATCH_SIZE = 500
+
+_PENDING_KEY = "zeus_invoice_totals_pending"
+
+
+def line_amounts(quantity: Any, unit_price: Any, tax_rate: Any, discount: Any) -> Dict[str, float]:
+    """Importes de una línea (mismas reglas que el total de la factura)."""
+    subtotal = float(quantity or 0) * float(unit_price or 0)
+    tax_amount = subtotal * float(tax_rate or 0) / 100.0
+    return {
+        "subtotal": subtotal,
+        "tax_amount": tax_amount,
+        "total": subtotal + tax_amount - float(discount or 0),
+    }
+
+
+def _computed_columns() -> Dict[str, Any]:
+    """Expresiones SQL de los totales, correlacionadas con ``invoices.id``.
+
+    subtotal e impuestos = Σ importes guardados de las líneas;
+    total = subtotal + impuestos − descuento de factura; cobrado = Σ pagos COMPLETED.
+    """
+    subtotal = (
+        select(func.coalesce(func.sum(InvoiceItem.subtotal), 0.0))
+        .where(InvoiceItem.invoice_id == Invoice.id)
+        .correlate(Invoice)
+        .scalar_subquery()
+    )
+    tax_amount = (
+        select(func.coalesce(func.sum(InvoiceItem.tax_amount), 0.0))
+        .where(InvoiceItem.invoice_id == Invoice.id)
+        .correlate(Invoice)
+        .scalar_subquery()
+    )
+    amount_paid = (
+        select(func.coalesce(func.sum(Payment.amount), 0.0))
+        .where(and_(Payment.invoice_id == Invoice.id, Payment.status == PaymentStatus.COMPLETED))
+        .correlate(Invoice)
+        .scalar_subquery()
+    )
+    total = subtotal + tax_amount - func.coalesce(Invoice.discount_amount, 0.0)
+    outstanding = total - amount_paid
+    return {
+        "subtotal": subtotal,
+        "tax_amount": tax_amount,
+        "total": total,
+        "amount_paid": amount_paid,
+        "amount_due": case((outstanding > 0, outstanding), else_=0.0),
+    }
+
+
+def _recompute(connection, invoice_ids: Iterable[int]) -> int:
+    ids = sorted({int(i) for i in invoice_ids if i is not None})
+    if not ids:
+        return 0
+    updated = 0
+    for start in range(0, len(ids), BATCH_SIZE):
+        chunk = ids[start : start + BATCH_SIZE]
+        stmt = update(Invoice).where(Invoice.id.in_(chunk)).values(**_computed_columns())
+        updated += connection.execute(stmt.execution_options(synchronize_session=False)).rowcount or 0
+    return updated
+
+
+def recompute_invoice_totals(db: Session, invoice_ids: Iterable[int]) -> int:
+    """Recalcula los totales de ``invoice_ids`` en la transacción de ``db`` (sin commit)."""
+    ids = {int(i) for i in invoice_ids if i is not None}
+    updated = _recompute(db.connection(), ids)
+    _expire_totals(db, ids)
+    return updated
+
+
+# --- Mantenimiento transaccional ----------------------------------------------------
+
+
+def _mark(target, *invoice_ids: Optional[int]) -> None:
+    session = object_session(target)
+    if session is None:
+        return
+    pending: Set[int] = session.info.setdefault(_PENDING_KEY, set())
+    pending.update(int(i) for i in invoice_ids if i is not None)
+
+
+def _previous_invoice_id(target) -> Optional[int]:
+    hist = sa_inspect(target).attrs["invoice_id"].history
+    return hist.deleted[0] if hist.deleted else None
+
+
+_LINE_AMOUNTS = ("subtotal", "tax_amount", "total")
+_LINE_INPUTS = ("quantity", "unit_price", "tax_rate", "discount")
+
+
+def _set_line_amounts(target: InvoiceItem) -> None:
+    for name, value in line_amounts(target.quantity, target.unit_price, target.tax_rate, target.discount).items():
+        setattr(target, name, value)
+
+
+def _on_item_insert(mapper, connection, target: InvoiceItem) -> None:
+    if all(getattr(target, name) is None for name in _LINE_AMOUNTS):
+        _set_line_amounts(target)
+
+
+def _on_item_update(mapper, connection, target: InvoiceItem) -> None:
+    attrs = sa_inspect(target).attrs
+    if any(attrs[name].history.has_changes() for name in _LINE_AMOUNTS):
+        return
+    if any(attrs[name].history.has_changes() for name in _LINE_INPUTS):
+        _set_line_amounts(target)
+
+
+def _on_child_change(mapper, connection, target) -> None:
+    _mark(target, target.invoice_id, _previous_invoice_id(target))
+
+
+def _on_invoice_update(mapper, connection, target: Invoice) -> None:
+    if sa_inspect(target).attrs["discount_amount"].history.has_changes():
+        _mark(target, target.id)
+
+
+def _expire_totals(session: Session, invoice_ids: Set[int]) -> None:
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, Invoice) and obj.id in invoice_ids:
+            session.expire(obj, list(TOTAL_COLUMNS))
+
+
+def _after_flush_postexec(session: Session, flush_context) -> None:
+    pending: Optional[Set[int]] = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    _recompute(session.connection(), pending)
+    _expire_totals(session, pending)
+
+
+def _after_soft_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+event.listen(InvoiceItem, "before_insert", _on_item_insert)
+event.listen(InvoiceItem, "before_update", _on_item_update)
+for _model in (InvoiceItem, Payment):
+    event.listen(_model, "after_insert", _on_child_change)
+    event.listen(_model, "after_update", _on_child_change)
+    event.listen(_model, "after_delete", _on_child_change)
+event.listen(Invoice, "after_update", _on_invoice_update)
+event.listen(Session, "after_flush_postexec", _after_flush_postexec)
+event.listen(Session, "after_soft_rollback", _after_soft_rollback)
+
+
+# --- Verificación y backfill --------------------------------------------------------
+
+
+def check_invoice_totals(
+    db: Session, *, fix: bool = False, limit: int = 100, tolerance: float = TOLERANCE
+) -> Dict[str, Any]:
+    """Facturas cuyas columnas guardadas no cuadran con líneas y pagos.
+
+    Recorre ``invoices`` por id en lotes (una consulta por lote). Con ``fix`` recalcula las
+    descuadradas y hace commit.
+    """
+    columns = [getattr(Invoice, name) for name in TOTAL_COLUMNS]
+    expected = [expr.label(f"expected_{name}") for name, expr in _computed_columns().items()]
+    checked = 0
+    mismatched: List[int] = []
+    sample: List[Dict[str, Any]] = []
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(Invoice.id, *columns, *expected).where(Invoice.id > last_id).order_by(Invoice.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        checked += len(rows)
+        for row in rows:
+            stored = {name: float(getattr(row, name) or 0) for name in TOTAL_COLUMNS}
+            wanted = {name: float(getattr(row, f"expected_{name}") or 0) for name in TOTAL_COLUMNS}
+            if all(abs(stored[name] - wanted[name]) <= tolerance for name in TOTAL_COLUMNS):
+                continue
+            mismatched.append(row.id)
+            if len(sample) < limit:
+                sample.append({"invoice_id": row.id, "stored": stored, "expected": wanted})
+    fixed = 0
+    if fix and mismatched:
+        fixed = recompute_invoice_totals(db, mismatched)
+        db.commit()
+    if mismatched:
+        logger.warning("[INVOICE_TOTALS] %s facturas descuadradas (fix=%s)", len(mismatched), fix)
+    return {"checked": checked, "mismatched": len(mismatched), "fixed": fixed, "sample": sample}
+
+
+def _recompute_lines(db: Session, invoice_ids: List[int]) -> int:
+    """Rellena las líneas sin importes (NULL o a 0 con precio); las fijadas no se tocan."""
+    line_subtotal = InvoiceItem.quantity * InvoiceItem.unit_price
+    line_tax = line_subtotal * InvoiceItem.tax_rate / 100.0
+    missing = or_(
+        InvoiceItem.subtotal.is_(None),
+        InvoiceItem.tax_amount.is_(None),
+        InvoiceItem.total.is_(None),
+        and_(InvoiceItem.subtotal == 0, InvoiceItem.total == 0, line_subtotal != 0),
+    )
+    stmt = (
+        update(InvoiceItem)
+        .where(InvoiceItem.invoice_id.in_(invoice_ids), missing)
+        .values(
+            subtotal=line_subtotal,
+            tax_amount=line_tax,
+            total=line_subtotal + line_tax - func.coalesce(InvoiceItem.discount, 0.0),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).rowcount or 0
+
+
+def backfill_invoice_totals(db: Session, *, batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """Recalcula líneas y totales de todas las facturas por lotes de id; commit por lote."""
+    lines = 0
+    updated = 0
+    last_id = 0
+    while True:
+        batch = db.execute(
+            select(Invoice.id).where(Invoice.id > last_id).order_by(Invoice.id).limit(max(1, batch_size))
+        ).scalars().all()
+        if not batch:
+            break
+        last_id = batch[-1]
+        lines += _recompute_lines(db, batch)
+        updated += recompute_invoice_totals(db, batch)
+        db.commit()
+    return {"invoices": updated, "lines": lines}
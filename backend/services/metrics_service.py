@@ -302,23 +302,31 @@ class MetricsService:
         hitl_rate = self.calculate_hitl_rate(organization_id, days)
         approval_rate = self.calculate_approval_rate(organization_id, days)
         
-        # Actividad por agente
+        # Actividad por agente: un GROUP BY en lugar de un COUNT por agente
+        decisions_by_agent = self.db.query(Decision.agent_name, func.count(Decision.id)).filter(
+            Decision.created_at >= start_date
+        )
+        if organization_id:
+            decisions_by_agent = decisions_by_agent.filter(Decision.organization_id == organization_id)
+        decision_counts = dict(decisions_by_agent.group_by(Decision.agent_name).all())
+        
+        # Actividades de agentes: mismos agregados SQL / rollup horario que /metrics
+        from services.activity_metrics_service import aggregate_activity
+        
+        activity = aggregate_activity(self.db, start=start_date, end=datetime.utcnow())
+        
         agent_stats = {}
         for agent_name in ["PERSEO", "RAFAEL", "ZEUS CORE", "THALOS", "JUSTICIA"]:
-            agent_decisions = self.db.query(func.count(Decision.id)).filter(
-                Decision.agent_name == agent_name,
-                Decision.created_at >= start_date
-            )
-            if organization_id:
-                agent_decisions = agent_decisions.filter(Decision.organization_id == organization_id)
-            
-            count = agent_decisions.scalar() or 0
+            count = int(decision_counts.get(agent_name) or 0)
             cost = cost_by_agent.get(agent_name, 0.0)
+            agent_activity = activity.by_agent.get(agent_name, {})
             
             agent_stats[agent_name] = {
                 "requests": count,
                 "cost": cost,
-                "avg_cost_per_request": cost / count if count > 0 else 0.0
+                "avg_cost_per_request": cost / count if count > 0 else 0.0,
+                "activities": agent_activity.get("total", 0),
+                "activities_failed": agent_activity.get("failed", 0),
             }
         
         return {
@@ -339,6 +347,11 @@ class MetricsService:
                 "hitl_rate": hitl_rate,
                 "approval_rate": approval_rate
             },
+            "activity": {
+                "total": activity.total,
+                "success_rate": activity.success_rate,
+                "avg_response_time": activity.avg_response_sec,
+            },
             "agents": agent_stats
         }
 
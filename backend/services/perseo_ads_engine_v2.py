@@ -6,11 +6,11 @@ import logging
 import os
 from typing import Any, Dict, List, Optional
 
-import requests
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
 from app.models.user import User
+from services import http_client
 from services.zeus_execution_controller_v1 import get_execution_status
 
 logger = logging.getLogger(__name__)
@@ -48,7 +48,7 @@ def create_meta_campaign(
         "special_ad_categories": "[]",
         "daily_budget": str(daily_budget_cents),
     }
-    r = requests.post(url, data=data, timeout=30)
+    r = http_client.post(url, data=data, timeout=30)
     body = r.json()
     if r.status_code >= 400 or "error" in body:
         raise HTTPException(
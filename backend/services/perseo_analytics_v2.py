@@ -6,11 +6,11 @@ import logging
 import os
 from typing import Any, Dict, Optional
 
-import requests
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
 from app.models.user import User
+from services import http_client
 from services.zeus_execution_controller_v1 import get_execution_status
 
 logger = logging.getLogger(__name__)
@@ -25,7 +25,7 @@ def fetch_meta_insights(*, campaign_id: Optional[str] = None) -> Dict[str, Any]:
     target = campaign_id or act
     fields = "impressions,clicks,ctr,spend,actions"
     url = f"https://graph.facebook.com/v21.0/{target}/insights"
-    r = requests.get(url, params={"access_token": token, "fields": fields}, timeout=30)
+    r = http_client.get(url, params={"access_token": token, "fields": fields}, timeout=30)
     body = r.json()
     if r.status_code >= 400:
         raise HTTPException(status_code=502, detail={"error": "meta_insights_failed", "response": body})
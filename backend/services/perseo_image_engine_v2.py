@@ -8,12 +8,12 @@ import uuid
 from pathlib import Path
 from typing import Any, Dict, Optional
 
-import requests
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.models.user import User
+from services import http_client
 from services.perseo_job_queue_v1 import enqueue_job, get_job, run_job_async, update_job
 from services.perseo_storage_v2 import require_cloud_storage, upload_file
 from services.zeus_execution_controller_v1 import get_execution_status
@@ -35,18 +35,18 @@ def _generate_replicate(prompt: str) -> bytes:
         "version": "39ed52f2a78e934b3ba6e2a89f5f1c245ec606edddb6454572f5a0885f138e2",
         "input": {"prompt": prompt, "width": 1024, "height": 1024},
     }
-    r = requests.post("https://api.replicate.com/v1/predictions", json=body, headers=headers, timeout=30)
+    r = http_client.post("https://api.replicate.com/v1/predictions", json=body, headers=headers, timeout=30)
     r.raise_for_status()
     pred = r.json()
     poll_url = pred.get("urls", {}).get("get") or f"https://api.replicate.com/v1/predictions/{pred['id']}"
     for _ in range(60):
-        pr = requests.get(poll_url, headers=headers, timeout=30)
+        pr = http_client.get(poll_url, headers=headers, timeout=30)
         pr.raise_for_status()
         data = pr.json()
         if data.get("status") == "succeeded":
             out = data.get("output")
             img_url = out[0] if isinstance(out, list) else out
-            ir = requests.get(img_url, timeout=60)
+            ir = http_client.get(img_url, timeout=60)
             ir.raise_for_status()
             return ir.content
         if data.get("status") in ("failed", "canceled"):
@@ -57,7 +57,7 @@ def _generate_replicate(prompt: str) -> bytes:
 
 def _generate_stability(prompt: str) -> bytes:
     key = settings.STABILITY_API_KEY
-    r = requests.post(
+    r = http_client.post(
         "https://api.stability.ai/v2beta/stable-image/generate/sd3",
         headers={"Authorization": f"Bearer {key}", "Accept": "image/*"},
         files={"none": ""},
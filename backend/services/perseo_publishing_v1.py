@@ -6,11 +6,11 @@ import logging
 import os
 from typing import Any, Dict, Optional
 
-import requests
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
 from app.models.user import User
+from services import http_client
 from services.zeus_execution_controller_v1 import get_execution_status
 
 logger = logging.getLogger(__name__)
@@ -26,7 +26,7 @@ def publish_instagram_reel(*, video_url: str, caption: str) -> Dict[str, Any]:
     if not token or not ig_user:
         raise HTTPException(status_code=503, detail={"error": "instagram_not_configured"})
     base = f"https://graph.facebook.com/v21.0/{ig_user}"
-    create = requests.post(
+    create = http_client.post(
         f"{base}/media",
         data={"media_type": "REELS", "video_url": video_url, "caption": caption, "access_token": token},
         timeout=60,
@@ -35,7 +35,7 @@ def publish_instagram_reel(*, video_url: str, caption: str) -> Dict[str, Any]:
     if create.status_code >= 400:
         raise HTTPException(status_code=502, detail={"error": "instagram_create_failed", "response": body})
     creation_id = body.get("id")
-    pub = requests.post(
+    pub = http_client.post(
         f"{base}/media_publish",
         data={"creation_id": creation_id, "access_token": token},
         timeout=60,
@@ -0,0 +1,213 @@
+"""
+Caché de renders PERSEO (motores FFmpeg v3 / v4).
+
+Marketing itera sobre la misma plantilla: misma imagen, mismo guion, misma marca.
+La clave es sha256 de (bytes de la imagen, motor + versión, tenant, guion, branding,
+parámetros de render); en un acierto se devuelve el asset ya almacenado sin lanzar
+FFmpeg ni volver a subirlo. Cada entrada es un JSON en
+``STATIC_DIR/uploads/render_cache/<k[:2]>/<k>.json`` (mismo volumen que los vídeos
+locales); si un fichero local referenciado ha desaparecido la entrada se ignora.
+
+Las imágenes remotas se guardan junto a su ETag / Last-Modified y se revalidan con
+GET condicional: un 304 evita descargar de nuevo la imagen en cada iteración.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+from app.core.config import settings
+from services import http_client
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "uploads/render_cache"
+_HASH_CHUNK = 1024 * 1024
+_IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+
+_locks_guard = threading.Lock()
+_key_locks: Dict[str, threading.Lock] = {}
+
+
+def cache_enabled() -> bool:
+    return bool(settings.PERSEO_RENDER_CACHE_ENABLED)
+
+
+def _entry_path(key: str) -> Path:
+    return Path(settings.STATIC_DIR) / CACHE_PREFIX / key[:2] / f"{key}.json"
+
+
+def _write_json_atomic(dest: Path, data: Dict[str, Any]) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(dir=dest.parent, suffix=".part")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            json.dump(data, out, ensure_ascii=False)
+        os.replace(name, dest)
+    except BaseException:
+        Path(name).unlink(missing_ok=True)
+        raise
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def render_key(
+    image_path: Path,
+    *,
+    engine: str,
+    version: str,
+    tenant_id: int,
+    script: Dict[str, Any],
+    branding: Dict[str, Any],
+    params: Dict[str, Any],
+) -> Optional[str]:
+    """Clave del render, o None (sin caché) si la caché está desactivada o la imagen no se puede leer."""
+    if not cache_enabled():
+        return None
+    try:
+        image_sha = _file_sha256(image_path)
+    except OSError:
+        return None
+    material = json.dumps(
+        {
+            "image": image_sha,
+            "engine": engine,
+            "version": version,
+            "tenant": tenant_id,
+            "script": script,
+            "branding": branding,
+            "params": params,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _local_asset(url: Optional[str]) -> Optional[Path]:
+    prefix = settings.STATIC_URL.rstrip("/") + "/"
+    if not url or not url.startswith(prefix):
+        return None
+    return Path(settings.STATIC_DIR) / url[len(prefix):]
+
+
+def lookup(key: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Asset almacenado para ``key`` (None si no hay, caducó o falta un fichero local)."""
+    if not key:
+        return None
+    try:
+        with open(_entry_path(key), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() > float(entry.get("expires_at") or 0):
+        return None
+    asset = entry.get("asset") or {}
+    for url in entry.get("urls") or []:
+        path = _local_asset(url)
+        if path is not None and not path.is_file():
+            return None
+    return asset
+
+
+def store(key: Optional[str], asset: Dict[str, Any]) -> None:
+    """Guarda ``asset`` (dict JSON con URLs ya persistidas) bajo ``key``."""
+    if not key:
+        return
+    urls = [v for k, v in asset.items() if k.endswith("url") and isinstance(v, str)]
+    ttl = settings.PERSEO_RENDER_CACHE_TTL_SEC
+    if any(asset.get(k) for k in ("signed_url", "preview_signed_url")):
+        # URL firmada de S3: no servirla más allá de su caducidad
+        ttl = min(ttl, max(0, settings.AWS_S3_SIGNED_URL_TTL_SEC - 300))
+    if ttl <= 0:
+        return
+    now = time.time()
+    try:
+        _write_json_atomic(
+            _entry_path(key),
+            {"key": key, "created_at": now, "expires_at": now + ttl, "urls": urls, "asset": asset},
+        )
+    except OSError as exc:
+        logger.warning("[PERSEO_RENDER_CACHE] no se pudo guardar %s: %s", key[:12], exc)
+
+
+@contextmanager
+def render_lock(key: Optional[str]) -> Iterator[None]:
+    """Serializa renders idénticos en el proceso: el segundo espera y acierta en caché."""
+    if not key:
+        yield
+        return
+    with _locks_guard:
+        lock = _key_locks.setdefault(key, threading.Lock())
+    with lock:
+        yield
+
+
+def _source_cache_dir() -> Path:
+    from services.perseo_video_engine_v3 import _temp_root
+
+    d = _temp_root() / "perseo_src_cache"
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def fetch_remote_image(url: str, *, timeout: float = 30) -> Path:
+    """Descarga ``url`` una vez y la revalida con If-None-Match / If-Modified-Since."""
+    url_key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    suffix = Path(urlparse(url).path).suffix.lower()
+    if suffix not in _IMAGE_SUFFIXES:
+        suffix = ".jpg"
+    base = _source_cache_dir()
+    body = base / f"{url_key}{suffix}"
+    meta_path = base / f"{url_key}.json"
+
+    headers: Dict[str, str] = {}
+    meta: Dict[str, Any] = {}
+    if body.is_file():
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            meta = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    resp = http_client.get(url, timeout=timeout, headers=headers)
+    if resp.status_code == 304 and body.is_file():
+        return body
+    resp.raise_for_status()
+    fd, name = tempfile.mkstemp(dir=base, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(resp.content)
+        os.replace(name, body)
+    except BaseException:
+        Path(name).unlink(missing_ok=True)
+        raise
+    validators = {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+    }
+    if any(validators.values()):
+        _write_json_atomic(meta_path, validators)
+    else:
+        meta_path.unlink(missing_ok=True)
+    return body
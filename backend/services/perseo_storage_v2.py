@@ -175,3 +175,39 @@ def store_local_fallback(local_path: Path, *, user_id: int, category: str) -> Di
     rel = local_path.relative_to(Path(settings.STATIC_DIR)) if str(local_path).startswith(str(settings.STATIC_DIR)) else local_path.name
     url = f"/static/{rel}".replace("\\", "/")
     return {"storage": "local", "url": url, "path": str(local_path)}
+
+
+def object_url(key: str) -> Dict[str, Any]:
+    """URL pública (AWS_S3_PUBLIC_URL_PREFIX) o firmada de un objeto S3."""
+    prefix = getattr(settings, "AWS_S3_PUBLIC_URL_PREFIX", "") or ""
+    if prefix:
+        return {"url": f"{prefix}/{key}", "signed_url": False}
+    url = _s3_client().generate_presigned_url(
+        "get_object",
+        Params={"Bucket": settings.AWS_S3_BUCKET, "Key": key},
+        ExpiresIn=int(getattr(settings, "AWS_S3_SIGNED_URL_TTL_SEC", 3600)),
+    )
+    return {"url": url, "signed_url": True}
+
+
+def put_object(local_path: Path, *, key: str, content_type: str) -> None:
+    """Sube un fichero local a S3 con clave exacta (almacén direccionado por contenido)."""
+    if not s3_configured():
+        raise PerseoStorageError("S3 no configurado (AWS_S3_BUCKET + credenciales)")
+    with open(local_path, "rb") as fh:
+        _s3_client().upload_fileobj(fh, settings.AWS_S3_BUCKET, key, ExtraArgs={"ContentType": content_type})
+    logger.info("[PERSEO_STORAGE] put_object key=%s", key)
+
+
+def get_object(key: str, dest: Path) -> None:
+    """Descarga un objeto S3 a ``dest`` (lector del archivo de retención)."""
+    if not s3_configured():
+        raise PerseoStorageError("S3 no configurado (AWS_S3_BUCKET + credenciales)")
+    with open(dest, "wb") as fh:
+        _s3_client().download_fileobj(settings.AWS_S3_BUCKET, key, fh)
+
+
+def delete_object(key: str) -> None:
+    if not s3_configured():
+        raise PerseoStorageError("S3 no configurado (AWS_S3_BUCKET + credenciales)")
+    _s3_client().delete_object(Bucket=settings.AWS_S3_BUCKET, Key=key)
@@ -16,9 +16,7 @@ import tempfile
 import uuid
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
-from urllib.parse import urlparse
 
-import requests
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
@@ -26,6 +24,9 @@ from app.core.config import settings
 from app.models.company import Company, UserCompany
 from app.models.user import User
 from services.crm_office_service import company_ids_for_user, log_activity
+from services.perseo_render_cache import fetch_remote_image, render_key, render_lock
+from services.perseo_render_cache import lookup as render_cache_lookup
+from services.perseo_render_cache import store as render_cache_store
 from services.perseo_storage_v2 import s3_configured, storage_backend, upload_file
 from services.perseo_video_engine_v1 import _ffmpeg_exe
 from services.zeus_execution_controller_v1 import get_execution_status
@@ -170,17 +171,11 @@ def _resolve_image_path(image_url: str, user_id: int) -> Path:
         raise HTTPException(status_code=422, detail="image_url required")
 
     if raw.startswith("http://") or raw.startswith("https://"):
+        # Copia cacheada y revalidada (304): iterar la misma plantilla no re-descarga
         try:
-            resp = requests.get(raw, timeout=30)
-            resp.raise_for_status()
+            return fetch_remote_image(raw, timeout=30)
         except Exception as exc:
             raise HTTPException(status_code=422, detail=f"No se pudo descargar imagen: {exc}") from exc
-        suffix = Path(urlparse(raw).path).suffix or ".jpg"
-        if suffix.lower() not in (".jpg", ".jpeg", ".png", ".webp", ".gif"):
-            suffix = ".jpg"
-        dest = _temp_root() / f"perseo_v3_{user_id}_{uuid.uuid4().hex[:8]}{suffix}"
-        dest.write_bytes(resp.content)
-        return dest
 
     if raw.startswith("/static/"):
         rel = raw[len("/static/") :]
@@ -296,7 +291,29 @@ def _build_drawtext_filter(
     return ",".join(parts)
 
 
-def _run_ffmpeg_pipeline(image_path: Path, vf: str, output_path: Path) -> None:
+def _run_ffmpeg_progress(cmd: List[str], timeout: float) -> Dict[str, str]:
+    """Ejecuta FFmpeg con ``-progress pipe:1`` y devuelve el último bloque de progreso."""
+    full = [cmd[0], "-nostats", "-progress", "pipe:1", *cmd[1:]]
+    proc = subprocess.run(full, capture_output=True, text=True, timeout=timeout, check=False)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr or "ffmpeg failure")
+    progress: Dict[str, str] = {}
+    for line in (proc.stdout or "").splitlines():
+        k, sep, v = line.partition("=")
+        if sep:
+            progress[k.strip()] = v.strip()
+    return progress
+
+
+def _progress_duration(progress: Dict[str, str], fps: int) -> float:
+    """Duración de la primera salida (``frame`` cuenta sus fotogramas) sin volver a decodificarla."""
+    try:
+        return round(int(progress.get("frame", "0")) / float(fps), 2)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _run_ffmpeg_pipeline(image_path: Path, vf: str, output_path: Path) -> float:
     ffmpeg = _ffmpeg_path()
     cmd = [
         ffmpeg,
@@ -329,11 +346,10 @@ def _run_ffmpeg_pipeline(image_path: Path, vf: str, output_path: Path) -> None:
         str(FPS),
         str(output_path),
     ]
-    proc = subprocess.run(cmd, capture_output=True, text=True, timeout=180, check=False)
-    if proc.returncode != 0:
-        raise RuntimeError(proc.stderr or "ffmpeg failure")
+    progress = _run_ffmpeg_progress(cmd, timeout=180)
     if not output_path.exists() or output_path.stat().st_size < 2048:
         raise RuntimeError("empty video output")
+    return _progress_duration(progress, FPS)
 
 
 def _persist_video(
@@ -483,13 +499,35 @@ def generate_perseo_video_v3(
 
     image_path = _resolve_image_path(image_url, user.id)
     work = _temp_root() / f"perseo_v3_job_{uuid.uuid4().hex[:10]}"
-    work.mkdir(parents=True, exist_ok=True)
     out_mp4 = work / "output.mp4"
+    cache_key = render_key(
+        image_path,
+        engine="perseo_video_engine_v3",
+        version=ENGINE_VERSION,
+        tenant_id=company_id,
+        script=script,
+        branding=brand,
+        params={
+            "duration": DURATION_SEC,
+            "resolution": RESOLUTION,
+            "fps": FPS,
+            "preset": getattr(settings, "PERSEO_FFMPEG_PRESET", "veryfast"),
+            "crf": getattr(settings, "PERSEO_VIDEO_CRF", 23),
+            "font": _font_file(),
+        },
+    )
 
     try:
-        vf = _build_drawtext_filter(work, script, brand)
-        _run_ffmpeg_pipeline(image_path, vf, out_mp4)
-        stored = _persist_video(out_mp4, user_id=user.id, company_id=company_id)
+        with render_lock(cache_key):
+            stored = render_cache_lookup(cache_key)
+            cache_hit = stored is not None
+            if not cache_hit:
+                work.mkdir(parents=True, exist_ok=True)
+                vf = _build_drawtext_filter(work, script, brand)
+                measured = _run_ffmpeg_pipeline(image_path, vf, out_mp4)
+                stored = _persist_video(out_mp4, user_id=user.id, company_id=company_id)
+                stored["measured_duration_sec"] = measured
+                render_cache_store(cache_key, stored)
         crm = _crm_integrate(
             db,
             user=user,
@@ -535,6 +573,8 @@ def generate_perseo_video_v3(
         "duration_sec": DURATION_SEC,
         "resolution": f"{RESOLUTION[0]}x{RESOLUTION[1]}",
         "storage": stored.get("storage", "local"),
+        "measured_duration_sec": stored.get("measured_duration_sec"),
+        "render_cache": {"hit": cache_hit, "key": cache_key},
         "copy_engine": copy_result,
         "crm": crm,
     }
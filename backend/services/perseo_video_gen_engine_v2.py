@@ -9,12 +9,12 @@ import uuid
 from pathlib import Path
 from typing import Any, Dict, Optional
 
-import requests
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.models.user import User
+from services import http_client
 from services.perseo_job_queue_v1 import enqueue_job, get_job, run_job_async, update_job
 from services.perseo_storage_v2 import require_cloud_storage, upload_file
 from services.zeus_execution_controller_v1 import get_execution_status
@@ -42,12 +42,12 @@ def _generate_zeroscope(prompt: str, duration_sec: float = 5.0) -> bytes:
         "version": ZEROscope_VERSION,
         "input": {"prompt": prompt, "num_frames": num_frames, "fps": DEFAULT_FPS},
     }
-    r = requests.post("https://api.replicate.com/v1/predictions", json=body, headers=headers, timeout=30)
+    r = http_client.post("https://api.replicate.com/v1/predictions", json=body, headers=headers, timeout=30)
     r.raise_for_status()
     pred = r.json()
     poll_url = pred.get("urls", {}).get("get") or f"https://api.replicate.com/v1/predictions/{pred['id']}"
     for _ in range(90):
-        pr = requests.get(poll_url, headers=headers, timeout=30)
+        pr = http_client.get(poll_url, headers=headers, timeout=30)
         pr.raise_for_status()
         data = pr.json()
         status = data.get("status")
@@ -56,7 +56,7 @@ def _generate_zeroscope(prompt: str, duration_sec: float = 5.0) -> bytes:
             video_url = out if isinstance(out, str) else (out[0] if isinstance(out, list) and out else None)
             if not video_url:
                 raise RuntimeError("replicate returned no video url")
-            vr = requests.get(video_url, timeout=120)
+            vr = http_client.get(video_url, timeout=120)
             vr.raise_for_status()
             return vr.content
         if status in ("failed", "canceled"):
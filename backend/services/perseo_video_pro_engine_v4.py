@@ -28,11 +28,16 @@ from services.perseo_video_engine_v3 import (
     _branding_for_tenant,
     _crm_integrate,
     _ffmpeg_path,
+    _progress_duration,
     _resolve_image_path,
+    _run_ffmpeg_progress,
     _temp_root,
     _word_count,
     resolve_tenant_company,
 )
+from services.perseo_render_cache import lookup as render_cache_lookup
+from services.perseo_render_cache import render_key, render_lock
+from services.perseo_render_cache import store as render_cache_store
 from services.perseo_video_engine_v1 import _video_duration
 from services.perseo_storage_v2 import upload_tenant_video
 from services.zeus_execution_controller_v1 import get_execution_status
@@ -47,6 +52,8 @@ ZOOMPAN_FRAMES = 450
 MAX_WORDS_PER_SCENE = 10
 DEFAULT_BRAND_COLOR = "0x004481"
 MIN_OUTPUT_BYTES = 4096
+PREVIEW_SECONDS = 4
+PREVIEW_FILTER = "fps=12,scale=270:-1:flags=lanczos,split[s0][s1];[s0]palettegen[p];[s1][p]paletteuse"
 
 
 def _ffmpeg_timeout_sec() -> float:
@@ -233,21 +240,36 @@ def _download_image_to_workdir(image_url: str, user_id: int, work_dir: Path) ->
     return dest
 
 
+def _with_preview_branch(filter_complex: str) -> str:
+    """Bifurca ``[out]`` con split: MP4 y GIF salen del mismo decodificado en una pasada."""
+    assert filter_complex.endswith("[out]")
+    return (
+        f"{filter_complex[: -len('[out]')]}[final];[final]split=2[out][pv];"
+        f"[pv]trim=duration={PREVIEW_SECONDS},setpts=PTS-STARTPTS,{PREVIEW_FILTER}[gif]"
+    )
+
+
 def _run_ffmpeg_production(
     input_path: Path,
     output_path: Path,
     filter_complex: str,
-) -> None:
+    gif_path: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """Una invocación FFmpeg: MP4 (+ GIF de preview si ``gif_path``) y duración desde el progreso."""
     ffmpeg = _ffmpeg_path()
+    graph = _with_preview_branch(filter_complex) if gif_path is not None else filter_complex
     cmd = [
         ffmpeg,
         "-y",
+        "-hide_banner",
+        "-loglevel",
+        "error",
         "-loop",
         "1",
         "-i",
         str(input_path),
         "-filter_complex",
-        filter_complex,
+        graph,
         "-map",
         "[out]",
         "-t",
@@ -262,21 +284,32 @@ def _run_ffmpeg_production(
         "+faststart",
         str(output_path),
     ]
-    timeout = _ffmpeg_timeout_sec()
-    proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, check=False)
-    if proc.returncode != 0:
-        raise RuntimeError(proc.stderr or "ffmpeg_error")
+    if gif_path is not None:
+        cmd += ["-map", "[gif]", str(gif_path)]
+    progress = _run_ffmpeg_progress(cmd, timeout=_ffmpeg_timeout_sec())
     if not output_path.exists() or output_path.stat().st_size < MIN_OUTPUT_BYTES:
         raise RuntimeError("empty_output")
+    gif_ok = gif_path is not None and gif_path.exists() and gif_path.stat().st_size > 500
+    return {
+        # ``frame`` es el contador de la primera salida (MP4)
+        "duration_sec": _progress_duration(progress, FPS),
+        "gif": gif_path if gif_ok else None,
+    }
 
 
-def _validate_output_video(output_path: Path, script: Dict[str, str]) -> Dict[str, bool]:
+def _validate_output_video(
+    output_path: Path,
+    script: Dict[str, str],
+    duration: Optional[float] = None,
+) -> Dict[str, bool]:
     if not output_path.exists():
         raise HTTPException(status_code=500, detail={"error": "empty_output"})
     if output_path.stat().st_size < MIN_OUTPUT_BYTES:
         raise HTTPException(status_code=500, detail={"error": "empty_output"})
 
-    duration = _video_duration(_ffmpeg_path(), output_path)
+    if not duration:
+        # Sin progreso de FFmpeg (binario antiguo): probar el MP4
+        duration = _video_duration(_ffmpeg_path(), output_path)
     if duration < 13.5 or duration > 16.5:
         raise HTTPException(
             status_code=500,
@@ -296,12 +329,13 @@ def _validate_output_video(output_path: Path, script: Dict[str, str]) -> Dict[st
 
 
 def _generate_gif_preview(video_path: Path, work_dir: Path) -> Optional[Path]:
+    """Respaldo: GIF desde el MP4 si la rama de preview de la pasada única no produjo salida."""
     ffmpeg = _ffmpeg_path()
     gif_path = work_dir / "preview.gif"
     cmd = [
         ffmpeg, "-y", "-hide_banner", "-loglevel", "error",
-        "-i", str(video_path), "-t", "4",
-        "-vf", "fps=12,scale=270:-1:flags=lanczos,split[s0][s1];[s0]palettegen[p];[s1][p]paletteuse",
+        "-i", str(video_path), "-t", str(PREVIEW_SECONDS),
+        "-vf", PREVIEW_FILTER,
         str(gif_path),
     ]
     proc = subprocess.run(cmd, capture_output=True, timeout=90, check=False)
@@ -384,22 +418,56 @@ def generate_perseo_video_pro_v4(
     try:
         _download_image_to_workdir(image_url, user.id, work)
         fc = _build_production_filter_complex(script, brand_color)
-        _run_ffmpeg_production(input_jpg, output_mp4, fc)
-        validation = _validate_output_video(output_mp4, script)
-
-        ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
-        stored = upload_tenant_video(
-            output_mp4,
+        cache_key = render_key(
+            input_jpg,
+            engine="perseo_video_pro_engine_v4",
+            version=ENGINE_VERSION,
             tenant_id=company_id,
-            user_id=user.id,
-            filename=f"{ts}.mp4",
+            script=script,
+            branding=brand,
+            params={
+                "filter_complex": fc,
+                "duration": DURATION_SEC,
+                "fps": FPS,
+                "preview_gif": bool(enable_preview_gif),
+            },
         )
-
-        preview_url: Optional[str] = None
-        if enable_preview_gif:
-            gif = _generate_gif_preview(output_mp4, work)
-            if gif:
-                preview_url = _persist_gif(gif, tenant_id=company_id)
+        with render_lock(cache_key):
+            cached = render_cache_lookup(cache_key)
+            cache_hit = cached is not None
+            if cache_hit:
+                stored = cached["video"]
+                preview_url = cached.get("preview_url")
+                validation = cached["validation"]
+            else:
+                gif_path = work / "preview.gif" if enable_preview_gif else None
+                run = _run_ffmpeg_production(input_jpg, output_mp4, fc, gif_path=gif_path)
+                validation = _validate_output_video(output_mp4, script, run.get("duration_sec"))
+
+                ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+                stored = upload_tenant_video(
+                    output_mp4,
+                    tenant_id=company_id,
+                    user_id=user.id,
+                    filename=f"{ts}.mp4",
+                )
+
+                preview_url = None
+                if enable_preview_gif:
+                    gif = run.get("gif") or _generate_gif_preview(output_mp4, work)
+                    if gif:
+                        preview_url = _persist_gif(gif, tenant_id=company_id)
+
+                render_cache_store(
+                    cache_key,
+                    {
+                        "video": stored,
+                        "video_url": stored.get("url"),
+                        "signed_url": stored.get("signed_url"),
+                        "preview_url": preview_url,
+                        "validation": validation,
+                    },
+                )
 
         crm = _crm_integrate(
             db,
@@ -456,6 +524,7 @@ def generate_perseo_video_pro_v4(
             "timeout_sec": _ffmpeg_timeout_sec(),
         },
         "validation": validation,
+        "render_cache": {"hit": cache_hit, "key": cache_key},
         "expected_result": {
             "video_generated": True,
             "animated": True,
@@ -0,0 +1,247 @@
+"""
+Rollups diarios de ventas (sales_daily_rollup).
+
+persist_fiscal_sale llama a ``apply_sale`` en la misma transacción que inserta la
+venta, así que el agregado nunca diverge de tpv_sales. Dashboards y resúmenes
+(analytics_service, orquestador, control horario) leen de aquí: coste O(días)
+en lugar de O(ventas).
+
+``rebuild_rollups`` reconstruye desde tpv_sales (backfill inicial o reparación):
+ver scripts/backfill_sales_rollups.py.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.sales_daily_rollup import SalesDailyRollup
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_TPV = "tpv"
+CHANNEL_CMR = "cmr"
+
+_KEY_COLUMNS = ("company_id", "user_id", "day", "channel", "payment_method", "vat_band")
+_MEASURES = ("sales_count", "lines_count", "base_amount", "tax_amount", "recargo_amount", "total_amount")
+
+
+def _dec(val: Any) -> Decimal:
+    if isinstance(val, Decimal):
+        return val
+    return Decimal(str(val if val is not None else 0))
+
+
+def sale_channel(customer_data: Any) -> str:
+    cd = customer_data if isinstance(customer_data, dict) else {}
+    return CHANNEL_CMR if cd.get("source") == "office_crm" else CHANNEL_TPV
+
+
+def vat_band(tax_rate: Any) -> str:
+    """0.21 → "21", 0.10 → "10", 0.04 → "4"."""
+    pct = (_dec(tax_rate) * 100).quantize(Decimal("0.01")).normalize()
+    return format(pct, "f")
+
+
+def sale_day(sale_date: Any) -> date:
+    """Día de imputación de una venta: fecha UTC de tpv_sales.sale_date (naive = UTC)."""
+    if isinstance(sale_date, datetime):
+        if sale_date.tzinfo is not None:
+            sale_date = sale_date.astimezone(timezone.utc)
+        return sale_date.date()
+    if isinstance(sale_date, date):
+        return sale_date
+    return datetime.now(timezone.utc).date()
+
+
+def _measured_items(items: List[Dict[str, Any]], header: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Venta sin líneas: imputar la cabecera al tramo "0" para no perder la venta ni su total."""
+    if items:
+        return items
+    header = header or {}
+    return [
+        {
+            "tax_rate_snapshot": 0,
+            "base_amount": header.get("base_amount"),
+            "tax_amount": header.get("tax_amount"),
+            "recargo_amount": header.get("recargo_amount"),
+            "header": True,
+        }
+    ]
+
+
+def _band_measures(items: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    bands: Dict[str, Dict[str, Any]] = {}
+    for it in items:
+        band = vat_band(it.get("tax_rate_snapshot"))
+        m = bands.setdefault(
+            band,
+            {"sales_count": 0, "lines_count": 0, "base_amount": Decimal("0"), "tax_amount": Decimal("0"),
+             "recargo_amount": Decimal("0"), "total_amount": Decimal("0")},
+        )
+        base = _dec(it.get("base_amount"))
+        tax = _dec(it.get("tax_amount"))
+        rec = _dec(it.get("recargo_amount"))
+        m["lines_count"] += 0 if it.get("header") else 1
+        m["base_amount"] += base
+        m["tax_amount"] += tax
+        m["recargo_amount"] += rec
+        m["total_amount"] += base + tax + rec
+    if bands:
+        primary = max(bands, key=lambda b: bands[b]["base_amount"])
+        bands[primary]["sales_count"] = 1
+    return bands
+
+
+def _upsert_increment(db: Session, key: Dict[str, Any], inc: Dict[str, Any]) -> None:
+    table = SalesDailyRollup.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(**key, **inc)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(_KEY_COLUMNS),
+            set_={
+                **{m: table.c[m] + stmt.excluded[m] for m in inc},
+                "updated_at": func.now(),
+            },
+        )
+        db.execute(stmt)
+        return
+    row = db.query(SalesDailyRollup).filter_by(**key).with_for_update().first()
+    if row is None:
+        db.add(SalesDailyRollup(**key, **inc))
+    else:
+        for m, v in inc.items():
+            setattr(row, m, (getattr(row, m) or 0) + v)
+    db.flush()
+
+
+def apply_sale(
+    db: Session,
+    *,
+    user_id: int,
+    company_id: Optional[int],
+    payment_method: str,
+    fiscal_items: List[Dict[str, Any]],
+    customer_data: Optional[Dict[str, Any]] = None,
+    sale_date: Optional[datetime] = None,
+) -> None:
+    """
+    Suma una venta recién insertada a sus filas de rollup (sin commit). ``sale_date`` es el
+    de la fila de tpv_sales: mismo día que usa rebuild_rollups.
+    """
+    day = sale_day(sale_date)
+    channel = sale_channel(customer_data)
+    for band, inc in _band_measures(_measured_items(fiscal_items)).items():
+        key = {
+            "company_id": int(company_id or 0),
+            "user_id": int(user_id),
+            "day": day,
+            "channel": channel,
+            "payment_method": (payment_method or "unknown")[:30],
+            "vat_band": band,
+        }
+        _upsert_increment(db, key, inc)
+
+
+def rebuild_rollups(
+    db: Session,
+    *,
+    company_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    batch_size: int = 1000,
+) -> Dict[str, int]:
+    """Reconstruye rollups desde tpv_sales (todas o filtradas). Hace commit."""
+    from app.models.fiscal import TPVSale
+
+    sq = db.query(TPVSale).options(selectinload(TPVSale.items))
+    dq = db.query(SalesDailyRollup)
+    if company_id is not None:
+        sq = sq.filter(TPVSale.company_id == company_id)
+        dq = dq.filter(SalesDailyRollup.company_id == company_id)
+    if user_id is not None:
+        sq = sq.filter(TPVSale.user_id == user_id)
+        dq = dq.filter(SalesDailyRollup.user_id == user_id)
+
+    acc: Dict[Tuple, Dict[str, Any]] = defaultdict(lambda: {m: 0 for m in _MEASURES})
+    sales = 0
+    for sale in sq.order_by(TPVSale.id.asc()).yield_per(batch_size):
+        sales += 1
+        day = sale_day(sale.sale_date)
+        items = [
+            {
+                "tax_rate_snapshot": it.tax_rate_snapshot,
+                "base_amount": it.base_amount,
+                "tax_amount": it.tax_amount,
+                "recargo_amount": it.recargo_amount,
+            }
+            for it in sale.items
+        ]
+        header = {"base_amount": sale.subtotal, "tax_amount": sale.tax_amount, "recargo_amount": sale.recargo_amount}
+        channel = sale_channel(sale.customer_data)
+        pm = (sale.payment_method or "unknown")[:30]
+        for band, inc in _band_measures(_measured_items(items, header)).items():
+            key = (int(sale.company_id or 0), int(sale.user_id), day, channel, pm, band)
+            bucket = acc[key]
+            for m in _MEASURES:
+                bucket[m] += inc[m]
+
+    dq.delete(synchronize_session=False)
+    for key, measures in acc.items():
+        db.add(SalesDailyRollup(**dict(zip(_KEY_COLUMNS, key)), **measures))
+    db.commit()
+    logger.info("sales rollups rebuilt: sales=%s rows=%s", sales, len(acc))
+    return {"sales": sales, "rollup_rows": len(acc)}
+
+
+def _scoped(q, *, company_id: Optional[int], user_id: Optional[int]):
+    if company_id is not None:
+        return q.filter(SalesDailyRollup.company_id == int(company_id))
+    if user_id is not None:
+        return q.filter(SalesDailyRollup.user_id == int(user_id))
+    return q
+
+
+def daily_channel_totals(
+    db: Session,
+    *,
+    since_day: date,
+    company_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+) -> List[Tuple[date, str, int, float]]:
+    """[(día, canal, nº ventas, total)] — una fila por día y canal."""
+    q = db.query(
+        SalesDailyRollup.day,
+        SalesDailyRollup.channel,
+        func.coalesce(func.sum(SalesDailyRollup.sales_count), 0),
+        func.coalesce(func.sum(SalesDailyRollup.total_amount), 0),
+    ).filter(SalesDailyRollup.day >= since_day)
+    q = _scoped(q, company_id=company_id, user_id=user_id)
+    rows = q.group_by(SalesDailyRollup.day, SalesDailyRollup.channel).order_by(SalesDailyRollup.day.asc()).all()
+    return [(d, ch, int(n or 0), float(t or 0)) for d, ch, n, t in rows]
+
+
+def period_totals(
+    db: Session,
+    *,
+    since_day: date,
+    company_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+) -> Tuple[int, float]:
+    """(nº ventas, total) desde since_day inclusive."""
+    q = db.query(
+        func.coalesce(func.sum(SalesDailyRollup.sales_count), 0),
+        func.coalesce(func.sum(SalesDailyRollup.total_amount), 0),
+    ).filter(SalesDailyRollup.day >= since_day)
+    n, total = _scoped(q, company_id=company_id, user_id=user_id).one()
+    return int(n or 0), float(total or 0)
@@ -388,13 +388,12 @@ def tpv_sales_window(db: Session, user: User, hours: float = 4.0) -> Dict[str, A
         .scalar()
     )
     total = float(q or 0)
+    # Línea base 7d desde sales_daily_rollup (la ventana de horas sigue en tpv_sales).
+    from services.sales_rollup_service import period_totals
+
     baseline_since = _utc_now() - timedelta(days=7)
     days = max(1, 7)
-    daily_avg = (
-        db.query(func.coalesce(func.sum(TPVSale.total), 0))
-        .filter(TPVSale.user_id == user.id, TPVSale.sale_date >= baseline_since)
-        .scalar()
-    )
+    _, daily_avg = period_totals(db, since_day=baseline_since.date(), user_id=user.id)
     avg = float(daily_avg or 0) / days
     window_equiv_daily = total * (24.0 / max(0.01, hours))
     high = float(settings.CONTROL_HORARIO_TPV_HIGH_RATIO)
@@ -12,6 +12,8 @@ except ImportError:
     STRIPE_AVAILABLE = False
     stripe = None
 
+from services import http_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -42,6 +44,10 @@ class StripeService:
             logger.warning("Stripe Service: Stripe library not installed (pip install stripe)")
         elif self.api_key:
             stripe.api_key = self.api_key
+            # Sesión keep-alive compartida con el resto de integraciones (reintentos: SDK de Stripe)
+            stripe.default_http_client = stripe.http_client.RequestsClient(
+                timeout=80, session=http_client.session_for("https://api.stripe.com")
+            )
             logger.info("Stripe Service: initialized successfully")
 
             if self.requested_mode not in ("auto", "live", "test"):
@@ -180,25 +180,34 @@ def detect_cashflow_anomaly(
     company_id: int,
     threshold_multiplier: float = 3.0,
 ) -> Dict[str, Any]:
-    """Detecta movimientos de cashflow anómalos vs media del periodo."""
+    """Detecta movimientos de cashflow anómalos vs media del periodo (momentos agregados)."""
+    from services.cashflow_ledger_service import period_moments
+
     since = datetime.now(timezone.utc) - timedelta(days=30)
+    moments = period_moments(db, company_id=company_id, since=since)
+    n = sum(m["count"] for m in moments.values())
+    if not n:
+        return {"company_id": company_id, "anomaly": False, "reason": "no_entries"}
+
+    total = sum(m["sum"] for m in moments.values())
+    if total <= 0:
+        return {"company_id": company_id, "anomaly": False, "reason": "no_positive_amounts"}
+
+    avg = total / n
+    variance = max(0.0, sum(m["sumsq"] for m in moments.values()) / n - avg * avg)
+    threshold = avg * threshold_multiplier
     rows: List[CashflowLedgerEntry] = (
         db.query(CashflowLedgerEntry)
         .filter(
             CashflowLedgerEntry.company_id == company_id,
             CashflowLedgerEntry.created_at >= since,
+            CashflowLedgerEntry.amount >= threshold,
+            CashflowLedgerEntry.amount > 100,
         )
+        .order_by(CashflowLedgerEntry.id.asc())
+        .limit(10)
         .all()
     )
-    if not rows:
-        return {"company_id": company_id, "anomaly": False, "reason": "no_entries"}
-
-    amounts = [float(r.amount or 0) for r in rows if float(r.amount or 0) > 0]
-    if not amounts:
-        return {"company_id": company_id, "anomaly": False, "reason": "no_positive_amounts"}
-
-    avg = sum(amounts) / len(amounts)
-    threshold = avg * threshold_multiplier
     suspicious = [
         {
             "id": r.id,
@@ -208,7 +217,6 @@ def detect_cashflow_anomaly(
             "created_at": r.created_at.isoformat() if r.created_at else None,
         }
         for r in rows
-        if float(r.amount or 0) >= threshold and float(r.amount or 0) > 100
     ]
 
     anomaly = len(suspicious) > 0
@@ -216,6 +224,7 @@ def detect_cashflow_anomaly(
         "company_id": company_id,
         "anomaly": anomaly,
         "average_amount": round(avg, 2),
+        "stddev_amount": round(variance ** 0.5, 2),
         "threshold": round(threshold, 2),
         "suspicious_entries": suspicious[:10],
     }
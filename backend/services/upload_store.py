@@ -0,0 +1,356 @@
+"""
+Almacén de subidas direccionado por contenido (workspaces, imágenes de producto TPV).
+
+La subida se copia por bloques a un temporal en un hilo (run_in_threadpool),
+calculando sha256 y cortando en cuanto supera el límite: memoria constante por
+subida y sin escrituras síncronas en el event loop. El objeto se guarda una sola vez
+bajo ``uploads/cas/<sha[:2]>/<sha><ext>`` (disco local en STATIC_DIR o S3 vía
+perseo_storage_v2) y cada uso queda como referencia en stored_blob_refs; la misma
+foto subida diez veces ocupa un objeto.
+
+La referencia de la subida (``tpv_product_upload``, ``workspace_upload:<cat>``) es
+provisional: se suelta cuando un dueño definitivo enlaza la URL (``link_url``) o,
+si nadie la enlaza, caduca pasado UPLOAD_GC_GRACE_SEC. ``collect_garbage`` borra los
+objetos que se quedan sin referencias (scripts/gc_upload_blobs.py).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.stored_blob import StoredBlob, StoredBlobRef
+from services import perseo_storage_v2 as cloud
+
+logger = logging.getLogger(__name__)
+
+CHUNK_BYTES = 1024 * 1024
+CAS_PREFIX = "uploads/cas"
+_SHA_IN_URL = re.compile(r"/uploads/cas/[0-9a-f]{2}/([0-9a-f]{64})")
+
+EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/svg+xml": ".svg",
+    "video/mp4": ".mp4",
+    "video/webm": ".webm",
+    "video/quicktime": ".mov",
+    "application/pdf": ".pdf",
+    "text/plain": ".txt",
+    "text/csv": ".csv",
+}
+UPLOAD_OWNER_TYPES = ("tpv_product_upload", "workspace_upload")
+
+
+def _backend() -> str:
+    return "s3" if settings.UPLOAD_STORE_BACKEND == "s3" and cloud.s3_configured() else "local"
+
+
+def _tmp_dir() -> Path:
+    # Mismo sistema de ficheros que el destino local: os.replace atómico.
+    d = Path(settings.STATIC_DIR) / "uploads" / ".tmp"
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def extension_for(content_type: Optional[str]) -> str:
+    """Extensión del objeto: tabla propia y, si no está, la de ``mimetypes``."""
+    mime = (content_type or "").split(";", 1)[0].strip().lower()
+    if not mime:
+        return ""
+    return EXTENSIONS.get(mime) or mimetypes.guess_extension(mime) or ""
+
+
+def object_key(sha256: str, content_type: Optional[str]) -> str:
+    return f"{CAS_PREFIX}/{sha256[:2]}/{sha256}{extension_for(content_type)}"
+
+
+def local_path(key: str) -> Path:
+    return Path(settings.STATIC_DIR) / key
+
+
+def blob_url(blob: StoredBlob) -> str:
+    if blob.backend == "s3":
+        return cloud.object_url(blob.object_key)["url"]
+    return f"{settings.STATIC_URL.rstrip('/')}/{blob.object_key}"
+
+
+def sha_from_url(url: Optional[str]) -> Optional[str]:
+    m = _SHA_IN_URL.search(url or "")
+    return m.group(1) if m else None
+
+
+def spool_to_temp(src: BinaryIO, max_bytes: int) -> Tuple[Path, str, int]:
+    """Copia ``src`` a un temporal por bloques. Devuelve (ruta, sha256, bytes). 413 al pasar ``max_bytes``."""
+    digest = hashlib.sha256()
+    size = 0
+    fd, name = tempfile.mkstemp(dir=_tmp_dir(), suffix=".part")
+    tmp = Path(name)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = src.read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"El archivo supera el límite de {max_bytes // (1024 * 1024)}MB",
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    if size == 0:
+        tmp.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail="Archivo vacío")
+    return tmp, digest.hexdigest(), size
+
+
+def _insert_ignore(db: Session, model, values: Dict[str, Any], conflict_cols) -> bool:
+    """INSERT ... ON CONFLICT DO NOTHING. True si insertó."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(model.__table__).values(**values).on_conflict_do_nothing(index_elements=list(conflict_cols))
+        return db.execute(stmt).rowcount == 1
+    exists = db.query(model).filter_by(**{c: values[c] for c in conflict_cols}).first()
+    if exists is not None:
+        return False
+    db.add(model(**values))
+    db.flush()
+    return True
+
+
+def add_ref(db: Session, sha256: str, *, owner_type: str, owner_id: Any, user_id: Optional[int] = None) -> bool:
+    """Registra un uso del blob (idempotente por dueño). Sin commit."""
+    inserted = _insert_ignore(
+        db,
+        StoredBlobRef,
+        {"sha256": sha256, "owner_type": owner_type, "owner_id": str(owner_id), "user_id": user_id},
+        ("sha256", "owner_type", "owner_id"),
+    )
+    if inserted:
+        db.query(StoredBlob).filter(StoredBlob.sha256 == sha256).update(
+            {StoredBlob.refcount: StoredBlob.refcount + 1}, synchronize_session=False
+        )
+    return inserted
+
+
+def release_ref(db: Session, sha256: str, *, owner_type: str, owner_id: Any) -> bool:
+    """Quita un uso del blob. El objeto se borra en collect_garbage. Sin commit."""
+    deleted = (
+        db.query(StoredBlobRef)
+        .filter(
+            StoredBlobRef.sha256 == sha256,
+            StoredBlobRef.owner_type == owner_type,
+            StoredBlobRef.owner_id == str(owner_id),
+        )
+        .delete(synchronize_session=False)
+    )
+    if deleted:
+        db.query(StoredBlob).filter(StoredBlob.sha256 == sha256).update(
+            {StoredBlob.refcount: StoredBlob.refcount - deleted}, synchronize_session=False
+        )
+    return bool(deleted)
+
+
+def _upload_ref_filter():
+    return or_(
+        *(
+            or_(StoredBlobRef.owner_type == t, StoredBlobRef.owner_type.like(f"{t}:%"))
+            for t in UPLOAD_OWNER_TYPES
+        )
+    )
+
+
+def _drop_refs(db: Session, refs) -> int:
+    """Borra las filas ``refs`` (id, sha256) y descuenta refcount por blob. Sin commit."""
+    by_sha: Dict[str, int] = {}
+    for _, sha in refs:
+        by_sha[sha] = by_sha.get(sha, 0) + 1
+    if not by_sha:
+        return 0
+    db.query(StoredBlobRef).filter(StoredBlobRef.id.in_([ref_id for ref_id, _ in refs])).delete(
+        synchronize_session=False
+    )
+    for sha, count in by_sha.items():
+        db.query(StoredBlob).filter(StoredBlob.sha256 == sha).update(
+            {StoredBlob.refcount: StoredBlob.refcount - count}, synchronize_session=False
+        )
+    return len(refs)
+
+
+def release_upload_refs(db: Session, sha256: str, *, user_id: Optional[int]) -> int:
+    """Suelta las referencias provisionales de subida de ``user_id`` sobre el blob. Sin commit."""
+    if user_id is None:
+        return 0
+    refs = (
+        db.query(StoredBlobRef.id, StoredBlobRef.sha256)
+        .filter(StoredBlobRef.sha256 == sha256, StoredBlobRef.user_id == user_id, _upload_ref_filter())
+        .all()
+    )
+    return _drop_refs(db, refs)
+
+
+def link_url(db: Session, url: Optional[str], *, owner_type: str, owner_id: Any, user_id: Optional[int] = None) -> bool:
+    """
+    add_ref si ``url`` apunta a un blob del almacén (URLs externas o legacy se ignoran).
+    El dueño definitivo sustituye a la referencia provisional de la subida del mismo usuario.
+    """
+    sha = sha_from_url(url)
+    if not sha or db.get(StoredBlob, sha) is None:
+        return False
+    inserted = add_ref(db, sha, owner_type=owner_type, owner_id=owner_id, user_id=user_id)
+    release_upload_refs(db, sha, user_id=user_id)
+    return inserted
+
+
+def unlink_url(db: Session, url: Optional[str], *, owner_type: str, owner_id: Any) -> bool:
+    sha = sha_from_url(url)
+    return release_ref(db, sha, owner_type=owner_type, owner_id=owner_id) if sha else False
+
+
+def _commit_upload(
+    db: Session,
+    tmp: Path,
+    sha256: str,
+    size: int,
+    content_type: Optional[str],
+    owner_type: str,
+    owner_id: Any,
+    user_id: Optional[int],
+) -> Tuple[StoredBlob, bool]:
+    backend = _backend()
+    key = object_key(sha256, content_type)
+    created = _insert_ignore(
+        db,
+        StoredBlob,
+        {
+            "sha256": sha256,
+            "size_bytes": size,
+            "content_type": content_type,
+            "backend": backend,
+            "object_key": key,
+            "refcount": 0,
+        },
+        ("sha256",),
+    )
+    blob = db.get(StoredBlob, sha256)
+    try:
+        if blob.backend == "s3":
+            if created:
+                cloud.put_object(tmp, key=blob.object_key, content_type=content_type or "application/octet-stream")
+        else:
+            final = local_path(blob.object_key)
+            if not final.exists():  # nuevo, o disco efímero perdido tras redeploy
+                final.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp, final)
+    finally:
+        tmp.unlink(missing_ok=True)
+    if not add_ref(db, sha256, owner_type=owner_type, owner_id=owner_id, user_id=user_id):
+        # Misma subida repetida: el periodo de gracia vuelve a empezar.
+        db.query(StoredBlobRef).filter(
+            StoredBlobRef.sha256 == sha256,
+            StoredBlobRef.owner_type == owner_type,
+            StoredBlobRef.owner_id == str(owner_id),
+        ).update({StoredBlobRef.created_at: func.now()}, synchronize_session=False)
+    db.commit()
+    db.refresh(blob)
+    return blob, not created
+
+
+async def store_upload(
+    db: Session,
+    upload: UploadFile,
+    *,
+    owner_type: str,
+    owner_id: Any,
+    user_id: Optional[int],
+    max_bytes: int,
+) -> Dict[str, Any]:
+    """Guarda ``upload`` (deduplicado por contenido) y devuelve url/sha256/tamaño para la respuesta."""
+    tmp, sha256, size = await run_in_threadpool(spool_to_temp, upload.file, max_bytes)
+    try:
+        blob, deduplicated = await run_in_threadpool(
+            _commit_upload, db, tmp, sha256, size, upload.content_type, owner_type, owner_id, user_id
+        )
+    except Exception:
+        tmp.unlink(missing_ok=True)
+        db.rollback()
+        raise
+    if deduplicated:
+        logger.info("upload dedupe sha256=%s owner=%s:%s", sha256[:12], owner_type, owner_id)
+    return {
+        "sha256": sha256,
+        "url": blob_url(blob),
+        "filename": Path(blob.object_key).name,
+        "content_type": upload.content_type,
+        "size_bytes": size,
+        "storage": blob.backend,
+        "deduplicated": deduplicated,
+    }
+
+
+def collect_garbage(db: Session, *, grace_sec: Optional[int] = None, limit: int = 500) -> Dict[str, int]:
+    """
+    Caduca las referencias de subida más antiguas que ``grace_sec`` que nadie enlazó y
+    borra objetos y filas de blobs sin referencias desde hace más de ``grace_sec``. Hace commit.
+    """
+    grace = settings.UPLOAD_GC_GRACE_SEC if grace_sec is None else grace_sec
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max(0, grace))
+    stale = (
+        db.query(StoredBlobRef.id, StoredBlobRef.sha256)
+        .filter(_upload_ref_filter(), StoredBlobRef.created_at <= cutoff)
+        .limit(limit)
+        .all()
+    )
+    # Al descontar, updated_at del blob se renueva: el objeto tiene su propia gracia desde ahora.
+    expired = _drop_refs(db, stale)
+    if expired:
+        db.commit()
+    orphans = (
+        db.query(StoredBlob)
+        .filter(StoredBlob.refcount <= 0, StoredBlob.updated_at <= cutoff)
+        .limit(limit)
+        .all()
+    )
+    deleted = failed = 0
+    for blob in orphans:
+        try:
+            if blob.backend == "s3":
+                cloud.delete_object(blob.object_key)
+            else:
+                local_path(blob.object_key).unlink(missing_ok=True)
+        except Exception as exc:
+            logger.warning("upload gc: no se pudo borrar %s: %s", blob.object_key, exc)
+            failed += 1
+            continue
+        if (blob.content_type or "").startswith("image/"):
+            from services.image_variants import purge_variants
+
+            purge_variants(blob.sha256)
+        db.delete(blob)
+        deleted += 1
+    db.commit()
+    return {"deleted": deleted, "failed": failed, "expired_refs": expired}
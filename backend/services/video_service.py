@@ -272,9 +272,9 @@ def _load_reference_image(raw: str) -> Optional[Image.Image]:
     s = raw.strip()
     if s.startswith("http://") or s.startswith("https://"):
         try:
-            import requests  # pyright: ignore[reportMissingModuleSource]
+            from services import http_client
 
-            r = requests.get(
+            r = http_client.get(
                 s,
                 timeout=25,
                 headers={"User-Agent": "ZEUS-IA-PerseoVideo/1.0"},
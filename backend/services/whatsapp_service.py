@@ -31,10 +31,45 @@ def _whatsapp_canonical(addr: str) -> str:
 
 try:
     from twilio.rest import Client  # type: ignore[reportMissingImports]
+    from twilio.http.http_client import TwilioHttpClient  # type: ignore[reportMissingImports]
+    from twilio.http.response import Response as TwilioResponse  # type: ignore[reportMissingImports]
     TWILIO_AVAILABLE = True
 except ImportError:
     TWILIO_AVAILABLE = False
     Client = None
+    TwilioHttpClient = object
+
+from services import http_client
+
+
+class _PooledTwilioHttpClient(TwilioHttpClient):
+    """Transporte Twilio sobre el cliente HTTP compartido (pool, timeouts, breaker)."""
+
+    def request(
+        self,
+        method,
+        url,
+        params=None,
+        data=None,
+        headers=None,
+        auth=None,
+        timeout=None,
+        allow_redirects=False,
+    ):
+        body_key = "json" if headers and headers.get("Content-Type") == "application/json" else "data"
+        resp = http_client.request(
+            method,
+            url,
+            provider="twilio",
+            timeout=timeout or self.timeout,
+            params=params,
+            headers=headers,
+            auth=auth,
+            allow_redirects=allow_redirects,
+            **{body_key: data},
+        )
+        self._test_only_last_response = TwilioResponse(int(resp.status_code), resp.text, resp.headers)
+        return self._test_only_last_response
 
 
 class WhatsAppService:
@@ -57,7 +92,9 @@ class WhatsAppService:
             logger.info("WhatsApp Service: TWILIO_WHATSAPP_ENABLED=false, sending disabled")
         elif self.account_sid and self.auth_token:
             try:
-                self.client = Client(self.account_sid, self.auth_token)
+                self.client = Client(
+                    self.account_sid, self.auth_token, http_client=_PooledTwilioHttpClient()
+                )
                 logger.info("WhatsApp Service: initialized successfully")
             except Exception as e:
                 logger.warning("WhatsApp Service init failed: %s", e)
@@ -6,9 +6,10 @@ from io import BytesIO
 from statistics import mean
 from typing import Any, Dict, List
 
-import requests  # pyright: ignore[reportMissingModuleSource]
 from PIL import Image  # pyright: ignore[reportMissingImports]
 
+from services import http_client
+
 
 def _hex_color(rgb: tuple[int, int, int]) -> str:
     return "#{:02x}{:02x}{:02x}".format(*rgb)
@@ -33,7 +34,7 @@ def analyze_perseo_image_heuristic(payload: Dict[str, Any]) -> Dict[str, Any]:
 
     if image_url:
         try:
-            response = requests.get(image_url, timeout=10)
+            response = http_client.get(image_url, timeout=10)
             response.raise_for_status()
             image = Image.open(BytesIO(response.content)).convert("RGB")
             width, height = image.size
@@ -1,18 +1,275 @@
 """
-Optimización de agenda comercial v1 — propone huecos según score.
+Optimización de agenda comercial v1 — huecos sin colisiones y agenda por lotes según score.
+
+Disponibilidad de la empresa en un rango [desde, hasta):
+
+- Ventanas de trabajo: turnos activos (EmployeeSchedule) de los usuarios de la empresa;
+  si no hay ninguno, AGENDA_DAY_START–AGENDA_DAY_END todos los días.
+- Ocupado: reuniones de leads (``meeting_at`` + AGENDA_MEETING_MINUTES), reservas no
+  canceladas (+ AGENDA_RESERVATION_MINUTES) y pausas de los turnos.
+
+Cada fuente se lee con una sola consulta por rango, sin importar cuántos leads se
+planifiquen; los intervalos ocupados se fusionan en ``AvailabilityIndex`` (listas
+ordenadas + bisect), de modo que buscar el siguiente hueco libre es O(log n) más los
+bloques que salta. Todas las horas son UTC.
 """
 
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.models.company import UserCompany
 from app.models.crm_lead import CrmLead
+from app.models.reservation import Reservation
+from app.models.time_tracking import EmployeeSchedule
 from app.models.user import User
 import services.crm_office_service as crm_svc
 
+Interval = Tuple[datetime, datetime]
+
+INACTIVE_RESERVATION_STATUSES = ("cancelled", "no_show")
+SLOTS_PER_DAY = 3
+SLOT_SPACING = timedelta(hours=2)
+PROPOSED_SLOTS = 6
+
+
+class AvailabilityIndex:
+    """Intervalos ocupados fusionados y ordenados (``starts``/``ends`` crecientes y disjuntos)."""
+
+    __slots__ = ("_starts", "_ends")
+
+    def __init__(self, busy: Iterable[Interval] = ()) -> None:
+        self._starts: List[datetime] = []
+        self._ends: List[datetime] = []
+        for start, end in sorted(busy):
+            if end <= start:
+                continue
+            if self._ends and start <= self._ends[-1]:
+                self._ends[-1] = max(self._ends[-1], end)
+            else:
+                self._starts.append(start)
+                self._ends.append(end)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def add(self, start: datetime, end: datetime) -> None:
+        """Marca [start, end) como ocupado, fusionando con los bloques que toca."""
+        if end <= start:
+            return
+        i = bisect_left(self._ends, start)
+        j = bisect_right(self._starts, end)
+        if i < j:
+            start = min(start, self._starts[i])
+            end = max(end, self._ends[j - 1])
+        self._starts[i:j] = [start]
+        self._ends[i:j] = [end]
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        i = bisect_right(self._ends, start)
+        return i < len(self._starts) and self._starts[i] < end
+
+    def next_free(
+        self, start: datetime, limit: datetime, duration: timedelta, step: timedelta
+    ) -> Optional[datetime]:
+        """Primer inicio >= ``start`` (alineado a ``step``) con [t, t+duration) libre y t+duration <= limit."""
+        t = _align(start, step)
+        i = bisect_right(self._ends, t)
+        while t + duration <= limit:
+            if i >= len(self._starts) or self._starts[i] >= t + duration:
+                return t
+            t = _align(max(t, self._ends[i]), step)
+            i += 1
+        return None
+
+
+def _align(moment: datetime, step: timedelta) -> datetime:
+    """Redondea hacia arriba al múltiplo de ``step`` contado desde medianoche."""
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    seconds = step.total_seconds()
+    if seconds <= 0:
+        return moment
+    offset = (moment - midnight).total_seconds()
+    steps = -(-offset // seconds)
+    return midnight + timedelta(seconds=steps * seconds)
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _parse_hhmm(value: Any) -> Optional[time]:
+    try:
+        parts = str(value or "").strip().split(":")
+        return time(int(parts[0]), int(parts[1]) if len(parts) > 1 else 0)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _at(day: date, moment: time) -> datetime:
+    return datetime.combine(day, moment, tzinfo=timezone.utc)
+
+
+def _days(start: datetime, end: datetime) -> List[date]:
+    first, last = start.date(), (end - timedelta(microseconds=1)).date()
+    return [first + timedelta(days=n) for n in range((last - first).days + 1)]
+
+
+def _merge(intervals: Iterable[Interval]) -> List[Interval]:
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        elif end > start:
+            merged.append((start, end))
+    return merged
+
+
+class CompanyAvailability:
+    """Ventanas de trabajo + índice de ocupación de una empresa en un rango."""
+
+    def __init__(self, windows: List[Interval], busy: AvailabilityIndex) -> None:
+        self.windows = windows
+        self.busy = busy
+        self._window_ends = [end for _, end in windows]
+
+    def free_slots(
+        self,
+        earliest: datetime,
+        duration: timedelta,
+        *,
+        limit: int,
+        per_day: int = SLOTS_PER_DAY,
+        spacing: timedelta = SLOT_SPACING,
+        step: Optional[timedelta] = None,
+    ) -> List[Interval]:
+        """Huecos libres desde ``earliest``, como mucho ``per_day`` por día y separados ``spacing``."""
+        step = step or timedelta(minutes=max(1, settings.AGENDA_SLOT_STEP_MINUTES))
+        out: List[Interval] = []
+        per_date: Dict[date, int] = {}
+        for w in range(bisect_right(self._window_ends, earliest), len(self.windows)):
+            w_start, w_end = self.windows[w]
+            t = max(w_start, earliest)
+            while len(out) < limit:
+                slot = self.busy.next_free(t, w_end, duration, step)
+                if slot is None:
+                    break
+                if per_date.get(slot.date(), 0) >= per_day:
+                    t = _at(slot.date() + timedelta(days=1), time(0))
+                    continue
+                out.append((slot, slot + duration))
+                per_date[slot.date()] = per_date.get(slot.date(), 0) + 1
+                t = slot + max(duration, spacing)
+            if len(out) >= limit:
+                break
+        return out
+
+    def first_free(self, earliest: datetime, duration: timedelta) -> Optional[Interval]:
+        slots = self.free_slots(earliest, duration, limit=1)
+        return slots[0] if slots else None
+
+
+def load_availability(
+    db: Session,
+    company_id: int,
+    *,
+    start: datetime,
+    end: datetime,
+    exclude_lead_ids: Sequence[int] = (),
+) -> CompanyAvailability:
+    """Turnos, reuniones y reservas de la empresa en [start, end): una consulta por fuente."""
+    start, end = _utc(start), _utc(end)
+    meeting = timedelta(minutes=max(1, settings.AGENDA_MEETING_MINUTES))
+    reservation = timedelta(minutes=max(1, settings.AGENDA_RESERVATION_MINUTES))
+    days = _days(start, end)
+    busy: List[Interval] = []
+
+    q = db.query(CrmLead.meeting_at).filter(
+        CrmLead.company_id == company_id,
+        CrmLead.meeting_at.isnot(None),
+        CrmLead.meeting_at >= start - meeting,
+        CrmLead.meeting_at < end,
+    )
+    if exclude_lead_ids:
+        q = q.filter(CrmLead.id.notin_(list(exclude_lead_ids)))
+    for (meeting_at,) in q:
+        at = _utc(meeting_at)
+        busy.append((at, at + meeting))
+
+    user_ids = [uid for (uid,) in db.query(UserCompany.user_id).filter(UserCompany.company_id == company_id)]
+    schedules: List[EmployeeSchedule] = []
+    if user_ids:
+        rows = db.query(Reservation.reservation_date, Reservation.reservation_time).filter(
+            Reservation.user_id.in_(user_ids),
+            Reservation.reservation_date >= days[0],
+            Reservation.reservation_date <= days[-1],
+            Reservation.status.notin_(INACTIVE_RESERVATION_STATUSES),
+        )
+        for day, hhmm in rows:
+            moment = _parse_hhmm(hhmm)
+            if moment is not None:
+                at = _at(day, moment)
+                busy.append((at, at + reservation))
+        schedules = (
+            db.query(EmployeeSchedule)
+            .filter(
+                EmployeeSchedule.user_id.in_(user_ids),
+                EmployeeSchedule.is_active.is_(True),
+                or_(EmployeeSchedule.valid_from.is_(None), EmployeeSchedule.valid_from < end),
+                or_(EmployeeSchedule.valid_until.is_(None), EmployeeSchedule.valid_until >= start),
+            )
+            .all()
+        )
+
+    windows: List[Interval] = []
+    if schedules:
+        by_weekday: Dict[int, List[EmployeeSchedule]] = {}
+        for sch in schedules:
+            by_weekday.setdefault(int(sch.day_of_week), []).append(sch)
+        for day in days:
+            for sch in by_weekday.get(day.weekday(), ()):
+                valid_from, valid_until = _utc(sch.valid_from), _utc(sch.valid_until)
+                begin, finish = _parse_hhmm(sch.start_time), _parse_hhmm(sch.end_time)
+                if begin is None or finish is None:
+                    continue
+                w_start, w_end = _at(day, begin), _at(day, finish)
+                if w_end <= w_start:
+                    w_end += timedelta(days=1)  # turno de noche
+                if (valid_from and w_end <= valid_from) or (valid_until and w_start > valid_until):
+                    continue
+                windows.append((w_start, w_end))
+                pause = _parse_hhmm(sch.break_start)
+                if pause is not None and sch.break_duration:
+                    p_start = _at(day, pause)
+                    busy.append((p_start, p_start + timedelta(minutes=int(sch.break_duration))))
+    else:
+        begin = _parse_hhmm(settings.AGENDA_DAY_START) or time(9)
+        finish = _parse_hhmm(settings.AGENDA_DAY_END) or time(19)
+        windows = [(_at(day, begin), _at(day, finish)) for day in days]
+
+    windows = [(max(s, start), min(e, end)) for s, e in _merge(windows) if e > start and s < end]
+    return CompanyAvailability(windows, AvailabilityIndex(busy))
+
+
+def _earliest_for(lead: CrmLead, now: datetime) -> datetime:
+    """Prioridad alta: desde mañana; el resto, desde pasado mañana."""
+    priority_boost = 0 if (lead.customer_priority or "low") == "high" else 1
+    day = (now + timedelta(days=1 + priority_boost)).date()
+    return max(now, _at(day, time(0)))
+
+
+def _horizon(now: datetime) -> Tuple[datetime, datetime]:
+    start = _at(now.date(), time(0))
+    return start, start + timedelta(days=max(3, settings.AGENDA_HORIZON_DAYS) + 2)
+
 
 def propose_meeting_slots(
     db: Session,
@@ -27,30 +284,93 @@ def propose_meeting_slots(
         raise ValueError("Lead no encontrado")
 
     now = datetime.now(timezone.utc)
-    priority_boost = 0 if (lead.customer_priority or "low") == "high" else 1
-    base = now + timedelta(days=1 + priority_boost)
-    slots: List[Dict[str, Any]] = []
-    for day_offset in range(5):
-        day = base + timedelta(days=day_offset)
-        for hour in (10, 12, 16):
-            start = day.replace(hour=hour, minute=0, second=0, microsecond=0)
-            end = start + timedelta(minutes=duration_minutes)
-            if lead.meeting_at and abs((lead.meeting_at - start).total_seconds()) < 3600:
-                continue
-            slots.append(
-                {
-                    "start": start.isoformat(),
-                    "end": end.isoformat(),
-                    "lead_id": lead.id,
-                    "lead_score": lead.lead_score,
-                    "priority": lead.customer_priority,
-                }
-            )
+    start, end = _horizon(now)
+    availability = load_availability(db, cid, start=start, end=end)
+    free = availability.free_slots(
+        _earliest_for(lead, now), timedelta(minutes=duration_minutes), limit=PROPOSED_SLOTS
+    )
+    slots = [
+        {
+            "start": slot_start.isoformat(),
+            "end": slot_end.isoformat(),
+            "lead_id": lead.id,
+            "lead_score": lead.lead_score,
+            "priority": lead.customer_priority,
+        }
+        for slot_start, slot_end in free
+    ]
 
     return {
         "lead_id": lead.id,
-        "proposed_slots": slots[:6],
-        "rules_applied": ["prioritize_high_score", "avoid_overlap", "business_hours"],
+        "proposed_slots": slots,
+        "rules_applied": [
+            "prioritize_high_score",
+            "avoid_overlap",
+            "business_hours",
+            "employee_shifts",
+            "reservations",
+        ],
+    }
+
+
+def schedule_leads_batch(
+    db: Session,
+    *,
+    user: User,
+    lead_ids: Optional[Sequence[int]] = None,
+    duration_minutes: int = 30,
+    apply: bool = False,
+) -> Dict[str, Any]:
+    """
+    Asigna a cada lead el primer hueco libre, en orden de ``lead_score`` descendente.
+
+    Solo considera leads abiertos sin reunión futura; ``lead_ids`` acota ese conjunto (los
+    cerrados o ya citados se ignoran y no se pisan). Cada asignación se marca
+    como ocupada antes de pasar al siguiente lead, así que el lote no se solapa consigo
+    mismo ni con la agenda existente. Con ``apply`` guarda ``meeting_at`` y hace commit.
+    """
+    cid = crm_svc.primary_company_id(db, user)
+    now = datetime.now(timezone.utc)
+    q = db.query(CrmLead).filter(
+        CrmLead.company_id == cid,
+        CrmLead.status == "open",
+        or_(CrmLead.meeting_at.is_(None), CrmLead.meeting_at < now),
+    )
+    if lead_ids is not None:
+        q = q.filter(CrmLead.id.in_(list(lead_ids)))
+    leads = q.order_by(CrmLead.lead_score.desc(), CrmLead.id.asc()).all()
+
+    start, end = _horizon(now)
+    availability = load_availability(db, cid, start=start, end=end, exclude_lead_ids=[lead.id for lead in leads])
+    duration = timedelta(minutes=duration_minutes)
+    scheduled: List[Dict[str, Any]] = []
+    unscheduled: List[int] = []
+    for lead in leads:
+        slot = availability.first_free(_earliest_for(lead, now), duration)
+        if slot is None:
+            unscheduled.append(lead.id)
+            continue
+        availability.busy.add(*slot)
+        scheduled.append(
+            {
+                "lead_id": lead.id,
+                "start": slot[0].isoformat(),
+                "end": slot[1].isoformat(),
+                "lead_score": lead.lead_score,
+                "priority": lead.customer_priority,
+            }
+        )
+        if apply:
+            lead.meeting_at = slot[0]
+            lead.next_best_action = "prepare_meeting"
+    if apply and scheduled:
+        db.commit()
+
+    return {
+        "scheduled": scheduled,
+        "unscheduled_lead_ids": unscheduled,
+        "applied": bool(apply),
+        "horizon_end": end.isoformat(),
     }
 
 
@@ -70,18 +390,9 @@ def schedule_meeting(
     if start.tzinfo is None:
         start = start.replace(tzinfo=timezone.utc)
 
-    overlap = (
-        db.query(CrmLead)
-        .filter(
-            CrmLead.company_id == cid,
-            CrmLead.id != lead.id,
-            CrmLead.meeting_at.isnot(None),
-            CrmLead.meeting_at >= start - timedelta(minutes=30),
-            CrmLead.meeting_at <= start + timedelta(minutes=30),
-        )
-        .first()
-    )
-    if overlap:
+    end = start + timedelta(minutes=max(1, settings.AGENDA_MEETING_MINUTES))
+    availability = load_availability(db, cid, start=start, end=end, exclude_lead_ids=[lead.id])
+    if availability.busy.overlaps(start, end):
         raise ValueError("Solapamiento detectado con otra reunión.")
 
     lead.meeting_at = start
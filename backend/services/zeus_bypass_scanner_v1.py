@@ -1,18 +1,32 @@
 """
 Escáner estático zeus_phase_2 — detecta bypass de mutaciones fuera del guard.
 
+Incremental: los resultados por fichero se cachean en JSON con clave
+(ruta, mtime, sha256); solo se reescanean los ficheros que cambiaron y, si son
+muchos, en un pool de procesos. La caché se invalida entera si cambia este módulo.
+Ruta de la caché: ZEUS_BYPASS_SCAN_CACHE (por defecto en el directorio temporal;
+en CI conviene apuntarla a un directorio cacheado entre ejecuciones).
+
 Uso: python -m services.zeus_bypass_scanner_v1
 """
 
 from __future__ import annotations
 
 import ast
+import concurrent.futures
+import hashlib
 import json
+import logging
+import multiprocessing
 import os
 import re
+import tempfile
+import time
 from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
 
 BACKEND_ROOT = Path(__file__).resolve().parent.parent
 
@@ -31,6 +45,20 @@ PATTERNS: List[tuple[str, re.Pattern[str]]] = [
     ("user_delete", re.compile(r"db\.delete\s*\(\s*user\b", re.I)),
 ]
 
+# Una sola pasada por línea: alternancia con un grupo con nombre por patrón. Solo en
+# las líneas que casan se evalúan los patrones sueltos (una línea puede dar varios).
+COMBINED_PATTERN = re.compile(
+    "|".join(f"(?P<{name}>{pat.pattern})" for name, pat in PATTERNS),
+    re.I,
+)
+
+# Directorios que nunca se recorren (antes se leían y se descartaban fichero a fichero)
+SKIP_DIRS = frozenset({"node_modules", ".venv", "venv", "__pycache__", "site-packages", "tests", ".git"})
+SKIP_REL_DIRS = ("alembic/versions",)
+
+# Por debajo de este número de ficheros cambiados no compensa arrancar procesos
+PARALLEL_MIN_FILES = 24
+
 ALLOWED_PATH_FRAGMENTS = frozenset(
     {
         "zeus_core_guard_v1.py",
@@ -71,6 +99,7 @@ class ScanReport:
     violations: List[Violation] = field(default_factory=list)
     summary: Dict[str, int] = field(default_factory=dict)
     coverage: Dict[str, Any] = field(default_factory=dict)
+    stats: Dict[str, Any] = field(default_factory=dict)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -78,6 +107,7 @@ class ScanReport:
             "violations": [asdict(v) for v in self.violations],
             "summary": self.summary,
             "coverage": self.coverage,
+            "stats": self.stats,
         }
 
 
@@ -134,27 +164,21 @@ def _classify(path: Path, pattern: str, line_text: str, scope: str) -> tuple[str
     return "legacy_safe", "Revisar manualmente"
 
 
-def scan_file(path: Path) -> List[Violation]:
-    if _is_allowed(path):
-        return []
-    if path.suffix != ".py":
-        return []
-
-    try:
-        text = path.read_text(encoding="utf-8", errors="replace")
-    except OSError:
-        return []
-
+def _scan_text(path: Path, text: str) -> List[Violation]:
     scope = _scope_for(path)
+    rel = str(path.relative_to(BACKEND_ROOT))
     hits: List[Violation] = []
     for i, line in enumerate(text.splitlines(), start=1):
+        m = COMBINED_PATTERN.search(line)
+        if m is None:
+            continue
         for pname, pat in PATTERNS:
-            if not pat.search(line):
+            if pname != m.lastgroup and not pat.search(line):
                 continue
             cat, rec = _classify(path, pname, line, scope)
             hits.append(
                 Violation(
-                    file=str(path.relative_to(BACKEND_ROOT)),
+                    file=rel,
                     line=i,
                     pattern=pname,
                     snippet=line.strip()[:200],
@@ -166,19 +190,198 @@ def scan_file(path: Path) -> List[Violation]:
     return hits
 
 
-def scan_codebase(root: Optional[Path] = None) -> ScanReport:
+def scan_file(path: Path) -> List[Violation]:
+    if _is_allowed(path):
+        return []
+    if path.suffix != ".py":
+        return []
+
+    try:
+        text = path.read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return []
+    return _scan_text(path, text)
+
+
+def _scan_endpoint_text(path: Path, text: str) -> Dict[str, Any]:
+    try:
+        tree = ast.parse(text)
+    except SyntaxError:
+        return {"total": 0, "unguarded": []}
+    total = 0
+    unguarded: List[Dict[str, Any]] = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef):
+            continue
+        if not any(
+            isinstance(d, ast.Attribute) and d.attr in ("get", "post", "put", "delete", "patch")
+            for d in ast.walk(node)
+        ):
+            continue
+        total += 1
+        body_src = ast.get_source_segment(text, node) or ""
+        has_db = "db.query" in body_src or "db.commit" in body_src
+        has_service = "services." in body_src or "_svc" in body_src or "Service" in body_src
+        if has_db and not has_service:
+            unguarded.append(
+                {
+                    "file": str(path.relative_to(BACKEND_ROOT)),
+                    "function": node.name,
+                    "line": node.lineno,
+                    "has_direct_db": has_db,
+                }
+            )
+    return {"total": total, "unguarded": unguarded}
+
+
+def _analyze(kind: str, path_str: str) -> Tuple[str, Any]:
+    """Trabajo de un fichero (también en procesos hijo): (sha256, resultado serializable)."""
+    path = Path(path_str)
+    try:
+        raw = path.read_bytes()
+    except OSError:
+        return "", [] if kind == "code" else {"total": 0, "unguarded": []}
+    sha = hashlib.sha256(raw).hexdigest()
+    text = raw.decode("utf-8", errors="replace")
+    if kind == "code":
+        return sha, [asdict(v) for v in _scan_text(path, text)]
+    return sha, _scan_endpoint_text(path, text)
+
+
+def _scanner_fingerprint() -> str:
+    try:
+        return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:16]
+    except OSError:
+        return "unknown"
+
+
+def _cache_path(root: Path) -> Path:
+    env = os.getenv("ZEUS_BYPASS_SCAN_CACHE")
+    if env:
+        return Path(env)
+    tag = hashlib.sha256(str(root).encode("utf-8")).hexdigest()[:12]
+    return Path(tempfile.gettempdir()) / f"zeus_bypass_scan_{tag}.json"
+
+
+class _ScanCache:
+    """Resultados por fichero: {kind: {ruta: {mtime_ns, size, sha256, result}}}."""
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self.fingerprint = _scanner_fingerprint()
+        self.entries: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.dirty = False
+        if path is None:
+            return
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        if data.get("fingerprint") == self.fingerprint:
+            self.entries = data.get("entries") or {}
+
+    def save(self) -> None:
+        if self.path is None or not self.dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, name = tempfile.mkstemp(dir=self.path.parent, suffix=".part")
+            with os.fdopen(fd, "w", encoding="utf-8") as out:
+                json.dump({"fingerprint": self.fingerprint, "entries": self.entries}, out)
+            os.replace(name, self.path)
+            self.dirty = False
+        except OSError as exc:
+            logger.warning("bypass scanner: no se pudo guardar la caché %s: %s", self.path, exc)
+
+    def resolve(self, kind: str, files: List[Path]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Resultados de ``files`` (por ruta) reescaneando solo los cambiados; devuelve (resultados, stats)."""
+        section = self.entries.setdefault(kind, {})
+        results: Dict[str, Any] = {}
+        pending: List[Tuple[str, Path, int, int]] = []
+        hits = 0
+        for fp in files:
+            key = str(fp)
+            try:
+                st = fp.stat()
+            except OSError:
+                continue
+            entry = section.get(key)
+            if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                results[key] = entry["result"]
+                hits += 1
+            else:
+                pending.append((key, fp, st.st_mtime_ns, st.st_size))
+
+        workers = 1
+        if pending:
+            computed, workers = _run_jobs(kind, [fp for _, fp, _, _ in pending])
+            for (key, _, mtime_ns, size), (sha, result) in zip(pending, computed):
+                entry = section.get(key)
+                if entry and entry["sha256"] == sha:
+                    # Solo cambió el mtime (checkout, touch): mismo contenido, mismo resultado
+                    hits += 1
+                    result = entry["result"]
+                section[key] = {"mtime_ns": mtime_ns, "size": size, "sha256": sha, "result": result}
+                results[key] = result
+            self.dirty = True
+        live = {str(fp) for fp in files}
+        for key in [k for k in section if k not in live]:
+            del section[key]
+            self.dirty = True
+
+        total = len(files)
+        stats = {
+            "files": total,
+            "cache_hits": hits,
+            "rescanned": total - hits,
+            "cache_hit_rate": round(hits / total, 3) if total else 1.0,
+            "workers": workers,
+        }
+        return results, stats
+
+
+def _run_jobs(kind: str, paths: List[Path]) -> Tuple[List[Tuple[str, Any]], int]:
+    args = [str(p) for p in paths]
+    workers = min(os.cpu_count() or 1, 8, max(1, len(args) // PARALLEL_MIN_FILES))
+    if workers > 1:
+        try:
+            # spawn: el escáner corre también dentro del servidor (hilos vivos, fork no es seguro)
+            ctx = multiprocessing.get_context("spawn")
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                chunk = max(1, len(args) // (workers * 4))
+                return list(pool.map(_analyze, [kind] * len(args), args, chunksize=chunk)), workers
+        except (OSError, RuntimeError, concurrent.futures.process.BrokenProcessPool) as exc:
+            logger.warning("bypass scanner: pool de procesos no disponible (%s), escaneo secuencial", exc)
+    return [_analyze(kind, a) for a in args], 1
+
+
+def _iter_py_files(root: Path) -> List[Path]:
+    files: List[Path] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel = os.path.relpath(dirpath, root)
+        dirnames[:] = [
+            d
+            for d in dirnames
+            if d not in SKIP_DIRS
+            and os.path.normpath(os.path.join(rel, d)).replace("\\", "/") not in SKIP_REL_DIRS
+        ]
+        files.extend(Path(dirpath) / f for f in filenames if f.endswith(".py"))
+    files.sort()
+    return files
+
+
+def scan_codebase(root: Optional[Path] = None, *, use_cache: bool = True) -> ScanReport:
     root = root or BACKEND_ROOT
+    t0 = time.perf_counter()
     report = ScanReport()
-    py_files = list(root.rglob("*.py"))
+    py_files = [fp for fp in _iter_py_files(root) if not _is_allowed(fp)]
     total_files = len(py_files)
 
+    cache = _ScanCache(_cache_path(root) if use_cache else None)
+    results, stats = cache.resolve("code", py_files)
+    cache.save()
     for fp in py_files:
-        if any(
-            p in fp.parts
-            for p in ("node_modules", ".venv", "venv", "__pycache__", "site-packages")
-        ):
-            continue
-        report.violations.extend(scan_file(fp))
+        report.violations.extend(Violation(**v) for v in results.get(str(fp), []))
 
     cats: Dict[str, int] = {}
     for v in report.violations:
@@ -212,57 +415,51 @@ def scan_codebase(root: Optional[Path] = None) -> ScanReport:
             1,
         ),
     }
+    report.stats = {**stats, "scan_time_ms": round((time.perf_counter() - t0) * 1000, 1)}
     return report
 
 
-def scan_endpoints(root: Optional[Path] = None) -> Dict[str, Any]:
+def scan_endpoints(root: Optional[Path] = None, *, use_cache: bool = True) -> Dict[str, Any]:
     """Detecta endpoints con db.commit/db.query directo."""
     root = root or (BACKEND_ROOT / "app" / "api" / "v1" / "endpoints")
+    t0 = time.perf_counter()
+    files = sorted(root.rglob("*.py"))
+    cache = _ScanCache(_cache_path(BACKEND_ROOT) if use_cache else None)
+    results, stats = cache.resolve("endpoints", files)
+    cache.save()
+
     unguarded: List[Dict[str, Any]] = []
     total = 0
-
-    for fp in root.rglob("*.py"):
-        text = fp.read_text(encoding="utf-8", errors="replace")
-        try:
-            tree = ast.parse(text)
-        except SyntaxError:
-            continue
-        for node in ast.walk(tree):
-            if not isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef):
-                continue
-            if not any(
-                isinstance(d, ast.Attribute) and d.attr in ("get", "post", "put", "delete", "patch")
-                for d in ast.walk(node)
-            ):
-                continue
-            total += 1
-            body_src = ast.get_source_segment(text, node) or ""
-            has_db = "db.query" in body_src or "db.commit" in body_src
-            has_service = "services." in body_src or "_svc" in body_src or "Service" in body_src
-            if has_db and not has_service:
-                unguarded.append(
-                    {
-                        "file": str(fp.relative_to(BACKEND_ROOT)),
-                        "function": node.name,
-                        "line": node.lineno,
-                        "has_direct_db": has_db,
-                    }
-                )
+    for fp in files:
+        res = results.get(str(fp)) or {"total": 0, "unguarded": []}
+        total += res["total"]
+        unguarded.extend(res["unguarded"])
 
     return {
         "endpoints_scanned": total,
         "unguarded_endpoints": unguarded,
         "unguarded_count": len(unguarded),
+        "stats": {**stats, "scan_time_ms": round((time.perf_counter() - t0) * 1000, 1)},
     }
 
 
 def run_full_audit() -> Dict[str, Any]:
+    t0 = time.perf_counter()
     code_report = scan_codebase()
     endpoint_report = scan_endpoints()
+    code_stats, ep_stats = code_report.stats, endpoint_report["stats"]
+    files = code_stats["files"] + ep_stats["files"]
+    hits = code_stats["cache_hits"] + ep_stats["cache_hits"]
     return {
         "code_scan": code_report.to_dict(),
         "endpoint_scan": endpoint_report,
         "runtime_guard": "zeus_runtime_guard_v1 (attach on startup when closure enabled)",
+        "scan_performance": {
+            "scan_time_ms": round((time.perf_counter() - t0) * 1000, 1),
+            "files": files,
+            "cache_hits": hits,
+            "cache_hit_rate": round(hits / files, 3) if files else 1.0,
+        },
     }
 
 
@@ -141,4 +141,7 @@ def on_client_updated(db: Session, user: User, customer: Customer) -> Dict[str,
             payload=risk,
         )
         out["payment_risk"] = risk_out
+    from services.zeus_scoring_engine_v1 import refresh_customer_score_safe
+
+    refresh_customer_score_safe(db, company_id=customer.company_id, customer_id=customer.id, commit=False)
     return out
@@ -203,6 +203,22 @@ def handle_perseo_client_created(db: Session, user: Optional[User], payload: Dic
     return handle_perseo_notification(db, "client_created", payload)
 
 
+def _invalidate_global_context(user: Optional[User], payload: Dict[str, Any]) -> bool:
+    """Clientes cambiados → descartar snapshot de contexto ZEUS de la empresa/usuario."""
+    try:
+        from services.zeus_global_context import invalidate_global_context
+
+        company_id = payload.get("company_id")
+        if company_id is not None:
+            invalidate_global_context(company_id=int(company_id))
+        if user is not None:
+            invalidate_global_context(user_id=user.id)
+        return True
+    except Exception as exc:
+        logger.warning("[EVENT_HANDLER] global context invalidate failed: %s", exc)
+        return False
+
+
 def dispatch_event_handlers(
     db: Session,
     user: Optional[User],
@@ -256,12 +272,16 @@ def dispatch_event_handlers(
             done.append("workspace.create_task")
 
     elif normalized == "client_created":
+        if _invalidate_global_context(user, payload):
+            done.append("zeus_core.context_invalidate")
         if handle_workspace_create_task(db, user, normalized, payload):
             done.append("workspace.create_task")
         if handle_perseo_client_created(db, user, payload):
             done.append("perseo.client_onboarding")
 
     elif normalized == "client_updated":
+        if _invalidate_global_context(user, payload):
+            done.append("zeus_core.context_invalidate")
         if handle_workspace_create_task(db, user, normalized, payload):
             done.append("workspace.create_task")
 
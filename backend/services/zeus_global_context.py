@@ -1,24 +1,73 @@
-"""Contexto operativo compartido por ZEUS Core y todos los handlers del orquestador."""
+"""Contexto operativo compartido por ZEUS Core y todos los handlers del orquestador.
+
+La parte estable (totales de clientes por COUNT y configuración de empresa) se
+cachea por (usuario, empresa) con TTL corto (ZEUS_GLOBAL_CONTEXT_TTL_SEC) y se
+invalida con los eventos client_created / client_updated del bus. La sesión de
+trabajo activa se consulta siempre (una lectura indexada).
+"""
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.models.employee_work_session import EmployeeWorkSession
 from app.models.user import User
 from services.company_module_config import get_company_config_for_user
 import services.crm_office_service as crm_svc
 
+_CACHE_MAX_ENTRIES = 1024
+_cache: "OrderedDict[Tuple[int, Optional[int]], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_get(key: Tuple[int, Optional[int]]) -> Optional[Dict[str, Any]]:
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is None:
+            return None
+        expires_at, value = hit
+        if expires_at <= time.monotonic():
+            _cache.pop(key, None)
+            return None
+        _cache.move_to_end(key)
+        return value
+
+
+def _cache_put(key: Tuple[int, Optional[int]], value: Dict[str, Any]) -> None:
+    ttl = float(settings.ZEUS_GLOBAL_CONTEXT_TTL_SEC or 0)
+    if ttl <= 0:
+        return
+    with _cache_lock:
+        _cache[key] = (time.monotonic() + ttl, value)
+        _cache.move_to_end(key)
+        while len(_cache) > _CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def invalidate_global_context(*, company_id: Optional[int] = None, user_id: Optional[int] = None) -> int:
+    """Descarta snapshots de la empresa y/o del usuario; sin argumentos vacía la caché."""
+    with _cache_lock:
+        if company_id is None and user_id is None:
+            n = len(_cache)
+            _cache.clear()
+            return n
+        stale = [
+            k for k in _cache
+            if (company_id is not None and k[1] == company_id) or (user_id is not None and k[0] == user_id)
+        ]
+        for k in stale:
+            _cache.pop(k, None)
+        return len(stale)
 
-def build_global_context(db: Session, user: User) -> Dict[str, Any]:
-    company_id = crm_svc.primary_company_id(db, user)
-    cfg = get_company_config_for_user(db, user)
-    customers = crm_svc.list_customers(db, user)
-    with_email = sum(1 for c in customers if c.email and str(c.email).strip())
 
-    active_session: Optional[Dict[str, Any]] = None
+def _active_session(db: Session, user: User) -> Optional[Dict[str, Any]]:
     ws = (
         db.query(EmployeeWorkSession)
         .filter(
@@ -28,29 +77,42 @@ def build_global_context(db: Session, user: User) -> Dict[str, Any]:
         .order_by(EmployeeWorkSession.id.desc())
         .first()
     )
-    if ws:
-        active_session = {
-            "id": ws.id,
-            "employee_code": ws.employee_code,
-            "status": ws.status,
-            "opened_at": ws.opened_at.isoformat() if ws.opened_at else None,
-            "company_id": ws.company_id,
-        }
-
+    if not ws:
+        return None
     return {
-        "company_id": company_id,
-        "user_id": user.id,
-        "active_customers": {
-            "total": len(customers),
-            "with_email": with_email,
-        },
-        "active_session": active_session,
-        "permissions": cfg.get("modules") or {},
-        "company_type": cfg.get("company_type"),
-        "company_name": cfg.get("company_name"),
+        "id": ws.id,
+        "employee_code": ws.employee_code,
+        "status": ws.status,
+        "opened_at": ws.opened_at.isoformat() if ws.opened_at else None,
+        "company_id": ws.company_id,
     }
 
 
+def build_global_context(db: Session, user: User) -> Dict[str, Any]:
+    company_id = crm_svc.primary_company_id(db, user)
+    key = (int(user.id), company_id)
+    snapshot = _cache_get(key)
+    if snapshot is None:
+        cfg = get_company_config_for_user(db, user)
+        customers = crm_svc.count_customers(db, user)
+        snapshot = {
+            "company_id": company_id,
+            "user_id": user.id,
+            "active_customers": {
+                "total": customers["total"],
+                "with_email": customers["with_email"],
+            },
+            "permissions": cfg.get("modules") or {},
+            "company_type": cfg.get("company_type"),
+            "company_name": cfg.get("company_name"),
+        }
+        _cache_put(key, snapshot)
+
+    out = copy.deepcopy(snapshot)
+    out["active_session"] = _active_session(db, user)
+    return out
+
+
 def enrich_chat_context(
     db: Session,
     user: User,
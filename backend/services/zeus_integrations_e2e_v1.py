@@ -8,10 +8,10 @@ import os
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
-import requests
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from services import http_client
 from services.email_service import email_service
 from services.stripe_service import stripe_service
 from services.whatsapp_service import whatsapp_service
@@ -154,7 +154,7 @@ def _probe_sendgrid_sync() -> Dict[str, Any]:
             error="not_configured",
         )
     try:
-        resp = requests.get(
+        resp = http_client.get(
             "https://api.sendgrid.com/v3/scopes",
             headers={"Authorization": f"Bearer {api_key}"},
             timeout=_PROBE_TIMEOUT,
@@ -200,7 +200,7 @@ def _probe_resend_sync() -> Dict[str, Any]:
     api_key = email_service.resend_api_key
     from_addr = email_service.resend_from
     try:
-        resp = requests.get(
+        resp = http_client.get(
             "https://api.resend.com/domains",
             headers={"Authorization": f"Bearer {api_key}"},
             timeout=_PROBE_TIMEOUT,
@@ -284,7 +284,7 @@ def _probe_openai_sync() -> Dict[str, Any]:
             error="not_configured",
         )
     try:
-        resp = requests.get(
+        resp = http_client.get(
             "https://api.openai.com/v1/models",
             headers={"Authorization": f"Bearer {api_key}"},
             timeout=_PROBE_TIMEOUT,
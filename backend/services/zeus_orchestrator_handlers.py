@@ -7,17 +7,16 @@ import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.models.agent_activity import AgentActivity
-from app.models.erp import TPVSale
 from app.models.user import User
 from app.schemas.zeus_action import ZeusAction
 from app.schemas.zeus_task import ZeusExecutionResult, ZeusExecutionStepResult, ZeusTaskObject
 from services.activity_logger import ActivityLogger
 from services.email_service import email_service
 import services.crm_office_service as crm_svc
+from services.sales_rollup_service import period_totals
 
 logger = logging.getLogger(__name__)
 
@@ -71,32 +70,31 @@ def log_central(
 
 
 def execute_list_customers(db: Session, user: User, action: ZeusAction) -> ZeusExecutionResult:
-    customers = crm_svc.list_customers(db, user)
-    with_email = sum(1 for c in customers if c.email)
-    with_phone = sum(1 for c in customers if c.phone)
+    counts = crm_svc.count_customers(db, user)
+    total, with_email, with_phone = counts["total"], counts["with_email"], counts["with_phone"]
     msg = (
-        f"Tienes {len(customers)} cliente(s) en CRM: "
+        f"Tienes {total} cliente(s) en CRM: "
         f"{with_email} con email, {with_phone} con teléfono."
     )
     log_central(
         user=user,
         action_type="crm_customers_summary",
         description="Consulta de clientes desde orquestador",
-        details={"total": len(customers), "company_id": action.company_id},
-        metrics={"total": len(customers), "with_email": with_email},
+        details={"total": total, "company_id": action.company_id},
+        metrics={"total": total, "with_email": with_email},
     )
     return ZeusExecutionResult(
         success=True,
         intent="list_customers_summary",
         message=msg,
         executed=True,
-        metrics={"total": len(customers), "with_email": with_email, "with_phone": with_phone},
+        metrics={"total": total, "with_email": with_email, "with_phone": with_phone},
         steps=[
             ZeusExecutionStepResult(
                 agent=AGENT_CRM,
                 step="list_customers",
                 success=True,
-                detail=str(len(customers)),
+                detail=str(total),
             ),
             ZeusExecutionStepResult(agent=AGENT_ACTIVITY, step="log", success=True, detail="ok"),
         ],
@@ -105,11 +103,9 @@ def execute_list_customers(db: Session, user: User, action: ZeusAction) -> ZeusE
 
 def preview_send_campaign(db: Session, user: User, action: ZeusAction) -> Dict[str, Any]:
     task = _action_to_task(action)
-    customers = crm_svc.list_customers(db, user)
-    with_email = [c for c in customers if c.email and str(c.email).strip()]
+    n = crm_svc.count_customers(db, user)["with_email"]
     discount = task.discount_percent
     pct = f"{int(discount)}%" if discount else "especial"
-    n = len(with_email)
     if n == 0:
         return {
             "message": (
@@ -140,12 +136,8 @@ async def execute_send_campaign(db: Session, user: User, action: ZeusAction) ->
     pct_label = f"{int(discount)}%" if discount else "especial"
 
     try:
-        customers = crm_svc.list_customers(db, user)
-        recipients = [
-            {"id": c.id, "name": c.name, "email": str(c.email).strip().lower()}
-            for c in customers
-            if c.email and str(c.email).strip()
-        ]
+        recipients = crm_svc.list_customer_recipients(db, user, MAX_EMAILS_PER_RUN)
+        recipient_total = crm_svc.count_customers(db, user)["with_email"] if recipients else 0
     except Exception as exc:
         logger.exception("crm list_customers")
         return ZeusExecutionResult(
@@ -171,7 +163,7 @@ async def execute_send_campaign(db: Session, user: User, action: ZeusAction) ->
             agent=AGENT_CRM,
             step="filter_target",
             success=True,
-            detail=f"{len(recipients)} destinatarios",
+            detail=f"{recipient_total} destinatarios",
         )
     )
 
@@ -185,7 +177,7 @@ async def execute_send_campaign(db: Session, user: User, action: ZeusAction) ->
         action_type="campaign_created",
         description=f"Campaña: {task.campaign_name}",
         details={"campaign_id": campaign_id, "discount_percent": discount},
-        metrics={"recipients_planned": len(recipients)},
+        metrics={"recipients_planned": recipient_total},
         agent_name="PERSEO",
         status="in_progress",
     )
@@ -204,7 +196,7 @@ async def execute_send_campaign(db: Session, user: User, action: ZeusAction) ->
             message="Email no configurado (SENDGRID_API_KEY o RESEND_API_KEY).",
             executed=False,
             steps=steps,
-            metrics={"recipients": len(recipients), "sent": 0},
+            metrics={"recipients": recipient_total, "sent": 0},
         )
 
     for rec in to_send:
@@ -272,7 +264,7 @@ async def execute_send_campaign(db: Session, user: User, action: ZeusAction) ->
         ZeusExecutionStepResult(agent=AGENT_ACTIVITY, step="campaign_sent", success=sent > 0, detail=str(sent))
     )
 
-    remaining = len(recipients) - len(to_send)
+    remaining = recipient_total - len(to_send)
     extra = f" ({remaining} pendientes por límite de {MAX_EMAILS_PER_RUN})" if remaining > 0 else ""
     fail_note = f" {failed} fallidos." if failed else ""
     if sent == 0:
@@ -287,7 +279,7 @@ async def execute_send_campaign(db: Session, user: User, action: ZeusAction) ->
         intent="create_campaign_send",
         message=msg,
         executed=True,
-        metrics={"campaign_id": campaign_id, "recipients": len(recipients), "sent": sent, "failed": failed},
+        metrics={"campaign_id": campaign_id, "recipients": recipient_total, "sent": sent, "failed": failed},
         steps=steps,
     )
 
@@ -336,15 +328,10 @@ def execute_analytics_summary(db: Session, user: User, action: ZeusAction) -> Ze
 def execute_tpv_sales_summary(db: Session, user: User, action: ZeusAction) -> ZeusExecutionResult:
     days = int(action.payload.get("days") or 7)
     since = datetime.now(timezone.utc) - timedelta(days=days)
-    q = db.query(
-        func.count(TPVSale.id),
-        func.coalesce(func.sum(TPVSale.total), 0),
-    ).filter(TPVSale.sale_date >= since)
     if action.company_id is not None:
-        q = q.filter(TPVSale.company_id == action.company_id)
+        count, total_sum = period_totals(db, since_day=since.date(), company_id=action.company_id)
     else:
-        q = q.filter(TPVSale.user_id == user.id)
-    count, total_sum = q.one()
+        count, total_sum = period_totals(db, since_day=since.date(), user_id=user.id)
     total_eur = float(total_sum or 0)
     msg = f"TPV últimos {days} días: {count} venta(s), total {total_eur:,.2f} €."
     log_central(
@@ -1,7 +1,10 @@
 """
 Runtime guard zeus_phase_2 — detecta mutaciones fuera de capas de servicio.
 
-Se registra en Session.before_flush cuando ZEUS_TOTAL_SYSTEM_CLOSURE_ENABLED=true.
+Se registra cuando ZEUS_TOTAL_SYSTEM_CLOSURE_ENABLED=true con eventos de mapper
+(``before_update`` / ``before_delete`` de ``User`` y ``CashflowLedgerEntry``) y un
+listener ``set`` sobre ``User.is_active``: los flush de otros modelos (importaciones
+CRM fila a fila, tickets TPV...) no pasan por el guard.
 """
 
 from __future__ import annotations
@@ -9,15 +12,28 @@ from __future__ import annotations
 import json
 import logging
 import traceback
-from typing import Any, Dict, Optional, Set
+from typing import Any, Dict, Set
 
 from sqlalchemy import event, inspect
-from sqlalchemy.orm import Session
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, object_session
+
+from app.models.cashflow_ledger import CashflowLedgerEntry
+from app.models.user import User
+from app.models.zeus_closure_audit import ZeusClosureAudit
+from services.zeus_core_guard_v1 import (
+    GuardResult,
+    ZeusGuardViolation,
+    closure_active,
+    guard_enforce,
+    is_protected_user,
+)
 
 logger = logging.getLogger(__name__)
 
 _registered = False
 _guard_depth: Set[int] = set()  # session id() en mutación autorizada
+_DEACTIVATED_KEY = "zeus_runtime_guard_deactivated"
 
 
 def mark_authorized_session(session: Session) -> None:
@@ -33,145 +49,148 @@ def _log_runtime_violation(
     *,
     violation_type: str,
     details: Dict[str, Any],
-    session: Session,
+    connection: Connection,
     enforced: bool,
 ) -> None:
     stack = traceback.format_stack(limit=12)
     payload = {**details, "stack_trace": stack[-8:]}
     logger.warning("[RUNTIME_GUARD] %s enforced=%s %s", violation_type, enforced, details)
 
+    # Dentro del flush no se puede session.add(): INSERT directo en la misma transacción
     try:
-        from app.models.zeus_closure_audit import ZeusClosureAudit
-
-        row = ZeusClosureAudit(
-            layer="runtime",
-            domain=details.get("domain", "unknown"),
-            action=violation_type,
-            target_id=str(details.get("target_id", "")),
-            company_id=details.get("company_id"),
-            result="rejected" if enforced else "observed",
-            execution_mode="real",
-            human_message=details.get("message", violation_type),
-            details_json=json.dumps(payload, ensure_ascii=False)[:4000],
+        connection.execute(
+            ZeusClosureAudit.__table__.insert().values(
+                layer="runtime",
+                domain=details.get("domain", "unknown"),
+                action=violation_type,
+                target_id=str(details.get("target_id", "")),
+                company_id=details.get("company_id"),
+                result="rejected" if enforced else "observed",
+                execution_mode="real",
+                human_message=details.get("message", violation_type),
+                details_json=json.dumps(payload, ensure_ascii=False)[:4000],
+            )
         )
-        session.add(row)
     except Exception:
         logger.exception("runtime violation audit failed")
 
 
-def _before_flush(session: Session, flush_context, instances) -> None:
-    from app.core.config import settings
-    from services.zeus_core_guard_v1 import (
-        ZeusGuardViolation,
-        closure_active,
-        guard_enforce,
-        is_protected_user,
+def _guarded(target: Any) -> bool:
+    """Closure activo y la mutación no viene de una sesión autorizada."""
+    if not closure_active():
+        return False
+    session = object_session(target)
+    return session is None or id(session) not in _guard_depth
+
+
+def _violation(
+    connection: Connection,
+    *,
+    violation_type: str,
+    domain: str,
+    action: str,
+    reason: str,
+    details: Dict[str, Any],
+) -> None:
+    enforced = guard_enforce()
+    _log_runtime_violation(
+        violation_type=violation_type,
+        details={"domain": domain, **details},
+        connection=connection,
+        enforced=enforced,
     )
+    if enforced:
+        msg = details["message"]
+        raise ZeusGuardViolation(
+            msg,
+            result=GuardResult(
+                allowed=False,
+                domain=domain,
+                action=action,
+                reason=reason,
+                human_message=msg,
+                enforced=True,
+            ),
+        )
 
-    if not closure_active():
+
+def _on_user_is_active_set(target: User, value: Any, oldvalue: Any, initiator: Any) -> None:
+    # Solo marca la transición a inactivo; la decisión se toma en before_update
+    info = inspect(target).info
+    if value is False and oldvalue is not False:
+        info[_DEACTIVATED_KEY] = True
+    else:
+        info.pop(_DEACTIVATED_KEY, None)
+
+
+def _before_user_update(mapper, connection: Connection, target: User) -> None:
+    state = inspect(target)
+    if not state.info.pop(_DEACTIVATED_KEY, False) or not state.attrs.is_active.history.has_changes():
+        return
+    if target.is_active is not False or not _guarded(target) or not is_protected_user(target):
+        return
+    _violation(
+        connection,
+        violation_type="user_deactivate_bypass",
+        domain="users",
+        action="deactivate_user",
+        reason="protected_user_or_superuser",
+        details={
+            "target_id": target.id,
+            "email": target.email,
+            "message": f"Runtime: intento desactivar usuario protegido id={target.id}",
+        },
+    )
+
+
+def _before_user_delete(mapper, connection: Connection, target: User) -> None:
+    if not getattr(target, "is_superuser", False) or not _guarded(target):
         return
+    _violation(
+        connection,
+        violation_type="user_delete_bypass",
+        domain="users",
+        action="delete_user",
+        reason="protected_user_or_superuser",
+        details={"target_id": target.id, "message": f"Runtime: intento eliminar superuser id={target.id}"},
+    )
+
 
-    if id(session) in _guard_depth:
+def _before_cashflow_update(mapper, connection: Connection, target: CashflowLedgerEntry) -> None:
+    if target.company_id is not None or not _guarded(target):
         return
+    _violation(
+        connection,
+        violation_type="financial_bypass",
+        domain="cashflow",
+        action="record_movement",
+        reason="company_id_required",
+        details={"target_id": target.id, "message": "Runtime: cashflow sin company_id"},
+    )
 
-    enforced = guard_enforce()
 
-    for obj in session.dirty:
-        cls_name = type(obj).__name__
-
-        if cls_name == "User":
-            attr = inspect(obj).attrs.is_active
-            if attr.history.has_changes() and obj.is_active is False:
-                if is_protected_user(obj):
-                    msg = f"Runtime: intento desactivar usuario protegido id={obj.id}"
-                    _log_runtime_violation(
-                        violation_type="user_deactivate_bypass",
-                        details={
-                            "domain": "users",
-                            "target_id": obj.id,
-                            "email": obj.email,
-                            "message": msg,
-                        },
-                        session=session,
-                        enforced=enforced,
-                    )
-                    if enforced:
-                        from services.zeus_core_guard_v1 import GuardResult
-
-                        raise ZeusGuardViolation(
-                            msg,
-                            result=GuardResult(
-                                allowed=False,
-                                domain="users",
-                                action="deactivate_user",
-                                reason="protected_user_or_superuser",
-                                human_message=msg,
-                                enforced=True,
-                            ),
-                        )
-
-        if cls_name == "CashflowLedgerEntry":
-            cid = getattr(obj, "company_id", None)
-            if cid is None:
-                msg = "Runtime: cashflow sin company_id"
-                _log_runtime_violation(
-                    violation_type="financial_bypass",
-                    details={"domain": "cashflow", "target_id": getattr(obj, "id", None), "message": msg},
-                    session=session,
-                    enforced=enforced,
-                )
-                if enforced:
-                    from services.zeus_core_guard_v1 import GuardResult
-
-                    raise ZeusGuardViolation(
-                        msg,
-                        result=GuardResult(
-                            allowed=False,
-                            domain="cashflow",
-                            action="record_movement",
-                            reason="company_id_required",
-                            human_message=msg,
-                            enforced=True,
-                        ),
-                    )
-
-    for obj in session.deleted:
-        if type(obj).__name__ == "User" and getattr(obj, "is_superuser", False):
-            msg = f"Runtime: intento eliminar superuser id={obj.id}"
-            _log_runtime_violation(
-                violation_type="user_delete_bypass",
-                details={"domain": "users", "target_id": obj.id, "message": msg},
-                session=session,
-                enforced=enforced,
-            )
-            if enforced:
-                from services.zeus_core_guard_v1 import GuardResult
-
-                raise ZeusGuardViolation(
-                    msg,
-                    result=GuardResult(
-                        allowed=False,
-                        domain="users",
-                        action="delete_user",
-                        reason="protected_user_or_superuser",
-                        human_message=msg,
-                        enforced=True,
-                    ),
-                )
+_LISTENERS = (
+    (User.is_active, "set", _on_user_is_active_set),
+    (User, "before_update", _before_user_update),
+    (User, "before_delete", _before_user_delete),
+    (CashflowLedgerEntry, "before_update", _before_cashflow_update),
+)
 
 
 def attach_runtime_guard() -> None:
     global _registered
     if _registered:
         return
-    event.listen(Session, "before_flush", _before_flush, retval=False)
+    for target, name, fn in _LISTENERS:
+        event.listen(target, name, fn)
     _registered = True
-    logger.info("[RUNTIME_GUARD] attached to Session.before_flush")
+    logger.info("[RUNTIME_GUARD] attached to User / CashflowLedgerEntry mapper events")
 
 
 def detach_runtime_guard() -> None:
     global _registered
     if not _registered:
         return
-    event.remove(Session, "before_flush", _before_flush)
+    for target, name, fn in _LISTENERS:
+        event.remove(target, name, fn)
     _registered = False
@@ -1,45 +1,67 @@
 """
 Scoring inteligente v1 — priorización comercial con datos reales.
 score = (revenue * 0.4) + (payment_score * 0.2) + (engagement * 0.2) + (potential * 0.2)
+
+Los componentes se calculan por lotes (todos los clientes de una empresa en tres
+consultas agrupadas sobre tpv_sales.customer_id y crm_activity_logs) y se guardan en
+customer_scores; payment_registered / client_updated refrescan solo el cliente afectado.
 """
 
 from __future__ import annotations
 
-import json
+import logging
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.models.crm_lead import CrmLead
 from app.models.crm_office import CrmActivityLog
 from app.models.customer import Customer
+from app.models.customer_score import CustomerScore
 from app.models.fiscal import TPVSale
 from app.models.user import User
 import services.crm_office_service as crm_svc
 
+logger = logging.getLogger(__name__)
+
+REVENUE_WINDOW_DAYS = 365
+ENGAGEMENT_WINDOW_DAYS = 90
+
+
+def _payment_score(paid: int) -> float:
+    return min(100.0, paid * 20.0)
+
+
+def _engagement_from_count(count: int) -> float:
+    return min(100.0, count * 10.0)
+
+
+def _potential_score(metadata: Any) -> float:
+    potential = float((metadata or {}).get("estimated_value") or 0) if isinstance(metadata, dict) else 0.0
+    if potential > 100:
+        potential = min(100.0, potential / 1000.0)
+    return potential
+
 
 def _payment_score_for_customer(db: Session, *, company_id: int, customer_id: int) -> float:
-    since = datetime.now(timezone.utc) - timedelta(days=365)
-    sales = (
-        db.query(TPVSale)
+    since = datetime.now(timezone.utc) - timedelta(days=REVENUE_WINDOW_DAYS)
+    paid = (
+        db.query(func.count(TPVSale.id))
         .filter(
             TPVSale.company_id == company_id,
+            TPVSale.customer_id == customer_id,
             TPVSale.sale_date >= since,
         )
-        .all()
+        .scalar()
     )
-    paid = 0
-    for s in sales:
-        cd = s.customer_data if isinstance(s.customer_data, dict) else {}
-        if cd.get("customer_id") == customer_id or cd.get("crm_customer_id") == customer_id:
-            paid += 1
-    return min(100.0, paid * 20.0)
+    return _payment_score(int(paid or 0))
 
 
 def _engagement_score(db: Session, *, company_id: int, customer_id: Optional[int], lead_id: Optional[int]) -> float:
-    since = datetime.now(timezone.utc) - timedelta(days=90)
+    since = datetime.now(timezone.utc) - timedelta(days=ENGAGEMENT_WINDOW_DAYS)
     q = db.query(func.count(CrmActivityLog.id)).filter(
         CrmActivityLog.company_id == company_id,
         CrmActivityLog.created_at >= since,
@@ -47,7 +69,7 @@ def _engagement_score(db: Session, *, company_id: int, customer_id: Optional[int
     if customer_id:
         q = q.filter(CrmActivityLog.customer_id == customer_id)
     count = int(q.scalar() or 0)
-    return min(100.0, count * 10.0)
+    return _engagement_from_count(count)
 
 
 def compute_lead_score(
@@ -79,38 +101,203 @@ def _next_action(score: float, has_meeting: bool) -> str:
     return "nurture"
 
 
-def score_customer(db: Session, *, user: User, customer_id: int) -> Dict[str, Any]:
-    cid = crm_svc.primary_company_id(db, user)
-    cust = db.query(Customer).filter(Customer.id == customer_id, Customer.company_id == cid).first()
-    if not cust:
-        raise ValueError("Cliente no encontrado")
+def score_customers_batch(
+    db: Session,
+    *,
+    company_id: int,
+    customer_ids: Optional[Iterable[int]] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Scores de los clientes de ``company_id`` (todos, o solo ``customer_ids``) sin N+1:
+    una consulta de clientes, una de ventas agrupada por customer_id y una de actividad.
+    """
+    ids = None if customer_ids is None else sorted({int(c) for c in customer_ids if c})
+    if ids is not None and not ids:
+        return {}
+    now = datetime.now(timezone.utc)
 
-    since = datetime.now(timezone.utc) - timedelta(days=365)
-    revenue = float(
-        db.query(func.coalesce(func.sum(TPVSale.total), 0.0))
-        .filter(TPVSale.company_id == cid, TPVSale.sale_date >= since)
-        .scalar()
-        or 0
+    cq = db.query(Customer.id, Customer.metadata_).filter(Customer.company_id == company_id)
+    sq = db.query(
+        TPVSale.customer_id,
+        func.count(TPVSale.id),
+        func.coalesce(func.sum(TPVSale.total), 0),
+    ).filter(
+        TPVSale.company_id == company_id,
+        TPVSale.customer_id.isnot(None),
+        TPVSale.sale_date >= now - timedelta(days=REVENUE_WINDOW_DAYS),
     )
-    payment_score = _payment_score_for_customer(db, company_id=cid, customer_id=customer_id)
-    engagement = _engagement_score(db, company_id=cid, customer_id=customer_id, lead_id=None)
-    potential = float((cust.metadata_ or {}).get("estimated_value") or 0) if isinstance(cust.metadata_, dict) else 0.0
-    if potential > 100:
-        potential = min(100.0, potential / 1000.0)
+    aq = db.query(CrmActivityLog.customer_id, func.count(CrmActivityLog.id)).filter(
+        CrmActivityLog.company_id == company_id,
+        CrmActivityLog.customer_id.isnot(None),
+        CrmActivityLog.created_at >= now - timedelta(days=ENGAGEMENT_WINDOW_DAYS),
+    )
+    if ids is not None:
+        cq = cq.filter(Customer.id.in_(ids))
+        sq = sq.filter(TPVSale.customer_id.in_(ids))
+        aq = aq.filter(CrmActivityLog.customer_id.in_(ids))
+    sales = {cid: (int(n or 0), float(total or 0)) for cid, n, total in sq.group_by(TPVSale.customer_id)}
+    activity = {cid: int(n or 0) for cid, n in aq.group_by(CrmActivityLog.customer_id)}
+
+    out: Dict[int, Dict[str, Any]] = {}
+    for customer_id, metadata in cq:
+        paid, revenue = sales.get(customer_id, (0, 0.0))
+        activity_count = activity.get(customer_id, 0)
+        components = {
+            "revenue_score": min(100.0, revenue / 100.0),
+            "payment_score": _payment_score(paid),
+            "engagement_score": _engagement_from_count(activity_count),
+            "potential_score": _potential_score(metadata),
+        }
+        score = compute_lead_score(
+            revenue=components["revenue_score"],
+            payment_score=components["payment_score"],
+            engagement=components["engagement_score"],
+            potential=components["potential_score"],
+        )
+        out[customer_id] = {
+            "customer_id": customer_id,
+            "lead_score": score,
+            "customer_priority": _priority_from_score(score),
+            "next_best_action": _next_action(score, False),
+            "sales_count": paid,
+            "revenue_amount": round(revenue, 2),
+            "activity_count": activity_count,
+            **components,
+        }
+    return out
+
+
+def refresh_customer_scores(
+    db: Session,
+    *,
+    company_id: int,
+    customer_ids: Optional[Iterable[int]] = None,
+    commit: bool = True,
+) -> int:
+    """Recalcula y guarda en customer_scores (toda la empresa o solo ``customer_ids``)."""
+    ids = None if customer_ids is None else list(customer_ids)
+    scores = score_customers_batch(db, company_id=company_id, customer_ids=ids)
+    q = db.query(CustomerScore).filter(CustomerScore.company_id == company_id)
+    if ids is not None:
+        if not ids:
+            return 0
+        q = q.filter(CustomerScore.customer_id.in_(ids))
+    now = datetime.now(timezone.utc)
+    existing = {row.customer_id: row for row in q}
+    for customer_id, row in existing.items():
+        if customer_id not in scores:
+            db.delete(row)
+    fields = [
+        c.name
+        for c in CustomerScore.__table__.columns
+        if c.name not in ("id", "company_id", "customer_id", "computed_at")
+    ]
+    for customer_id, data in scores.items():
+        row = existing.get(customer_id)
+        if row is None:
+            row = CustomerScore(company_id=company_id, customer_id=customer_id)
+            db.add(row)
+        for name in fields:
+            setattr(row, name, data[name])
+        row.computed_at = now
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+    return len(scores)
 
-    score = compute_lead_score(
-        revenue=min(100.0, revenue / 100.0),
-        payment_score=payment_score,
-        engagement=engagement,
-        potential=potential,
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def get_company_scores(
+    db: Session,
+    *,
+    user: User,
+    limit: Optional[int] = None,
+    max_age_sec: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Scores de todos los clientes de la empresa, de mayor a menor lead_score.
+    Lee customer_scores y solo recalcula (en lote) si faltan clientes o la caché caducó.
+    """
+    cid = crm_svc.primary_company_id(db, user)
+    if cid is None:
+        return {"company_id": None, "total": 0, "refreshed": False, "items": []}
+    ttl = settings.CUSTOMER_SCORE_TTL_SEC if max_age_sec is None else max_age_sec
+    customers = int(db.query(func.count(Customer.id)).filter(Customer.company_id == cid).scalar() or 0)
+    cached, oldest = (
+        db.query(func.count(CustomerScore.id), func.min(CustomerScore.computed_at))
+        .filter(CustomerScore.company_id == cid)
+        .one()
+    )
+    oldest = _aware(oldest)
+    stale = oldest is not None and (datetime.now(timezone.utc) - oldest).total_seconds() > ttl
+    refreshed = int(cached or 0) != customers or stale
+    if refreshed:
+        refresh_customer_scores(db, company_id=cid)
+
+    q = (
+        db.query(CustomerScore)
+        .filter(CustomerScore.company_id == cid)
+        .order_by(CustomerScore.lead_score.desc(), CustomerScore.customer_id.asc())
     )
-    priority = _priority_from_score(score)
-    nba = _next_action(score, False)
+    if limit:
+        q = q.limit(limit)
+    items = [
+        {
+            "customer_id": row.customer_id,
+            "lead_score": row.lead_score,
+            "customer_priority": row.customer_priority,
+            "next_best_action": row.next_best_action,
+            "revenue_score": row.revenue_score,
+            "payment_score": row.payment_score,
+            "engagement_score": row.engagement_score,
+            "potential_score": row.potential_score,
+            "computed_at": row.computed_at.isoformat() if row.computed_at else None,
+        }
+        for row in q
+    ]
+    return {"company_id": cid, "total": customers, "refreshed": refreshed, "items": items}
+
+
+def refresh_customer_score_safe(
+    db: Optional[Session],
+    *,
+    company_id: Optional[int],
+    customer_id: Optional[int],
+    commit: bool = True,
+) -> None:
+    """
+    Refresco incremental desde eventos (payment_registered / client_updated).
+    Va en un savepoint: si falla no arrastra la transacción del llamante ni propaga el error.
+    """
+    if db is None or not company_id or not customer_id:
+        return
+    try:
+        with db.begin_nested():
+            refresh_customer_scores(db, company_id=int(company_id), customer_ids=[int(customer_id)], commit=False)
+        if commit:
+            db.commit()
+    except Exception:
+        logger.warning(
+            "refresh customer score falló company_id=%s customer_id=%s", company_id, customer_id, exc_info=True
+        )
+
+
+def score_customer(db: Session, *, user: User, customer_id: int) -> Dict[str, Any]:
+    cid = crm_svc.primary_company_id(db, user)
+    scored = score_customers_batch(db, company_id=cid, customer_ids=[customer_id]).get(customer_id)
+    if not scored:
+        raise ValueError("Cliente no encontrado")
     return {
         "customer_id": customer_id,
-        "lead_score": score,
-        "customer_priority": priority,
-        "next_best_action": nba,
+        "lead_score": scored["lead_score"],
+        "customer_priority": scored["customer_priority"],
+        "next_best_action": scored["next_best_action"],
     }
 
 
@@ -1,3 +1,5 @@
+import re
+
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
@@ -31,3 +33,22 @@ def test_token(test_client, test_user):
 def authorized_client(test_client, test_token):
     test_client.headers.update({"Authorization": f"Bearer {test_token}"})
     return test_client
+
+
+@pytest.fixture()
+def max_queries(monkeypatch):
+    """
+    Presupuesto de queries por ruta: muestrea todas las peticiones y comprueba el nº de
+    queries que informa Server-Timing. Uso: ``max_queries(client.get(url), 6)``.
+    """
+    monkeypatch.setattr(settings, "SQL_INSTRUMENTATION_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "SQL_SERVER_TIMING_HEADER", True)
+
+    def check(response, limit):
+        match = re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', response.headers.get("server-timing", ""))
+        assert match, "respuesta sin Server-Timing db (¿SQL_INSTRUMENTATION_ENABLED?)"
+        count = int(match.group(1))
+        assert count <= limit, f"{count} queries > {limit} en {response.request.method} {response.request.url.path}"
+        return count
+
+    return check
@@ -0,0 +1,163 @@
+"""Tests métricas de actividad: agregados SQL y rollup horario incremental vs crudo."""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest  # pyright: ignore[reportMissingImports]
+from fastapi.testclient import TestClient
+
+from app.core.jwt_auth import create_access_token
+from app.core.security import get_password_hash
+from app.db.base import Base, SessionLocal, engine
+from app.main import app
+from app.models.agent_activity import AgentActivity
+from app.models.agent_activity_hourly import AgentActivityHourly
+from app.models.user import User
+import services.activity_metrics_service as activity_metrics
+
+
+@pytest.fixture()
+def seeded():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    suf = uuid.uuid4().hex[:8].upper()
+    user = User(
+        email=f"activity_{suf.lower()}@example.test",
+        hashed_password=get_password_hash("TestPass1"),
+        full_name="Activity Tester",
+        is_active=True,
+    )
+    db.add(user)
+    now = datetime.utcnow()
+    agents = (f"AG{suf}A", f"AG{suf}B")
+    rows = []
+    for i in range(30):
+        created = now - timedelta(days=i % 12, hours=i, minutes=7 * i)
+        status = ("completed", "failed", "pending")[i % 3]
+        rows.append(
+            AgentActivity(
+                agent_name=agents[i % 2],
+                action_type="test",
+                action_description=f"Actividad {i}",
+                status=status,
+                user_email=user.email if i % 4 else None,
+                created_at=created,
+                completed_at=created + timedelta(seconds=i + 1) if status == "completed" else None,
+            )
+        )
+    db.add_all(rows)
+    db.commit()
+    db.refresh(user)
+    try:
+        yield db, user, agents, rows
+    finally:
+        db.close()
+
+
+def _stats(db, agent, **kw):
+    end = datetime.utcnow()
+    s = activity_metrics.aggregate_activity(db, start=end - timedelta(days=30), end=end, agent=agent, **kw)
+    return s.source, s.total, dict(s.by_status), s.rt_samples, round(s.rt_total_sec, 3)
+
+
+def _raw(db, agent, monkeypatch, **kw):
+    monkeypatch.setattr(activity_metrics, "ROLLUP_MIN_DAYS", 10_000)
+    try:
+        return _stats(db, agent, **kw)[1:]
+    finally:
+        monkeypatch.undo()
+
+
+def test_rollup_matches_raw_after_updates_and_deletes(seeded, monkeypatch):
+    db, user, agents, rows = seeded
+    # Cambio de estado (pending → completed) y borrado: el rollup se corrige en la misma transacción
+    pending = next(r for r in rows if r.status == "pending")
+    pending.status = "completed"
+    pending.completed_at = pending.created_at + timedelta(seconds=90)
+    db.delete(next(r for r in rows if r.status == "failed"))
+    db.commit()
+    db.expire_all()
+    expired = (
+        db.query(AgentActivity)
+        .filter(AgentActivity.agent_name == agents[1], AgentActivity.status == "pending")
+        .first()
+    )
+    expired.status = "failed"
+    db.commit()
+
+    for agent in agents:
+        source, *rolled = _stats(db, agent)
+        assert source == "rollup"
+        assert rolled == list(_raw(db, agent, monkeypatch))
+        assert _stats(db, agent, user_email=user.email)[1:] == _raw(db, agent, monkeypatch, user_email=user.email)
+
+    total = sum(_stats(db, agent)[1] for agent in agents)
+    assert total == 29
+
+    incremental = sorted(
+        (r.hour, r.agent_name, r.user_email, r.status, r.activity_count, r.rt_samples, round(r.rt_total_sec, 3))
+        for r in db.query(AgentActivityHourly).filter(AgentActivityHourly.agent_name.in_(agents))
+        if r.activity_count
+    )
+    activity_metrics.rebuild_hourly_rollups(db, since=datetime.utcnow() - timedelta(days=40))
+    rebuilt = sorted(
+        (r.hour, r.agent_name, r.user_email, r.status, r.activity_count, r.rt_samples, round(r.rt_total_sec, 3))
+        for r in db.query(AgentActivityHourly).filter(AgentActivityHourly.agent_name.in_(agents))
+    )
+    assert incremental == rebuilt
+
+
+def test_performance_endpoint_uses_sql_aggregates(seeded):
+    db, user, agents, rows = seeded
+    mine = [r for r in rows if r.user_email == user.email and r.agent_name == agents[0]]
+    token = create_access_token(user_id=str(user.id), email=user.email)
+    client = TestClient(app)
+    body = client.get(
+        "/api/v1/metrics/performance",
+        params={"agent": agents[0].lower(), "days": 30},
+        headers={"Authorization": f"Bearer {token}"},
+    ).json()
+    assert body["total_activities"] == len(mine)
+    completed = [r for r in mine if r.status == "completed"]
+    assert body["response_times"]["samples"] == len(completed)
+    assert body["success_rate"] == f"{len(completed) / len(mine) * 100:.1f}%"
+    assert body["by_agent"][agents[0]]["failed"] == sum(1 for r in mine if r.status == "failed")
+
+
+def test_purge_user_activity_drops_rollup_rows(seeded, monkeypatch):
+    db, user, agents, rows = seeded
+    before = sum(_stats(db, agent)[1] for agent in agents)
+    own = sum(1 for r in rows if r.user_email == user.email)
+
+    counts = activity_metrics.purge_user_activity(db, user.email)
+    db.commit()
+    assert counts["agent_activities"] == own and counts["agent_activity_hourly"] > 0
+
+    for agent in agents:
+        assert _stats(db, agent, user_email=user.email)[1] == 0
+        assert _stats(db, agent)[1:] == _raw(db, agent, monkeypatch)
+    assert sum(_stats(db, agent)[1] for agent in agents) == before - own
+
+
+def test_insert_without_created_at_buckets_by_stored_timestamp(monkeypatch):
+    Base.metadata.create_all(bind=engine)
+    class _Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(2031, 5, 4, 10, 59, 59, 900000, tzinfo=timezone.utc)
+
+    monkeypatch.setattr(activity_metrics, "datetime", _Clock)
+    agent = f"AG{uuid.uuid4().hex[:8].upper()}"
+    db = SessionLocal()
+    try:
+        row = AgentActivity(agent_name=agent, action_type="test", action_description="sin fecha", status="pending")
+        db.add(row)
+        db.commit()
+        db.refresh(row)
+        assert activity_metrics.floor_hour(row.created_at) == datetime(2031, 5, 4, 10)
+        hours = [h.hour for h in db.query(AgentActivityHourly).filter(AgentActivityHourly.agent_name == agent)]
+        assert [activity_metrics.floor_hour(h) for h in hours] == [datetime(2031, 5, 4, 10)]
+    finally:
+        db.close()
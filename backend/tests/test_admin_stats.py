@@ -0,0 +1,135 @@
+"""Tests panel de superusuario: agregados SQL = cálculo por usuario, foto diaria y listado paginado."""
+
+from __future__ import annotations
+
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytest  # pyright: ignore[reportMissingImports]
+from fastapi.testclient import TestClient
+
+from app.core.jwt_auth import create_access_token
+from app.core.security import get_password_hash
+from app.db.base import Base, SessionLocal, engine
+from app.main import app
+from app.models.admin_revenue_snapshot import AdminRevenueSnapshot
+from app.models.user import User
+from services import admin_stats_service as admin_stats
+from services.admin_stats_service import PRICING_PLANS
+
+PLANS = ["startup", " Growth ", "business", "enterprise", None, "legacy"]
+
+
+@pytest.fixture()
+def tenants():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    suf = uuid.uuid4().hex[:8]
+    admin = User(
+        email=f"root_{suf}@example.test",
+        hashed_password=get_password_hash("TestPass1"),
+        full_name="Root",
+        is_active=True,
+        is_superuser=True,
+    )
+    db.add(admin)
+    now = datetime.utcnow()
+    for i in range(12):
+        db.add(
+            User(
+                email=f"tenant_{suf}_{i}@example.test",
+                hashed_password="x",
+                full_name=f"Tenant {i}",
+                company_name=f"Empresa {suf} {i}",
+                plan=PLANS[i % len(PLANS)],
+                is_active=i % 4 != 3,
+                created_at=now - timedelta(days=45 * i),
+            )
+        )
+    db.commit()
+    db.refresh(admin)
+    token = create_access_token(user_id=str(admin.id), email=admin.email)
+    try:
+        yield db, suf, {"Authorization": f"Bearer {token}"}
+    finally:
+        db.close()
+
+
+def _reference(db):
+    """Cálculo anterior: recorre todos los usuarios en Python."""
+    users = db.query(User).all()
+    monthly = setup = 0
+    by_month = defaultdict(int)
+    now = datetime.utcnow()
+    for user in users:
+        plan = (user.plan or "").lower().strip()
+        if not user.is_active or plan not in PRICING_PLANS:
+            continue
+        monthly += PRICING_PLANS[plan]["monthly_price"]
+        setup += PRICING_PLANS[plan]["setup_price"]
+        if user.created_at:
+            cursor = user.created_at.replace(day=1)
+            while cursor <= now.replace(day=1):
+                by_month[cursor.strftime("%Y-%m")] += PRICING_PLANS[plan]["monthly_price"]
+                cursor = (cursor + timedelta(days=32)).replace(day=1)
+    return len(users), sum(1 for u in users if u.is_active), monthly, setup, by_month
+
+
+def test_stats_and_chart_match_per_user_calculation(tenants, monkeypatch):
+    db, _, headers = tenants
+    monkeypatch.setattr(admin_stats, "_last_snapshot_day", None)
+    client = TestClient(app)
+    total, active, monthly, setup, by_month = _reference(db)
+
+    body = client.get("/api/v1/admin/stats", headers=headers).json()
+    assert body["stats"]["total_customers"] == total
+    assert body["stats"]["active_subscriptions"] == active
+    assert body["stats"]["monthly_revenue"] == monthly
+    assert body["stats"]["total_setup_fees"] == setup
+    assert sum(p["monthly_total"] for p in body["revenue_by_plan"]) == monthly
+
+    today = datetime.utcnow().date()
+    snap = db.query(AdminRevenueSnapshot).filter(AdminRevenueSnapshot.snapshot_date == today).one()
+    assert float(snap.monthly_revenue) == monthly
+
+    chart = client.get("/api/v1/admin/revenue-chart?months=6", headers=headers).json()["chart_data"]
+    expected = sorted(by_month)[-6:]
+    assert chart["labels"] == expected
+    assert chart["datasets"][0]["data"] == [by_month[m] for m in expected]
+
+
+def test_snapshot_overrides_history(tenants):
+    db, _, _ = tenants
+    series = dict(admin_stats.revenue_by_month(db, 3))
+    month = sorted(series)[0]
+    day = datetime.strptime(month, "%Y-%m").date().replace(day=28)
+    stats = admin_stats.compute_stats(db)
+    admin_stats.record_snapshot(db, {**stats, "monthly_revenue": 12345}, day=day)
+    try:
+        assert dict(admin_stats.revenue_by_month(db, 3))[month]["revenue"] == 12345
+    finally:
+        db.query(AdminRevenueSnapshot).filter(AdminRevenueSnapshot.snapshot_date == day).delete()
+        db.commit()
+
+
+def test_customers_are_paginated_and_searchable(tenants, max_queries):
+    _, suf, headers = tenants
+    client = TestClient(app)
+
+    r = client.get("/api/v1/admin/customers", params={"q": f"tenant_{suf}", "limit": 5, "page": 2}, headers=headers)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["total"] == 12 and body["total_pages"] == 3
+    assert [c["email"] for c in body["customers"]] == [f"tenant_{suf}_{i}@example.test" for i in range(5, 10)]
+    max_queries(r, 3)
+
+    r = client.get(
+        "/api/v1/admin/customers",
+        params={"q": f"Empresa {suf}", "status": "inactive", "plan": "growth"},
+        headers=headers,
+    )
+    assert [c["email"] for c in r.json()["customers"]] == [f"tenant_{suf}_7@example.test"]
+    r = client.get("/api/v1/admin/customers", params={"q": f"Empresa {suf}", "plan": "none"}, headers=headers)
+    assert {c["plan"] for c in r.json()["customers"]} == {"none"}
+    assert r.json()["total"] == 2
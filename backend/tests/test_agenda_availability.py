@@ -0,0 +1,180 @@
+"""Tests agenda v1: índice de disponibilidad, huecos sin colisiones y agenda por lotes."""
+
+from __future__ import annotations
+
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+
+import pytest  # pyright: ignore[reportMissingImports]
+from fastapi.testclient import TestClient
+
+from app.core.jwt_auth import create_access_token
+from app.core.security import get_password_hash
+from app.db.base import Base, SessionLocal, engine
+from app.main import app
+from app.models.company import Company, UserCompany
+from app.models.crm_lead import CrmLead
+from app.models.reservation import Reservation
+from app.models.time_tracking import EmployeeSchedule
+from app.models.user import User
+from services.zeus_agenda_optimizer_v1 import (
+    AvailabilityIndex,
+    propose_meeting_slots,
+    schedule_leads_batch,
+    schedule_meeting,
+)
+
+UTC = timezone.utc
+
+
+def _at(day: date, hour: int, minute: int = 0) -> datetime:
+    return datetime.combine(day, time(hour, minute), tzinfo=UTC)
+
+
+@pytest.fixture()
+def company():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    suf = uuid.uuid4().hex[:8]
+    user = User(
+        email=f"agenda_{suf}@example.test",
+        hashed_password=get_password_hash("TestPass1"),
+        full_name="Agenda Tester",
+        is_active=True,
+    )
+    co = Company(company_name=f"Agenda Co {suf}", slug=f"agenda-{suf}")
+    db.add_all([user, co])
+    db.flush()
+    db.add(UserCompany(user_id=user.id, company_id=co.id, role="owner"))
+    db.commit()
+    db.refresh(user)
+    try:
+        yield db, user, co
+    finally:
+        db.close()
+
+
+def test_index_merges_and_finds_gaps():
+    day = date(2030, 1, 7)
+    index = AvailabilityIndex([(_at(day, 10), _at(day, 11)), (_at(day, 9), _at(day, 9, 30))])
+    index.add(_at(day, 10, 30), _at(day, 12))
+    index.add(_at(day, 9, 30), _at(day, 9, 45))
+    assert len(index) == 2
+    assert index.overlaps(_at(day, 11, 30), _at(day, 11, 45))
+    assert not index.overlaps(_at(day, 12), _at(day, 12, 30))
+    step = timedelta(minutes=30)
+    assert index.next_free(_at(day, 9), _at(day, 18), timedelta(minutes=30), step) == _at(day, 12)
+    assert index.next_free(_at(day, 9), _at(day, 12, 15), timedelta(minutes=30), step) is None
+
+
+def test_slots_avoid_meetings_reservations_and_breaks(company):
+    db, user, co = company
+    day = datetime.now(UTC).date() + timedelta(days=2)
+    for weekday in range(7):
+        db.add(
+            EmployeeSchedule(
+                employee_id="E1",
+                user_id=user.id,
+                day_of_week=weekday,
+                start_time="09:00",
+                end_time="13:00",
+                break_start="11:00",
+                break_duration=30,
+                is_active=True,
+            )
+        )
+    db.add(
+        Reservation(
+            user_id=user.id,
+            guest_name="Mesa",
+            guest_phone="600000000",
+            reservation_date=day,
+            reservation_time="09:00",
+            num_guests=2,
+            status="confirmed",
+        )
+    )
+    db.add(
+        Reservation(
+            user_id=user.id,
+            guest_name="Anulada",
+            guest_phone="600000001",
+            reservation_date=day,
+            reservation_time="12:30",
+            num_guests=2,
+            status="cancelled",
+        )
+    )
+    other = CrmLead(company_id=co.id, name="Otro", meeting_at=_at(day, 12), lead_score=50)
+    lead = CrmLead(company_id=co.id, name="Nuevo", lead_score=80, customer_priority="low")
+    db.add_all([other, lead])
+    db.commit()
+
+    slots = propose_meeting_slots(db, user=user, lead_id=lead.id)["proposed_slots"]
+    starts = [datetime.fromisoformat(s["start"]) for s in slots]
+    first_day = [s for s in starts if s.date() == day]
+    # 09:00–10:30 reserva, 11:00–11:30 pausa, 12:00–12:30 reunión: libre 10:30 y 12:30 (cancelada no cuenta)
+    assert first_day == [_at(day, 10, 30), _at(day, 12, 30)]
+    assert len(slots) == 6
+    assert all(time(9) <= s.time() and s + timedelta(minutes=30) <= _at(s.date(), 13) for s in starts)
+
+    with pytest.raises(ValueError, match="Solapamiento"):
+        schedule_meeting(db, user=user, lead_id=lead.id, start_iso=_at(day, 12, 15).isoformat())
+    assert schedule_meeting(db, user=user, lead_id=lead.id, start_iso=_at(day, 10, 30).isoformat())["scheduled"]
+
+
+def test_batch_is_greedy_by_score_without_overlaps(company, max_queries):
+    db, user, co = company
+    leads = [
+        CrmLead(company_id=co.id, name=f"L{i}", lead_score=float((i * 37) % 101), customer_priority="low")
+        for i in range(250)
+    ]
+    db.add_all(leads)
+    db.commit()
+
+    token = create_access_token(user_id=str(user.id), email=user.email)
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {token}"}
+    r = client.post("/api/v1/zeus-core/leads/agenda/batch-schedule", json={}, headers=headers)
+    assert r.status_code == 200, r.text
+    max_queries(r, 12)
+    result = r.json()
+
+    plan = result["scheduled"]
+    assert len(plan) + len(result["unscheduled_lead_ids"]) == len(leads)
+    assert len(plan) > 200
+    scores = [p["lead_score"] for p in plan]
+    assert scores == sorted(scores, reverse=True)
+    intervals = sorted((datetime.fromisoformat(p["start"]), datetime.fromisoformat(p["end"])) for p in plan)
+    assert all(prev[1] <= cur[0] for prev, cur in zip(intervals, intervals[1:]))
+    starts = [p["start"] for p in plan]
+    assert starts == sorted(starts)
+    assert db.query(CrmLead).filter(CrmLead.company_id == co.id, CrmLead.meeting_at.isnot(None)).count() == 0
+
+    r = client.post(
+        "/api/v1/zeus-core/leads/agenda/batch-schedule",
+        json={"lead_ids": [lead.id for lead in leads[:20]], "apply": True},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    max_queries(r, 12)
+    assert len(r.json()["scheduled"]) == 20
+    db.expire_all()
+    assert db.query(CrmLead).filter(CrmLead.company_id == co.id, CrmLead.meeting_at.isnot(None)).count() == 20
+
+
+def test_batch_with_lead_ids_skips_closed_and_booked_leads(company):
+    db, user, co = company
+    booked_at = _at(datetime.now(UTC).date() + timedelta(days=3), 12)
+    open_lead = CrmLead(company_id=co.id, name="Abierto", lead_score=10.0)
+    won = CrmLead(company_id=co.id, name="Ganado", lead_score=90.0, status="converted")
+    booked = CrmLead(company_id=co.id, name="Citado", lead_score=80.0, meeting_at=booked_at)
+    db.add_all([open_lead, won, booked])
+    db.commit()
+
+    result = schedule_leads_batch(db, user=user, lead_ids=[open_lead.id, won.id, booked.id], apply=True)
+    assert [p["lead_id"] for p in result["scheduled"]] == [open_lead.id]
+    db.expire_all()
+    assert db.get(CrmLead, won.id).meeting_at is None
+    assert db.get(CrmLead, booked.id).meeting_at.replace(tzinfo=UTC) == booked_at
+    assert db.get(CrmLead, open_lead.id).meeting_at is not None
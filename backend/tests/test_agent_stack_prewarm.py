@@ -0,0 +1,111 @@
+"""Tests pila de agentes: precalentado en segundo plano, readiness por agente y modos lazy / fail_fast."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest  # pyright: ignore[reportMissingImports]
+from fastapi import HTTPException
+
+from agents import shared_config
+from app.api.v1.endpoints import chat
+from app.core.config import settings
+
+
+class _Agent:
+    def set_zeus_core_ref(self, zeus):
+        self.zeus = zeus
+
+
+class _Zeus:
+    def __init__(self):
+        self.agents = []
+
+    def set_teamflow_engine(self, engine):
+        pass
+
+    def register_agent(self, agent):
+        self.agents.append(agent)
+
+
+def _broken():
+    raise RuntimeError("init roto")
+
+
+@pytest.fixture()
+def stack(monkeypatch):
+    monkeypatch.setattr(chat, "_agents_ready", False)
+    monkeypatch.setattr(chat, "_stack_state", {"state": "pending", "source": None, "total_ms": None, "error": None})
+    monkeypatch.setattr(chat, "_agent_status", {k: {"status": "pending"} for k in chat.AGENT_ORDER_KEYS})
+    monkeypatch.setattr(chat, "AGENTS", {})
+    for name in ("zeus", "perseo", "rafael", "thalos", "justicia", "afrodita"):
+        monkeypatch.setattr(chat, name, None)
+    monkeypatch.setattr(chat, "ZeusCore", _Zeus)
+    for cls in ("Perseo", "Rafael", "Thalos", "Justicia", "Afrodita"):
+        monkeypatch.setattr(chat, cls, type(cls, (_Agent,), {}))
+    monkeypatch.setattr("services.tpv_service.set_tpv_integrations", lambda **kw: None)
+    monkeypatch.setattr(settings, "ZEUS_AGENT_INIT_MODE", "lazy")
+    return monkeypatch
+
+
+def test_prewarm_thread_reports_per_agent_readiness(stack):
+    pending = asyncio.run(chat.chat_ready())
+    assert pending.status_code == 503
+
+    thread = chat.start_agent_prewarm()
+    thread.join(timeout=5)
+    body = chat.agent_stack_readiness()
+    assert body["ready"] is True
+    assert body["source"] == "prewarm"
+    assert set(body["agents"]) == set(chat.AGENT_ORDER_KEYS)
+    assert all(a["status"] == "ready" and "duration_ms" in a for a in body["agents"].values())
+    assert len(chat.zeus.agents) == 5
+    assert asyncio.run(chat.chat_ready()).status_code == 200
+    assert chat.start_agent_prewarm() is None  # ya lista
+
+
+def test_secondary_agent_failure_is_isolated_in_lazy_mode(stack):
+    stack.setattr(chat, "Perseo", _broken)
+    chat.ensure_agent_stack()
+    assert chat._stack_state["state"] == "ready"
+    assert chat.AGENTS["PERSEO"] is None
+    assert chat.AGENTS["RAFAEL"] is not None
+    assert chat._agent_status["PERSEO"]["status"] == "error"
+
+
+def test_core_failure_lazy_retries_on_next_request(stack):
+    stack.setattr(chat, "ZeusCore", _broken)
+    chat.ensure_agent_stack()
+    assert chat._stack_state["state"] == "failed"
+    assert chat._agents_ready is False
+
+    stack.setattr(chat, "ZeusCore", _Zeus)
+    chat.ensure_agent_stack()
+    assert chat._stack_state["state"] == "ready"
+    assert chat.zeus is not None
+
+
+def test_core_failure_fail_fast_is_terminal(stack):
+    stack.setattr(settings, "ZEUS_AGENT_INIT_MODE", "fail_fast")
+    stack.setattr(chat, "ZeusCore", _broken)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(chat._require_agent_stack())
+    assert exc.value.status_code == 503
+    assert chat._agents_ready is True
+
+    stack.setattr(chat, "ZeusCore", _Zeus)
+    chat.ensure_agent_stack()
+    assert chat.zeus is None  # sin reintento en el mismo proceso
+
+
+def test_request_waits_bounded_while_stack_is_warming(stack):
+    with chat._agents_lock:
+        with pytest.raises(chat.AgentStackNotReady):
+            chat.ensure_agent_stack(timeout=0.05)
+
+
+def test_prompt_config_is_parsed_once_and_frozen():
+    first = shared_config.agent_prompt_config("RAFAEL")
+    assert first is shared_config.agent_prompt_config("RAFAEL")
+    with pytest.raises(TypeError):
+        first["role"] = "otro"
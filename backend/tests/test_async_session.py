@@ -0,0 +1,85 @@
+"""Tests ruta async de BD (get_async_db / run_sync) y persistencia de chat async."""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+
+import pytest  # pyright: ignore[reportMissingImports]
+
+from app.core.security import get_password_hash
+from app.db.async_session import AsyncSessionLocal, async_database_url, attach_user, dispose_async_engine
+from app.db.base import Base, SessionLocal, engine
+from app.models.user import User
+from services import chat_persistence_service as chat_db
+
+
+@pytest.fixture()
+def user():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        u = User(
+            email=f"async_{uuid.uuid4().hex[:8]}@example.test",
+            hashed_password=get_password_hash("TestPass1"),
+            full_name="Async Tester",
+            is_active=True,
+        )
+        db.add(u)
+        db.commit()
+        db.refresh(u)
+        yield u
+    finally:
+        db.close()
+
+
+def test_async_url_translation_sqlite():
+    url, args = async_database_url("sqlite:////tmp/zeus.db")
+    assert url == "sqlite+aiosqlite:////tmp/zeus.db"
+    assert args == {}
+
+
+def test_async_url_translation_postgres_strips_libpq_params():
+    url, args = async_database_url("postgresql://u:p@host:5432/db?sslmode=require&channel_binding=require")
+    assert url.startswith("postgresql+asyncpg://u:p@host:5432/db")
+    assert "sslmode" not in url and "channel_binding" not in url
+    assert args["ssl"] == "require"
+    assert args["server_settings"]["statement_timeout"] == "30000"
+
+
+def test_chat_messages_roundtrip_async(user):
+    async def _run():
+        adb = AsyncSessionLocal()
+        try:
+            saved = await chat_db.save_message_async(
+                adb,
+                user=user,
+                agent_name="zeus-core",
+                thread_id="t-async",
+                role="user",
+                message="hola",
+                company_id=None,
+            )
+            assert saved is not None and saved.agent_name == "ZEUS CORE"
+            await chat_db.save_message_async(
+                adb, user=user, agent_name="ZEUS CORE", thread_id="t-async", role="assistant", message="ok"
+            )
+            rows = await chat_db.list_messages_async(adb, user=user, agent_name="ZEUS CORE", thread_id="t-async")
+            return [(r.role, r.message) for r in rows]
+        finally:
+            await adb.close()
+            await dispose_async_engine()
+
+    assert asyncio.run(_run()) == [("user", "hola"), ("assistant", "ok")]
+
+
+def test_run_sync_attaches_user(user):
+    async def _run():
+        adb = AsyncSessionLocal()
+        try:
+            return await adb.run_sync(lambda s: attach_user(s, user) in s)
+        finally:
+            await adb.close()
+            await dispose_async_engine()
+
+    assert asyncio.run(_run()) is True
@@ -0,0 +1,154 @@
+"""Tests motor de informes de asistencia: cálculo vectorizado, snapshots de días cerrados y exportación."""
+
+from __future__ import annotations
+
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import pytest  # pyright: ignore[reportMissingImports]
+
+from app.core.security import get_password_hash
+from app.db.base import Base, SessionLocal, _migrate_smart_time_control_tables, engine
+from app.models.time_tracking import (
+    AttendanceReport,
+    EmployeeSchedule,
+    RecordStatus,
+    TimeControlEvent,
+    TimeTrackingRecord,
+)
+from app.models.user import User
+from services import attendance_report_engine as are
+
+
+def _at(day: date, hh: int, mm: int = 0) -> datetime:
+    return datetime(day.year, day.month, day.day, hh, mm, tzinfo=timezone.utc)
+
+
+@pytest.fixture()
+def seeded():
+    Base.metadata.create_all(bind=engine)
+    _migrate_smart_time_control_tables()  # columnas nuevas en BD locales ya existentes
+    db = SessionLocal()
+    suf = uuid.uuid4().hex[:8]
+    user = User(
+        email=f"are_{suf}@example.test",
+        hashed_password=get_password_hash("TestPass1"),
+        full_name="Report Tester",
+        is_active=True,
+    )
+    db.add(user)
+    db.flush()
+
+    today = datetime.now(timezone.utc).date()
+    # Lunes de hace dos semanas: semana completa cerrada.
+    monday = today - timedelta(days=today.weekday() + 14)
+    emp = f"E{suf}"
+    for dow in range(5):
+        db.add(EmployeeSchedule(employee_id=emp, user_id=user.id, day_of_week=dow,
+                                start_time="09:00", end_time="17:00", is_active=True))
+
+    # Lunes: 09:00-18:30 con pausa de 30 min → 9h trabajadas, 1h extra.
+    r1 = TimeTrackingRecord(employee_id=emp, user_id=user.id, status=RecordStatus.COMPLETED,
+                            check_in_time=_at(monday, 9), check_out_time=_at(monday, 18, 30))
+    # Martes: llega 09:40 (retraso > gracia), sale 17:00, sin eventos → break_duration 0.25h.
+    tuesday = monday + timedelta(days=1)
+    r2 = TimeTrackingRecord(employee_id=emp, user_id=user.id, status=RecordStatus.COMPLETED,
+                            check_in_time=_at(tuesday, 9, 40), check_out_time=_at(tuesday, 17),
+                            break_duration=0.25)
+    db.add_all([r1, r2])
+    db.flush()
+    db.add_all([
+        TimeControlEvent(user_id=user.id, employee_id=emp, record_id=r1.id,
+                         event_type="break-start", occurred_at=_at(monday, 13)),
+        TimeControlEvent(user_id=user.id, employee_id=emp, record_id=r1.id,
+                         event_type="break-end", occurred_at=_at(monday, 13, 30)),
+    ])
+    db.commit()
+    try:
+        yield db, user, emp, monday
+    finally:
+        db.close()
+
+
+def test_compute_daily_hours_breaks_late_and_absences(seeded):
+    db, user, emp, monday = seeded
+    daily = are.compute_daily(db, user_id=user.id, start_day=monday, end_day=monday + timedelta(days=4))
+    by_day = {row["day"]: row for row in daily.to_dict("records")}
+
+    mon = by_day[monday]
+    assert mon["worked_hours"] == pytest.approx(9.0)
+    assert mon["break_hours"] == pytest.approx(0.5)
+    assert mon["overtime_hours"] == pytest.approx(1.0)
+    assert mon["late_check_ins"] == 0
+
+    tue = by_day[monday + timedelta(days=1)]
+    assert tue["worked_hours"] == pytest.approx(7 + 20 / 60 - 0.25)
+    assert tue["late_check_ins"] == 1
+    assert tue["overtime_hours"] == 0
+
+    # Miércoles a viernes programados y sin fichaje → ausencias.
+    assert int(daily["absences"].sum()) == 3
+    assert by_day[monday + timedelta(days=2)]["expected_hours"] == pytest.approx(8.0)
+
+
+def test_closed_days_are_snapshotted_and_reused(seeded, monkeypatch):
+    db, user, emp, monday = seeded
+    friday = monday + timedelta(days=4)
+    first = are.daily_report(db, user_id=user.id, start_day=monday, end_day=friday)
+    stored = db.query(AttendanceReport).filter(
+        AttendanceReport.user_id == user.id, AttendanceReport.period_type == "daily"
+    ).all()
+    assert len(stored) == 5
+    assert all(r.is_locked for r in stored)
+
+    def _boom(*args, **kwargs):
+        raise AssertionError("no debería recalcular días con snapshot")
+
+    monkeypatch.setattr(are, "compute_daily", _boom)
+    second = are.daily_report(db, user_id=user.id, start_day=monday, end_day=friday)
+    cols = ["worked_hours", "overtime_hours", "break_hours", "late_check_ins", "absences"]
+    assert second[cols].round(4).to_dict("records") == first[cols].round(4).to_dict("records")
+
+
+def test_open_record_is_capped_at_its_day_and_not_snapshotted(seeded):
+    db, user, emp, monday = seeded
+    wednesday = monday + timedelta(days=2)
+    friday = monday + timedelta(days=4)
+    db.add(TimeTrackingRecord(employee_id=emp, user_id=user.id, status=RecordStatus.ACTIVE,
+                              check_in_time=_at(wednesday, 20)))
+    db.commit()
+
+    daily = are.daily_report(db, user_id=user.id, start_day=monday, end_day=friday)
+    wed = daily[daily["day"] == wednesday].iloc[0]
+    assert wed["worked_hours"] == pytest.approx(4.0)
+    assert wed["open_records"] == 1
+
+    locked = {
+        start.date()
+        for (start,) in db.query(AttendanceReport.period_start).filter(
+            AttendanceReport.user_id == user.id, AttendanceReport.period_type == "daily"
+        )
+    }
+    assert wednesday not in locked and monday in locked
+    again = are.daily_report(db, user_id=user.id, start_day=monday, end_day=friday)
+    assert again[again["day"] == wednesday].iloc[0]["open_records"] == 1
+
+
+def test_report_groups_and_exports(seeded):
+    db, user, emp, monday = seeded
+    friday = monday + timedelta(days=4)
+    by_emp = are.build_report(db, user, start_day=monday, end_day=friday, group="employee")
+    assert list(by_emp["employee_id"]) == [emp]
+    assert by_emp.iloc[0]["days_worked"] == 2
+
+    weekly = are.build_report(db, user, start_day=monday, end_day=friday, group="week")
+    assert len(weekly) == 1
+    assert are.report_totals(weekly)["absences"] == 3
+
+    csv_text = "".join(are.iter_csv(by_emp))
+    assert csv_text.splitlines()[0].startswith("employee_id,employee_name")
+    assert emp in csv_text
+
+    pytest.importorskip("openpyxl")
+    xlsx = b"".join(are.iter_xlsx(by_emp))
+    assert xlsx[:2] == b"PK"
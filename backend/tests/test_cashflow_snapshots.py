@@ -0,0 +1,97 @@
+"""Tests snapshots de saldo y momentos diarios del libro de cashflow."""
+
+from __future__ import annotations
+
+import uuid
+
+import pytest  # pyright: ignore[reportMissingImports]
+from sqlalchemy.orm import Session
+
+from app.db.base import Base, SessionLocal, engine
+from app.models.cashflow_ledger import CashflowBalanceSnapshot, CashflowDailyAggregate, CashflowLedgerEntry
+from app.models.company import Company
+from services.cashflow_ledger_service import get_balance, get_summary, rebuild_snapshots, record_movement
+from services.thalos_security_engine import detect_cashflow_anomaly
+
+
+@pytest.fixture()
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _company(db: Session) -> int:
+    suf = uuid.uuid4().hex[:8]
+    company = Company(company_name=f"Cashflow Co {suf}", slug=f"cashflow-{suf}")
+    db.add(company)
+    db.commit()
+    return company.id
+
+
+def _state(db: Session, company_id: int):
+    snap = db.get(CashflowBalanceSnapshot, company_id)
+    aggs = (
+        db.query(CashflowDailyAggregate)
+        .filter(CashflowDailyAggregate.company_id == company_id)
+        .all()
+    )
+    return (
+        (round(snap.total_in, 2), round(snap.total_out, 2), snap.entries_count, snap.last_entry_id),
+        sorted((a.day, a.source, a.direction, a.entries_count, round(a.amount_sum, 2)) for a in aggs),
+    )
+
+
+def test_record_movement_maintains_snapshot(db: Session):
+    cid = _company(db)
+    record_movement(db, company_id=cid, amount=100.0, direction="in", source="TPV")
+    record_movement(db, company_id=cid, amount=40.0, direction="in", source="CRM")
+    last = record_movement(db, company_id=cid, amount=25.0, direction="out", source="TPV")
+
+    (totals, aggs) = _state(db, cid)
+    assert totals == (140.0, 25.0, 3, last.id)
+    assert {(s, d, n) for _, s, d, n, _ in aggs} == {("TPV", "in", 1), ("CRM", "in", 1), ("TPV", "out", 1)}
+    assert get_balance(db, company_id=cid) == 115.0
+
+    summary = get_summary(db, company_id=cid, days=30)
+    assert summary["total_in"] == 140.0 and summary["total_out"] == 25.0
+    assert summary["by_source"] == {"TPV": 100.0, "CRM": 40.0}
+    assert summary["entries_count"] == 3
+    assert len(summary["recent"]) == 3
+
+
+def test_out_of_band_rows_are_delta_then_folded(db: Session):
+    cid = _company(db)
+    record_movement(db, company_id=cid, amount=10.0, source="TPV")
+    db.add(CashflowLedgerEntry(company_id=cid, amount=5.0, direction="in", source="LEGACY"))
+    db.commit()
+    assert get_balance(db, company_id=cid) == 15.0
+
+    record_movement(db, company_id=cid, amount=1.0, direction="out", source="TPV")
+    totals, _ = _state(db, cid)
+    assert totals[:3] == (15.0, 1.0, 3)
+    assert get_balance(db, company_id=cid) == 14.0
+
+
+def test_rebuild_matches_incremental(db: Session):
+    cid = _company(db)
+    for amount, direction in [(12.5, "in"), (7.25, "out"), (30.0, "in")]:
+        record_movement(db, company_id=cid, amount=amount, direction=direction, source="TPV")
+    incremental = _state(db, cid)
+    rebuild_snapshots(db, company_id=cid)
+    db.expire_all()
+    assert _state(db, cid) == incremental
+
+
+def test_anomaly_uses_stored_moments(db: Session):
+    cid = _company(db)
+    for amount in [50.0, 55.0, 48.0, 52.0, 5000.0]:
+        record_movement(db, company_id=cid, amount=amount, source="test")
+    result = detect_cashflow_anomaly(db, company_id=cid)
+    assert result["anomaly"] is True
+    assert [e["amount"] for e in result["suspicious_entries"]] == [5000.0]
+    assert result["average_amount"] == pytest.approx(1041.0)
+    assert result["stddev_amount"] > 0
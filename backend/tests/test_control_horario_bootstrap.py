@@ -0,0 +1,119 @@
+"""Tests agregador bootstrap de control horario: secciones paralelas, caché TTL y ciclo periódico."""
+
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+
+import pytest  # pyright: ignore[reportMissingImports]
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.jwt_auth import create_access_token
+from app.core.security import get_password_hash
+from app.db.base import Base, SessionLocal, engine
+from app.main import app
+from app.models.company import Company, UserCompany
+from app.models.company_employee import CompanyEmployee
+from app.models.user import User
+from services import control_horario_bootstrap as chb
+
+
+@pytest.fixture()
+def seeded(monkeypatch):
+    monkeypatch.setattr(settings, "CONTROL_HORARIO_PATTERNS_TTL_SEC", 300.0)
+    chb.invalidate_bootstrap_cache()
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    suf = uuid.uuid4().hex[:8]
+    user = User(
+        email=f"chb_{suf}@example.test",
+        hashed_password=get_password_hash("TestPass1"),
+        full_name="Bootstrap Tester",
+        is_active=True,
+    )
+    company = Company(company_name=f"CH Co {suf}", slug=f"ch-{suf}")
+    db.add_all([user, company])
+    db.flush()
+    db.add(UserCompany(user_id=user.id, company_id=company.id, role="owner"))
+    db.add(CompanyEmployee(company_id=company.id, full_name="Ana", employee_code=f"E{suf}", is_active=True))
+    db.commit()
+    db.refresh(user)
+    try:
+        yield db, user, company
+    finally:
+        db.close()
+        chb.invalidate_bootstrap_cache()
+
+
+def test_cached_section_hits_until_invalidated(seeded):
+    db, user, company = seeded
+    calls = []
+    section = chb.cached_section("patterns", company.id, lambda s, u: calls.append(1) or len(calls))
+    assert section(db, user) == 1
+    assert section(db, user) == 1
+    chb.invalidate_bootstrap_cache(company_id=company.id)
+    assert section(db, user) == 2
+
+
+def test_run_sections_isolates_failures(seeded):
+    import asyncio
+
+    _, user, _ = seeded
+
+    def boom(s, u):
+        raise RuntimeError("fallo")
+
+    results, timings = asyncio.run(
+        chb.run_sections(user, {"ok": (lambda s, u: u.id, None), "bad": (boom, "default")})
+    )
+    assert results == {"ok": user.id, "bad": "default"}
+    assert "ms" in timings["ok"] and "fallo" in timings["bad"]["error"]
+
+
+def test_run_sections_caps_open_sessions(seeded, monkeypatch):
+    import asyncio
+
+    _, user, _ = seeded
+    monkeypatch.setattr(chb, "_slots", threading.BoundedSemaphore(2))
+    lock = threading.Lock()
+    state = {"open": 0, "peak": 0}
+
+    def section(s, u):
+        with lock:
+            state["open"] += 1
+            state["peak"] = max(state["peak"], state["open"])
+        time.sleep(0.05)
+        with lock:
+            state["open"] -= 1
+        return u.id
+
+    sections = {f"s{i}": (section, None) for i in range(6)}
+    results, timings = asyncio.run(chb.run_sections(user, sections))
+    assert set(results.values()) == {user.id}
+    assert state["peak"] == 2
+    assert all("wait_ms" in t for t in timings.values())
+
+
+def test_bootstrap_endpoint_reports_timings(seeded):
+    _, user, company = seeded
+    token = create_access_token(user_id=str(user.id), email=user.email)
+    with TestClient(app) as client:
+        resp = client.get(
+            f"{settings.API_V1_STR}/control-horario/bootstrap",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert body["employees_source"] == "database"
+    assert [e["name"] for e in body["employees"]] == ["Ana"]
+    assert {"info", "status", "roster", "patterns", "tpv", "cost_analytics", "total_ms"} <= set(body["timings"])
+    assert body["cost_engine"]["company_id"] == company.id
+
+
+def test_periodic_cycle_evaluates_users(seeded):
+    db, user, _ = seeded
+    out = chb.run_control_horario_cycle(db)
+    assert out["users"] >= 1
+    assert out["companies_refreshed"] >= 1
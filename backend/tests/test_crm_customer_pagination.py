@@ -0,0 +1,113 @@
+"""Tests listado CRM paginado: cursor keyset (name, id), búsqueda en BD y COUNT cacheado."""
+
+from __future__ import annotations
+
+import uuid
+
+import pytest  # pyright: ignore[reportMissingImports]
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.jwt_auth import create_access_token
+from app.core.security import get_password_hash
+from app.db.base import Base, SessionLocal, engine
+from app.main import app
+from app.models.company import Company, UserCompany
+from app.models.customer import ContactPerson, Customer
+from app.models.user import User
+import services.crm_office_service as crm_svc
+
+
+@pytest.fixture()
+def tenant():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    suf = uuid.uuid4().hex[:8]
+    user = User(
+        email=f"crm_page_{suf}@example.test",
+        hashed_password=get_password_hash("TestPass1"),
+        full_name="CRM Pager",
+        is_active=True,
+    )
+    company = Company(company_name=f"Pager Co {suf}", slug=f"pager-{suf}")
+    db.add_all([user, company])
+    db.flush()
+    db.add(UserCompany(user_id=user.id, company_id=company.id, role="owner"))
+    # Nombres repetidos: el desempate por id no debe saltar ni repetir filas
+    for i in range(23):
+        cust = Customer(
+            name=f"Cliente {i % 7:02d}",
+            email=f"c{i}_{suf}@acme-example.com" if i % 3 else None,
+            phone=f"600{i:06d}",
+            tax_id=f"B{i:08d}",
+            company_id=company.id,
+            owner_user_id=user.id,
+        )
+        db.add(cust)
+        db.flush()
+        db.add(ContactPerson(customer_id=cust.id, name=f"Contacto {i}"))
+    db.add(Customer(name="Zapatería Núñez", email=f"zap_{suf}@shop-example.com", company_id=company.id))
+    db.commit()
+    db.refresh(user)
+    try:
+        yield db, user
+    finally:
+        db.close()
+
+
+def test_cursor_walks_every_customer_once(tenant):
+    db, user = tenant
+    seen, cursor = [], None
+    while True:
+        page = crm_svc.page_customers(db, user, limit=5, cursor=cursor)
+        assert page.total == 24
+        seen.extend((c.name, c.id) for c in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert len(seen) == 24 and len(set(seen)) == 24
+    assert seen == sorted(seen)
+    assert all(len(c.contacts) == 1 for c in crm_svc.page_customers(db, user, limit=3).items)
+
+    with pytest.raises(HTTPException) as exc:
+        crm_svc.page_customers(db, user, cursor="no-es-un-cursor")
+    assert exc.value.status_code == 400
+
+
+def test_search_prefix_and_contains(tenant):
+    db, user = tenant
+    assert crm_svc.page_customers(db, user, q="za").total == 1  # prefijo
+    assert crm_svc.page_customers(db, user, q="ería").total == 1  # subcadena (3+)
+    assert crm_svc.page_customers(db, user, q="B00000012").items[0].tax_id == "B00000012"
+    assert crm_svc.page_customers(db, user, q="cliente 03").total == 3
+    assert crm_svc.page_customers(db, user, q="100%").total == 0
+
+
+def test_count_cache_invalidated_on_write(tenant, monkeypatch):
+    db, user = tenant
+    monkeypatch.setattr(settings, "CRM_COUNT_CACHE_TTL_SEC", 60)
+    assert crm_svc.count_customers_matching(db, user) == 24
+    company_id = db.query(UserCompany.company_id).filter(UserCompany.user_id == user.id).scalar()
+    db.add(Customer(name="Nuevo", company_id=company_id))
+    db.commit()
+    assert crm_svc.count_customers_matching(db, user) == 25
+
+
+def test_endpoints_return_next_cursor(tenant):
+    _, user = tenant
+    token = create_access_token(user_id=str(user.id), email=user.email)
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    first = client.get("/api/v1/customers", params={"limit": 10}, headers=headers).json()
+    assert first["total"] == 24 and first["total_pages"] == 3 and len(first["data"]) == 10
+    nxt = client.get(
+        "/api/v1/customers", params={"limit": 10, "cursor": first["next_cursor"]}, headers=headers
+    ).json()
+    legacy = client.get("/api/v1/customers", params={"limit": 10, "page": 2}, headers=headers).json()
+    assert [c["id"] for c in nxt["data"]] == [c["id"] for c in legacy["data"]]
+
+    crm = client.get("/api/v1/crm/customers", params={"q": "zap"}, headers=headers).json()
+    assert crm["total"] == 1 and crm["next_cursor"] is None
+    assert crm["data"][0]["name"] == "Zapatería Núñez"
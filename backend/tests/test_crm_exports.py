@@ -0,0 +1,100 @@
+"""Tests exportaciones CRM en streaming: CSV por trozos, CSV.gz y XLSX write-only."""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import uuid
+from decimal import Decimal
+
+import pytest  # pyright: ignore[reportMissingImports]
+from fastapi.testclient import TestClient
+
+from app.core.jwt_auth import create_access_token
+from app.core.security import get_password_hash
+from app.db.base import Base, SessionLocal, engine
+from app.main import app
+from app.models.company import Company, UserCompany
+from app.models.crm_office import CustomerRecord
+from app.models.customer import Customer
+from app.models.user import User
+from services import crm_export_service as crm_export
+from services.crm_office_service import customer_scope
+
+ROWS = 40
+
+
+@pytest.fixture()
+def tenant():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    suf = uuid.uuid4().hex[:8]
+    user = User(
+        email=f"crm_export_{suf}@example.test",
+        hashed_password=get_password_hash("TestPass1"),
+        full_name="CRM Export",
+        is_active=True,
+    )
+    company = Company(company_name=f"Export Co {suf}", slug=f"export-{suf}")
+    db.add_all([user, company])
+    db.flush()
+    db.add(UserCompany(user_id=user.id, company_id=company.id, role="owner"))
+    for i in range(ROWS):
+        cust = Customer(name=f"Cliente, {i:03d}", email=f"e{i}@x.com", company_id=company.id)
+        db.add(cust)
+        db.flush()
+        db.add(
+            CustomerRecord(
+                company_id=company.id,
+                customer_id=cust.id,
+                title=f"Expediente {i}",
+                status="paid" if i % 2 else "open",
+                amount=Decimal("10.50"),
+            )
+        )
+    db.commit()
+    db.refresh(user)
+    token = create_access_token(user_id=str(user.id), email=user.email)
+    try:
+        yield db, user, {"Authorization": f"Bearer {token}"}
+    finally:
+        db.close()
+
+
+def test_csv_streams_in_chunks_header_first(tenant, monkeypatch):
+    db, user, _ = tenant
+    monkeypatch.setattr(crm_export, "CHUNK_BYTES", 256)
+    chunks = list(crm_export.iter_csv("clients", customer_scope(db, user)))
+    assert chunks[0] == b"id,name,email,phone,status,created_at\r\n"
+    assert len(chunks) > 3
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert len(rows) == ROWS + 1
+    assert rows[1][1] == "Cliente, 000" and rows[1][4] == "active"
+
+
+def test_csv_and_gzip_endpoints_match(tenant):
+    _, _, headers = tenant
+    client = TestClient(app)
+    plain = client.get("/api/v1/crm/export/cases", headers=headers)
+    assert plain.status_code == 200 and plain.headers["content-type"].startswith("text/csv")
+    packed = client.get("/api/v1/crm/export/cases", params={"gzip": "true"}, headers=headers)
+    assert packed.headers["content-disposition"].endswith("cases.csv.gz")
+    assert gzip.decompress(packed.content) == plain.content
+    rows = list(csv.reader(io.StringIO(plain.text)))
+    assert rows[0] == ["id", "client_id", "title", "status", "amount", "paid", "created_at"]
+    assert {r[5] for r in rows[1:]} == {"true", "false"} and len(rows) == ROWS + 1
+
+
+def test_xlsx_write_only_export(tenant):
+    from openpyxl import load_workbook  # pyright: ignore[reportMissingModuleSource]
+
+    _, _, headers = tenant
+    client = TestClient(app)
+    for url in ("/api/v1/office/export/clients/excel", "/api/v1/crm/export/clients?format=xlsx"):
+        resp = client.get(url, headers=headers)
+        assert resp.status_code == 200
+        ws = load_workbook(io.BytesIO(resp.content), read_only=True)["clients"]
+        rows = list(ws.iter_rows(values_only=True))
+        assert rows[0][:2] == ("id", "name") and len(rows) == ROWS + 1
+    assert client.get("/api/v1/office/export/unknown/excel", headers=headers).status_code == 404
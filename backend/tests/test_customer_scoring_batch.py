@@ -0,0 +1,144 @@
+"""Tests scoring por lotes: tpv_sales.customer_id, consultas agrupadas y caché customer_scores."""
+
+from __future__ import annotations
+
+import uuid
+
+import pytest  # pyright: ignore[reportMissingImports]
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.core.jwt_auth import create_access_token
+from app.core.security import get_password_hash
+from app.db.base import Base, SessionLocal, engine
+from app.main import app
+from app.models.company import Company, UserCompany
+from app.models.crm_office import CrmActivityLog
+from app.models.customer import Customer
+from app.models.customer_score import CustomerScore
+from app.models.fiscal import TPVSale
+from app.models.user import User
+from services.event_bus import emit_payment_registered
+from services.fiscal_engine import backfill_sale_customer_ids, build_fiscal_items_from_cart, persist_fiscal_sale
+import services.zeus_scoring_engine_v1 as scoring
+
+
+@pytest.fixture()
+def tenant():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    suf = uuid.uuid4().hex[:8]
+    user = User(
+        email=f"scoring_{suf}@example.test",
+        hashed_password=get_password_hash("TestPass1"),
+        full_name="Scoring Tester",
+        is_active=True,
+    )
+    company = Company(company_name=f"Scoring Co {suf}", slug=f"scoring-{suf}")
+    other = Company(company_name=f"Other Co {suf}", slug=f"other-{suf}")
+    db.add_all([user, company, other])
+    db.flush()
+    db.add(UserCompany(user_id=user.id, company_id=company.id, role="owner"))
+    customers = [Customer(name=f"Cliente {i}", company_id=company.id) for i in range(6)]
+    customers.append(Customer(name="Potencial", company_id=company.id, metadata_={"estimated_value": 80}))
+    foreign = Customer(name="Ajeno", company_id=other.id)
+    db.add_all(customers + [foreign])
+    db.commit()
+    db.refresh(user)
+    try:
+        yield db, user, company, customers, foreign
+    finally:
+        db.close()
+
+
+def _sell(db, user, company, price, customer_data=None, customer_id=None):
+    return persist_fiscal_sale(
+        db,
+        user_id=user.id,
+        ticket_id=f"S-{uuid.uuid4().hex[:10]}",
+        document_type="ticket",
+        payment_method="card",
+        fiscal_items=build_fiscal_items_from_cart([{"price": price, "quantity": 1, "iva_rate": 0}]),
+        company_id=company.id,
+        customer_data=customer_data,
+        customer_id=customer_id,
+    )
+
+
+def test_sale_customer_link_and_backfill(tenant):
+    db, user, company, customers, foreign = tenant
+    a, b = customers[0], customers[1]
+    s1 = _sell(db, user, company, 10, customer_data={"customer_id": str(a.id)})
+    s2 = _sell(db, user, company, 10, customer_id=b.id)
+    s3 = _sell(db, user, company, 10, customer_data={"customer_id": foreign.id})
+    assert [db.get(TPVSale, s).customer_id for s in (s1, s2, s3)] == [a.id, b.id, None]
+
+    # Venta previa a la columna: customer_data sin normalizar
+    db.query(TPVSale).filter(TPVSale.id == s1).update({"customer_id": None})
+    db.commit()
+    stats = backfill_sale_customer_ids(db, batch_size=1)
+    assert stats["from_customer_data"] >= 1
+    db.expire_all()
+    assert db.get(TPVSale, s1).customer_id == a.id
+    assert db.get(TPVSale, s3).customer_id is None
+
+
+def test_batch_scores_use_grouped_queries(tenant):
+    db, user, company, customers, _ = tenant
+    top = customers[0]
+    for _ in range(5):
+        _sell(db, user, company, 2000, customer_id=top.id)
+    _sell(db, user, company, 50, customer_id=customers[1].id)
+    for _ in range(4):
+        db.add(CrmActivityLog(company_id=company.id, customer_id=top.id, action="call"))
+    db.commit()
+    company_id = company.id
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        scores = scoring.score_customers_batch(db, company_id=company_id)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert len(statements) == 3
+    assert len(scores) == 7
+    assert scores[top.id]["lead_score"] == pytest.approx(40 + 20 + 8)
+    assert scores[top.id]["customer_priority"] == "medium"
+    assert scores[customers[1].id]["payment_score"] == 20.0
+    assert scores[customers[6].id]["potential_score"] == 80.0
+    assert scoring.score_customer(db, user=user, customer_id=top.id)["lead_score"] == scores[top.id]["lead_score"]
+
+
+def test_score_cache_refreshed_on_payment_event(tenant):
+    db, user, company, customers, _ = tenant
+    token = create_access_token(user_id=str(user.id), email=user.email)
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    first = client.get("/api/v1/zeus-core/customers/scores", headers=headers).json()
+    assert first["refreshed"] is True and first["total"] == 7 and len(first["items"]) == 7
+    assert first["items"][0]["customer_id"] == customers[6].id
+    assert client.get("/api/v1/zeus-core/customers/scores", headers=headers).json()["refreshed"] is False
+
+    target = customers[2]
+    sale_id = _sell(db, user, company, 4000, customer_id=target.id)
+    emit_payment_registered(
+        user_id=user.id,
+        user_email=user.email,
+        company_id=company.id,
+        customer_id=target.id,
+        ticket_id=None,
+        tpv_sale_id=sale_id,
+        payment_method="card",
+        amount=4000.0,
+        db=db,
+    )
+    row = (
+        db.query(CustomerScore)
+        .filter(CustomerScore.company_id == company.id, CustomerScore.customer_id == target.id)
+        .one()
+    )
+    assert row.sales_count == 1 and row.lead_score == pytest.approx(16 + 4)
+    top = client.get("/api/v1/zeus-core/customers/scores", params={"limit": 1}, headers=headers).json()
+    assert [i["customer_id"] for i in top["items"]] == [target.id]
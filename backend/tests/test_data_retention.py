@@ -0,0 +1,147 @@
+"""Tests retención: archivado por lotes a JSONL.gz, lectura del archivo y rollup conservado."""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest  # pyright: ignore[reportMissingImports]
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.db.base import Base, SessionLocal, engine
+from app.models.agent_activity import AgentActivity
+from app.models.agent_activity_hourly import AgentActivityHourly
+from app.models.data_archive_segment import DataArchiveSegment
+from app.models.thalos_alert import ThalosAlert
+from app.models.thalos_event import ThalosEvent
+import services.activity_metrics_service as activity_metrics
+import services.data_retention_service as retention
+
+# Reloj ficticio en 2001: solo las filas sembradas quedan por debajo del corte
+NOW = datetime(2001, 6, 1, tzinfo=timezone.utc)
+OLD = datetime(2001, 1, 10, 9, 0)
+
+
+@pytest.fixture()
+def seeded(tmp_path, monkeypatch):
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(settings, "RETENTION_ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "RETENTION_ARCHIVE_BACKEND", "local")
+    monkeypatch.setattr(settings, "RETENTION_ARCHIVE_FORMAT", "jsonl")
+    db = SessionLocal()
+    agent = f"RET{uuid.uuid4().hex[:8].upper()}"
+    rows = [
+        AgentActivity(
+            agent_name=agent,
+            action_type="test",
+            action_description=f"Antigua {i}",
+            status="completed",
+            user_email=f"{agent.lower()}_{i % 2}@example.test",
+            created_at=OLD + timedelta(minutes=i),
+        )
+        for i in range(7)
+    ]
+    rows.append(
+        AgentActivity(
+            agent_name=agent,
+            action_type="test",
+            action_description="Reciente",
+            status="completed",
+            created_at=datetime(2001, 5, 20, 12, 0),
+        )
+    )
+    db.add_all(rows)
+    db.commit()
+    try:
+        yield db, agent, tmp_path
+    finally:
+        db.query(AgentActivity).filter(AgentActivity.agent_name == agent).delete()
+        db.query(AgentActivityHourly).filter(AgentActivityHourly.agent_name == agent).delete()
+        db.commit()
+        db.close()
+
+
+def test_archive_moves_cold_rows_to_segments(seeded):
+    db, agent, root = seeded
+    assert retention.archive_table(db, "agent_activities", now=NOW, dry_run=True)["pending"] >= 7
+
+    last_segment = db.query(func.max(DataArchiveSegment.id)).scalar() or 0
+    report = retention.archive_table(db, "agent_activities", now=NOW, batch_size=3)
+    assert report["archived"] >= 7 and report["segments"] >= 3
+    left = db.query(AgentActivity.action_description).filter(AgentActivity.agent_name == agent).all()
+    assert [r[0] for r in left] == ["Reciente"]
+
+    segments = db.query(DataArchiveSegment).filter(DataArchiveSegment.id > last_segment).all()
+    assert segments and all((root / s.location).is_file() and s.fmt == "jsonl" for s in segments)
+
+    match = {"user_email": f"{agent.lower()}_1@example.test"}
+    found = retention.read_archive(db, "agent_activities", start=OLD, end=OLD + timedelta(hours=1), match=match)
+    assert sorted(r["action_description"] for r in found) == ["Antigua 1", "Antigua 3", "Antigua 5"]
+    assert retention.read_archive(db, "agent_activities", start=OLD + timedelta(days=1), match=match) == []
+
+
+def test_rollup_keeps_archived_hours(seeded):
+    db, agent, _ = seeded
+    retention.archive_table(db, "agent_activities", now=NOW)
+    # Una reconstrucción completa no debe borrar las horas que ya solo viven en el rollup
+    activity_metrics.rebuild_hourly_rollups(db)
+    total = (
+        db.query(AgentActivityHourly.activity_count)
+        .filter(AgentActivityHourly.agent_name == agent, AgentActivityHourly.hour == OLD)
+        .all()
+    )
+    assert sum(r[0] for r in total) == 7
+    status = {row["table"]: row for row in retention.retention_status(db, now=NOW)}
+    assert status["agent_activities"]["pending_rows"] == 0
+    assert status["agent_activities"]["archived_rows"] >= 7
+
+
+def test_rebuild_keeps_boundary_hour_shared_with_archive(seeded):
+    db, agent, _ = seeded
+    # Corte a mitad de la hora 09:00: 4 filas archivadas y 3 en crudo en la misma hora
+    days = retention.get_policy("agent_activities").hot_days
+    now = (OLD + timedelta(days=days, minutes=3, seconds=30)).replace(tzinfo=timezone.utc)
+    retention.archive_table(db, "agent_activities", now=now)
+    assert db.query(AgentActivity).filter(AgentActivity.agent_name == agent).count() == 4
+
+    activity_metrics.rebuild_hourly_rollups(db)
+    activity_metrics.rebuild_hourly_rollups(db, since=OLD - timedelta(days=1))
+    hour = (
+        db.query(func.sum(AgentActivityHourly.activity_count))
+        .filter(AgentActivityHourly.agent_name == agent, AgentActivityHourly.hour == OLD)
+        .scalar()
+    )
+    assert hour == 7
+
+
+def test_events_referenced_by_alerts_are_not_archived(seeded):
+    db, _, _ = seeded
+    tag = uuid.uuid4().hex[:8]
+    old = datetime(2001, 1, 5, tzinfo=timezone.utc)
+    kept = ThalosEvent(event_type="test", message=f"con alerta {tag}", created_at=old)
+    gone = ThalosEvent(event_type="test", message=f"sin alerta {tag}", created_at=old)
+    db.add_all([kept, gone])
+    db.flush()
+    db.add(ThalosAlert(event_id=kept.id, title=f"Alerta {tag}", resolved=False, created_at=old))
+    db.commit()
+    kept_id, gone_id = kept.id, gone.id
+
+    retention.archive_table(db, "thalos_events", now=NOW)
+    db.expire_all()
+    assert db.get(ThalosEvent, kept_id) is not None
+    assert db.query(ThalosAlert).filter(ThalosAlert.event_id == kept_id).count() == 1
+    assert db.get(ThalosEvent, gone_id) is None
+    archived = retention.read_archive(db, "thalos_events", match={"message": f"sin alerta {tag}"})
+    assert [r["id"] for r in archived] == [gone_id]
+
+    db.query(ThalosAlert).filter(ThalosAlert.event_id == kept_id).delete()
+    db.query(ThalosEvent).filter(ThalosEvent.id == kept_id).delete()
+    db.commit()
+
+
+def test_tables_with_incoming_foreign_keys_are_not_partitionable(seeded):
+    db, _, _ = seeded
+    assert not retention.get_policy("thalos_events").partitionable
+    with pytest.raises(ValueError, match="FK entrantes"):
+        retention.partition_conversion_sql(db, "thalos_events", now=NOW)
@@ -0,0 +1,149 @@
+"""Tests cliente HTTP compartido: pool keep-alive, reintentos, circuit breaker y métricas."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.config import settings
+from services import http_client
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Cola de códigos a devolver; vacía → 200
+    statuses: list = []
+    hits: list = []
+    cookies: list = []
+
+    def _reply(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        type(self).hits.append((self.command, self.client_address[1]))
+        type(self).cookies.append(self.headers.get("Cookie"))
+        status = type(self).statuses.pop(0) if type(self).statuses else 200
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header("Set-Cookie", "sid=tenant-a; Path=/")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture()
+def stub(monkeypatch):
+    _Stub.statuses = []
+    _Stub.hits = []
+    _Stub.cookies = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(settings, "HTTP_MAX_RETRIES", 2)
+    monkeypatch.setattr(settings, "HTTP_BREAKER_THRESHOLD", 3)
+    monkeypatch.setattr(settings, "HTTP_BREAKER_RESET_SEC", 30)
+    monkeypatch.setattr(http_client, "_backoff", lambda *a, **k: 0)
+    http_client.reset_state()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    http_client.reset_state()
+
+
+def test_keep_alive_reuses_connection(stub):
+    for _ in range(3):
+        assert http_client.get(f"{stub}/a").status_code == 200
+    ports = {port for _, port in _Stub.hits}
+    assert len(ports) == 1
+    assert http_client.session_for(f"{stub}/x") is http_client.session_for(f"{stub}/y")
+
+
+def test_get_retries_on_503(stub):
+    _Stub.statuses = [503, 200]
+    resp = http_client.get(f"{stub}/a")
+    assert resp.status_code == 200
+    assert len(_Stub.hits) == 2
+    stats = http_client.metrics_snapshot()["providers"]["external:127.0.0.1"]
+    assert stats["calls"] == 2 and stats["retries"] == 1 and stats["errors"] == 1
+
+
+def test_post_only_retried_on_429(stub):
+    _Stub.statuses = [503]
+    assert http_client.post(f"{stub}/a", json={}).status_code == 503
+    assert len(_Stub.hits) == 1
+
+    _Stub.statuses = [429, 200]
+    assert http_client.post(f"{stub}/a", json={}).status_code == 200
+    assert len(_Stub.hits) == 3
+
+
+def test_breaker_opens_then_half_opens(stub, monkeypatch):
+    _Stub.statuses = [500, 500, 500]
+    for _ in range(3):
+        assert http_client.post(f"{stub}/a").status_code == 500
+    with pytest.raises(http_client.CircuitOpenError):
+        http_client.get(f"{stub}/a")
+    assert len(_Stub.hits) == 3
+
+    # Otro host sin proveedor conocido no comparte el circuito
+    other = stub.replace("127.0.0.1", "localhost")
+    assert http_client.get(f"{other}/a").status_code == 200
+
+    breaker = http_client._breaker("external:127.0.0.1")
+    monkeypatch.setattr(breaker, "reset_sec", 0)
+    assert http_client.get(f"{stub}/a").status_code == 200
+    assert breaker.snapshot() == {"state": "closed", "consecutive_failures": 0, "trips": 1}
+
+
+def test_shared_session_does_not_keep_cookies(stub):
+    http_client.get(f"{stub}/a")
+    http_client.get(f"{stub}/a")
+    http_client.get(f"{stub}/a", cookies={"explicit": "1"})
+    assert _Stub.cookies == [None, None, "explicit=1"]
+    assert len(http_client.session_for(stub).cookies) == 0
+
+
+def test_async_request(stub):
+    _Stub.statuses = [502]
+
+    async def _run():
+        try:
+            return await http_client.async_request("GET", f"{stub}/a")
+        finally:
+            await http_client.aclose_async_clients()
+
+    resp = asyncio.run(_run())
+    assert resp.status_code == 200 and resp.json() == {"ok": True}
+    assert len(_Stub.hits) == 2
+
+
+@pytest.mark.parametrize("exc", [ValueError("cuerpo inválido"), KeyboardInterrupt()])
+def test_half_open_probe_is_released_on_unexpected_error(stub, monkeypatch, exc):
+    breaker = http_client._breaker("external:127.0.0.1")
+    for _ in range(3):
+        breaker.record_failure()
+    monkeypatch.setattr(breaker, "reset_sec", 0)
+
+    sess = http_client.session_for(stub)
+    real = sess.request
+
+    def _boom(*args, **kwargs):
+        raise exc
+
+    monkeypatch.setattr(sess, "request", _boom)
+    with pytest.raises(type(exc)):
+        http_client.get(f"{stub}/a")
+    monkeypatch.setattr(sess, "request", real)
+
+    assert http_client.get(f"{stub}/a").status_code == 200
+    assert breaker.snapshot()["state"] == "closed"
@@ -0,0 +1,95 @@
+"""Tests variantes responsive de imágenes de producto: caché por hash+tamaño, sin ampliar, srcset."""
+
+from __future__ import annotations
+
+import pytest  # pyright: ignore[reportMissingImports]
+from PIL import Image
+
+from app.core.config import settings
+from services import image_variants as iv
+
+
+@pytest.fixture()
+def static_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STATIC_DIR", str(tmp_path))
+    monkeypatch.setattr(iv, "_manifests", {})
+    monkeypatch.setattr(iv, "_source_sha", {})
+    monkeypatch.setattr(iv, "_inflight", {})
+    monkeypatch.setattr(iv, "_failed", {})
+    (tmp_path / "uploads" / "products").mkdir(parents=True)
+    return tmp_path
+
+
+def _legacy_image(root, name, size, mode="RGB"):
+    Image.new(mode, size, (200, 40, 40, 128) if mode == "RGBA" else (200, 40, 40)).save(
+        root / "uploads" / "products" / name
+    )
+    return f"{settings.STATIC_URL}/uploads/products/{name}"
+
+
+def test_lazy_generation_then_srcset_in_payload(static_dir):
+    url = _legacy_image(static_dir, "product_a.png", (1600, 1200), mode="RGBA")
+    assert iv.variants_for_url(url) is None  # encola, la petición no espera
+    future = iv.schedule_variants(url)
+    if future is not None:
+        future.result(timeout=10)
+
+    payload = iv.variants_for_url(url)
+    assert payload is not None
+    sizes = payload["sizes"]
+    assert [sizes[k]["width"] for k in ("thumb", "grid", "detail")] == [160, 400, 1024]
+    assert payload["srcset"].count("w,") == 2 and payload["srcset"].endswith("1024w")
+    thumb = static_dir / sizes["thumb"]["jpeg"][len(settings.STATIC_URL) + 1:]
+    with Image.open(thumb) as img:
+        assert img.size == (160, 120)
+        assert img.mode == "RGB"
+    assert iv.schedule_variants(url) is None  # ya lista: no se vuelve a encolar
+
+
+def test_small_images_are_not_upscaled_and_share_files(static_dir):
+    url = _legacy_image(static_dir, "tiny.jpg", (120, 90))
+    manifest = iv.render_variants(iv.resolve_source(url))
+    assert set(manifest["widths"].values()) == {120}
+    files = [p for p in (static_dir / "uploads" / "variants").rglob("*") if p.suffix in (".webp", ".jpg")]
+    assert len(files) == 2  # un tamaño x (webp, jpeg)
+
+
+def test_same_content_is_rendered_once_and_purged(static_dir):
+    a = _legacy_image(static_dir, "a.png", (800, 800))
+    (static_dir / "uploads" / "products" / "b.png").write_bytes(
+        (static_dir / "uploads" / "products" / "a.png").read_bytes()
+    )
+    first = iv.render_variants(iv.resolve_source(a))
+    second = iv.render_variants(static_dir / "uploads" / "products" / "b.png")
+    assert first == second
+    assert iv.purge_variants(first["sha256"]) == 6
+    assert not list((static_dir / "uploads" / "variants").rglob("*.*"))
+
+
+def test_external_and_traversal_urls_are_ignored(static_dir):
+    assert iv.resolve_source("https://cdn.example/x.png") is None
+    assert iv.resolve_source(f"{settings.STATIC_URL}/uploads/products/../../etc/passwd") is None
+    assert iv.variants_for_url(None) is None
+
+
+def test_failed_render_is_not_rescheduled_and_hash_is_cached(static_dir, monkeypatch):
+    path = static_dir / "uploads" / "products" / "broken.png"
+    path.write_bytes(b"no es una imagen")
+    url = f"{settings.STATIC_URL}/uploads/products/broken.png"
+    hashes = []
+    real_hash = iv.file_sha256
+    monkeypatch.setattr(iv, "file_sha256", lambda p: hashes.append(p) or real_hash(p))
+
+    future = iv.schedule_variants(url)
+    with pytest.raises(Exception):
+        future.result(timeout=10)
+    for _ in range(3):
+        assert iv.variants_for_url(url) is None
+        assert iv.schedule_variants(url) is None
+    assert len(hashes) == 1
+
+    path.write_bytes(b"otro contenido roto")  # fichero cambiado: nueva clave, se reintenta
+    retry = iv.schedule_variants(url)
+    assert retry is not None
+    with pytest.raises(Exception):
+        retry.result(timeout=10)
@@ -0,0 +1,142 @@
+"""Tests totales desnormalizados de facturas: mantenimiento transaccional, verificador y listado en 1 query."""
+
+from __future__ import annotations
+
+import uuid
+
+import pytest  # pyright: ignore[reportMissingImports]
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.core import security
+from app.core.security import get_password_hash
+from app.db.base import Base, SessionLocal, engine
+from app.main import app
+from app.models.company import Company
+from app.models.customer import Customer
+from app.models.erp import Invoice, InvoiceItem, Payment, PaymentMethod, PaymentStatus
+from app.models.user import User
+from services import invoice_totals_service as totals
+from services.scan_flow_service_v1 import _create_invoice_draft
+
+INVOICES = 15
+
+
+@pytest.fixture()
+def billing():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    suf = uuid.uuid4().hex[:8]
+    user = User(
+        email=f"invtot_{suf}@example.test",
+        hashed_password=get_password_hash("TestPass1"),
+        full_name="Invoice Totals",
+        is_active=True,
+    )
+    db.add(user)
+    db.flush()
+    invoices = []
+    for i in range(INVOICES):
+        inv = Invoice(invoice_number=f"TOT-{suf}-{i}", created_by=user.id)
+        inv.items = [
+            InvoiceItem(description="Servicio", quantity=2, unit_price=10.0, tax_rate=21.0),
+            InvoiceItem(description="Extra", quantity=1, unit_price=5.0, tax_rate=0.0),
+        ]
+        inv.payments = [Payment(amount=4.0, payment_method=PaymentMethod.CASH, status=PaymentStatus.COMPLETED)]
+        invoices.append(inv)
+    db.add_all(invoices)
+    db.commit()
+    db.refresh(user)
+    app.dependency_overrides[security.get_current_active_user] = lambda: user
+    try:
+        yield db, [inv.id for inv in invoices]
+    finally:
+        app.dependency_overrides.pop(security.get_current_active_user, None)
+        db.close()
+
+
+def test_totals_follow_items_and_payments(billing):
+    db, ids = billing
+    inv = db.get(Invoice, ids[0])
+    assert (inv.subtotal, inv.tax_amount, inv.total) == pytest.approx((25.0, 4.2, 29.2))
+    assert (inv.amount_paid, inv.amount_due) == pytest.approx((4.0, 25.2))
+    assert inv.items[0].total == pytest.approx(24.2)
+
+    inv.items[1].quantity = 3
+    inv.payments.append(Payment(amount=10.0, payment_method=PaymentMethod.CASH, status=PaymentStatus.PENDING))
+    db.flush()
+    assert (inv.subtotal, inv.total, inv.amount_due) == pytest.approx((35.0, 39.2, 35.2))
+
+    inv.payments[-1].status = PaymentStatus.COMPLETED
+    inv.discount_amount = 5.0
+    db.commit()
+    assert (inv.total, inv.amount_paid, inv.amount_due) == pytest.approx((34.2, 14.0, 20.2))
+
+    db.delete(inv.items[0])
+    db.rollback()
+    assert db.get(Invoice, ids[0]).total == pytest.approx(34.2)
+
+
+def test_checker_detects_and_fixes_bulk_drift(billing):
+    db, ids = billing
+    db.execute(update(Invoice).where(Invoice.id.in_(ids[:3])).values(total=0.0, amount_due=0.0))
+    db.commit()
+
+    report = totals.check_invoice_totals(db, limit=5)
+    drifted = {row["invoice_id"] for row in report["sample"]}
+    assert set(ids[:3]) <= drifted
+    assert report["fixed"] == 0
+
+    totals.check_invoice_totals(db, fix=True)
+    assert totals.check_invoice_totals(db)["mismatched"] == 0
+    assert db.get(Invoice, ids[0]).total == pytest.approx(29.2)
+
+
+def test_list_is_one_query_and_details_are_opt_in(billing, max_queries):
+    db, ids = billing
+    client = TestClient(app)
+
+    r = client.get("/api/v1/invoices/", params={"limit": 1000})
+    assert r.status_code == 200, r.text
+    assert max_queries(r, 1) == 1
+    body = r.json()
+    assert body["total"] >= INVOICES
+    row = next(inv for inv in body["data"] if inv["id"] == ids[0])
+    assert row["items"] is None and row["amount_due"] == pytest.approx(25.2)
+
+    # selectinload parte el IN en bloques de 500 ids: página corta para un presupuesto fijo
+    r = client.get("/api/v1/invoices/", params={"limit": 100, "include_details": "true"})
+    assert r.status_code == 200, r.text
+    max_queries(r, 3)
+    row = next(inv for inv in r.json()["data"] if inv["id"] == ids[0])
+    assert len(row["items"]) == 2 and len(row["payments"]) == 1
+
+
+def test_scan_flow_draft_keeps_rounded_amounts(billing):
+    db, ids = billing
+    user = db.get(Invoice, ids[0]).created_by
+    suf = uuid.uuid4().hex[:8]
+    company = Company(company_name=f"Totals Co {suf}", slug=f"totals-{suf}")
+    db.add(company)
+    db.flush()
+    customer = Customer(name="Cliente QR", company_id=company.id)
+    db.add(customer)
+    db.flush()
+
+    inv = _create_invoice_draft(
+        db, db.get(User, user), company_id=company.id, customer_id=customer.id, amount=100.0, description="QR"
+    )
+    db.commit()
+    db.refresh(inv)
+    assert (inv.subtotal, inv.tax_amount, inv.total, inv.amount_due) == pytest.approx((82.64, 17.36, 100.0, 100.0))
+    item = inv.items[0]
+    assert (item.subtotal, item.tax_amount, item.total) == pytest.approx((82.64, 17.36, 100.0))
+
+    totals.backfill_invoice_totals(db)
+    db.expire_all()
+    assert db.get(Invoice, inv.id).total == pytest.approx(100.0)
+    assert inv.id not in {row["invoice_id"] for row in totals.check_invoice_totals(db, limit=10_000)["sample"]}
+
+    item.quantity = 2
+    db.commit()
+    assert (item.subtotal, item.total) == pytest.approx((165.28, 165.28 * 1.21))
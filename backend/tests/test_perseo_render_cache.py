@@ -0,0 +1,117 @@
+"""Tests caché de renders PERSEO y pasada única MP4 + GIF."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.config import settings
+from services import perseo_render_cache as rc
+from services import perseo_video_pro_engine_v4 as v4
+
+SCRIPT = {
+    "hook": "¿Sin ventas?",
+    "problem": "Tu anuncio falla",
+    "solution": "Acme lo arregla",
+    "cta": "Reserva demo hoy",
+}
+
+
+@pytest.fixture()
+def static_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STATIC_DIR", str(tmp_path / "static"))
+    monkeypatch.setattr(settings, "PERSEO_RENDER_CACHE_ENABLED", True)
+    monkeypatch.setenv("TEMP_DIR", str(tmp_path / "tmp"))
+    return tmp_path / "static"
+
+
+def _image(path: Path, color=(10, 120, 200)) -> Path:
+    from PIL import Image
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (64, 96), color).save(path)
+    return path
+
+
+def _key(img: Path, **over):
+    kw = dict(engine="e", version="1", tenant_id=3, script=SCRIPT, branding={"c": 1}, params={"fps": 30})
+    kw.update(over)
+    return rc.render_key(img, **kw)
+
+
+def test_key_tracks_image_script_and_params(static_dir, tmp_path):
+    img = _image(tmp_path / "a.jpg")
+    base = _key(img)
+    assert base == _key(img)
+    assert base != _key(img, script={**SCRIPT, "cta": "Otra cosa ya"})
+    assert base != _key(img, params={"fps": 24})
+    assert base != _key(_image(tmp_path / "b.jpg", color=(1, 2, 3)))
+    assert _key(tmp_path / "missing.jpg") is None
+
+
+def test_store_lookup_invalidates_missing_local_asset(static_dir, tmp_path):
+    key = _key(_image(tmp_path / "a.jpg"))
+    video = static_dir / "uploads" / "videos" / "3" / "x.mp4"
+    video.parent.mkdir(parents=True)
+    video.write_bytes(b"mp4")
+    rc.store(key, {"video_url": "/static/uploads/videos/3/x.mp4", "validation": {"ok": True}})
+    assert rc.lookup(key)["validation"] == {"ok": True}
+    video.unlink()
+    assert rc.lookup(key) is None
+
+
+def test_single_pass_produces_mp4_gif_and_duration(static_dir, tmp_path):
+    try:
+        v4._ffmpeg_path()
+    except Exception:
+        pytest.skip("ffmpeg no disponible")
+    img = _image(tmp_path / "in.jpg")
+    out, gif = tmp_path / "out.mp4", tmp_path / "preview.gif"
+    with patch.object(v4, "DURATION_SEC", 2), patch.object(v4, "PREVIEW_SECONDS", 1), patch.object(
+        v4, "MIN_OUTPUT_BYTES", 256
+    ):
+        run = v4._run_ffmpeg_production(img, out, "[0:v]scale=108:192,format=yuv420p[out]", gif_path=gif)
+    assert run["duration_sec"] == 2.0
+    assert run["gif"] == gif and gif.stat().st_size > 500
+    assert out.stat().st_size >= 256
+
+
+@patch("services.perseo_video_pro_engine_v4._crm_integrate", return_value={"crm_saved": True})
+@patch("services.perseo_video_pro_engine_v4._resolve_tenant_id")
+@patch("services.perseo_video_pro_engine_v4.get_execution_status")
+@patch("services.perseo_video_pro_engine_v4._ffmpeg_path", return_value="/usr/bin/ffmpeg")
+def test_identical_request_hits_cache_without_ffmpeg(_ff, mock_exec, mock_tenant, mock_crm, static_dir, tmp_path):
+    mock_exec.return_value = {"execution_mode": "REAL", "writes_enabled": True}
+    company = MagicMock(id=3, slug="acme", company_name="Acme", metadata_={})
+    mock_tenant.return_value = (company, 3)
+    source = _image(tmp_path / "src.jpg")
+    video = static_dir / "uploads" / "videos" / "3" / "v.mp4"
+    video.parent.mkdir(parents=True)
+    video.write_bytes(b"x" * 5000)
+
+    def _download(image_url, user_id, work):
+        (work / "input.jpg").write_bytes(source.read_bytes())
+
+    def _render(input_path, output_path, fc, gif_path=None):
+        output_path.write_bytes(b"x" * 5000)
+        return {"duration_sec": 15.0, "gif": None}
+
+    with patch.object(v4, "_download_image_to_workdir", side_effect=_download), patch.object(
+        v4, "_run_ffmpeg_production", side_effect=_render
+    ) as mock_render, patch.object(
+        v4,
+        "upload_tenant_video",
+        return_value={"storage": "local", "url": "/static/uploads/videos/3/v.mp4", "path": str(video)},
+    ) as mock_upload:
+        kwargs = dict(image_url="https://x.com/p.jpg", enable_preview_gif=False, **SCRIPT)
+        first = v4.generate_perseo_video_pro_v4(MagicMock(), MagicMock(id=1), **kwargs)
+        second = v4.generate_perseo_video_pro_v4(MagicMock(), MagicMock(id=1), **kwargs)
+
+    assert first["render_cache"]["hit"] is False
+    assert second["render_cache"]["hit"] is True
+    assert second["video_url"] == first["video_url"]
+    assert second["validation"]["duration_15s"] is True
+    assert mock_render.call_count == 1 and mock_upload.call_count == 1
+    assert mock_crm.call_count == 2  # el CRM registra cada petición
@@ -0,0 +1,137 @@
+"""Tests caché de principal autenticado (get_current_user)."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+
+import pytest  # pyright: ignore[reportMissingImports]
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core import principal_cache as pc
+from app.core.auth import get_current_user
+from app.core.jwt_auth import create_access_token
+from app.core.security import get_password_hash
+from app.db.base import Base, SessionLocal, engine
+from app.db.session import get_db
+from app.main import app
+from app.models.user import User
+
+
+@pytest.fixture()
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture()
+def user(db):
+    u = User(
+        email=f"pc_{uuid.uuid4().hex[:8]}@example.test",
+        hashed_password=get_password_hash("TestPass1"),
+        full_name="Principal Cache",
+        is_active=True,
+    )
+    db.add(u)
+    db.commit()
+    db.refresh(u)
+    return u
+
+
+def _resolve(token: str):
+    session = SessionLocal()
+    try:
+        found = asyncio.run(get_current_user(request=None, db=session, token=token))
+        return found.id, found.email, found.is_active
+    finally:
+        session.close()
+
+
+def test_lru_evicts_oldest_and_counts():
+    cache = pc.PrincipalCache(maxsize=2, ttl_sec=60)
+    users = [User(id=i, email=f"u{i}@x.test", hashed_password="x") for i in (1, 2, 3)]
+    for u in users:
+        cache.put(f"k{u.id}", u, {"sub": str(u.id)})
+    assert cache.get("k1") is None
+    assert cache.get("k3").user_id == 3
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_ttl_capped_at_token_expiry():
+    cache = pc.PrincipalCache(maxsize=10, ttl_sec=600)
+    u = User(id=7, email="u7@x.test", hashed_password="x")
+    cache.put("expired", u, {"exp": time.time() - 1})
+    cache.put("short", u, {"exp": time.time() + 5})
+    assert cache.get("expired") is None
+    assert cache.get("short").expires_at <= time.time() + 5
+
+
+def test_second_call_hits_cache_and_update_invalidates(db, user):
+    token = create_access_token(user_id=str(user.id), email=user.email)
+    before = pc.principal_cache.stats()
+
+    assert _resolve(token)[0] == user.id
+    assert _resolve(token)[0] == user.id
+    after = pc.principal_cache.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+    user.is_active = False
+    db.commit()
+    assert pc.principal_cache.get(pc.token_cache_key(token)) is None
+    assert _resolve(token)[2] is False
+
+
+def test_logout_invalidation_by_user(db, user):
+    token = create_access_token(user_id=str(user.id), email=user.email)
+    _resolve(token)
+    pc.principal_cache.invalidate_user(user.id)
+    assert pc.principal_cache.get(pc.token_cache_key(token)) is None
+
+
+def test_invalid_token_not_cached():
+    with pytest.raises(HTTPException):
+        _resolve("not-a-jwt")
+    assert pc.principal_cache.get(pc.token_cache_key("not-a-jwt")) is None
+
+
+@pytest.mark.parametrize(
+    "url,error",
+    [("sqlite:////nonexistent-zeus-dir/zeus.db", "db_unavailable"), ("sqlite:///{tmp}/empty.db", "schema_missing")],
+)
+def test_database_errors_map_to_503(tmp_path, url, error):
+    broken = create_engine(url.format(tmp=tmp_path))
+
+    def _broken_db():
+        with Session(broken) as session:
+            yield session
+
+    app.dependency_overrides[get_db] = _broken_db
+    try:
+        r = TestClient(app).post(
+            "/api/v1/auth/register",
+            json={
+                "email": f"db503_{uuid.uuid4().hex[:8]}@zeus-tests.com",
+                "password": "TestPass1",
+                "full_name": "Sin BD",
+                "phone": "600000000",
+                "company_name": "Sin BD",
+                "business_type": "retail",
+            },
+        )
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        broken.dispose()
+    assert r.status_code == 503, r.text
+    assert r.json()["detail"]["error"] == error
@@ -0,0 +1,468 @@
+"""
+Regresión de planes: las consultas calientes no deben degradar a un recorrido completo.
+
+Siembra volúmenes realistas en una BD aislada (SQLite; Postgres si ZEUS_EXPLAIN_DATABASE_URL
+apunta a una base desechable), llama a los puntos de entrada de los servicios, captura todo el
+SQL que emiten y comprueba su EXPLAIN. Las consultas de HOT_QUERIES reproducen a mano filtros
+de servicios sin punto de entrada aislable y solo protegen los índices, no el SQL del servicio.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, List, Tuple
+
+import pytest  # pyright: ignore[reportMissingImports]
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.db.base import Base, import_all_models
+from app.models.agent_activity import AgentActivity
+from app.models.agent_activity_hourly import AgentActivityHourly
+from app.models.cashflow_ledger import CashflowDailyAggregate, CashflowLedgerEntry
+from app.models.cashflow_ledger import CashflowBalanceSnapshot
+from app.models.company import Company, UserCompany
+from app.models.crm_office import CrmActivityLog
+from app.models.customer import Customer
+from app.models.customer_score import CustomerScore
+from app.models.fiscal import TPVSale
+from app.models.sales_daily_rollup import SalesDailyRollup
+from app.models.time_tracking import RecordStatus, TimeTrackingRecord
+from app.models.user import User
+from services.activity_metrics_service import aggregate_activity
+from services.cashflow_ledger_service import get_balance
+from services.crm_office_service import page_customers
+from services.zeus_scoring_engine_v1 import score_customers_batch
+
+NOW = datetime(2026, 6, 1, 12, 0)
+USERS, COMPANIES, CUSTOMERS = 20, 50, 400
+ROWS = 6000
+
+
+def _backends() -> List[str]:
+    out = ["sqlite"]
+    if os.getenv("ZEUS_EXPLAIN_DATABASE_URL"):
+        out.append("postgresql")
+    return out
+
+
+def _seed(engine) -> None:
+    rnd = random.Random(46)
+    ago = lambda days: NOW - timedelta(days=rnd.uniform(0, days))  # noqa: E731
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User.__table__),
+            [{"id": i, "email": f"plan{i}@example.test", "hashed_password": "x"} for i in range(1, USERS + 1)],
+        )
+        conn.execute(
+            insert(Company.__table__),
+            [{"id": i, "company_name": f"Plan {i}", "slug": f"plan-{i}"} for i in range(1, COMPANIES + 1)],
+        )
+        conn.execute(
+            insert(UserCompany.__table__),
+            [{"user_id": i, "company_id": i + 4, "role": "owner"} for i in range(1, USERS + 1)],
+        )
+        conn.execute(
+            insert(Customer.__table__),
+            [
+                {"id": i, "name": f"Cliente {i:04d}", "company_id": i % COMPANIES + 1}
+                for i in range(1, CUSTOMERS + 1)
+            ],
+        )
+        conn.execute(
+            insert(TPVSale.__table__),
+            [
+                {
+                    "user_id": i % USERS + 1,
+                    "company_id": i % COMPANIES + 1,
+                    "customer_id": rnd.randint(1, CUSTOMERS) if i % 3 == 0 else None,
+                    "ticket_id": f"T-{i:06d}",
+                    "document_type": "ticket",
+                    "sale_date": ago(730),
+                    "payment_method": rnd.choice(("cash", "card")),
+                    "subtotal": 10,
+                    "tax_amount": 2.1,
+                    "total": 12.1,
+                }
+                for i in range(ROWS)
+            ],
+        )
+        conn.execute(
+            insert(AgentActivity.__table__),
+            [
+                {
+                    "agent_name": rnd.choice(("ZEUS", "PERSEO", "RAFAEL", "THALOS", "JUSTICIA", "AFRODITA")),
+                    "action_type": "test",
+                    "action_description": f"Actividad {i}",
+                    "status": "pending" if i % 97 == 0 else rnd.choice(("completed", "failed")),
+                    "user_email": f"plan{i % USERS + 1}@example.test",
+                    "created_at": ago(365),
+                }
+                for i in range(ROWS)
+            ],
+        )
+        conn.execute(
+            insert(AgentActivityHourly.__table__),
+            [
+                {
+                    "hour": (NOW - timedelta(hours=i)).replace(minute=0, second=0),
+                    "agent_name": "ZEUS",
+                    "user_email": "",
+                    "status": "completed",
+                    "activity_count": 3,
+                }
+                for i in range(ROWS // 2)
+            ],
+        )
+        conn.execute(
+            insert(TimeTrackingRecord.__table__),
+            [
+                {
+                    "user_id": i % USERS + 1,
+                    "employee_id": f"E{i % 40:03d}",
+                    "check_in_time": ago(365),
+                    "status": RecordStatus.ACTIVE if i % 50 == 0 else RecordStatus.COMPLETED,
+                    "is_late_check_in": i % 7 == 0,
+                }
+                for i in range(ROWS // 2)
+            ],
+        )
+        conn.execute(
+            insert(CashflowLedgerEntry.__table__),
+            [
+                {
+                    "company_id": i % COMPANIES + 1,
+                    "amount": 10.0,
+                    "direction": "in",
+                    "source": "tpv",
+                    "created_at": ago(730),
+                }
+                for i in range(ROWS)
+            ],
+        )
+        conn.execute(
+            insert(CashflowBalanceSnapshot.__table__),
+            [{"company_id": c, "last_entry_id": ROWS - 200} for c in range(1, COMPANIES + 1)],
+        )
+        conn.execute(
+            insert(CashflowDailyAggregate.__table__),
+            [
+                {"company_id": c, "day": (NOW - timedelta(days=d)).date(), "source": "tpv", "direction": "in"}
+                for c in range(1, COMPANIES + 1)
+                for d in range(60)
+            ],
+        )
+        conn.execute(
+            insert(SalesDailyRollup.__table__),
+            [
+                {
+                    "company_id": c,
+                    "user_id": c % USERS + 1,
+                    "day": (NOW - timedelta(days=d)).date(),
+                    "channel": "tpv",
+                    "payment_method": "card",
+                    "vat_band": "21",
+                }
+                for c in range(1, COMPANIES + 1)
+                for d in range(60)
+            ],
+        )
+        conn.execute(
+            insert(CrmActivityLog.__table__),
+            [
+                {
+                    "company_id": i % COMPANIES + 1,
+                    "customer_id": rnd.randint(1, CUSTOMERS),
+                    "action": "note",
+                    "created_at": ago(365),
+                }
+                for i in range(ROWS // 2)
+            ],
+        )
+        conn.execute(
+            insert(CustomerScore.__table__),
+            [
+                {"company_id": i % COMPANIES + 1, "customer_id": i, "lead_score": rnd.uniform(0, 100)}
+                for i in range(1, CUSTOMERS + 1)
+            ],
+        )
+        conn.exec_driver_sql("ANALYZE")
+
+
+@pytest.fixture(scope="module", params=_backends())
+def plan_engine(request, tmp_path_factory):
+    import_all_models()
+    if request.param == "sqlite":
+        engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    else:
+        engine = create_engine(os.environ["ZEUS_EXPLAIN_DATABASE_URL"])
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    _seed(engine)
+    try:
+        yield engine
+    finally:
+        if request.param != "sqlite":
+            Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+
+
+def since(days: float) -> datetime:
+    return NOW - timedelta(days=days)
+
+
+# (nombre, tabla que no debe recorrerse entera, consulta equivalente a la del servicio)
+HOT_QUERIES: List[Tuple[str, str, Callable[[], Any]]] = [
+    (
+        "tpv_sales_window",
+        "tpv_sales",
+        lambda: select(func.sum(TPVSale.total)).where(TPVSale.user_id == 3, TPVSale.sale_date >= since(1)),
+    ),
+    (
+        "vat_quarter",
+        "tpv_sales",
+        lambda: select(TPVSale).where(
+            TPVSale.user_id == 3, TPVSale.sale_date >= since(120), TPVSale.sale_date < since(30)
+        ),
+    ),
+    (
+        "company_sales_window",
+        "tpv_sales",
+        lambda: select(func.count(), func.sum(TPVSale.total)).where(
+            TPVSale.company_id == 7, TPVSale.sale_date >= since(30)
+        ),
+    ),
+    (
+        "customer_scoring_revenue",
+        "tpv_sales",
+        lambda: select(TPVSale.customer_id, func.sum(TPVSale.total))
+        .where(TPVSale.company_id == 7, TPVSale.customer_id.in_([7, 57, 107]), TPVSale.sale_date >= since(90))
+        .group_by(TPVSale.customer_id),
+    ),
+    ("ticket_lookup", "tpv_sales", lambda: select(TPVSale.id).where(TPVSale.ticket_id == "T-000042")),
+    (
+        "automation_queue",
+        "agent_activities",
+        lambda: select(AgentActivity.id).where(AgentActivity.open_status_clause()).order_by(AgentActivity.created_at),
+    ),
+    (
+        "agent_feed",
+        "agent_activities",
+        lambda: select(AgentActivity.id)
+        .where(AgentActivity.agent_name == "PERSEO", AgentActivity.created_at >= since(7))
+        .order_by(AgentActivity.created_at.desc())
+        .limit(50),
+    ),
+    (
+        "user_activity",
+        "agent_activities",
+        lambda: select(AgentActivity.id).where(
+            AgentActivity.user_email == "plan3@example.test", AgentActivity.created_at >= since(30)
+        ),
+    ),
+    (
+        "activity_window_stats",
+        "agent_activities",
+        lambda: select(AgentActivity.agent_name, AgentActivity.status, func.count())
+        .where(AgentActivity.created_at >= since(1), AgentActivity.created_at < NOW)
+        .group_by(AgentActivity.agent_name, AgentActivity.status),
+    ),
+    (
+        "activity_hourly_range",
+        "agent_activity_hourly",
+        lambda: select(AgentActivityHourly.agent_name, func.sum(AgentActivityHourly.activity_count))
+        .where(AgentActivityHourly.hour >= since(14), AgentActivityHourly.hour < since(7))
+        .group_by(AgentActivityHourly.agent_name),
+    ),
+    (
+        "detect_patterns_late",
+        "time_tracking_records",
+        lambda: select(func.count(TimeTrackingRecord.id)).where(
+            TimeTrackingRecord.user_id == 3,
+            TimeTrackingRecord.employee_id == "E003",
+            TimeTrackingRecord.check_in_time >= since(30),
+            TimeTrackingRecord.is_late_check_in.is_(True),
+        ),
+    ),
+    (
+        "active_time_record",
+        "time_tracking_records",
+        lambda: select(TimeTrackingRecord.id).where(
+            TimeTrackingRecord.user_id == 3,
+            TimeTrackingRecord.employee_id == "E003",
+            TimeTrackingRecord.status == RecordStatus.ACTIVE,
+        ),
+    ),
+    (
+        "attendance_report",
+        "time_tracking_records",
+        lambda: select(TimeTrackingRecord.id).where(
+            TimeTrackingRecord.user_id == 3,
+            TimeTrackingRecord.check_in_time >= since(31),
+            TimeTrackingRecord.check_in_time < NOW,
+        ),
+    ),
+    (
+        "cashflow_recent",
+        "cashflow_ledger",
+        lambda: select(CashflowLedgerEntry.id)
+        .where(CashflowLedgerEntry.company_id == 7, CashflowLedgerEntry.created_at >= since(30))
+        .order_by(CashflowLedgerEntry.created_at.desc()),
+    ),
+    (
+        "cashflow_delta",
+        "cashflow_ledger",
+        lambda: select(func.sum(CashflowLedgerEntry.amount)).where(
+            CashflowLedgerEntry.company_id == 7, CashflowLedgerEntry.id > ROWS - 200
+        ),
+    ),
+    (
+        "cashflow_daily_window",
+        "cashflow_daily_aggregates",
+        lambda: select(CashflowDailyAggregate.day, CashflowDailyAggregate.amount_sum).where(
+            CashflowDailyAggregate.company_id == 7, CashflowDailyAggregate.day >= date(2026, 5, 1)
+        ),
+    ),
+    (
+        "sales_rollup_period",
+        "sales_daily_rollup",
+        lambda: select(func.sum(SalesDailyRollup.total_amount)).where(
+            SalesDailyRollup.company_id == 7, SalesDailyRollup.day >= date(2026, 5, 1)
+        ),
+    ),
+    (
+        "crm_customer_page",
+        "customers",
+        lambda: select(Customer.id, Customer.name)
+        .where(Customer.company_id == 7)
+        .order_by(Customer.name.asc(), Customer.id.asc())
+        .limit(25),
+    ),
+    (
+        "crm_activity_engagement",
+        "crm_activity_logs",
+        lambda: select(CrmActivityLog.customer_id, func.count())
+        .where(
+            CrmActivityLog.company_id == 7,
+            CrmActivityLog.customer_id.in_([7, 57, 107]),
+            CrmActivityLog.created_at >= since(90),
+        )
+        .group_by(CrmActivityLog.customer_id),
+    ),
+    (
+        "customer_scores_top",
+        "customer_scores",
+        lambda: select(CustomerScore.customer_id)
+        .where(CustomerScore.company_id == 7)
+        .order_by(CustomerScore.lead_score.desc())
+        .limit(20),
+    ),
+]
+
+
+def _capture(engine, run: Callable[[Session], Any]) -> List[Tuple[str, Any]]:
+    """Todas las sentencias que emite ``run`` con una sesión sobre ``engine``."""
+    seen: List[Tuple[str, Any]] = []
+
+    def _listener(conn, cursor, statement, parameters, context, executemany):
+        seen.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _listener)
+    try:
+        with Session(engine) as db:
+            run(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", _listener)
+    return seen
+
+
+def _run_stmt(stmt) -> Callable[[Session], Any]:
+    return lambda db: db.execute(stmt).all()
+
+
+def _plan(engine, sql: str, params: Any) -> List[str]:
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            return [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params)]
+        return [row[0] for row in conn.exec_driver_sql(f"EXPLAIN {sql}", params)]
+
+
+def _full_scans(engine, plan: List[str], table: str) -> List[str]:
+    if engine.dialect.name == "sqlite":
+        # "SCAN t" recorre la tabla; "SCAN t USING [COVERING] INDEX" recorre un índice (parcial u ordenado)
+        pattern = re.compile(rf"^SCAN (TABLE )?{table}$")
+        return [line for line in plan if pattern.match(line.strip())]
+    return [line for line in plan if f"Seq Scan on {table}" in line]
+
+
+@pytest.mark.parametrize("name,table,build", HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+def test_hot_query_uses_index(plan_engine, name, table, build):
+    sql, params = _capture(plan_engine, _run_stmt(build()))[-1]
+    plan = _plan(plan_engine, sql, params)
+    assert not _full_scans(plan_engine, plan, table), f"{name}: recorrido completo de {table}\n" + "\n".join(plan)
+
+
+def _customer_pages(db: Session) -> None:
+    user = db.get(User, 3)
+    first = page_customers(db, user, limit=3, cached_total=False)
+    page_customers(db, user, limit=3, cursor=first.next_cursor, with_total=False)
+
+
+# (nombre, tablas que no deben recorrerse enteras, llamada al servicio)
+SERVICE_CALLS: List[Tuple[str, Tuple[str, ...], Callable[[Session], Any]]] = [
+    (
+        "aggregate_activity_raw",
+        ("agent_activities",),
+        lambda db: aggregate_activity(db, start=since(1), end=NOW),
+    ),
+    (
+        "aggregate_activity_rollup",
+        ("agent_activities", "agent_activity_hourly"),
+        lambda db: aggregate_activity(db, start=since(30) + timedelta(minutes=20), end=NOW, agent="ZEUS"),
+    ),
+    ("page_customers", ("customers", "customer_contacts", "user_companies"), _customer_pages),
+    (
+        "score_customers_batch",
+        ("customers", "tpv_sales", "crm_activity_logs"),
+        lambda db: score_customers_batch(db, company_id=7, customer_ids=[7, 57, 107]),
+    ),
+    (
+        "score_customers_company",
+        ("customers", "tpv_sales", "crm_activity_logs"),
+        lambda db: score_customers_batch(db, company_id=7),
+    ),
+    ("get_balance", ("cashflow_ledger", "cashflow_balance_snapshots"), lambda db: get_balance(db, company_id=7)),
+]
+
+
+@pytest.mark.parametrize("name,tables,call", SERVICE_CALLS, ids=[c[0] for c in SERVICE_CALLS])
+def test_service_plans_use_indexes(plan_engine, name, tables, call):
+    statements = _capture(plan_engine, call)
+    assert statements, f"{name}: no emitió SQL"
+    for sql, params in statements:
+        plan = _plan(plan_engine, sql, params)
+        scans = [line for table in tables for line in _full_scans(plan_engine, plan, table)]
+        assert not scans, f"{name}: recorrido completo\n{sql}\n" + "\n".join(plan)
+
+
+# Índices del paquete 0052 que deben elegirse (el planner de SQLite es determinista tras ANALYZE)
+EXPECTED_INDEXES = {
+    "tpv_sales_window": "ix_tpv_sales_user_sale_date",
+    "vat_quarter": "ix_tpv_sales_user_sale_date",
+    "company_sales_window": "ix_tpv_sales_company_sale_date",
+    "automation_queue": "ix_agent_activities_open_created",
+    "agent_feed": "ix_agent_activities_agent_created",
+    "detect_patterns_late": "ix_time_tracking_records_user_employee_checkin",
+}
+
+
+@pytest.mark.parametrize("name,index", sorted(EXPECTED_INDEXES.items()))
+def test_workload_index_is_chosen(plan_engine, name, index):
+    if plan_engine.dialect.name != "sqlite":
+        pytest.skip("Postgres puede preferir otro índice válido según estadísticas")
+    build = next(b for n, _, b in HOT_QUERIES if n == name)
+    sql, params = _capture(plan_engine, _run_stmt(build()))[-1]
+    assert index in "\n".join(_plan(plan_engine, sql, params))
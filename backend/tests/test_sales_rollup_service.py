@@ -0,0 +1,118 @@
+"""Tests rollup diario de ventas: incremental (persist_fiscal_sale) vs reconstrucción."""
+
+from __future__ import annotations
+
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import pytest  # pyright: ignore[reportMissingImports]
+
+from app.core.security import get_password_hash
+from app.db.base import Base, SessionLocal, engine
+from app.models.fiscal import TPVSale
+from app.models.sales_daily_rollup import SalesDailyRollup
+from app.models.user import User
+from services.analytics_service import build_analytics_summary
+from services.fiscal_engine import build_fiscal_items_from_cart, persist_fiscal_sale
+from services.sales_rollup_service import apply_sale, period_totals, rebuild_rollups, vat_band
+
+
+@pytest.fixture()
+def db_user():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    u = User(
+        email=f"rollup_{uuid.uuid4().hex[:8]}@example.test",
+        hashed_password=get_password_hash("TestPass1"),
+        full_name="Rollup Tester",
+        is_active=True,
+    )
+    db.add(u)
+    db.commit()
+    db.refresh(u)
+    try:
+        yield db, u
+    finally:
+        db.close()
+
+
+def _sell(db, user, cart, payment_method="cash", customer_data=None):
+    items = build_fiscal_items_from_cart(cart)
+    return persist_fiscal_sale(
+        db,
+        user_id=user.id,
+        ticket_id=f"T-{uuid.uuid4().hex[:8]}",
+        document_type="ticket",
+        payment_method=payment_method,
+        fiscal_items=items,
+        customer_data=customer_data,
+    )
+
+
+def _snapshot(db, user_id):
+    rows = db.query(SalesDailyRollup).filter(SalesDailyRollup.user_id == user_id).all()
+    return sorted(
+        (r.day, r.channel, r.payment_method, r.vat_band, r.sales_count, r.lines_count, float(r.total_amount))
+        for r in rows
+    )
+
+
+def test_vat_band_labels():
+    assert vat_band(0.21) == "21"
+    assert vat_band("0.10") == "10"
+    assert vat_band(0) == "0"
+
+
+def test_incremental_rollup_matches_rebuild(db_user):
+    db, user = db_user
+    _sell(db, user, [{"price": 10, "quantity": 2, "iva_rate": 21}, {"price": 5, "quantity": 1, "iva_rate": 10}])
+    _sell(db, user, [{"price": 3, "quantity": 1, "iva_rate": 21}], payment_method="card")
+    _sell(db, user, [{"price": 100, "quantity": 1, "iva_rate": 21}], customer_data={"source": "office_crm"})
+
+    since = datetime.now(timezone.utc).date() - timedelta(days=1)
+    count, total = period_totals(db, since_day=since, user_id=user.id)
+    assert count == 3
+    assert total == pytest.approx(24.2 + 5.5 + 3.63 + 121.0)
+
+    incremental = _snapshot(db, user.id)
+    rebuild_rollups(db, user_id=user.id)
+    assert _snapshot(db, user.id) == incremental
+
+
+def test_analytics_summary_reads_rollups(db_user):
+    db, user = db_user
+    _sell(db, user, [{"price": 10, "quantity": 1, "iva_rate": 21}])
+    _sell(db, user, [{"price": 20, "quantity": 1, "iva_rate": 21}], customer_data={"source": "office_crm"})
+
+    summary = build_analytics_summary(db, user, days=7)
+    fin = summary["financial"]
+    assert fin["sales_count"] == 2
+    assert fin["total_revenue"] == pytest.approx(36.3)
+    assert fin["cmr_payments_count"] == 1 and fin["tpv_sales_count"] == 1
+    assert sum(d["total"] for d in summary["sales_by_day"]) == pytest.approx(36.3)
+    assert summary["customers"] == {"active_total": 0, "with_email": 0}
+
+
+def test_backdated_sale_without_lines_matches_rebuild(db_user):
+    db, user = db_user
+    sold_at = datetime(2024, 3, 1, 23, 30, tzinfo=timezone.utc)
+    db.add(
+        TPVSale(
+            user_id=user.id,
+            ticket_id=f"T-{uuid.uuid4().hex[:8]}",
+            document_type="ticket",
+            payment_method="cash",
+            subtotal=0,
+            tax_amount=0,
+            total=0,
+            sale_date=sold_at,
+        )
+    )
+    db.flush()
+    apply_sale(db, user_id=user.id, company_id=None, payment_method="cash", fiscal_items=[], sale_date=sold_at)
+    db.commit()
+
+    incremental = _snapshot(db, user.id)
+    assert incremental == [(date(2024, 3, 1), "tpv", "cash", "0", 1, 0, 0.0)]
+    rebuild_rollups(db, user_id=user.id)
+    assert _snapshot(db, user.id) == incremental
@@ -0,0 +1,84 @@
+"""Tests arranque de esquema: huella versionada, lock de líder e informe de tiempos."""
+
+from __future__ import annotations
+
+import pytest  # pyright: ignore[reportMissingImports]
+
+from app.db import base
+from app.db import schema_bootstrap as sb
+
+
+def test_leader_applies_once_then_workers_only_verify(monkeypatch):
+    first = sb.bootstrap_schema(force=True)
+    assert first["role"] == "leader"
+    assert first["applied"] is True
+    assert "_migrate_user_columns" in first["patches"]
+    for phase in ("fingerprint", "lock_wait", "schema_patches", "create_all"):
+        assert phase in first["phases"]
+
+    def _boom():
+        raise AssertionError("un worker con huella al día no debe aplicar parches")
+
+    monkeypatch.setattr(sb, "create_tables", _boom)
+    second = sb.bootstrap_schema()
+    assert second["role"] == "verified"
+    assert "apply" not in second["phases"]
+    assert sb.last_bootstrap_report()["role"] == "verified"
+
+
+def test_fingerprint_tracks_models_and_version(monkeypatch):
+    base = sb.schema_fingerprint()
+    assert base == sb.schema_fingerprint()
+    monkeypatch.setattr(sb, "SCHEMA_BOOTSTRAP_VERSION", sb.SCHEMA_BOOTSTRAP_VERSION + 1)
+    assert sb.schema_fingerprint() != base
+
+
+def test_stale_fingerprint_triggers_single_leader(monkeypatch):
+    sb.bootstrap_schema(force=True)
+    calls = []
+    monkeypatch.setattr(sb, "SCHEMA_BOOTSTRAP_VERSION", sb.SCHEMA_BOOTSTRAP_VERSION + 1)
+    fake = {"patches": {}, "errors": {}, "schema_patches_ms": 0.0, "create_all_ms": 0.0}
+    monkeypatch.setattr(sb, "create_tables", lambda: calls.append(1) or dict(fake))
+    assert sb.bootstrap_schema()["role"] == "leader"
+    assert sb.bootstrap_schema()["role"] == "verified"
+    assert calls == [1]
+    monkeypatch.undo()
+    assert sb.bootstrap_schema()["role"] == "leader"  # restaurar huella real
+
+
+def test_leader_lock_is_exclusive():
+    if sb.engine.dialect.name != "sqlite":
+        pytest.skip("lock por fichero solo en SQLite")
+    with sb.leader_lock(1.0) as first:
+        assert first is True
+        with sb.leader_lock(0.0) as second:
+            assert second is False
+    with sb.leader_lock(0.0) as again:
+        assert again is True
+
+
+def test_leader_failure_is_not_reapplied_without_lock(monkeypatch):
+    calls = []
+
+    def _fail():
+        calls.append(1)
+        raise RuntimeError("parche roto")
+
+    monkeypatch.setattr(sb, "create_tables", _fail)
+    with pytest.raises(RuntimeError, match="parche roto"):
+        sb.bootstrap_schema(force=True)
+    assert calls == [1]
+
+
+def test_failed_patch_is_reported_and_not_fingerprinted(monkeypatch):
+    sb.bootstrap_schema(force=True)
+    monkeypatch.setattr(sb, "SCHEMA_BOOTSTRAP_VERSION", sb.SCHEMA_BOOTSTRAP_VERSION + 1)
+    monkeypatch.setattr(base, "AGENDA_INDEXES", (("crm_leads", "ix_crm_leads_broken", "no_such_column"),))
+    monkeypatch.setattr(base, "_schema_patch_steps", lambda: (base._migrate_agenda_indexes,))
+    report = sb.bootstrap_schema()
+    assert report["role"] == "leader"
+    assert "_migrate_agenda_indexes" in report["errors"]
+    assert sb._read_fingerprint() != sb.schema_fingerprint()
+    assert sb.bootstrap_schema()["role"] == "leader"  # sin huella: se reintenta
+    monkeypatch.undo()
+    assert sb.bootstrap_schema()["role"] == "verified"  # la huella anterior sigue intacta
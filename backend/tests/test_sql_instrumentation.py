@@ -0,0 +1,120 @@
+"""Tests instrumentación SQL: huellas, detección N+1, Server-Timing y presupuesto por ruta."""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import pytest  # pyright: ignore[reportMissingImports]
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.jwt_auth import create_access_token
+from app.core.security import get_password_hash
+from app.db import sql_instrumentation as sqli
+from app.db.base import Base, SessionLocal, engine
+from app.main import app
+from app.models.fiscal import TPVSale, TPVSaleItem
+from app.models.user import User
+
+SALES = 12
+
+
+@pytest.fixture()
+def seller():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    suf = uuid.uuid4().hex[:8]
+    user = User(
+        email=f"sql_{suf}@example.test",
+        hashed_password=get_password_hash("TestPass1"),
+        full_name="SQL Budget",
+        is_active=True,
+    )
+    db.add(user)
+    db.flush()
+    for i in range(SALES):
+        sale = TPVSale(
+            user_id=user.id,
+            ticket_id=f"SQL-{suf}-{i}",
+            document_type="ticket",
+            sale_date=datetime(2025, 2, 1 + i),
+            payment_method="card",
+            subtotal=Decimal("10.00"),
+            tax_amount=Decimal("2.10"),
+            total=Decimal("12.10"),
+        )
+        sale.items = [
+            TPVSaleItem(
+                product_id=f"P{j}",
+                product_name=f"Producto {j}",
+                quantity=Decimal("1"),
+                unit_price=Decimal("5.00"),
+                tax_rate_snapshot=Decimal("0.21"),
+                tax_amount=Decimal("1.05"),
+                base_amount=Decimal("5.00"),
+            )
+            for j in range(2)
+        ]
+        db.add(sale)
+    db.commit()
+    db.refresh(user)
+    token = create_access_token(user_id=str(user.id), email=user.email)
+    try:
+        yield db, {"Authorization": f"Bearer {token}"}
+    finally:
+        db.close()
+
+
+def test_fingerprint_collapses_literals_and_in_lists():
+    a = sqli.fingerprint("SELECT * FROM t WHERE id IN (?, ?, ?) AND name = 'x'  LIMIT 10")
+    b = sqli.fingerprint("SELECT * FROM t\nWHERE id IN (%(id_1)s, %(id_2)s) AND name = 'y' LIMIT 50")
+    assert a == b == "SELECT * FROM t WHERE id IN (?+) AND name = ? LIMIT ?"
+    assert sqli.fingerprint("SELECT x::text FROM t") == "SELECT x::text FROM t"
+
+
+def test_capture_queries_flags_repeated_shapes(seller):
+    db, _ = seller
+    ids = [s.id for s in db.query(TPVSale.id).order_by(TPVSale.id.desc()).limit(SALES)]
+    db.expire_all()
+    with sqli.capture_queries() as stats:
+        for sale_id in ids:
+            db.get(TPVSale, sale_id).items  # noqa: B018 — carga perezosa: N+1 deliberado
+    assert stats.queries == 2 * SALES
+    shapes = dict(stats.repeated(threshold=SALES))
+    assert len(shapes) == 2 and set(shapes.values()) == {SALES}
+    assert any("FROM tpv_sale_items" in shape for shape in shapes)
+
+
+def test_quarterly_vat_query_budget(seller, max_queries, monkeypatch):
+    _, headers = seller
+    sqli.reset_sql_metrics()
+    client = TestClient(app)
+    resp = client.get("/api/v1/tpv/fiscal/quarterly-vat", params={"year": 2025, "quarter": 1}, headers=headers)
+    assert resp.status_code == 200 and resp.json()["base_21"] == pytest.approx(SALES * 10.0)
+    # Ventas + líneas con selectinload: no crece con el número de ventas
+    max_queries(resp, 4)
+
+    routes = {r["route"]: r for r in sqli.sql_metrics_snapshot()["routes"]}
+    entry = routes["GET /api/v1/tpv/fiscal/quarterly-vat"]
+    assert entry["sampled_requests"] == 1 and entry["n_plus_one_requests"] == 0
+
+    monkeypatch.setattr(settings, "SQL_INSTRUMENTATION_SAMPLE_RATE", 0.0)
+    resp = client.get("/api/v1/tpv/fiscal/quarterly-vat", params={"year": 2025, "quarter": 1}, headers=headers)
+    assert "server-timing" not in resp.headers
+
+
+def test_server_timing_header_is_opt_in(seller, monkeypatch):
+    _, headers = seller
+    monkeypatch.setattr(settings, "SQL_INSTRUMENTATION_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "SQL_SERVER_TIMING_HEADER", False)
+    sqli.reset_sql_metrics()
+    resp = TestClient(app).get(
+        "/api/v1/tpv/fiscal/quarterly-vat", params={"year": 2025, "quarter": 1}, headers=headers
+    )
+    assert resp.status_code == 200
+    assert "server-timing" not in resp.headers
+    # La métrica se sigue registrando para /metrics/sql aunque el cliente no la vea
+    routes = {r["route"] for r in sqli.sql_metrics_snapshot()["routes"]}
+    assert "GET /api/v1/tpv/fiscal/quarterly-vat" in routes
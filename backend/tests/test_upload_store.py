@@ -0,0 +1,138 @@
+"""Tests almacén de subidas por contenido: streaming con límite, dedupe, refcount y GC."""
+
+from __future__ import annotations
+
+import io
+import uuid
+
+import pytest  # pyright: ignore[reportMissingImports]
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.jwt_auth import create_access_token
+from app.core.security import get_password_hash
+from app.db.base import Base, SessionLocal, engine
+from app.main import app
+from app.models.stored_blob import StoredBlob, StoredBlobRef
+from app.models.user import User
+from services import upload_store
+
+PNG = b"\x89PNG\r\n\x1a\n" + uuid.uuid4().bytes * 64
+
+
+def _user(db, tag: str) -> User:
+    user = User(
+        email=f"up_{tag}_{uuid.uuid4().hex[:8]}@example.test",
+        hashed_password=get_password_hash("TestPass1"),
+        full_name="Upload Tester",
+        is_active=True,
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+@pytest.fixture()
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STATIC_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "UPLOAD_STORE_BACKEND", "local")
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        yield db, tmp_path
+    finally:
+        db.close()
+
+
+def _cas_files(root):
+    return [p for p in (root / "uploads" / "cas").rglob("*") if p.is_file()]
+
+
+def test_spool_enforces_limit_while_streaming(store):
+    _, root = store
+    with pytest.raises(HTTPException) as exc:
+        upload_store.spool_to_temp(io.BytesIO(b"x" * (upload_store.CHUNK_BYTES + 10)), upload_store.CHUNK_BYTES)
+    assert exc.value.status_code == 413
+    assert not list((root / "uploads" / ".tmp").iterdir())
+
+    tmp, sha, size = upload_store.spool_to_temp(io.BytesIO(PNG), 10 * 1024)
+    assert size == len(PNG)
+    assert len(sha) == 64 and tmp.read_bytes() == PNG
+    tmp.unlink()
+
+
+def test_product_image_upload_dedupes_by_content(store):
+    db, root = store
+    first_user, second_user = _user(db, "a"), _user(db, "b")
+    client = TestClient(app)
+    url = f"{settings.API_V1_STR}/tpv/products/upload-image"
+
+    def _post(user):
+        token = create_access_token(user_id=str(user.id), email=user.email)
+        return client.post(
+            url,
+            files={"image": ("logo.png", PNG, "image/png")},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+    r1, r2, r3 = _post(first_user), _post(first_user), _post(second_user)
+    assert r1.status_code == 200, r1.text
+    b1, b2, b3 = r1.json(), r2.json(), r3.json()
+    assert b1["deduplicated"] is False
+    assert b2["deduplicated"] is True and b3["deduplicated"] is True
+    assert b1["url"] == b2["url"] == b3["url"]
+    assert b1["url"].startswith(f"{settings.STATIC_URL}/uploads/cas/")
+    assert len(_cas_files(root)) == 1
+
+    db.expire_all()
+    blob = db.get(StoredBlob, b1["sha256"])
+    assert blob.refcount == 2  # una referencia por usuario, no por subida
+
+
+def test_refs_and_garbage_collection(store):
+    db, root = store
+    user = _user(db, "gc")
+    tmp, sha, size = upload_store.spool_to_temp(io.BytesIO(PNG + b"gc"), 10 * 1024)
+    blob, dedup = upload_store._commit_upload(db, tmp, sha, size, "image/png", "workspace_upload:imagenes", user.id, user.id)
+    assert dedup is False
+    url = upload_store.blob_url(blob)
+    assert upload_store.sha_from_url(url) == sha
+
+    assert upload_store.link_url(db, url, owner_type="tpv_product", owner_id="p1", user_id=user.id)
+    assert not upload_store.link_url(db, "https://cdn.example/x.png", owner_type="tpv_product", owner_id="p1")
+    db.commit()
+    db.refresh(blob)
+    # El producto sustituye a la referencia provisional de la subida.
+    assert blob.refcount == 1
+    refs = db.query(StoredBlobRef.owner_type).filter(StoredBlobRef.sha256 == sha).all()
+    assert [r.owner_type for r in refs] == ["tpv_product"]
+
+    upload_store.collect_garbage(db, grace_sec=0)
+    assert db.get(StoredBlob, sha) is not None
+    upload_store.unlink_url(db, url, owner_type="tpv_product", owner_id="p1")
+    db.commit()
+    assert db.query(StoredBlobRef).filter(StoredBlobRef.sha256 == sha).count() == 0
+
+    assert upload_store.collect_garbage(db, grace_sec=0)["deleted"] >= 1
+    db.expire_all()
+    assert db.get(StoredBlob, sha) is None
+    assert not upload_store.local_path(blob.object_key).exists()
+
+
+def test_unlinked_upload_ref_expires_and_keys_keep_extension(store):
+    db, _ = store
+    user = _user(db, "exp")
+    tmp, sha, size = upload_store.spool_to_temp(io.BytesIO(PNG + b"exp"), 10 * 1024)
+    blob, _ = upload_store._commit_upload(db, tmp, sha, size, "video/webm", "workspace_upload:videos", user.id, user.id)
+    assert blob.object_key.endswith(".webm")
+    assert upload_store.object_key(sha, "application/json").endswith(".json")
+
+    upload_store.collect_garbage(db, grace_sec=3600)
+    db.expire_all()
+    assert db.get(StoredBlob, sha).refcount == 1
+    assert upload_store.collect_garbage(db, grace_sec=0)["expired_refs"] >= 1
+    upload_store.collect_garbage(db, grace_sec=0)
+    db.expire_all()
+    assert db.get(StoredBlob, sha) is None
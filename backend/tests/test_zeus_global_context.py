@@ -0,0 +1,81 @@
+"""Tests snapshot de contexto global ZEUS: agregados COUNT, caché TTL e invalidación por eventos."""
+
+from __future__ import annotations
+
+import uuid
+
+import pytest  # pyright: ignore[reportMissingImports]
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.db.base import Base, SessionLocal, engine
+from app.models.company import Company, UserCompany
+from app.models.customer import Customer
+from app.models.user import User
+from app.schemas.customer import CustomerCreate
+import services.crm_office_service as crm_svc
+from services.zeus_global_context import build_global_context, invalidate_global_context
+
+
+@pytest.fixture()
+def db(monkeypatch):
+    monkeypatch.setattr(settings, "ZEUS_GLOBAL_CONTEXT_TTL_SEC", 300.0)
+    invalidate_global_context()
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        invalidate_global_context()
+
+
+def _seed(db: Session):
+    suf = uuid.uuid4().hex[:8]
+    user = User(
+        email=f"gctx_{suf}@example.test",
+        hashed_password=get_password_hash("TestPass1"),
+        full_name="Context Tester",
+        is_active=True,
+    )
+    company = Company(company_name=f"Ctx Co {suf}", slug=f"ctx-{suf}")
+    db.add_all([user, company])
+    db.flush()
+    db.add(UserCompany(user_id=user.id, company_id=company.id, role="owner"))
+    db.add_all(
+        [
+            Customer(name="Con email", email=f"a_{suf}@test.com", company_id=company.id, owner_user_id=user.id),
+            Customer(name="Sin email", email="  ", company_id=company.id, owner_user_id=user.id),
+        ]
+    )
+    db.commit()
+    db.refresh(user)
+    return user, company
+
+
+def test_context_counts_customers(db: Session):
+    user, company = _seed(db)
+    gc = build_global_context(db, user)
+    assert gc["company_id"] == company.id
+    assert gc["active_customers"] == {"total": 2, "with_email": 1}
+    assert gc["active_session"] is None
+
+
+def test_context_cached_until_client_event(db: Session):
+    user, company = _seed(db)
+    assert build_global_context(db, user)["active_customers"]["total"] == 2
+
+    db.add(Customer(name="Sin evento", company_id=company.id, owner_user_id=user.id))
+    db.commit()
+    assert build_global_context(db, user)["active_customers"]["total"] == 2
+
+    crm_svc.create_customer(db, user, CustomerCreate(name="Con evento", email=f"e_{uuid.uuid4().hex[:6]}@test.com"))
+    assert build_global_context(db, user)["active_customers"] == {"total": 4, "with_email": 2}
+
+
+def test_context_copies_are_independent(db: Session):
+    user, _ = _seed(db)
+    first = build_global_context(db, user)
+    first["active_customers"]["total"] = -1
+    assert build_global_context(db, user)["active_customers"]["total"] == 2
@@ -44,7 +44,7 @@ def test_probe_sendgrid_ok():
         mock_resp = MagicMock()
         mock_resp.status_code = 200
         mock_resp.json.return_value = {"scopes": ["mail.send"]}
-        with patch("services.zeus_integrations_e2e_v1.requests.get", return_value=mock_resp):
+        with patch("services.zeus_integrations_e2e_v1.http_client.get", return_value=mock_resp):
             result = _probe_sendgrid_sync()
     assert result["ok"] is True
 
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import os
 import uuid
 from concurrent.futures import ThreadPoolExecutor
 
@@ -16,7 +17,7 @@ from app.models.company import Company, UserCompany
 from app.models.user import User
 from services.event_bus import emit_cashflow_updated
 from services.user_service_v1 import secure_deactivate
-from services.zeus_bypass_scanner_v1 import run_full_audit, scan_codebase
+from services.zeus_bypass_scanner_v1 import run_full_audit, scan_codebase, scan_endpoints
 from services.zeus_core_guard_v1 import ZeusGuardViolation, closure_active, guard_enforce
 from services.zeus_runtime_guard_v1 import attach_runtime_guard, detach_runtime_guard
 
@@ -76,6 +77,40 @@ def test_full_audit_includes_endpoints():
     assert "code_scan" in audit
     assert "endpoint_scan" in audit
     assert audit["endpoint_scan"]["endpoints_scanned"] > 0
+    assert 0.0 <= audit["scan_performance"]["cache_hit_rate"] <= 1.0
+
+
+def test_scanner_cache_rescans_only_changed_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("ZEUS_BYPASS_SCAN_CACHE", str(tmp_path / "cache.json"))
+    cold = scan_codebase()
+    warm = scan_codebase()
+    assert warm.stats["cache_hit_rate"] == 1.0 and warm.stats["rescanned"] == 0
+    assert [v.line for v in warm.violations] == [v.line for v in cold.violations]
+    assert warm.summary == cold.summary == scan_codebase(use_cache=False).summary
+
+    routes = tmp_path / "routes"
+    routes.mkdir()
+    src = "@router.get('/a')\ndef a():\n    return 1\n"
+    (routes / "a.py").write_text(src, encoding="utf-8")
+    (routes / "b.py").write_text(src, encoding="utf-8")
+    assert scan_endpoints(routes)["stats"]["cache_hits"] == 0
+    os.utime(routes / "a.py", ns=(1, 1))  # mismo contenido, otro mtime → acierto por sha256
+    (routes / "b.py").write_text(src + "@router.post('/b')\ndef b():\n    return 2\n", encoding="utf-8")
+    again = scan_endpoints(routes)
+    assert again["stats"]["cache_hits"] == 1 and again["stats"]["rescanned"] == 1
+    assert again["endpoints_scanned"] == 3
+
+
+def test_scanner_process_pool_matches_sequential(monkeypatch):
+    from services import zeus_bypass_scanner_v1 as scanner
+
+    files = [p for p in scanner._iter_py_files(scanner.BACKEND_ROOT / "services") if not scanner._is_allowed(p)][:8]
+    sequential, _ = scanner._run_jobs("code", files)
+    monkeypatch.setattr(scanner, "PARALLEL_MIN_FILES", 1)
+    monkeypatch.setattr(scanner.os, "cpu_count", lambda: 2)
+    parallel, workers = scanner._run_jobs("code", files)
+    assert workers == 2
+    assert parallel == sequential
 
 
 def test_attack_superuser_block_via_service(db: Session, monkeypatch):
@@ -157,3 +192,49 @@ def test_closure_flags_independent():
     assert guard_enforce() == (
         settings.ZEUS_TOTAL_SYSTEM_CLOSURE_ENABLED and settings.ZEUS_CORE_GUARD_ENFORCE
     )
+
+
+def test_runtime_guard_observe_mode_writes_audit_row(db: Session, monkeypatch):
+    from app.models.zeus_closure_audit import ZeusClosureAudit
+
+    monkeypatch.setattr(settings, "ZEUS_TOTAL_SYSTEM_CLOSURE_ENABLED", True)
+    monkeypatch.setattr(settings, "ZEUS_CORE_GUARD_ENFORCE", False)
+    detach_runtime_guard()
+    attach_runtime_guard()
+    try:
+        su = _seed_superuser(db)
+        su.is_active = False
+        db.commit()
+        row = (
+            db.query(ZeusClosureAudit)
+            .filter(ZeusClosureAudit.action == "user_deactivate_bypass", ZeusClosureAudit.target_id == str(su.id))
+            .one()
+        )
+        assert row.result == "observed" and row.layer == "runtime"
+    finally:
+        detach_runtime_guard()
+
+
+def test_runtime_guard_ignores_unrelated_updates(db: Session, monkeypatch):
+    from services import zeus_runtime_guard_v1 as rg
+
+    monkeypatch.setattr(settings, "ZEUS_TOTAL_SYSTEM_CLOSURE_ENABLED", True)
+    monkeypatch.setattr(settings, "ZEUS_CORE_GUARD_ENFORCE", True)
+    calls = []
+    monkeypatch.setattr(rg, "closure_active", lambda: calls.append(1) or True)
+    detach_runtime_guard()
+    attach_runtime_guard()
+    try:
+        su = _seed_superuser(db)
+        _, company = _seed_normal(db)
+        company.company_name = company.company_name + " bis"
+        su.full_name = "Renamed"
+        db.commit()
+        assert calls == []
+
+        db.delete(su)
+        with pytest.raises(ZeusGuardViolation):
+            db.commit()
+        db.rollback()
+    finally:
+        detach_runtime_guard()
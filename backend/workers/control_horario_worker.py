@@ -0,0 +1,71 @@
+"""Control horario background worker — alertas ROCE y coste parcial de sesiones activas."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+_worker_thread: threading.Thread | None = None
+_worker_running = False
+_last_run_at: float = 0.0
+_last_result: dict = {}
+
+
+def _interval_sec() -> int:
+    return max(30, int(getattr(settings, "CONTROL_HORARIO_WORKER_INTERVAL_SEC", 300) or 300))
+
+
+def _worker_loop() -> None:
+    global _worker_running, _last_run_at, _last_result
+    interval = _interval_sec()
+    logger.info("[CONTROL_HORARIO_WORKER] started interval=%ss", interval)
+    # Primer ciclo poco después del arranque (no en el propio startup).
+    time.sleep(min(60, interval))
+    while _worker_running:
+        db = SessionLocal()
+        try:
+            from services.control_horario_bootstrap import run_control_horario_cycle
+
+            _last_result = run_control_horario_cycle(db)
+            _last_run_at = time.time()
+            if _last_result.get("alerts"):
+                logger.info("[CONTROL_HORARIO_WORKER] cycle %s", _last_result)
+        except Exception:
+            logger.exception("[CONTROL_HORARIO_WORKER] cycle failed")
+            db.rollback()
+        finally:
+            db.close()
+        time.sleep(interval)
+    logger.info("[CONTROL_HORARIO_WORKER] stopped")
+
+
+def start_control_horario_worker() -> None:
+    global _worker_thread, _worker_running
+    if not getattr(settings, "CONTROL_HORARIO_WORKER_ENABLED", True):
+        logger.info("[CONTROL_HORARIO_WORKER] skipped (CONTROL_HORARIO_WORKER_ENABLED=false)")
+        return
+    if _worker_thread and _worker_thread.is_alive():
+        return
+    _worker_running = True
+    _worker_thread = threading.Thread(target=_worker_loop, daemon=True, name="control-horario-worker")
+    _worker_thread.start()
+
+
+def stop_control_horario_worker() -> None:
+    global _worker_running
+    _worker_running = False
+
+
+def worker_status() -> dict:
+    return {
+        "running": bool(_worker_thread and _worker_thread.is_alive()),
+        "interval_sec": _interval_sec(),
+        "last_run_at": _last_run_at,
+        "last_result": _last_result,
+    }
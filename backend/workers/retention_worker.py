@@ -0,0 +1,70 @@
+"""Retention background worker — archiva y poda las tablas de auditoría frías."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+_worker_thread: threading.Thread | None = None
+_worker_running = False
+_last_run_at: float = 0.0
+_last_result: dict = {}
+
+
+def _interval_sec() -> int:
+    return max(300, int(getattr(settings, "RETENTION_INTERVAL_SEC", 21600) or 21600))
+
+
+def _worker_loop() -> None:
+    global _worker_running, _last_run_at, _last_result
+    interval = _interval_sec()
+    logger.info("[RETENTION_WORKER] started interval=%ss", interval)
+    # Primer ciclo poco después del arranque (no en el propio startup).
+    time.sleep(min(120, interval))
+    while _worker_running:
+        db = SessionLocal()
+        try:
+            from services.data_retention_service import run_retention
+
+            _last_result = run_retention(db)
+            _last_run_at = time.time()
+        except Exception:
+            logger.exception("[RETENTION_WORKER] cycle failed")
+            db.rollback()
+        finally:
+            db.close()
+        time.sleep(interval)
+    logger.info("[RETENTION_WORKER] stopped")
+
+
+def start_retention_worker() -> None:
+    global _worker_thread, _worker_running
+    if not getattr(settings, "RETENTION_ENABLED", False):
+        logger.info("[RETENTION_WORKER] skipped (RETENTION_ENABLED=false)")
+        return
+    if _worker_thread and _worker_thread.is_alive():
+        return
+    _worker_running = True
+    _worker_thread = threading.Thread(target=_worker_loop, daemon=True, name="retention-worker")
+    _worker_thread.start()
+
+
+def stop_retention_worker() -> None:
+    global _worker_running
+    _worker_running = False
+
+
+def worker_status() -> dict:
+    return {
+        "running": bool(_worker_thread and _worker_thread.is_alive()),
+        "enabled": bool(getattr(settings, "RETENTION_ENABLED", False)),
+        "interval_sec": _interval_sec(),
+        "last_run_at": _last_run_at,
+        "last_result": _last_result,
+    }